@@ -0,0 +1,40 @@
+#!/usr/bin/env python
+
+from os.path import join, realpath
+import sys
+sys.path.insert(0, realpath(join(__file__, "../../")))
+
+import argparse
+import asyncio
+import logging
+
+import conf
+from wings.order_book_server import OrderBookServer
+from wings.order_book_tracker import OrderBookTrackerDataSourceType
+from wings.tracker.binance_order_book_tracker import BinanceOrderBookTracker
+
+
+def main():
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(
+        description="Tracks the Binance order books, and serves them to the bots on this host."
+    )
+    parser.add_argument("--address", default=conf.order_book_server_address,
+                        help="Unix socket path, or host:port TCP address to serve the order books at.")
+    parser.add_argument("--snapshot-depth", type=int, default=None,
+                        help="Number of price levels of each side in the order book snapshots sent to clients.")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    ev_loop: asyncio.AbstractEventLoop = asyncio.get_event_loop()
+    tracker: BinanceOrderBookTracker = BinanceOrderBookTracker(
+        data_source_type=OrderBookTrackerDataSourceType.EXCHANGE_API
+    )
+    server: OrderBookServer = OrderBookServer(tracker, args.address, snapshot_depth=args.snapshot_depth)
+    try:
+        ev_loop.run_until_complete(server.start())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
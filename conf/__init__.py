@@ -49,6 +49,10 @@ web3_test_private_key_c = "***REMOVED***"
 coinalpha_order_book_api_username = "***REMOVED***"
 coinalpha_order_book_api_password = "***REMOVED***"
 
+# Order book server, for the ORDER_BOOK_SERVER order book tracker data source. Either a Unix socket path, or a
+# "host:port" TCP address.
+order_book_server_address = os.getenv("ORDER_BOOK_SERVER_ADDRESS", "/tmp/hummingbot_order_books.sock")
+
 kafka_2 = {
     "bootstrap_servers": "***REMOVED***",
     "zookeeper_servers":  "***REMOVED***"
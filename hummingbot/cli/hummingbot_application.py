@@ -563,6 +563,7 @@ class HummingbotApplication:
 
     async def stop(self, skip_order_cancellation: bool = False):
         self.app.log("\nWinding down...")
+        markets: List[MarketBase] = list(self.markets.values())
         if not skip_order_cancellation:
             success = await self._cancel_outstanding_orders()
             if success:
@@ -572,6 +573,9 @@ class HummingbotApplication:
             self.reporting_module.stop()
         if self.strategy_task is not None and not self.strategy_task.cancelled():
             self.strategy_task.cancel()
+        # Release the markets' shared order book trackers - the markets are created again on the next start.
+        for market in markets:
+            market.stop(self.clock)
         self.wallet = None
         self.strategy_task = None
         self.strategy = None
@@ -19,6 +19,7 @@ from wings.events import (
     TradeType
 )
 from wings.event_listener cimport EventListener
+from wings.fixed_point cimport c_get_quantizer
 from wings.limit_order cimport LimitOrder
 from wings.limit_order import LimitOrder
 from wings.market_base import (
@@ -756,7 +757,7 @@ cdef class CrossExchangeMarketMakingStrategy(Strategy):
                 market_pair.maker_symbol,
                 top_bid_price
             )
-            next_price = (round(Decimal(top_bid_price) / price_quantum) + 1) * price_quantum
+            next_price = c_get_quantizer(price_quantum).c_quantize(top_bid_price, 1)
             maker_balance_size_limit = maker_market.c_get_balance(market_pair.maker_quote_currency) / float(next_price)
             taker_balance_size_limit = (taker_market.c_get_balance(market_pair.taker_base_currency) *
                                         self._order_size_taker_balance_factor)
@@ -774,7 +775,7 @@ cdef class CrossExchangeMarketMakingStrategy(Strategy):
                 market_pair.maker_symbol,
                 top_ask_price
             )
-            next_price = (round(Decimal(top_ask_price) / price_quantum) - 1) * price_quantum
+            next_price = c_get_quantizer(price_quantum).c_quantize(top_ask_price, -1)
             maker_balance_size_limit = maker_market.c_get_balance(market_pair.maker_base_currency)
             taker_balance_size_limit = (taker_market.c_get_balance(market_pair.taker_quote_currency) /
                                         float(next_price) *
@@ -799,10 +800,22 @@ cdef class CrossExchangeMarketMakingStrategy(Strategy):
             double quantity_sum = 0
             double order_row_price = 0
             double order_row_amount = 0
+            bint is_taker_buy = not is_maker_bid
 
         if maker_order_size <= 0:
             raise ValueError(f"Maker order size ({maker_order_size}) must be greater than 0.")
 
+        # Look up the last price level needed and the cumulative volumes up to it in the taker order book's depth
+        # index, and take off the part of the last level that isn't needed.
+        try:
+            order_row_price = taker_order_book.c_get_price_for_volume(is_taker_buy, maker_order_size)
+            quantity_sum = taker_order_book.c_get_volume_for_price(is_taker_buy, order_row_price)
+            price_quantity_product_sum = taker_order_book.c_get_quote_volume_for_price(is_taker_buy, order_row_price)
+            return (price_quantity_product_sum - (quantity_sum - maker_order_size) * order_row_price) / maker_order_size
+        except EnvironmentError:
+            # The taker order book isn't deep enough - fall back to the average price over all of its levels.
+            price_quantity_product_sum = quantity_sum = 0
+
         iter_func = taker_order_book.bid_entries
         if not is_maker_bid:
             iter_func = taker_order_book.ask_entries
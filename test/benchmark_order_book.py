@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+
+from os.path import join, realpath
+import sys
+sys.path.insert(0, realpath(join(__file__, "../../")))
+
+import argparse
+import numpy as np
+import random
+import time
+import timeit
+from typing import (
+    Callable,
+    List,
+    Tuple
+)
+
+from wings.order_book import OrderBook
+from wings.order_book_row import OrderBookRow
+
+
+def generator_walk_price_for_volume(order_book: OrderBook, is_buy: bool, volume: float) -> float:
+    """
+    The level by level walk that OrderBook used before the cumulative volume index, kept as the baseline.
+    """
+    cumulative_volume = 0
+    for order_book_row in (order_book.ask_entries() if is_buy else order_book.bid_entries()):
+        cumulative_volume += order_book_row.amount
+        if cumulative_volume >= volume:
+            return order_book_row.price
+    raise EnvironmentError(f"Requested volume {volume} is beyond order book depth - no price quote is possible.")
+
+
+def generator_walk_vwap_for_volume(order_book: OrderBook, is_buy: bool, volume: float) -> float:
+    total_cost = 0
+    total_volume = 0
+    for order_book_row in (order_book.ask_entries() if is_buy else order_book.bid_entries()):
+        total_cost += order_book_row.amount * order_book_row.price
+        total_volume += order_book_row.amount
+        if total_volume >= volume:
+            return total_cost / total_volume
+    raise EnvironmentError(f"Requested volume {volume} is beyond order book depth - no price quote is possible.")
+
+
+def generator_walk_volume_for_price(order_book: OrderBook, is_buy: bool, price: float) -> float:
+    cumulative_volume = 0
+    for order_book_row in (order_book.ask_entries() if is_buy else order_book.bid_entries()):
+        if (order_book_row.price > price) if is_buy else (order_book_row.price < price):
+            return cumulative_volume
+        cumulative_volume += order_book_row.amount
+    return cumulative_volume
+
+
+def make_order_book(levels: int, seed: int = 42) -> OrderBook:
+    rng: random.Random = random.Random(seed)
+    bids: List[OrderBookRow] = [OrderBookRow(10000.0 - i * 0.01, rng.uniform(0.01, 2.0), 1) for i in range(levels)]
+    asks: List[OrderBookRow] = [OrderBookRow(10000.01 + i * 0.01, rng.uniform(0.01, 2.0), 1) for i in range(levels)]
+    order_book: OrderBook = OrderBook()
+    order_book.apply_snapshot(bids, asks, 1)
+    return order_book
+
+
+def make_diffs(levels: int, count: int, seed: int = 7) -> List[Tuple[List[OrderBookRow], List[OrderBookRow]]]:
+    rng: random.Random = random.Random(seed)
+    diffs: List[Tuple[List[OrderBookRow], List[OrderBookRow]]] = []
+    for update_id in range(2, count + 2):
+        bids = [OrderBookRow(10000.0 - rng.randint(0, levels) * 0.01, rng.choice([0.0, rng.uniform(0.01, 2.0)]),
+                             update_id)
+                for _ in range(10)]
+        asks = [OrderBookRow(10000.01 + rng.randint(0, levels) * 0.01, rng.choice([0.0, rng.uniform(0.01, 2.0)]),
+                             update_id)
+                for _ in range(10)]
+        diffs.append((bids, asks))
+    return diffs
+
+
+def time_apply_diffs(order_book: OrderBook, diffs: List[Tuple[List[OrderBookRow], List[OrderBookRow]]]) -> float:
+    start: float = time.perf_counter()
+    for update_id, (bids, asks) in enumerate(diffs, 2):
+        order_book.apply_diffs(bids, asks, update_id)
+    return (time.perf_counter() - start) / len(diffs)
+
+
+def time_apply_diffs_frozen(order_book: OrderBook,
+                            diffs: List[Tuple[List[OrderBookRow], List[OrderBookRow]]]) -> float:
+    """
+    Same as time_apply_diffs(), with a view of the order book frozen before every diff and kept alive through it, so
+    every diff first copies the price levels into the view.
+    """
+    start: float = time.perf_counter()
+    for update_id, (bids, asks) in enumerate(diffs, 2):
+        frozen_view = order_book.freeze()
+        order_book.apply_diffs(bids, asks, update_id)
+    del frozen_view
+    return (time.perf_counter() - start) / len(diffs)
+
+
+def time_per_call(func: Callable[[], float], number: int) -> float:
+    return min(timeit.repeat(func, number=number, repeat=3)) / number
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks order book depth queries and diff application.")
+    parser.add_argument("--levels", type=int, default=1000, help="Number of price levels on each side.")
+    parser.add_argument("--number", type=int, default=200, help="Number of calls per timing run.")
+    args = parser.parse_args()
+
+    order_book: OrderBook = make_order_book(args.levels)
+    total_ask_volume: float = order_book.get_volume_for_price(True, float("inf"))
+    deep_price: float = list(order_book.ask_entries())[-1].price
+
+    # Query the far end of the book, which is the worst case for the level by level walk.
+    volume: float = total_ask_volume * 0.99
+    benchmarks = [
+        ("get_price_for_volume",
+         lambda: generator_walk_price_for_volume(order_book, True, volume),
+         lambda: order_book.get_price_for_volume(True, volume)),
+        ("get_vwap_for_volume",
+         lambda: generator_walk_vwap_for_volume(order_book, True, volume),
+         lambda: order_book.get_vwap_for_volume(True, volume)),
+        ("get_volume_for_price",
+         lambda: generator_walk_volume_for_price(order_book, True, deep_price),
+         lambda: order_book.get_volume_for_price(True, deep_price)),
+    ]
+
+    print(f"Order book with {args.levels} levels per side.")
+    print(f"{'query':<24}{'generator walk (us)':>22}{'depth index (us)':>20}{'speedup':>10}")
+    for name, walk_func, index_func in benchmarks:
+        walk_result: float = walk_func()
+        index_result: float = index_func()
+        if abs(walk_result - index_result) > 1e-9 * max(abs(walk_result), 1.0):
+            raise AssertionError(f"{name} mismatch: generator walk = {walk_result}, depth index = {index_result}.")
+        walk_time: float = time_per_call(walk_func, args.number)
+        index_time: float = time_per_call(index_func, args.number)
+        print(f"{name:<24}{walk_time * 1e6:>22.2f}{index_time * 1e6:>20.2f}{walk_time / index_time:>9.1f}x")
+
+    curve_volumes: np.ndarray = np.linspace(total_ask_volume * 0.01, total_ask_volume * 0.99, 50)
+    loop_time: float = time_per_call(lambda: [(order_book.get_price_for_volume(True, v),
+                                               order_book.get_vwap_for_volume(True, v))
+                                              for v in curve_volumes], args.number)
+    curve_time: float = time_per_call(lambda: order_book.get_depth_curve(True, curve_volumes), args.number)
+    print()
+    print(f"{'depth curve, 50 volumes':<24}{'per volume calls (us)':>24}{'get_depth_curve (us)':>22}")
+    print(f"{'':<24}{loop_time * 1e6:>24.2f}{curve_time * 1e6:>22.2f}{loop_time / curve_time:>9.1f}x")
+
+    diffs: List[Tuple[List[OrderBookRow], List[OrderBookRow]]] = make_diffs(args.levels, 5000)
+    ladder_order_book: OrderBook = make_order_book(args.levels)
+    ladder_order_book.use_tick_ladder(0.01)
+    set_time: float = time_apply_diffs(make_order_book(args.levels), diffs)
+    ladder_time: float = time_apply_diffs(ladder_order_book, diffs)
+    print()
+    print(f"{'storage':<24}{'apply_diffs, 20 levels (us)':>30}")
+    print(f"{'std::set':<24}{set_time * 1e6:>30.2f}")
+    print(f"{'tick ladder':<24}{ladder_time * 1e6:>30.2f}")
+
+    # Freezing is free until the next diff, which copies the price levels into the live view.
+    freeze_diffs: List[Tuple[List[OrderBookRow], List[OrderBookRow]]] = diffs[:1000]
+    frozen_time: float = time_apply_diffs_frozen(make_order_book(args.levels), freeze_diffs)
+    snapshot_time: float = time_per_call(lambda: order_book.snapshot_arrays(), args.number)
+    print()
+    print(f"{'consistent state':<24}{'per diff (us)':>30}")
+    print(f"{'apply_diffs':<24}{set_time * 1e6:>30.2f}")
+    print(f"{'freeze, then apply_diffs':<24}{frozen_time * 1e6:>30.2f}")
+    print(f"{'snapshot_arrays':<24}{snapshot_time * 1e6:>30.2f}")
+
+
+if __name__ == "__main__":
+    main()
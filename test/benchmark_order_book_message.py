@@ -0,0 +1,178 @@
+#!/usr/bin/env python
+
+from os.path import join, realpath
+import sys
+sys.path.insert(0, realpath(join(__file__, "../../")))
+
+import argparse
+from collections import namedtuple
+import random
+import time
+import tracemalloc
+from typing import (
+    Callable,
+    Dict,
+    List,
+    Optional
+)
+import ujson
+
+from wings.order_book import OrderBook
+from wings.order_book_message import (
+    OrderBookMessage,
+    OrderBookMessageType
+)
+from wings.order_book_row import OrderBookRow
+
+
+class NamedTupleOrderBookMessage(namedtuple("_OrderBookMessage", "type, content, timestamp")):
+    """
+    The namedtuple based message that OrderBookMessage replaced, kept as the baseline.
+    """
+    @property
+    def update_id(self) -> int:
+        return self.content["update_id"]
+
+    @property
+    def asks(self) -> List[OrderBookRow]:
+        return [OrderBookRow(float(price), float(amount), self.update_id)
+                for price, amount, *trash in self.content["asks"]]
+
+    @property
+    def bids(self) -> List[OrderBookRow]:
+        return [OrderBookRow(float(price), float(amount), self.update_id)
+                for price, amount, *trash in self.content["bids"]]
+
+
+def load_recording(path: str) -> List[Dict[str, any]]:
+    """
+    Reads a recorded Binance diff depth stream - one raw websocket message per line, from either a single stream or a
+    combined stream.
+    """
+    events: List[Dict[str, any]] = []
+    with open(path) as fd:
+        for line in fd:
+            if len(line.strip()) < 1:
+                continue
+            event: Dict[str, any] = ujson.loads(line)
+            events.append(event.get("data", event))
+    return events
+
+
+def make_synthetic_stream(count: int, seed: int = 11) -> List[Dict[str, any]]:
+    """
+    Generates diff depth events in Binance's wire format, with string prices and amounts.
+    """
+    rng: random.Random = random.Random(seed)
+    events: List[Dict[str, any]] = []
+    update_id: int = 100
+    for i in range(count):
+        first_update_id: int = update_id + 1
+        update_id += rng.randint(1, 20)
+        events.append({
+            "e": "depthUpdate",
+            "E": 1550000000000 + i * 1000,
+            "s": "ETHUSDT",
+            "U": first_update_id,
+            "u": update_id,
+            "b": [[f"{100.0 - rng.randint(0, 500) * 0.01:.8f}", f"{rng.choice([0.0, rng.uniform(0.01, 50.0)]):.8f}", []]
+                  for _ in range(rng.randint(0, 20))],
+            "a": [[f"{100.01 + rng.randint(0, 500) * 0.01:.8f}", f"{rng.choice([0.0, rng.uniform(0.01, 50.0)]):.8f}", []]
+                  for _ in range(rng.randint(0, 20))]
+        })
+    return events
+
+
+def make_messages(message_class: type, events: List[Dict[str, any]]) -> List[OrderBookMessage]:
+    return [message_class(OrderBookMessageType.DIFF, {
+        "symbol": event["s"],
+        "first_update_id": event["U"],
+        "update_id": event["u"],
+        "bids": event["b"],
+        "asks": event["a"]
+    }, event["E"] * 1e-3) for event in events]
+
+
+def make_order_book() -> OrderBook:
+    order_book: OrderBook = OrderBook()
+    order_book.apply_snapshot([OrderBookRow(100.0 - i * 0.01, 1.0, 100) for i in range(500)],
+                              [OrderBookRow(100.01 + i * 0.01, 1.0, 100) for i in range(500)],
+                              100)
+    return order_book
+
+
+def measure_memory(func: Callable[[], any]) -> int:
+    tracemalloc.start()
+    result = func()
+    size: int = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def time_messages(events: List[Dict[str, any]], message_class: type, apply_func: Callable, reads: int) -> float:
+    """
+    Returns the messages per second for creating each message, and applying its price levels `reads` times - the
+    tracker reads a message again when it replays it on top of a new snapshot.
+    """
+    best_time: Optional[float] = None
+    for _ in range(3):
+        order_book: OrderBook = make_order_book()
+        start: float = time.perf_counter()
+        for message in make_messages(message_class, events):
+            for _ in range(reads):
+                apply_func(order_book, message)
+        elapsed: float = time.perf_counter() - start
+        best_time = elapsed if best_time is None else min(best_time, elapsed)
+    return len(events) / best_time
+
+
+def apply_rows(order_book: OrderBook, message: OrderBookMessage):
+    order_book.apply_diffs(message.bids, message.asks, message.update_id)
+
+
+def apply_arrays(order_book: OrderBook, message: OrderBookMessage):
+    order_book.apply_diffs(message.bids_array, message.asks_array, message.update_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks order book message memory and parsing throughput.")
+    parser.add_argument("--recording", type=str, default=None,
+                        help="Recorded Binance diff depth stream, one websocket message per line. A synthetic stream "
+                             "in the same format is used if not given.")
+    parser.add_argument("--count", type=int, default=20000, help="Number of synthetic messages.")
+    args = parser.parse_args()
+
+    events: List[Dict[str, any]] = (load_recording(args.recording) if args.recording is not None
+                                    else make_synthetic_stream(args.count))
+    levels: int = sum(len(event["b"]) + len(event["a"]) for event in events)
+    print(f"{len(events)} diff messages, {levels / len(events):.1f} price levels per message.")
+
+    def parsed_messages() -> List[OrderBookMessage]:
+        messages: List[OrderBookMessage] = make_messages(OrderBookMessage, events)
+        for message in messages:
+            message.bids_array, message.asks_array
+        return messages
+
+    print()
+    print(f"{'message':<40}{'bytes / message':>16}")
+    for name, func in [
+        ("namedtuple", lambda: make_messages(NamedTupleOrderBookMessage, events)),
+        ("__slots__, unparsed", lambda: make_messages(OrderBookMessage, events)),
+        ("__slots__, with cached arrays", parsed_messages),
+    ]:
+        print(f"{name:<40}{measure_memory(func) / len(events):>16.1f}")
+
+    print()
+    print(f"{'message, price levels':<40}{'1 read (msg/s)':>16}{'2 reads (msg/s)':>18}")
+    for name, message_class, apply_func in [
+        ("namedtuple, OrderBookRow lists", NamedTupleOrderBookMessage, apply_rows),
+        ("__slots__, OrderBookRow lists", OrderBookMessage, apply_rows),
+        ("__slots__, float64 arrays", OrderBookMessage, apply_arrays),
+    ]:
+        print(f"{name:<40}{time_messages(events, message_class, apply_func, 1):>16.0f}"
+              f"{time_messages(events, message_class, apply_func, 2):>18.0f}")
+
+
+if __name__ == "__main__":
+    main()
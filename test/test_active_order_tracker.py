@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+
+from os.path import join, realpath
+import sys
+sys.path.insert(0, realpath(join(__file__, "../../")))
+
+from collections import defaultdict
+import pandas as pd
+import random
+from typing import (
+    Dict,
+    List,
+    Tuple
+)
+import unittest
+
+from wings.ddex_active_order_tracker import DDEXActiveOrderTracker
+from wings.order_book import OrderBook
+from wings.order_book_message import (
+    DDEXOrderBookMessage,
+    OrderBookMessageType,
+    RadarRelayOrderBookMessage
+)
+from wings.radar_relay_active_order_tracker import RadarRelayActiveOrderTracker
+
+
+def book_levels(order_book: OrderBook) -> Tuple[Dict[float, float], Dict[float, float]]:
+    bids, asks = order_book.snapshot
+    return dict(zip(bids.price, bids.amount)), dict(zip(asks.price, asks.amount))
+
+
+def expected_levels(orders: Dict[str, Tuple[bool, str, float]], is_bid: bool) -> Dict[float, float]:
+    levels: Dict[float, float] = defaultdict(float)
+    for order_is_bid, price, amount in orders.values():
+        if order_is_bid == is_bid:
+            levels[float(price)] += amount
+    return dict(levels)
+
+
+class ActiveOrderTrackerUnitTest(unittest.TestCase):
+    def setUp(self):
+        self.random: random.Random = random.Random(5)
+
+    def assert_levels_equal(self, expected: Dict[float, float], actual: Dict[float, float]):
+        self.assertEqual(sorted(expected.keys()), sorted(actual.keys()))
+        for price, amount in expected.items():
+            self.assertAlmostEqual(amount, actual[price], places=9, msg=price)
+
+    def random_price(self, is_bid: bool) -> str:
+        return f"{(0.9 if is_bid else 1.1) + self.random.randint(-10, 10) * 0.001 * (1 if is_bid else -1):.4f}"
+
+    def ddex_diff(self, timestamp: float, **content) -> DDEXOrderBookMessage:
+        content.update({"orderType": "limit", "time": int(timestamp * 1e3)})
+        return DDEXOrderBookMessage(OrderBookMessageType.DIFF, content)
+
+    def test_ddex_orders(self):
+        tracker: DDEXActiveOrderTracker = DDEXActiveOrderTracker()
+        order_book: OrderBook = OrderBook()
+        orders: Dict[str, Tuple[bool, str, float]] = {}
+        snapshot_orders: Dict[str, List[Dict[str, str]]] = {"bids": [], "asks": []}
+        for i in range(50):
+            is_bid: bool = i % 2 == 0
+            price: str = self.random_price(is_bid)
+            amount: float = round(self.random.uniform(1, 10), 2)
+            orders[f"snapshot-{i}"] = (is_bid, price, amount)
+            snapshot_orders["bids" if is_bid else "asks"].append({"orderId": f"snapshot-{i}",
+                                                                  "price": price,
+                                                                  "amount": str(amount)})
+        tracker.apply_snapshot_message(order_book, DDEXOrderBookMessage(OrderBookMessageType.SNAPSHOT,
+                                                                        snapshot_orders,
+                                                                        timestamp=1000.0))
+        self.assertEqual(50, tracker.order_count)
+
+        timestamp: float = 1000.0
+        for i in range(2000):
+            timestamp += 0.1
+            action: float = self.random.random()
+            if action < 0.4 or len(orders) < 1:
+                is_bid: bool = self.random.random() < 0.5
+                price: str = self.random_price(is_bid)
+                amount: float = round(self.random.uniform(1, 10), 2)
+                orders[f"order-{i}"] = (is_bid, price, amount)
+                message = self.ddex_diff(timestamp, type="receive", side="buy" if is_bid else "sell",
+                                         orderId=f"order-{i}", price=price, availableAmount=str(amount))
+            elif action < 0.7:
+                order_id: str = self.random.choice(sorted(orders.keys()))
+                is_bid, price, amount = orders[order_id]
+                filled: float = amount if self.random.random() < 0.3 else round(amount / 2, 2)
+                if amount - filled <= 0:
+                    del orders[order_id]
+                else:
+                    orders[order_id] = (is_bid, price, amount - filled)
+                message = self.ddex_diff(timestamp, type="trade_success", makerSide="buy" if is_bid else "sell",
+                                         makerOrderId=order_id, price=price, amount=str(filled))
+            else:
+                order_id: str = self.random.choice(sorted(orders.keys()))
+                is_bid, price, amount = orders.pop(order_id)
+                message = self.ddex_diff(timestamp, type="done", side="buy" if is_bid else "sell",
+                                         orderId=order_id, price=price, availableAmount="0")
+            tracker.apply_diff_message(order_book, message)
+
+            if i % 100 == 0:
+                bids, asks = book_levels(order_book)
+                self.assert_levels_equal(expected_levels(orders, True), bids)
+                self.assert_levels_equal(expected_levels(orders, False), asks)
+        self.assertEqual(len(orders), tracker.order_count)
+        self.assertEqual(len(orders), sum(len(level) for level in tracker.active_bids.values()) +
+                         sum(len(level) for level in tracker.active_asks.values()))
+
+    def test_ddex_ignored_messages(self):
+        tracker: DDEXActiveOrderTracker = DDEXActiveOrderTracker()
+        message: DDEXOrderBookMessage = self.ddex_diff(1000.0, type="receive", side="buy", orderId="market",
+                                                       price="1", availableAmount="1")
+        message.content["orderType"] = "market"
+        self.assertEqual(([], []), tracker.convert_diff_message_to_order_book_row(message))
+        with self.assertRaises(ValueError):
+            tracker.convert_diff_message_to_order_book_row(self.ddex_diff(1000.0, type="unknown"))
+
+    def test_fixed_point_prices(self):
+        tracker: DDEXActiveOrderTracker = DDEXActiveOrderTracker()
+        tracker.convert_diff_message_to_order_book_row(self.ddex_diff(
+            1000.0, type="receive", side="buy", orderId="a", price="0.10", availableAmount="1.5"))
+        bids, asks = tracker.convert_diff_message_to_order_book_row(self.ddex_diff(
+            1000.1, type="receive", side="buy", orderId="b", price="0.1000", availableAmount="2"))
+        self.assertEqual([(0.1, 3.5)], [(row.price, row.amount) for row in bids])
+        self.assertEqual([], asks)
+        bids, asks = tracker.convert_diff_message_to_order_book_row(self.ddex_diff(
+            1000.2, type="receive", side="buy", orderId="c", price="1e-1", availableAmount="1"))
+        self.assertEqual([(0.1, 4.5)], [(row.price, row.amount) for row in bids])
+        self.assertAlmostEqual(4.5, tracker.volume_for_bid_price("0.1"))
+        self.assertEqual({0.1: {"a": 1.5, "b": 2.0, "c": 1.0}}, tracker.active_bids)
+
+        # An order that changes price moves between levels.
+        bids, asks = tracker.convert_diff_message_to_order_book_row(self.ddex_diff(
+            1000.3, type="receive", side="buy", orderId="c", price="0.09", availableAmount="1"))
+        self.assertEqual([(0.1, 3.5), (0.09, 1.0)], [(row.price, row.amount) for row in bids])
+
+    def test_radar_relay_orders(self):
+        tracker: RadarRelayActiveOrderTracker = RadarRelayActiveOrderTracker()
+        order_book: OrderBook = OrderBook()
+        snapshot: RadarRelayOrderBookMessage = RadarRelayOrderBookMessage(OrderBookMessageType.SNAPSHOT, {
+            "bids": [{"orderHash": "0x01", "price": "100.5", "remainingBaseTokenAmount": "2"},
+                     {"orderHash": "0x02", "price": "100.5", "remainingBaseTokenAmount": "3"}],
+            "asks": [{"orderHash": "0x03", "price": "101", "remainingBaseTokenAmount": "1"}]
+        }, timestamp=1000.0)
+        tracker.apply_snapshot_message(order_book, snapshot)
+        self.assertEqual(({100.5: 5.0}, {101.0: 1.0}), book_levels(order_book))
+
+        created: str = pd.Timestamp(1001.0, unit="s", tz="UTC").isoformat()
+        tracker.apply_diff_message(order_book, RadarRelayOrderBookMessage(OrderBookMessageType.DIFF, {
+            "action": "NEW",
+            "event": {"order": {"type": "ASK", "orderHash": "0x04", "price": "101.00",
+                                "remainingBaseTokenAmount": "4", "createdDate": created}}
+        }))
+        self.assertEqual(({100.5: 5.0}, {101.0: 5.0}), book_levels(order_book))
+
+        tracker.apply_diff_message(order_book, RadarRelayOrderBookMessage(OrderBookMessageType.DIFF, {
+            "action": "FILL",
+            "event": {"type": "BUY", "timestamp": 1002.0,
+                      "order": {"orderHash": "0x01", "price": "100.5", "state": "OPEN",
+                                "remainingBaseTokenAmount": "0.5"}}
+        }))
+        tracker.apply_diff_message(order_book, RadarRelayOrderBookMessage(OrderBookMessageType.DIFF, {
+            "action": "FILL",
+            "event": {"type": "SELL", "timestamp": 1003.0,
+                      "order": {"orderHash": "0x03", "price": "101", "state": "FILLED",
+                                "remainingBaseTokenAmount": "0"}}
+        }))
+        self.assertEqual(({100.5: 3.5}, {101.0: 4.0}), book_levels(order_book))
+
+        for order_hash, order_type in [("0x01", "BID"), ("0x02", "BID"), ("0x05", "ASK")]:
+            tracker.apply_diff_message(order_book, RadarRelayOrderBookMessage(OrderBookMessageType.DIFF, {
+                "action": "CANCEL",
+                "event": {"orderType": order_type, "orderHash": order_hash}
+            }, timestamp=1004.0))
+        self.assertEqual(({}, {101.0: 4.0}), book_levels(order_book))
+        self.assertEqual(1, tracker.order_count)
+
+
+def main():
+    unittest.main()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+
+from os.path import join, realpath
+import sys
+sys.path.insert(0, realpath(join(__file__, "../../")))
+
+import numpy as np
+import pickle
+import ujson
+import unittest
+
+from wings.depth_message_decoder import DepthMessageDecoder
+from wings.order_book_message import (
+    OrderBookMessage,
+    OrderBookMessageType
+)
+
+
+class DepthMessageDecoderUnitTest(unittest.TestCase):
+    BINANCE_DIFF: str = '{"e": "depthUpdate", "E": 123456789, "s": "BNBBTC", "U": 157, "u": 160, ' \
+                        '"b": [["0.0024", "10", []], ["0.0023", "0.00000000", []]], ' \
+                        '"a": [["0.0026", "100", []]]}'
+
+    def setUp(self):
+        self.binance_decoder: DepthMessageDecoder = DepthMessageDecoder("s", "b", "a",
+                                                                        update_id_key="u",
+                                                                        first_update_id_key="U",
+                                                                        wrapper_key="data",
+                                                                        event_time_key="E")
+
+    def test_decode_binance_diff(self):
+        message: OrderBookMessage = self.binance_decoder.decode(self.BINANCE_DIFF, timestamp=1550000000.0)
+        self.assertEqual(OrderBookMessageType.DIFF, message.type)
+        self.assertEqual("BNBBTC", message.symbol)
+        self.assertEqual(160, message.update_id)
+        self.assertEqual(157, message.first_update_id)
+        self.assertEqual(1550000000.0, message.timestamp)
+        self.assertEqual(123456789000000, message.exchange_timestamp_ns)
+        self.assertEqual(-1, message.apply_timestamp_ns)
+        np.testing.assert_array_equal(np.array([[0.0024, 10, 160], [0.0023, 0, 160]]), message.bids_array)
+        np.testing.assert_array_equal(np.array([[0.0026, 100, 160]]), message.asks_array)
+        self.assertEqual([(row.price, row.amount, row.update_id) for row in message.bids],
+                         [(0.0024, 10.0, 160), (0.0023, 0.0, 160)])
+
+    def test_matches_json_decoding(self):
+        msg = ujson.loads(self.BINANCE_DIFF)
+        expected: OrderBookMessage = OrderBookMessage(OrderBookMessageType.DIFF, {
+            "symbol": msg["s"],
+            "first_update_id": msg["U"],
+            "update_id": msg["u"],
+            "bids": msg["b"],
+            "asks": msg["a"]
+        })
+        message: OrderBookMessage = self.binance_decoder.decode(self.BINANCE_DIFF.encode("utf8"))
+        self.assertEqual(expected.update_id, message.update_id)
+        self.assertEqual(expected.first_update_id, message.first_update_id)
+        np.testing.assert_array_equal(expected.bids_array, message.bids_array)
+        np.testing.assert_array_equal(expected.asks_array, message.asks_array)
+
+    def test_combined_stream(self):
+        raw: str = '{"stream": "bnbbtc@depth", "data": ' + self.BINANCE_DIFF + '}'
+        message: OrderBookMessage = self.binance_decoder.decode(raw)
+        self.assertEqual("BNBBTC", message.symbol)
+        self.assertEqual(160, message.update_id)
+        self.assertEqual(2, len(message.bids_array))
+
+    def test_numeric_levels_and_given_update_id(self):
+        decoder: DepthMessageDecoder = DepthMessageDecoder("s", "bids", "asks")
+        message: OrderBookMessage = decoder.decode(
+            b'{"ch": "market.ethbtc.depth.step0", "s": "ethbtc", "bids": [[0.031, 1.5e-2]], "asks": []}',
+            update_id=1550000000123,
+            timestamp=1550000000.123
+        )
+        self.assertEqual("ethbtc", message.symbol)
+        self.assertEqual(1550000000123, message.update_id)
+        self.assertEqual(-1, message.first_update_id)
+        self.assertEqual(-1, message.exchange_timestamp_ns)
+        np.testing.assert_array_equal(np.array([[0.031, 0.015, 1550000000123]]), message.bids_array)
+        self.assertEqual((0, 3), message.asks_array.shape)
+
+    def test_number_formats(self):
+        prices = ["0.00000000", "100.12345678", "-0.5", "1e-5", "2.5E3", "0.30000000000000004", "123456789012345678",
+                  "0.0000000000000000000001234"]
+        raw: str = '{"s": "BNBBTC", "u": 1, "b": [' + ", ".join(f'["{price}", 1]' for price in prices) + '], "a": []}'
+        message: OrderBookMessage = self.binance_decoder.decode(raw)
+        self.assertEqual([float(price) for price in prices], message.bids_array[:, 0].tolist())
+
+    def test_symbols_are_interned(self):
+        first: OrderBookMessage = self.binance_decoder.decode(self.BINANCE_DIFF)
+        second: OrderBookMessage = self.binance_decoder.decode(self.BINANCE_DIFF)
+        self.assertIs(first.symbol, second.symbol)
+        escaped: OrderBookMessage = self.binance_decoder.decode(self.BINANCE_DIFF.replace("BNBBTC", "BNB\\u0042TC"))
+        self.assertEqual("BNBBTC", escaped.symbol)
+
+    def test_pickle(self):
+        message: OrderBookMessage = self.binance_decoder.decode(self.BINANCE_DIFF)
+        unpickled: OrderBookMessage = pickle.loads(pickle.dumps(message))
+        self.assertEqual(message.symbol, unpickled.symbol)
+        self.assertEqual((message.exchange_timestamp_ns, message.receive_timestamp_ns),
+                         (unpickled.exchange_timestamp_ns, unpickled.receive_timestamp_ns))
+        np.testing.assert_array_equal(message.bids_array, unpickled.bids_array)
+
+    def test_malformed_messages(self):
+        for raw in ['', '[]', '{"s": "BNBBTC", "u": 1, "b": [["0.1"]], "a": []}',
+                    '{"s": "BNBBTC", "b": [], "a": []}', '{"u": 1, "b": [], "a": []}',
+                    '{"s": "BNBBTC", "u": 1, "b": [], "a": []} trailing', '{"s": "BNBBTC", "u": 1, "b": [',
+                    '{"s": "BNBBTC", "u": 1, "b": [["abc", "1"]], "a": []}']:
+            with self.assertRaises(ValueError, msg=raw):
+                self.binance_decoder.decode(raw)
+
+
+def main():
+    unittest.main()
+
+
+if __name__ == "__main__":
+    main()
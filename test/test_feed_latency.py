@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+
+from os.path import join, realpath
+import sys
+sys.path.insert(0, realpath(join(__file__, "../../")))
+
+import math
+import time
+import unittest
+from unittest import mock
+
+from wings.feed_latency import (
+    FeedLatencyStats,
+    LatencyHistogram
+)
+from wings.order_book_message import (
+    OrderBookMessage,
+    OrderBookMessageType,
+    clock_ns
+)
+
+
+class LatencyHistogramUnitTest(unittest.TestCase):
+    def test_percentiles(self):
+        histogram: LatencyHistogram = LatencyHistogram()
+        self.assertTrue(math.isnan(histogram.percentile(50)))
+        for latency_ms in range(1, 101):
+            histogram.record(latency_ms * 1000000)
+        for percentile in (50, 90, 99):
+            estimate: float = histogram.percentile(percentile) * 1e-6
+            self.assertGreaterEqual(estimate, percentile)
+            self.assertLessEqual(estimate, percentile * 1.19 + 1)
+        stats = histogram.stats
+        self.assertEqual(100, stats["count"])
+        self.assertAlmostEqual(50.5, stats["mean_ms"])
+        self.assertEqual(100.0, stats["max_ms"])
+        self.assertEqual(100.0, histogram.percentile(100) * 1e-6)
+
+    def test_merge_and_out_of_range(self):
+        histogram: LatencyHistogram = LatencyHistogram()
+        histogram.record(-5000)
+        histogram.record(10 ** 15)
+        other: LatencyHistogram = LatencyHistogram()
+        other.record(2000)
+        histogram.merge(other)
+        self.assertEqual(3, histogram.count)
+        self.assertEqual(1000.0, histogram.percentile(1))
+        self.assertEqual(1e15, histogram.percentile(100))
+
+
+class FeedLatencyStatsUnitTest(unittest.TestCase):
+    def test_record(self):
+        clock_offset_ns: int = clock_ns(time.time) - clock_ns()
+        message: OrderBookMessage = OrderBookMessage(OrderBookMessageType.DIFF, {
+            "symbol": "ETHUSDT",
+            "update_id": 1,
+            "bids": [],
+            "asks": []
+        }, exchange_timestamp_ns=clock_ns(time.time) - 20000000)
+        message.apply_timestamp_ns = message.receive_timestamp_ns + 3000000
+        feed_latency_stats: FeedLatencyStats = FeedLatencyStats()
+        feed_latency_stats.record(message, clock_offset_ns)
+        stats = feed_latency_stats.stats
+        self.assertAlmostEqual(3.0, stats["processing"]["max_ms"])
+        self.assertAlmostEqual(20.0, stats["feed"]["max_ms"], delta=1.0)
+        self.assertAlmostEqual(23.0, stats["total"]["max_ms"], delta=1.0)
+
+    def test_clock_ns(self):
+        # Timestamps mustn't depend on the nanosecond clocks of Python 3.7.
+        with mock.patch.object(time, "monotonic_ns", side_effect=AttributeError, create=True), \
+                mock.patch.object(time, "time_ns", side_effect=AttributeError, create=True):
+            before_ns: int = int(time.monotonic() * 1e9)
+            message: OrderBookMessage = OrderBookMessage(OrderBookMessageType.DIFF, {
+                "symbol": "ETHUSDT",
+                "update_id": 1,
+                "bids": [],
+                "asks": []
+            })
+            after_ns: int = int(time.monotonic() * 1e9)
+            wall_clock_ns: int = clock_ns(time.time)
+        self.assertIsInstance(message.receive_timestamp_ns, int)
+        self.assertTrue(before_ns <= message.receive_timestamp_ns <= after_ns)
+        self.assertAlmostEqual(time.time(), wall_clock_ns * 1e-9, delta=1.0)
+
+
+def main():
+    unittest.main()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+
+from os.path import join, realpath
+import sys
+sys.path.insert(0, realpath(join(__file__, "../../")))
+
+from decimal import Decimal
+import random
+import unittest
+
+from wings.fixed_point import (
+    FixedPointQuantizer,
+    get_quantizer
+)
+
+
+class FixedPointQuantizerUnitTest(unittest.TestCase):
+    def test_matches_decimal_rounding(self):
+        rng: random.Random = random.Random(3)
+        for step in [Decimal("0.01"), Decimal("1E-8"), Decimal("0.05"), Decimal("0.010"), Decimal("25")]:
+            quantizer: FixedPointQuantizer = get_quantizer(step)
+            values = [rng.uniform(0, 1000) for _ in range(1000)]
+            # Exact ties, and values a rounding error away from them.
+            values += [float(Decimal(rng.randint(0, 10 ** 6)) * step + step / 2) for _ in range(1000)]
+            values += [rng.randint(0, 10 ** 6) * float(step) / 2 for _ in range(1000)]
+            for value in values:
+                for step_offset in (0, 1, -1):
+                    expected: Decimal = (round(Decimal(value) / step) + step_offset) * step
+                    actual: Decimal = quantizer.quantize(value, step_offset)
+                    self.assertEqual(str(expected), str(actual), msg=(step, value))
+
+    def test_ticks(self):
+        quantizer: FixedPointQuantizer = get_quantizer(0.05)
+        self.assertEqual(Decimal("0.05"), quantizer.step)
+        self.assertEqual(2, quantizer.decimals)
+        self.assertEqual(3, quantizer.to_ticks(0.1 + 0.05))
+        self.assertEqual(0.15, quantizer.from_ticks(3))
+        self.assertIs(quantizer, get_quantizer("0.05"))
+
+    def test_decimal_fallback(self):
+        # Steps and values outside of the integer grid are quantized with Decimal arithmetic.
+        self.assertEqual("1.2E+2", str(get_quantizer(Decimal("1E+1")).quantize(123.0)))
+        self.assertEqual(Decimal(10 ** 20), get_quantizer(1).quantize(1e20))
+        with self.assertRaises(ValueError):
+            get_quantizer(1).to_ticks(1e20)
+        with self.assertRaises(ValueError):
+            FixedPointQuantizer(Decimal("-0.01"))
+
+
+def main():
+    unittest.main()
+
+
+if __name__ == "__main__":
+    main()
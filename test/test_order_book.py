@@ -0,0 +1,648 @@
+#!/usr/bin/env python
+
+from os.path import join, realpath
+import sys
+sys.path.insert(0, realpath(join(__file__, "../../")))
+
+from decimal import Decimal
+import logging
+import math
+import numpy as np
+import random
+from typing import (
+    Dict,
+    List,
+    Tuple
+)
+import unittest
+
+from wings.composite_order_book import CompositeOrderBook
+from wings.event_logger import EventLogger
+from wings.events import (
+    OrderBookEvent,
+    OrderBookTopOfBookChangedEvent,
+    OrderBookTradeEvent,
+    TradeType
+)
+from wings.order_book import OrderBook
+from wings.order_book_message import (
+    OrderBookMessage,
+    OrderBookMessageType
+)
+from wings.order_book_row import OrderBookRow
+
+
+def walk_price_for_volume(rows: List[OrderBookRow], volume: float) -> float:
+    cumulative_volume = 0
+    for row in rows:
+        cumulative_volume += row.amount
+        if cumulative_volume >= volume:
+            return row.price
+    raise EnvironmentError
+
+
+def walk_vwap_for_volume(rows: List[OrderBookRow], volume: float) -> float:
+    total_cost = total_volume = 0
+    for row in rows:
+        total_cost += row.amount * row.price
+        total_volume += row.amount
+        if total_volume >= volume:
+            return total_cost / total_volume
+    raise EnvironmentError
+
+
+def walk_volume_for_price(rows: List[OrderBookRow], is_buy: bool, price: float) -> float:
+    cumulative_volume = 0
+    for row in rows:
+        if (row.price > price) if is_buy else (row.price < price):
+            break
+        cumulative_volume += row.amount
+    return cumulative_volume
+
+
+class OrderBookUnitTest(unittest.TestCase):
+    def make_order_book(self) -> OrderBook:
+        return OrderBook()
+
+    def setUp(self):
+        self.random = random.Random(42)
+        self.order_book: OrderBook = self.make_order_book()
+        self.order_book.apply_snapshot(self.make_rows(1000.0, -1, 200, 1), self.make_rows(1001.0, 1, 200, 1), 1)
+
+    def make_rows(self, start_price: float, direction: int, count: int, update_id: int) -> List[OrderBookRow]:
+        return [OrderBookRow(start_price + direction * i * 0.5, round(self.random.uniform(0.1, 10.0), 3), update_id)
+                for i in range(count)]
+
+    def make_random_diff_messages(self, rounds: int, ask_offset: int = -4) -> List[OrderBookMessage]:
+        messages: List[OrderBookMessage] = []
+        for update_id in range(2, rounds + 2):
+            bids = [[str(1000.0 - self.random.randint(0, 250) * 0.5),
+                     str(self.random.choice([0.0, round(self.random.uniform(0.1, 10.0), 3)]))]
+                    for _ in range(5)]
+            asks = [[str(1001.0 + self.random.randint(ask_offset, 250) * 0.5),
+                     str(self.random.choice([0.0, round(self.random.uniform(0.1, 10.0), 3)]))]
+                    for _ in range(5)]
+            messages.append(OrderBookMessage(OrderBookMessageType.DIFF, {
+                "symbol": "BTCUSDT",
+                "update_id": update_id,
+                "bids": bids,
+                "asks": asks
+            }, timestamp=float(update_id)))
+        return messages
+
+    def apply_random_diffs(self, rounds: int):
+        for message in self.make_random_diff_messages(rounds):
+            self.order_book.apply_diffs(message.bids, message.asks, message.update_id)
+
+    def assert_depth_queries_match_walk(self):
+        for is_buy in [True, False]:
+            rows: List[OrderBookRow] = list(self.order_book.ask_entries() if is_buy
+                                            else self.order_book.bid_entries())
+            total_volume: float = sum(row.amount for row in rows)
+            for volume in [v for v in [0.0, 0.05, 1.0, 17.3, 250.0, total_volume * 0.999] if v < total_volume]:
+                self.assertEqual(walk_price_for_volume(rows, volume),
+                                 self.order_book.get_price_for_volume(is_buy, volume))
+                self.assertAlmostEqual(walk_vwap_for_volume(rows, volume),
+                                       self.order_book.get_vwap_for_volume(is_buy, volume))
+            for row in rows[::17]:
+                self.assertAlmostEqual(walk_volume_for_price(rows, is_buy, row.price),
+                                       self.order_book.get_volume_for_price(is_buy, row.price))
+            with self.assertRaises(EnvironmentError):
+                self.order_book.get_price_for_volume(is_buy, total_volume * 1.01)
+
+    def test_depth_queries_after_snapshot(self):
+        self.assert_depth_queries_match_walk()
+
+    def test_depth_queries_after_diffs(self):
+        self.apply_random_diffs(500)
+        self.assert_depth_queries_match_walk()
+
+    def test_depth_queries_after_overlap_truncation(self):
+        # A newer ask below the best bid wipes out the overlapping bids.
+        self.order_book.apply_diffs([], [OrderBookRow(995.0, 1.0, 2)], 2)
+        self.assertEqual(995.0, self.order_book.get_price(True))
+        self.assertLess(self.order_book.get_price(False), 995.0)
+        self.assert_depth_queries_match_walk()
+
+    def test_apply_diff_batch(self):
+        # Non-crossing diffs, so applying them one by one or as a batch gives the same order book.
+        messages: List[OrderBookMessage] = self.make_random_diff_messages(200, ask_offset=0)
+        batch_order_book: OrderBook = self.make_order_book()
+        batch_order_book.apply_snapshot(list(self.order_book.bid_entries()), list(self.order_book.ask_entries()), 1)
+        for message in messages:
+            self.order_book.apply_diffs(message.bids, message.asks, message.update_id)
+
+        levels_touched: int = batch_order_book.apply_diff_batch(messages)
+        distinct_levels: int = len(set(row.price for message in messages for row in message.bids)) + \
+            len(set(row.price for message in messages for row in message.asks))
+        self.assertEqual(distinct_levels, levels_touched)
+        self.assertEqual(201, batch_order_book.last_diff_uid)
+        self.assertEqual(list(self.order_book.bid_entries()), list(batch_order_book.bid_entries()))
+        self.assertEqual(list(self.order_book.ask_entries()), list(batch_order_book.ask_entries()))
+        self.assertEqual(0, batch_order_book.apply_diff_batch([]))
+
+    def test_apply_diff_batch_off_grid_prices(self):
+        # Raw prices that round to the same level of the order book - e.g. on a tick ladder or fixed-point grid - are
+        # merged with the latest message winning, as if the messages were applied one by one.
+        messages: List[OrderBookMessage] = []
+        for update_id in range(2, 42):
+            messages.append(OrderBookMessage(OrderBookMessageType.DIFF, {
+                "symbol": "BTCUSDT",
+                "update_id": update_id,
+                "bids": [[str(1000.0 - i * 0.5 + self.random.choice([-0.1, 0.0, 0.1])),
+                          str(self.random.choice([0.0, float(update_id)]))] for i in range(5)],
+                "asks": [[str(1001.0 + i * 0.5 + self.random.choice([-0.1, 0.0, 0.1])), str(float(update_id))]
+                         for i in range(5)]
+            }, timestamp=float(update_id)))
+        batch_order_book: OrderBook = self.make_order_book()
+        batch_order_book.apply_snapshot(list(self.order_book.bid_entries()), list(self.order_book.ask_entries()), 1)
+        for message in messages:
+            self.order_book.apply_diffs(message.bids_array, message.asks_array, message.update_id)
+
+        # A tick ladder level keeps the raw price it was created with, so the levels are compared on the 0.5 grid.
+        def levels(order_book: OrderBook) -> List[Tuple[float, float]]:
+            return [(round(row.price * 2) / 2, row.amount)
+                    for row in list(order_book.bid_entries()) + list(order_book.ask_entries())]
+
+        batch_order_book.apply_diff_batch(messages)
+        self.assertEqual(levels(self.order_book), levels(batch_order_book))
+
+    def test_message_arrays(self):
+        message: OrderBookMessage = OrderBookMessage(OrderBookMessageType.DIFF, {
+            "symbol": "ETHUSDT",
+            "update_id": 2,
+            "bids": [["999.5", "3.0", []], ["999.0", "0.0", []]],
+            "asks": []
+        }, timestamp=1.0)
+        self.assertTrue(np.array_equal(np.array([[999.5, 3.0, 2], [999.0, 0.0, 2]]), message.bids_array))
+        self.assertEqual((0, 3), message.asks_array.shape)
+        self.assertIs(message.bids_array, message.bids_array)
+        self.assertEqual([OrderBookRow(999.5, 3.0, 2), OrderBookRow(999.0, 0.0, 2)], message.bids)
+
+        # Arrays and rows are applied the same way.
+        row_order_book: OrderBook = self.make_order_book()
+        row_order_book.apply_snapshot(list(self.order_book.bid_entries()), list(self.order_book.ask_entries()), 1)
+        row_order_book.apply_diffs(message.bids, message.asks, message.update_id)
+        self.order_book.apply_diffs(message.bids_array, message.asks_array, message.update_id)
+        self.assertEqual(list(row_order_book.bid_entries()), list(self.order_book.bid_entries()))
+        self.assertEqual(list(row_order_book.ask_entries()), list(self.order_book.ask_entries()))
+
+    def test_top_of_book_changed_events(self):
+        event_logger: EventLogger = EventLogger()
+        self.order_book.add_listener(OrderBookEvent.TopOfBookChanged, event_logger)
+        best_bid: float = self.order_book.get_price(False)
+        best_ask: float = self.order_book.get_price(True)
+
+        # Changes below the top of the book don't emit events.
+        self.order_book.apply_diffs([OrderBookRow(best_bid - 10, 1.0, 2)], [OrderBookRow(best_ask + 10, 1.0, 2)], 2)
+        self.assertEqual(0, len(event_logger.event_log))
+
+        self.order_book.apply_diffs([OrderBookRow(best_bid + 0.5, 3.0, 3)], [], 3)
+        self.assertEqual(1, len(event_logger.event_log))
+        event: OrderBookTopOfBookChangedEvent = event_logger.event_log[0]
+        self.assertEqual(3, event.update_id)
+        self.assertEqual(best_bid, event.old_bid_price)
+        self.assertEqual((best_bid + 0.5, 3.0), (event.bid_price, event.bid_amount))
+        self.assertEqual((best_ask, best_ask), (event.old_ask_price, event.ask_price))
+
+        # Size changes below the threshold are accumulated until they cross it.
+        self.order_book.set_top_of_book_thresholds(min_price_change=1.0, min_size_change=1.0)
+        self.order_book.apply_diffs([OrderBookRow(best_bid + 0.5, 3.5, 4)], [], 4)
+        self.assertEqual(1, len(event_logger.event_log))
+        self.order_book.apply_diffs([OrderBookRow(best_bid + 0.5, 4.0, 5)], [], 5)
+        self.assertEqual(2, len(event_logger.event_log))
+        self.assertEqual((3.0, 4.0), (event_logger.event_log[1].old_bid_amount, event_logger.event_log[1].bid_amount))
+
+    def test_snapshot_arrays(self):
+        bids_array, asks_array = self.order_book.snapshot_arrays()
+        self.assertEqual(list(self.order_book.bid_entries()), [OrderBookRow(*row) for row in bids_array.tolist()])
+        self.assertEqual(list(self.order_book.ask_entries()), [OrderBookRow(*row) for row in asks_array.tolist()])
+
+        bids_array, asks_array = self.order_book.snapshot_arrays(depth=5)
+        self.assertEqual((5, 3), bids_array.shape)
+        self.assertEqual(self.order_book.get_price(True), asks_array[0, 0])
+
+        # Caller supplied buffers are filled in place.
+        bids_buffer: np.ndarray = np.zeros((10, 3))
+        asks_buffer: np.ndarray = np.zeros((1000, 3))
+        bids_array, asks_array = self.order_book.snapshot_arrays(bids_array=bids_buffer, asks_array=asks_buffer)
+        self.assertTrue(np.shares_memory(bids_array, bids_buffer))
+        self.assertEqual(10, len(bids_array))
+        self.assertEqual(200, len(asks_array))
+        self.assertEqual(self.order_book.get_price(False), bids_buffer[0, 0])
+
+        bids_df, asks_df = self.order_book.snapshot
+        self.assertEqual(200, len(bids_df))
+        self.assertEqual(self.order_book.get_price(True), asks_df.price.iloc[0])
+
+    def test_max_depth(self):
+        self.order_book.set_max_depth(20)
+        bids: List[OrderBookRow] = list(self.order_book.bid_entries())
+        asks: List[OrderBookRow] = list(self.order_book.ask_entries())
+        self.assertEqual((20, 20), (len(bids), len(asks)))
+        self.assertTrue(self.order_book.bid_depth_truncated)
+        self.assertTrue(self.order_book.ask_depth_truncated)
+        self.assert_depth_queries_match_walk()
+
+        # Queries that run past the retained levels fail, rather than quoting from an incomplete order book.
+        with self.assertRaisesRegex(EnvironmentError, "retained"):
+            self.order_book.get_price_for_volume(True, sum(row.amount for row in asks) + 1)
+        with self.assertRaisesRegex(EnvironmentError, "retained"):
+            self.order_book.get_volume_for_price(False, bids[-1].price - 0.5)
+
+        # Levels beyond the first trimmed price are ignored, even when there's room left after a deletion.
+        self.order_book.apply_diffs([OrderBookRow(bids[0].price, 0, 2), OrderBookRow(bids[-1].price - 1.0, 5.0, 2)],
+                                    [], 2)
+        self.assertEqual(bids[1:], list(self.order_book.bid_entries()))
+        self.order_book.apply_diffs([OrderBookRow(bids[0].price + 0.5, 1.0, 3)], [], 3)
+        self.assertEqual(20, len(list(self.order_book.bid_entries())))
+        self.assert_depth_queries_match_walk()
+
+        # A new snapshot restores the full depth, trimmed down to the limit again.
+        self.order_book.apply_snapshot(self.make_rows(1000.0, -1, 10, 4), self.make_rows(1001.0, 1, 30, 4), 4)
+        self.assertFalse(self.order_book.bid_depth_truncated)
+        self.assertTrue(self.order_book.ask_depth_truncated)
+        self.assertEqual(20, len(list(self.order_book.ask_entries())))
+
+    def test_memory_usage(self):
+        memory_usage = self.order_book.memory_usage
+        self.assertEqual(200, memory_usage["bid_levels"])
+        self.assertGreater(memory_usage["bid_storage_bytes"], 0)
+        self.assertEqual(memory_usage["total_bytes"],
+                         sum(memory_usage[key] for key in ["bid_storage_bytes", "ask_storage_bytes",
+                                                           "bid_index_bytes", "ask_index_bytes"]))
+
+    def test_freeze(self):
+        version: int = self.order_book.version
+        frozen_book = self.order_book.freeze()
+        self.assertIs(frozen_book, self.order_book.freeze())
+        self.assertTrue(frozen_book.is_shared)
+        self.assertEqual(version, frozen_book.version)
+        bids: List[OrderBookRow] = list(self.order_book.bid_entries())
+        asks: List[OrderBookRow] = list(self.order_book.ask_entries())
+        price_for_volume: float = self.order_book.get_price_for_volume(True, 17.3)
+
+        # The frozen view keeps the state it was taken at, after the live order book moves on.
+        self.apply_random_diffs(50)
+        self.order_book.apply_snapshot(self.make_rows(900.0, -1, 10, 60), self.make_rows(901.0, 1, 10, 60), 60)
+        self.assertEqual(version + 51, self.order_book.version)
+        self.assertFalse(frozen_book.is_shared)
+        self.assertEqual(bids, list(frozen_book.bid_entries()))
+        self.assertEqual(asks, list(frozen_book.ask_entries()))
+        self.assertEqual(price_for_volume, frozen_book.get_price_for_volume(True, 17.3))
+        self.assertEqual(bids[0].price, frozen_book.get_price(False))
+        self.assertEqual(1, frozen_book.snapshot_uid)
+        self.assertEqual(200, len(frozen_book.snapshot_arrays()[0]))
+        self.assertIsNot(frozen_book, self.order_book.freeze())
+
+        with self.assertRaises(TypeError):
+            frozen_book.apply_diffs([OrderBookRow(1.0, 1.0, 61)], [], 61)
+        with self.assertRaises(TypeError):
+            frozen_book.apply_snapshot([], [], 61)
+        with self.assertRaises(TypeError):
+            frozen_book.set_max_depth(10)
+
+    def test_freeze_shared_queries(self):
+        frozen_book = self.order_book.freeze()
+        original_book: OrderBook = self.order_book
+        self.order_book = frozen_book
+        self.assert_depth_queries_match_walk()
+        self.assertEqual(original_book.memory_usage, frozen_book.memory_usage)
+        self.assertTrue(frozen_book.is_shared)
+
+        # Settings changes are rejected too, and leave the view as it was.
+        fixed_point_tick_size: float = frozen_book.fixed_point_tick_size
+        for change in [lambda: frozen_book.use_fixed_point("0.25"),
+                       lambda: frozen_book.enable_analytics(),
+                       lambda: frozen_book.enable_trade_tape(),
+                       lambda: frozen_book.set_top_of_book_thresholds(1.0)]:
+            with self.assertRaises(TypeError):
+                change()
+        self.assertTrue(fixed_point_tick_size == frozen_book.fixed_point_tick_size or
+                        math.isnan(fixed_point_tick_size) and math.isnan(frozen_book.fixed_point_tick_size))
+        self.assertFalse(frozen_book.analytics_enabled)
+        self.assertIsNone(frozen_book.trade_tape)
+        self.assert_depth_queries_match_walk()
+
+    def test_to_bytes(self):
+        self.apply_random_diffs(100)
+        self.order_book.set_max_depth(50)
+        order_book_bytes: bytes = self.order_book.to_bytes()
+        self.assertEqual(88 + 100 * 24, len(order_book_bytes))
+
+        restored_book: OrderBook = OrderBook.from_bytes(memoryview(order_book_bytes))
+        self.assertEqual(list(self.order_book.bid_entries()), list(restored_book.bid_entries()))
+        self.assertEqual(list(self.order_book.ask_entries()), list(restored_book.ask_entries()))
+        self.assertEqual((1, 101), (restored_book.snapshot_uid, restored_book.last_diff_uid))
+        self.assertEqual(50, restored_book.max_depth)
+        self.assertTrue(restored_book.ask_depth_truncated)
+        for size_property in ["price_tick_size", "fixed_point_tick_size", "fixed_point_lot_size"]:
+            size: float = getattr(self.order_book, size_property)
+            restored_size: float = getattr(restored_book, size_property)
+            self.assertTrue(size == restored_size or math.isnan(size) and math.isnan(restored_size))
+        self.assertEqual(self.order_book.get_vwap_for_volume(True, 17.3), restored_book.get_vwap_for_volume(True, 17.3))
+
+        with self.assertRaises(ValueError):
+            OrderBook.from_bytes(order_book_bytes[:-8])
+        with self.assertRaises(ValueError):
+            OrderBook.from_bytes(b"XXXX" + order_book_bytes[4:])
+
+    def test_depth_curve(self):
+        self.apply_random_diffs(100)
+        for is_buy in [True, False]:
+            total_volume: float = self.order_book.get_volume_for_price(is_buy, float("inf") if is_buy else 0.0)
+            # Unsorted, with duplicates and volumes beyond the order book depth - both the sweep and the per volume
+            # lookups are exercised.
+            for volumes in [np.array([17.3, 0.05, total_volume * 2, 1.0, 17.3]),
+                            np.array([self.random.uniform(0, total_volume * 1.1) for _ in range(500)])]:
+                prices, vwaps = self.order_book.get_depth_curve(is_buy, volumes)
+                np.testing.assert_array_equal(prices, self.order_book.get_prices_for_volumes(is_buy, volumes))
+                for volume, price, vwap in zip(volumes, prices, vwaps):
+                    if volume > total_volume:
+                        self.assertTrue(np.isnan(price) and np.isnan(vwap))
+                        continue
+                    self.assertEqual(self.order_book.get_price_for_volume(is_buy, volume), price)
+                    self.assertAlmostEqual(self.order_book.get_vwap_for_volume(is_buy, volume), vwap)
+        self.assertEqual((0,), self.order_book.get_vwaps_for_volumes(True, np.array([])).shape)
+
+    def test_simulate_fills(self):
+        asks: List[OrderBookRow] = list(self.order_book.ask_entries())
+        fills: np.ndarray = self.order_book.simulate_buy(asks[0].amount + asks[1].amount + 0.01)
+        self.assertEqual((3, 3), fills.shape)
+        self.assertEqual([asks[0], asks[1]], [OrderBookRow(*row) for row in fills[:2].tolist()])
+        self.assertEqual(asks[2].price, fills[2, 0])
+        self.assertAlmostEqual(0.01, fills[2, 1])
+
+        total_bid_volume: float = sum(row.amount for row in self.order_book.bid_entries())
+        fills = self.order_book.simulate_sell(total_bid_volume * 2)
+        self.assertEqual(200, len(fills))
+        self.assertAlmostEqual(total_bid_volume, fills[:, 1].sum())
+        self.assertEqual((0, 3), self.order_book.simulate_sell(0).shape)
+
+        # Volumes that are filled exactly at a level boundary, where the depth index and the level walk add up the
+        # amounts in different orders.
+        self.apply_random_diffs(100)
+        asks = list(self.order_book.ask_entries())
+        cumulative_volume: float = 0
+        for level, ask in enumerate(asks[:50], 1):
+            cumulative_volume += ask.amount
+            for order_book in [self.order_book, self.order_book.freeze()]:
+                fills = order_book.simulate_buy(cumulative_volume)
+                self.assertEqual(level, len(fills))
+                self.assertEqual(asks[:level - 1], [OrderBookRow(*row) for row in fills[:-1].tolist()])
+                self.assertEqual(ask.price, fills[-1, 0])
+                self.assertAlmostEqual(ask.amount, fills[-1, 1])
+
+    def test_analytics(self):
+        self.assertTrue(np.isnan(self.order_book.mid_price))
+        self.order_book.enable_analytics(imbalance_depth=3, ewma_alpha=0.5)
+        self.apply_random_diffs(100)
+        bids: List[OrderBookRow] = list(self.order_book.bid_entries())
+        asks: List[OrderBookRow] = list(self.order_book.ask_entries())
+        self.assertEqual((bids[0].price + asks[0].price) / 2, self.order_book.mid_price)
+        self.assertEqual(asks[0].price - bids[0].price, self.order_book.spread)
+        self.assertAlmostEqual((bids[0].price * asks[0].amount + asks[0].price * bids[0].amount) /
+                               (bids[0].amount + asks[0].amount), self.order_book.microprice)
+        bid_volume: float = sum(row.amount for row in bids[:3])
+        ask_volume: float = sum(row.amount for row in asks[:3])
+        self.assertAlmostEqual((bid_volume - ask_volume) / (bid_volume + ask_volume), self.order_book.imbalance)
+
+        self.assertTrue(np.isnan(self.order_book.trade_volume_ewma))
+        for price, amount in [(1000.0, 2.0), (1010.0, 4.0), (1000.0, 1.0)]:
+            self.order_book.apply_trade(OrderBookTradeEvent("BTCUSDT", 1.0, TradeType.BUY, price, amount))
+        self.assertAlmostEqual(2.0, self.order_book.trade_volume_ewma)
+        log_return: float = np.log(1010.0 / 1000.0)
+        self.assertAlmostEqual(np.sqrt((0.5 * log_return ** 2) * 0.5 + 0.5 * log_return ** 2),
+                               self.order_book.trade_volatility_ewma)
+        self.assertEqual(self.order_book.analytics["microprice"], self.order_book.microprice)
+
+        frozen_book = self.order_book.freeze()
+        with self.assertRaises(TypeError):
+            frozen_book.apply_trade(OrderBookTradeEvent("BTCUSDT", 1.0, TradeType.BUY, 1000.0, 1.0))
+        self.assertEqual(self.order_book.analytics, frozen_book.analytics)
+
+        self.order_book.disable_analytics()
+        self.assertTrue(np.isnan(self.order_book.spread))
+
+    def test_empty_order_book(self):
+        order_book: OrderBook = self.make_order_book()
+        with self.assertRaises(EnvironmentError):
+            order_book.get_price_for_volume(True, 1.0)
+        with self.assertRaises(EnvironmentError):
+            order_book.get_vwap_for_volume(False, 1.0)
+        self.assertEqual(0, order_book.get_volume_for_price(True, 1000.0))
+        bids_array, asks_array = order_book.snapshot_arrays()
+        self.assertEqual((0, 3), bids_array.shape)
+
+
+class TickLadderOrderBookUnitTest(OrderBookUnitTest):
+    def make_order_book(self) -> OrderBook:
+        order_book: OrderBook = OrderBook()
+        order_book.use_tick_ladder(0.5)
+        return order_book
+
+    def test_entries_match_set_storage(self):
+        set_order_book: OrderBook = OrderBook()
+        set_order_book.apply_snapshot(list(self.order_book.bid_entries()), list(self.order_book.ask_entries()), 1)
+        self.random = random.Random(7)
+        self.apply_random_diffs(300)
+        ladder_order_book: OrderBook = self.order_book
+        self.order_book = set_order_book
+        self.random = random.Random(7)
+        self.apply_random_diffs(300)
+        self.assertEqual(list(set_order_book.bid_entries()), list(ladder_order_book.bid_entries()))
+        self.assertEqual(list(set_order_book.ask_entries()), list(ladder_order_book.ask_entries()))
+        self.assertEqual(set_order_book.get_price(True), ladder_order_book.get_price(True))
+        self.assertEqual(set_order_book.get_price(False), ladder_order_book.get_price(False))
+
+    def test_recentering(self):
+        # Levels far away from the initial price range force the ladder to re-center and grow.
+        self.order_book.apply_diffs([OrderBookRow(10.0, 1.0, 2)], [OrderBookRow(5000.0, 2.0, 2)], 2)
+        self.assertEqual(10.0, list(self.order_book.bid_entries())[-1].price)
+        self.assertEqual(5000.0, list(self.order_book.ask_entries())[-1].price)
+        self.assert_depth_queries_match_walk()
+
+    def test_shrinking(self):
+        # A spike of far away levels grows the ladder, which shrinks back once they're deleted.
+        storage_bytes: int = self.order_book.memory_usage["ask_storage_bytes"]
+        ask_prices: List[float] = [row.price for row in self.order_book.ask_entries()]
+        far_asks: List[OrderBookRow] = [OrderBookRow(5000.0 + i * 0.5, 1.0, 2) for i in range(10)]
+        self.order_book.apply_diffs([], far_asks, 2)
+        self.assertGreater(self.order_book.memory_usage["ask_storage_bytes"], 8 * storage_bytes)
+        self.order_book.apply_diffs([], [OrderBookRow(row.price, 0.0, 3) for row in far_asks], 3)
+
+        # The ladder is checked for shrinking every 256 deletions.
+        for update_id in range(4, 604, 2):
+            self.order_book.apply_diffs([], [OrderBookRow(1100.5, 0.0, update_id)], update_id)
+            self.order_book.apply_diffs([], [OrderBookRow(1100.5, 1.0, update_id + 1)], update_id + 1)
+        self.assertEqual(storage_bytes, self.order_book.memory_usage["ask_storage_bytes"])
+        self.assertEqual(ask_prices, [row.price for row in self.order_book.ask_entries()])
+        self.assertEqual(1001.0, self.order_book.get_price(True))
+        self.assert_depth_queries_match_walk()
+
+    def test_switch_storage(self):
+        order_book: OrderBook = OrderBook()
+        order_book.apply_snapshot(list(self.order_book.bid_entries()), list(self.order_book.ask_entries()), 5)
+        bids: List[OrderBookRow] = list(order_book.bid_entries())
+        order_book.use_tick_ladder(0.5)
+        self.assertEqual(0.5, order_book.price_tick_size)
+        self.assertEqual(5, order_book.snapshot_uid)
+        self.assertEqual(bids, list(order_book.bid_entries()))
+
+
+class FixedPointOrderBookUnitTest(OrderBookUnitTest):
+    def make_order_book(self) -> OrderBook:
+        order_book: OrderBook = OrderBook()
+        order_book.use_fixed_point("0.5")
+        return order_book
+
+    def test_exact_price_lookups(self):
+        order_book: OrderBook = OrderBook()
+        order_book.use_fixed_point(Decimal("0.01"), Decimal("0.001"))
+        order_book.apply_snapshot([OrderBookRow(0.3, 1.0, 1)], [OrderBookRow(0.31, 2.0, 1)], 1)
+
+        # 0.1 + 0.2 is not 0.3 as a double - but both are on the same tick.
+        order_book.apply_diffs([OrderBookRow(0.1 + 0.2, 1.0004, 2)], [OrderBookRow(0.30999999, 0.0, 2)], 2)
+        self.assertEqual([OrderBookRow(0.3, 1.0, 2)], list(order_book.bid_entries()))
+        self.assertEqual([], list(order_book.ask_entries()))
+        self.assertEqual(30, order_book.price_to_ticks(0.1 + 0.2))
+        self.assertEqual(0.3, order_book.ticks_to_price(30))
+        self.assertEqual(0.01, order_book.fixed_point_tick_size)
+        self.assertEqual(0.001, order_book.fixed_point_lot_size)
+
+        # Amounts below half a lot are deletions, and are left out of snapshots.
+        order_book.apply_diffs([OrderBookRow(0.3, 0.0004, 3)], [], 3)
+        self.assertEqual([], list(order_book.bid_entries()))
+        order_book.apply_snapshot([OrderBookRow(0.29, 0.0004, 4), OrderBookRow(0.28, 1.0, 4)], [], 4)
+        self.assertEqual([OrderBookRow(0.28, 1.0, 4)], list(order_book.bid_entries()))
+        self.assertEqual(0.01, order_book.freeze().fixed_point_tick_size)
+
+    def test_to_bytes_fixed_point(self):
+        order_book: OrderBook = OrderBook()
+        order_book.use_fixed_point(Decimal("0.01"), Decimal("0.001"))
+        order_book.apply_snapshot([OrderBookRow(0.3, 1.0, 1)], [OrderBookRow(0.31, 2.0, 1)], 1)
+        restored_book: OrderBook = OrderBook.from_bytes(order_book.to_bytes())
+        self.assertEqual((0.01, 0.001), (restored_book.fixed_point_tick_size, restored_book.fixed_point_lot_size))
+        self.assertEqual(30, restored_book.price_to_ticks(0.1 + 0.2))
+
+        # Diffs applied to the restored order book are snapped to the same grids.
+        restored_book.apply_diffs([OrderBookRow(0.1 + 0.2, 1.0004, 2)], [OrderBookRow(0.30999999, 0.0, 2)], 2)
+        self.assertEqual([OrderBookRow(0.3, 1.0, 2)], list(restored_book.bid_entries()))
+        self.assertEqual([], list(restored_book.ask_entries()))
+
+        # Fixed-point prices don't need an amount grid.
+        order_book = OrderBook()
+        order_book.use_fixed_point("0.5")
+        restored_book = OrderBook.from_bytes(order_book.to_bytes())
+        self.assertEqual(0.5, restored_book.fixed_point_tick_size)
+        self.assertTrue(math.isnan(restored_book.fixed_point_lot_size))
+
+    def test_switch_to_fixed_point(self):
+        order_book: OrderBook = OrderBook()
+        order_book.apply_snapshot([OrderBookRow(100.004, 1.0, 1)], [OrderBookRow(100.016, 1.0, 1)], 5)
+        self.assertTrue(math.isnan(order_book.fixed_point_tick_size))
+        with self.assertRaises(ValueError):
+            order_book.price_to_ticks(100.0)
+        with self.assertRaises(ValueError):
+            order_book.use_fixed_point(0)
+        order_book.use_fixed_point(0.01)
+        self.assertEqual(5, order_book.snapshot_uid)
+        self.assertEqual([OrderBookRow(100.0, 1.0, 1)], list(order_book.bid_entries()))
+        self.assertEqual([OrderBookRow(100.02, 1.0, 1)], list(order_book.ask_entries()))
+        self.assertTrue(math.isnan(order_book.fixed_point_lot_size))
+
+
+class CompositeOrderBookUnitTest(unittest.TestCase):
+    def setUp(self):
+        self.random = random.Random(42)
+        self.venue_books: Dict[str, OrderBook] = {"binance": OrderBook(), "ddex": OrderBook()}
+        self.venue_books["ddex"].use_tick_ladder(0.5)
+        self.exchange_rates: Dict[str, float] = {"binance": 1.0, "ddex": 2.0}
+        for venue, order_book in self.venue_books.items():
+            rate: float = self.exchange_rates[venue]
+            order_book.apply_snapshot([OrderBookRow(1000.0 / rate - i * 0.5, 1.0, 1) for i in range(100)],
+                                      [OrderBookRow(1000.5 / rate + i * 0.5, 1.0, 1) for i in range(100)], 1)
+        self.composite_book: CompositeOrderBook = CompositeOrderBook()
+        for venue, order_book in self.venue_books.items():
+            self.composite_book.add_order_book(venue, order_book, self.exchange_rates[venue])
+
+    def apply_random_venue_diffs(self, rounds: int):
+        for update_id in range(2, rounds + 2):
+            venue: str = self.random.choice(list(self.venue_books.keys()))
+            base_price: float = 1000.0 / self.exchange_rates[venue]
+            bids = [OrderBookRow(base_price - self.random.randint(-4, 120) * 0.5,
+                                 self.random.choice([0.0, round(self.random.uniform(0.1, 10.0), 3)]), update_id)
+                    for _ in range(5)]
+            asks = [OrderBookRow(base_price + self.random.randint(-4, 120) * 0.5,
+                                 self.random.choice([0.0, round(self.random.uniform(0.1, 10.0), 3)]), update_id)
+                    for _ in range(5)]
+            self.venue_books[venue].apply_diffs(bids, asks, update_id)
+
+    def assert_composite_matches_venues(self):
+        for is_buy in [True, False]:
+            merged_levels: Dict[float, float] = {}
+            for venue, order_book in self.venue_books.items():
+                for row in (order_book.ask_entries() if is_buy else order_book.bid_entries()):
+                    price: float = row.price * self.exchange_rates[venue]
+                    merged_levels[price] = merged_levels.get(price, 0.0) + row.amount
+            expected_levels: List[Tuple[float, float]] = sorted(merged_levels.items(), reverse=not is_buy)
+            composite_levels: List[Tuple[float, float]] = [
+                (row.price, row.amount)
+                for row in (self.composite_book.ask_entries() if is_buy else self.composite_book.bid_entries())
+            ]
+            self.assertEqual([price for price, _ in expected_levels], [price for price, _ in composite_levels])
+            for (_, expected_amount), (_, amount) in zip(expected_levels, composite_levels):
+                self.assertAlmostEqual(expected_amount, amount)
+            total_volume: float = sum(amount for _, amount in expected_levels)
+            self.assertEqual(walk_price_for_volume([OrderBookRow(price, amount, 0)
+                                                    for price, amount in expected_levels], total_volume / 3),
+                             self.composite_book.get_price_for_volume(is_buy, total_volume / 3))
+
+    def test_merged_levels(self):
+        self.assert_composite_matches_venues()
+        self.assertEqual(1000.0, self.composite_book.get_price(False))
+        self.assertEqual({"binance": 1.0, "ddex": 1.0}, self.composite_book.get_venue_amounts(False, 1000.0))
+        self.apply_random_venue_diffs(300)
+        self.assert_composite_matches_venues()
+
+    def test_crossed_venues(self):
+        # A bid on one venue above the asks of the other venue doesn't remove any levels from the composite order book.
+        self.venue_books["binance"].apply_diffs([OrderBookRow(1001.0, 2.0, 2)], [OrderBookRow(1001.5, 2.0, 2)], 2)
+        self.assertEqual(1001.0, self.composite_book.get_price(False))
+        self.assertEqual(1000.5, self.composite_book.get_price(True))
+        self.assertEqual({"binance": 2.0}, self.composite_book.get_venue_amounts(False, 1001.0))
+        self.assertEqual({"ddex": 1.0}, self.composite_book.get_venue_amounts(True, 1000.5))
+        self.assert_composite_matches_venues()
+
+    def test_venue_changes(self):
+        self.venue_books["binance"].set_max_depth(10)
+        self.assert_composite_matches_venues()
+        self.apply_random_venue_diffs(100)
+        self.assert_composite_matches_venues()
+
+        self.exchange_rates["ddex"] = 2.5
+        self.composite_book.set_exchange_rate("ddex", 2.5)
+        self.assert_composite_matches_venues()
+
+        self.venue_books["ddex"].apply_snapshot([OrderBookRow(390.0, 3.0, 200)], [OrderBookRow(410.0, 3.0, 200)], 200)
+        self.assert_composite_matches_venues()
+
+        self.composite_book.remove_order_book("binance")
+        del self.venue_books["binance"]
+        self.assertEqual(["ddex"], self.composite_book.venues)
+        self.assert_composite_matches_venues()
+        self.assertEqual(975.0, self.composite_book.get_price(False))
+
+        with self.assertRaises(TypeError):
+            self.composite_book.apply_diffs([OrderBookRow(1.0, 1.0, 1)], [], 1)
+        with self.assertRaises(ValueError):
+            self.composite_book.add_order_book("ddex", OrderBook())
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    unittest.main()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+#!/usr/bin/env python
+
+from os.path import join, realpath
+import sys
+sys.path.insert(0, realpath(join(__file__, "../../")))
+
+import asyncio
+import numpy as np
+import os
+import tempfile
+from typing import (
+    Dict,
+    List,
+    Optional
+)
+import unittest
+
+from wings.data_source.order_book_server_data_source import OrderBookServerDataSource
+from wings.data_source.order_book_tracker_data_source import OrderBookTrackerDataSource
+from wings.order_book import OrderBook
+from wings.order_book_message import (
+    OrderBookMessage,
+    OrderBookMessageType
+)
+from wings.order_book_row import OrderBookRow
+from wings.order_book_server import (
+    FRAME_HEADER,
+    MAX_FRAME_ROWS,
+    PROTOCOL_MAGIC,
+    PROTOCOL_VERSION,
+    OrderBookFrame,
+    OrderBookFrameType,
+    OrderBookServer,
+    check_hello,
+    encode_frame,
+    open_connection,
+    parse_address,
+    read_frame
+)
+from wings.order_book_tracker import OrderBookTracker
+from wings.order_book_tracker_entry import OrderBookTrackerEntry
+
+
+class FixedOrderBookDataSource(OrderBookTrackerDataSource):
+    def __init__(self, order_books: Dict[str, OrderBook]):
+        self._order_books: Dict[str, OrderBook] = order_books
+
+    async def get_tracking_pairs(self) -> Dict[str, OrderBookTrackerEntry]:
+        return {
+            symbol: OrderBookTrackerEntry(symbol, 0.0, order_book)
+            for symbol, order_book in self._order_books.items()
+        }
+
+    async def listen_for_order_book_diffs(self, ev_loop: asyncio.BaseEventLoop, output: asyncio.Queue):
+        pass
+
+    async def listen_for_order_book_snapshots(self, ev_loop: asyncio.BaseEventLoop, output: asyncio.Queue):
+        pass
+
+
+class FixedOrderBookTracker(OrderBookTracker):
+    def __init__(self, order_books: Dict[str, OrderBook]):
+        super().__init__()
+        self._data_source: FixedOrderBookDataSource = FixedOrderBookDataSource(order_books)
+
+    @property
+    def data_source(self) -> OrderBookTrackerDataSource:
+        return self._data_source
+
+    async def start(self):
+        self._order_book_diff_router_task = asyncio.ensure_future(self._order_book_diff_router())
+        self._refresh_tracking_task = asyncio.ensure_future(self._refresh_tracking_loop())
+        await asyncio.gather(self._order_book_diff_router_task, self._refresh_tracking_task)
+
+
+def make_diff_message(symbol: str, update_id: int, bids: List[List[str]], asks: List[List[str]]) -> OrderBookMessage:
+    return OrderBookMessage(OrderBookMessageType.DIFF, {
+        "symbol": symbol,
+        "update_id": update_id,
+        "bids": bids,
+        "asks": asks
+    }, timestamp=float(update_id))
+
+
+class OrderBookFrameUnitTest(unittest.TestCase):
+    def setUp(self):
+        self.ev_loop: asyncio.AbstractEventLoop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.ev_loop)
+
+    def tearDown(self):
+        self.ev_loop.close()
+
+    def test_encode_and_read(self):
+        bids: np.ndarray = np.array([[100.0, 1.0, 5.0], [99.0, 2.0, 5.0]])
+        asks: np.ndarray = np.array([[101.0, 3.0, 5.0]])
+        reader: asyncio.StreamReader = asyncio.StreamReader()
+        reader.feed_data(encode_frame(OrderBookFrameType.DIFF, "ETHUSDT", 5, 1.5, bids, asks))
+        reader.feed_data(encode_frame(OrderBookFrameType.SUBSCRIBE, "BTCUSDT"))
+        reader.feed_data(b"\x63" + bytes(31))
+        reader.feed_eof()
+
+        frame: OrderBookFrame = self.ev_loop.run_until_complete(read_frame(reader))
+        self.assertEqual((OrderBookFrameType.DIFF, "ETHUSDT", 5, 1.5), frame[:4])
+        np.testing.assert_array_equal(bids, frame.bids)
+        np.testing.assert_array_equal(asks, frame.asks)
+        frame = self.ev_loop.run_until_complete(read_frame(reader))
+        self.assertEqual((OrderBookFrameType.SUBSCRIBE, "BTCUSDT"), frame[:2])
+        self.assertEqual((0, 3), frame.bids.shape)
+        with self.assertRaises(ValueError):
+            self.ev_loop.run_until_complete(read_frame(reader))
+        with self.assertRaises(asyncio.IncompleteReadError):
+            self.ev_loop.run_until_complete(read_frame(reader))
+
+    def test_parse_address(self):
+        self.assertEqual(("/tmp/order_books.sock", None, None), parse_address("/tmp/order_books.sock"))
+        self.assertEqual((None, "10.0.0.1", 8222), parse_address("10.0.0.1:8222"))
+        self.assertEqual((None, "127.0.0.1", 8222), parse_address(":8222"))
+
+
+class OrderBookServerUnitTest(unittest.TestCase):
+    def setUp(self):
+        self.ev_loop: asyncio.AbstractEventLoop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.ev_loop)
+        order_books: Dict[str, OrderBook] = {}
+        for symbol in ["ETHUSDT", "BTCUSDT", "XRPBTC"]:
+            order_books[symbol] = OrderBook()
+            order_books[symbol].apply_snapshot([OrderBookRow(100.0, 1.0, 10), OrderBookRow(99.0, 2.0, 10)],
+                                               [OrderBookRow(101.0, 1.0, 10)], 10)
+        self.tracker: FixedOrderBookTracker = FixedOrderBookTracker(order_books)
+        self.temp_dir: tempfile.TemporaryDirectory = tempfile.TemporaryDirectory()
+        self.address: str = os.path.join(self.temp_dir.name, "order_books.sock")
+        self.server: OrderBookServer = OrderBookServer(self.tracker, self.address)
+        self.server_task: asyncio.Task = self.ev_loop.create_task(self.server.start())
+        self.ev_loop.run_until_complete(asyncio.sleep(0.01))
+
+    def tearDown(self):
+        self.server_task.cancel()
+        for task in [self.tracker._order_book_diff_router_task, self.tracker._refresh_tracking_task] + \
+                list(self.tracker._tracking_tasks.values()):
+            if task is not None:
+                task.cancel()
+        self.ev_loop.run_until_complete(asyncio.sleep(0.01))
+        self.ev_loop.close()
+        self.temp_dir.cleanup()
+
+    def run_async(self, coroutine):
+        return self.ev_loop.run_until_complete(asyncio.wait_for(coroutine, timeout=5))
+
+    def put_diffs(self, *messages: OrderBookMessage):
+        for message in messages:
+            self.tracker._order_book_diff_stream.put_nowait(message)
+        self.ev_loop.run_until_complete(asyncio.sleep(0.05))
+
+    def assert_same_order_book(self, order_book: OrderBook, other_order_book: OrderBook):
+        for side, other_side in zip(order_book.snapshot_arrays(), other_order_book.snapshot_arrays()):
+            np.testing.assert_array_equal(side[:, :2], other_side[:, :2])
+
+    def test_serve_order_books(self):
+        data_source: OrderBookServerDataSource = OrderBookServerDataSource(self.address)
+        self.assertEqual(["BTCUSDT", "ETHUSDT", "XRPBTC"], self.run_async(data_source.get_trading_pairs()))
+
+        # The client bootstraps from the server's snapshots, and the server tracks only what its clients subscribe to.
+        data_source.set_subscribed_symbols(["ETHUSDT", "BTCUSDT"])
+        tracking_pairs: Dict[str, OrderBookTrackerEntry] = self.run_async(data_source.get_tracking_pairs())
+        self.assertEqual({"ETHUSDT", "BTCUSDT"}, set(tracking_pairs.keys()))
+        self.assertEqual({"ETHUSDT", "BTCUSDT"}, set(self.tracker.order_books.keys()))
+        client_order_book: OrderBook = tracking_pairs["ETHUSDT"].order_book
+        self.assertEqual(10, client_order_book.snapshot_uid)
+        self.assert_same_order_book(self.tracker.order_books["ETHUSDT"], client_order_book)
+        self.ev_loop.run_until_complete(asyncio.sleep(0.05))
+        self.assertEqual({}, self.tracker.subscription_counts)
+
+        # Streams the diffs the tracker applies, after a snapshot.
+        diffs: asyncio.Queue = asyncio.Queue()
+        snapshots: asyncio.Queue = asyncio.Queue()
+        listener_tasks: List[asyncio.Task] = [
+            self.ev_loop.create_task(data_source.listen_for_order_book_diffs(self.ev_loop, diffs)),
+            self.ev_loop.create_task(data_source.listen_for_order_book_snapshots(self.ev_loop, snapshots))
+        ]
+        try:
+            snapshot_messages: List[OrderBookMessage] = [self.run_async(snapshots.get()) for _ in range(2)]
+            self.assertEqual({"ETHUSDT", "BTCUSDT"}, {message.symbol for message in snapshot_messages})
+            self.put_diffs(make_diff_message("ETHUSDT", 11, [["100.0", "0"], ["99.5", "3.0"]], []),
+                           make_diff_message("XRPBTC", 11, [["100.0", "5.0"]], []))
+            self.put_diffs(make_diff_message("ETHUSDT", 12, [], [["101.0", "4.0"]]))
+            diff_messages: List[OrderBookMessage] = [self.run_async(diffs.get()) for _ in range(2)]
+            self.assertTrue(diffs.empty())
+            self.assertEqual([11, 12], [message.update_id for message in diff_messages])
+            for message in diff_messages:
+                self.assertEqual(OrderBookMessageType.DIFF, message.type)
+                client_order_book.apply_diffs(message.bids_array, message.asks_array, message.update_id)
+            self.assert_same_order_book(self.tracker.order_books["ETHUSDT"], client_order_book)
+            self.assertEqual(1, self.server.stats["clients"])
+
+            # Subscription changes are followed on the open connection.
+            data_source.set_subscribed_symbols(["XRPBTC"])
+            snapshot_message: OrderBookMessage = self.run_async(snapshots.get())
+            self.assertEqual(("XRPBTC", 10), (snapshot_message.symbol, snapshot_message.update_id))
+            self.assertEqual(["XRPBTC"], list(self.tracker.subscription_counts.keys()))
+            consumers: List[str] = list(self.tracker.subscription_counts["XRPBTC"].keys())
+            self.assertEqual(1, len(consumers))
+
+            # Resubscribes and gets new snapshots after reconnecting.
+            for client in list(self.server._clients.values()):
+                client.writer.transport.abort()
+            data_source.RECONNECT_DELAY = 0.0
+            snapshot_message = self.run_async(snapshots.get())
+            self.assertEqual("XRPBTC", snapshot_message.symbol)
+            self.assertEqual(["XRPBTC"], list(self.tracker.subscription_counts.keys()))
+            self.assertNotEqual(consumers, list(self.tracker.subscription_counts["XRPBTC"].keys()))
+        finally:
+            for task in listener_tasks:
+                task.cancel()
+        self.ev_loop.run_until_complete(asyncio.sleep(0.05))
+        self.assertEqual(0, self.server.stats["clients"])
+
+    def test_reject_large_client_frames(self):
+        async def send_frames(*frames: bytes) -> Optional[OrderBookFrame]:
+            reader, writer = await open_connection(self.address)
+            writer.write(encode_frame(OrderBookFrameType.HELLO, PROTOCOL_MAGIC, PROTOCOL_VERSION))
+            await check_hello(reader)
+            for frame in frames:
+                writer.write(frame)
+            try:
+                return await read_frame(reader)
+            except asyncio.IncompleteReadError:
+                return None
+            finally:
+                writer.close()
+
+        # Frames that carry rows or long symbols get the client disconnected, before their rows are read.
+        rows: np.ndarray = np.array([[100.0, 1.0, 5.0]])
+        for frame_type in [OrderBookFrameType.SUBSCRIBE, OrderBookFrameType.UNSUBSCRIBE,
+                           OrderBookFrameType.LIST_SYMBOLS]:
+            self.assertIsNone(self.run_async(send_frames(encode_frame(frame_type, "ETHUSDT", 0, 0.0, rows))))
+        self.assertIsNone(self.run_async(send_frames(encode_frame(OrderBookFrameType.SUBSCRIBE, "X" * 65))))
+        header: bytes = FRAME_HEADER.pack(OrderBookFrameType.SUBSCRIBE.value, 7, MAX_FRAME_ROWS, 0, 0, 0.0)
+        self.assertIsNone(self.run_async(send_frames(header)))
+        self.assertEqual({}, self.tracker.subscription_counts)
+
+        # Symbols up to the limit are fine.
+        frame: OrderBookFrame = self.run_async(send_frames(encode_frame(OrderBookFrameType.UNSUBSCRIBE, "X" * 64),
+                                                           encode_frame(OrderBookFrameType.LIST_SYMBOLS)))
+        self.assertEqual((OrderBookFrameType.SYMBOLS, "BTCUSDT,ETHUSDT,XRPBTC"), frame[:2])
+
+    def test_stop(self):
+        self.server_task.cancel()
+        self.ev_loop.run_until_complete(asyncio.sleep(0.01))
+        self.assertFalse(os.path.exists(self.address))
+        self.assertEqual([], self.tracker._order_book_listeners)
+
+
+if __name__ == "__main__":
+    unittest.main()
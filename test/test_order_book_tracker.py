@@ -0,0 +1,600 @@
+#!/usr/bin/env python
+
+from os.path import join, realpath
+import sys
+sys.path.insert(0, realpath(join(__file__, "../../")))
+
+import asyncio
+import os
+import pandas as pd
+import tempfile
+import time
+from typing import (
+    Dict,
+    List,
+    Optional
+)
+import unittest
+
+from wings.data_source.ddex_api_order_book_data_source import DDEXAPIOrderBookDataSource
+from wings.data_source.order_book_tracker_data_source import OrderBookTrackerDataSource
+from wings.data_source.radar_relay_api_order_book_data_source import RadarRelayAPIOrderBookDataSource
+from wings.order_book import OrderBook
+from wings.order_book_message import (
+    DDEXOrderBookMessage,
+    OrderBookMessage,
+    OrderBookMessageType,
+    RadarRelayOrderBookMessage
+)
+from wings.order_book_row import OrderBookRow
+from wings.order_book_tracker import (
+    OrderBookConflationPolicy,
+    OrderBookMessageBuffer,
+    OrderBookTracker,
+    OrderBookTrackerDataSourceType
+)
+from wings.order_book_tracker_entry import OrderBookTrackerEntry
+from wings.tracker.ddex_order_book_tracker import DDEXOrderBookTracker
+from wings.tracker.radar_relay_order_book_tracker import RadarRelayOrderBookTracker
+
+
+class FixedOrderBookDataSource(OrderBookTrackerDataSource):
+    def __init__(self, order_books: Dict[str, OrderBook]):
+        self._order_books: Dict[str, OrderBook] = order_books
+        self.snapshot_messages: Dict[str, OrderBookMessage] = {}
+        self.snapshot_requests: List[str] = []
+
+    async def get_tracking_pairs(self) -> Dict[str, OrderBookTrackerEntry]:
+        return {
+            symbol: OrderBookTrackerEntry(symbol, 0.0, order_book)
+            for symbol, order_book in self._order_books.items()
+        }
+
+    async def get_snapshot_message(self, symbol: str) -> OrderBookMessage:
+        self.snapshot_requests.append(symbol)
+        return self.snapshot_messages[symbol]
+
+    async def listen_for_order_book_diffs(self, ev_loop: asyncio.BaseEventLoop, output: asyncio.Queue):
+        pass
+
+    async def listen_for_order_book_snapshots(self, ev_loop: asyncio.BaseEventLoop, output: asyncio.Queue):
+        pass
+
+
+class FixedOrderBookTracker(OrderBookTracker):
+    def __init__(self, order_books: Dict[str, OrderBook]):
+        super().__init__()
+        self._data_source: FixedOrderBookDataSource = FixedOrderBookDataSource(order_books)
+
+    @property
+    def data_source(self) -> OrderBookTrackerDataSource:
+        return self._data_source
+
+    async def start(self):
+        self._order_book_diff_router_task = asyncio.ensure_future(self._order_book_diff_router())
+        await self._refresh_tracking_tasks()
+
+
+def make_diff_message(symbol: str,
+                      update_id: int,
+                      bids: List[List[str]],
+                      first_update_id: Optional[int] = None) -> OrderBookMessage:
+    content: Dict[str, any] = {
+        "symbol": symbol,
+        "update_id": update_id,
+        "bids": bids,
+        "asks": []
+    }
+    if first_update_id is not None:
+        content["first_update_id"] = first_update_id
+    return OrderBookMessage(OrderBookMessageType.DIFF, content, timestamp=float(update_id))
+
+
+class OrderBookTrackerCheckpointUnitTest(unittest.TestCase):
+    def setUp(self):
+        self.ev_loop: asyncio.AbstractEventLoop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.ev_loop)
+        self.temp_dir: tempfile.TemporaryDirectory = tempfile.TemporaryDirectory()
+        self.checkpoint_path: str = os.path.join(self.temp_dir.name, "order_books.checkpoint")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+        self.ev_loop.close()
+
+    def make_order_books(self) -> Dict[str, OrderBook]:
+        order_books: Dict[str, OrderBook] = {}
+        for symbol, base_price in [("ETHUSDT", 100.0), ("BTCUSDT", 4000.0), ("XRPBTC", 0.00008)]:
+            order_book: OrderBook = OrderBook()
+            order_book.apply_snapshot([OrderBookRow(base_price * (1 - i * 0.001), 1.0 + i, 10) for i in range(20)],
+                                      [OrderBookRow(base_price * (1.001 + i * 0.001), 2.0 + i, 10) for i in range(20)],
+                                      10)
+            order_book.apply_diffs([OrderBookRow(base_price, 5.0, 12)], [], 12)
+            order_books[symbol] = order_book
+        return order_books
+
+    def test_checkpoint_and_restore(self):
+        order_books: Dict[str, OrderBook] = self.make_order_books()
+        tracker: FixedOrderBookTracker = FixedOrderBookTracker(order_books)
+        self.ev_loop.run_until_complete(tracker._refresh_tracking_tasks())
+        self.assertEqual(3, tracker.checkpoint(self.checkpoint_path))
+        self.assertFalse(os.path.exists(f"{self.checkpoint_path}.tmp"))
+        for task in tracker._tracking_tasks.values():
+            task.cancel()
+
+        # The restored tracker starts out with the checkpointed order books, rather than the data source's.
+        restored_tracker: FixedOrderBookTracker = FixedOrderBookTracker(self.make_order_books())
+        self.assertEqual(sorted(order_books.keys()), sorted(restored_tracker.restore(self.checkpoint_path)))
+        self.ev_loop.run_until_complete(restored_tracker.start())
+        for symbol, order_book in order_books.items():
+            restored_book: OrderBook = restored_tracker.order_books[symbol]
+            self.assertIsNot(restored_tracker.data_source._order_books[symbol], restored_book)
+            self.assertEqual(list(order_book.bid_entries()), list(restored_book.bid_entries()))
+            self.assertEqual(list(order_book.ask_entries()), list(restored_book.ask_entries()))
+            self.assertEqual((10, 12), (restored_book.snapshot_uid, restored_book.last_diff_uid))
+
+        # Diffs that were already applied before the checkpoint are skipped, and newer ones are applied.
+        restored_book: OrderBook = restored_tracker.order_books["ETHUSDT"]
+        restored_tracker._order_book_diff_stream.put_nowait(make_diff_message("ETHUSDT", 11, [["99.95", "7.0"]]))
+        restored_tracker._order_book_diff_stream.put_nowait(make_diff_message("ETHUSDT", 13, [["99.9", "8.0"]]))
+        self.ev_loop.run_until_complete(asyncio.sleep(0.1))
+        bids: Dict[float, float] = {row.price: row.amount for row in restored_book.bid_entries()}
+        self.assertNotIn(99.95, bids)
+        self.assertEqual(8.0, bids[99.9])
+        self.assertEqual(13, restored_book.last_diff_uid)
+
+        restored_tracker._order_book_diff_router_task.cancel()
+        for task in restored_tracker._tracking_tasks.values():
+            task.cancel()
+        self.ev_loop.run_until_complete(asyncio.sleep(0))
+
+    def test_restore_invalid_checkpoint(self):
+        with open(self.checkpoint_path, "wb") as fd:
+            fd.write(b"not a checkpoint")
+        with self.assertRaises(ValueError):
+            FixedOrderBookTracker({}).restore(self.checkpoint_path)
+
+
+class OrderBookTrackerSequenceGapUnitTest(unittest.TestCase):
+    def setUp(self):
+        self.ev_loop: asyncio.AbstractEventLoop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.ev_loop)
+        self.order_book: OrderBook = OrderBook()
+        self.order_book.apply_snapshot([OrderBookRow(100.0, 1.0, 10)], [OrderBookRow(101.0, 1.0, 10)], 10)
+        self.tracker: FixedOrderBookTracker = FixedOrderBookTracker({"ETHUSDT": self.order_book})
+        self.tracker.SNAPSHOT_RESYNC_DELAY = 0.0
+        self.ev_loop.run_until_complete(self.tracker.start())
+
+    def tearDown(self):
+        self.tracker._order_book_diff_router_task.cancel()
+        for task in list(self.tracker._tracking_tasks.values()) + list(self.tracker._resync_tasks.values()):
+            task.cancel()
+        self.ev_loop.run_until_complete(asyncio.sleep(0))
+        self.ev_loop.close()
+
+    def put_diffs(self, *messages: OrderBookMessage):
+        for message in messages:
+            self.tracker._order_book_diff_stream.put_nowait(message)
+        self.ev_loop.run_until_complete(asyncio.sleep(0.1))
+
+    def test_sequence_gap_resync(self):
+        data_source: FixedOrderBookDataSource = self.tracker.data_source
+        data_source.snapshot_messages["ETHUSDT"] = OrderBookMessage(OrderBookMessageType.SNAPSHOT, {
+            "symbol": "ETHUSDT",
+            "update_id": 20,
+            "bids": [["99.0", "3.0"]],
+            "asks": [["101.0", "3.0"]]
+        }, timestamp=20.0)
+
+        # The first diff may start before the snapshot's update ID, and the following diffs continue from the last.
+        self.put_diffs(make_diff_message("ETHUSDT", 12, [["100.0", "2.0"]], first_update_id=9),
+                       make_diff_message("ETHUSDT", 15, [["100.0", "3.0"]], first_update_id=13))
+        self.assertEqual({}, self.tracker.sequence_gap_counts)
+        self.assertEqual([], data_source.snapshot_requests)
+
+        # Diffs without first update IDs can't be checked.
+        self.put_diffs(make_diff_message("ETHUSDT", 17, [["100.0", "4.0"]]))
+        self.assertEqual({}, self.tracker.sequence_gap_counts)
+
+        # A gap resyncs the order book from a snapshot, and the diffs after the snapshot are replayed on top of it.
+        self.put_diffs(make_diff_message("ETHUSDT", 21, [["98.0", "5.0"]], first_update_id=19))
+        self.assertEqual({"ETHUSDT": 1}, self.tracker.sequence_gap_counts)
+        self.assertEqual(["ETHUSDT"], data_source.snapshot_requests)
+        self.assertEqual(20, self.order_book.snapshot_uid)
+        bids: Dict[float, float] = {row.price: row.amount for row in self.order_book.bid_entries()}
+        self.assertEqual({99.0: 3.0, 98.0: 5.0}, bids)
+        self.assertEqual(set(), self.tracker.stale_symbols)
+
+        # Another gap right after the resync waits for SNAPSHOT_RESYNC_MIN_INTERVAL. Until the resync, the order book
+        # is stale, and the diffs after the gap aren't applied.
+        self.put_diffs(make_diff_message("ETHUSDT", 30, [["97.0", "1.0"]], first_update_id=25),
+                       make_diff_message("ETHUSDT", 31, [["96.0", "1.0"]], first_update_id=31))
+        self.assertEqual({"ETHUSDT": 2}, self.tracker.sequence_gap_counts)
+        self.assertEqual(["ETHUSDT"], data_source.snapshot_requests)
+        self.assertFalse(self.tracker._resync_tasks["ETHUSDT"].done())
+        self.assertEqual({"ETHUSDT"}, self.tracker.stale_symbols)
+        self.assertEqual(21, self.order_book.last_diff_uid)
+        bids = {row.price: row.amount for row in self.order_book.bid_entries()}
+        self.assertEqual({99.0: 3.0, 98.0: 5.0}, bids)
+
+    def test_batched_diffs(self):
+        # Diffs that arrive together are applied in a single wakeup, with the same result as one at a time.
+        expected_book: OrderBook = OrderBook()
+        expected_book.apply_snapshot([OrderBookRow(100.0, 1.0, 10)], [OrderBookRow(101.0, 1.0, 10)], 10)
+        messages: List[OrderBookMessage] = [
+            make_diff_message("ETHUSDT", 11 + i, [[str(99.0 + (i % 3) * 0.5), str(float(i))]], first_update_id=11 + i)
+            for i in range(10)
+        ]
+        for message in messages:
+            expected_book.apply_diffs(message.bids_array, message.asks_array, message.update_id)
+
+        self.put_diffs(*messages)
+        self.assertEqual(list(expected_book.bid_entries()), list(self.order_book.bid_entries()))
+        self.assertEqual(20, self.order_book.last_diff_uid)
+        self.assertEqual({}, self.tracker.sequence_gap_counts)
+        self.assertEqual(10, len(self.tracker._past_diffs_windows["ETHUSDT"]))
+        self.assertTrue(all(message.apply_timestamp_ns >= message.receive_timestamp_ns for message in messages))
+        latency_stats: Dict[str, Dict[str, float]] = self.tracker.feed_latency_stats["ETHUSDT"]
+        self.assertEqual(10, latency_stats["processing"]["count"])
+        # The test messages have no exchange event time.
+        self.assertEqual(0, latency_stats["total"]["count"])
+        self.assertEqual(latency_stats["processing"], self.tracker.exchange_feed_latency_stats["processing"])
+        stats: Dict[str, float] = self.tracker.message_batch_stats["ETHUSDT"]
+        self.assertEqual((1, 10, 10.0, 10),
+                         (stats["wakeups"], stats["messages"], stats["messages_per_wakeup"], stats["max_batch_size"]))
+
+        # Gaps within a batch are detected against the previous diff in the batch.
+        self.tracker.data_source.snapshot_messages["ETHUSDT"] = OrderBookMessage(OrderBookMessageType.SNAPSHOT, {
+            "symbol": "ETHUSDT",
+            "update_id": 22,
+            "bids": [["99.0", "3.0"]],
+            "asks": [["101.0", "3.0"]]
+        }, timestamp=22.0)
+        self.put_diffs(make_diff_message("ETHUSDT", 21, [["98.0", "1.0"]], first_update_id=21),
+                       make_diff_message("ETHUSDT", 23, [["97.0", "1.0"]], first_update_id=23),
+                       make_diff_message("ETHUSDT", 24, [["96.0", "1.0"]], first_update_id=24))
+        self.assertEqual({"ETHUSDT": 1}, self.tracker.sequence_gap_counts)
+        self.assertEqual(22, self.order_book.snapshot_uid)
+        bids: Dict[float, float] = {row.price: row.amount for row in self.order_book.bid_entries()}
+        self.assertEqual({99.0: 3.0, 97.0: 1.0, 96.0: 1.0}, bids)
+
+
+class BoundedOrderBookTracker(FixedOrderBookTracker):
+    MESSAGE_STREAM_MAX_SIZE = 4
+    MESSAGE_BUFFER_MAX_SIZE = 5
+
+
+class ResyncingOrderBookTracker(BoundedOrderBookTracker):
+    CONFLATION_POLICY = OrderBookConflationPolicy.RESYNC
+
+
+class OrderBookTrackerConflationUnitTest(unittest.TestCase):
+    def setUp(self):
+        self.ev_loop: asyncio.AbstractEventLoop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.ev_loop)
+        self.order_book: OrderBook = OrderBook()
+        self.order_book.apply_snapshot([OrderBookRow(100.0, 1.0, 10)], [OrderBookRow(101.0, 1.0, 10)], 10)
+        self.tracker: Optional[FixedOrderBookTracker] = None
+
+    def tearDown(self):
+        self.tracker._order_book_diff_router_task.cancel()
+        for task in list(self.tracker._tracking_tasks.values()) + list(self.tracker._resync_tasks.values()):
+            task.cancel()
+        self.ev_loop.run_until_complete(asyncio.sleep(0))
+        self.ev_loop.close()
+
+    def start_tracker(self, tracker: FixedOrderBookTracker):
+        self.tracker = tracker
+        self.tracker.SNAPSHOT_RESYNC_DELAY = 0.0
+        self.ev_loop.run_until_complete(self.tracker.start())
+
+    def test_merge_diffs(self):
+        self.start_tracker(BoundedOrderBookTracker({"ETHUSDT": self.order_book}))
+        expected_book: OrderBook = OrderBook()
+        expected_book.apply_snapshot([OrderBookRow(100.0, 1.0, 10)], [OrderBookRow(101.0, 1.0, 10)], 10)
+        messages: List[OrderBookMessage] = [
+            make_diff_message("ETHUSDT", 11 + i, [[str(99.0 + (i % 4) * 0.5), str(float(i % 3))]],
+                              first_update_id=11 + i)
+            for i in range(20)
+        ]
+        for message in messages:
+            expected_book.apply_diffs(message.bids_array, message.asks_array, message.update_id)
+
+        # Without yielding to the event loop, the full stream overflows into the order book's buffer, which merges its
+        # pending diffs - neither holds more messages than its limit.
+        for message in messages:
+            self.tracker._order_book_diff_stream.put_nowait(message)
+            self.assertLessEqual(self.tracker.message_stream_stats["diff"]["depth"], 4)
+            self.assertLessEqual(self.tracker.message_queue_stats["ETHUSDT"]["depth"], 5)
+        self.assertEqual(4, self.tracker.message_stream_stats["diff"]["overflows"])
+        queue_stats: Dict[str, int] = self.tracker.message_queue_stats["ETHUSDT"]
+        self.assertEqual(3, queue_stats["conflations"])
+        self.assertEqual(15, queue_stats["conflated_messages"])
+        self.assertEqual(0, queue_stats["dropped_messages"])
+
+        self.ev_loop.run_until_complete(asyncio.sleep(0.1))
+        self.assertEqual(list(expected_book.bid_entries()), list(self.order_book.bid_entries()))
+        self.assertEqual(30, self.order_book.last_diff_uid)
+        self.assertEqual({}, self.tracker.sequence_gap_counts)
+        self.assertEqual(0, self.tracker.message_queue_stats["ETHUSDT"]["depth"])
+
+    def test_resync(self):
+        self.start_tracker(ResyncingOrderBookTracker({"ETHUSDT": self.order_book}))
+        data_source: FixedOrderBookDataSource = self.tracker.data_source
+        data_source.snapshot_messages["ETHUSDT"] = OrderBookMessage(OrderBookMessageType.SNAPSHOT, {
+            "symbol": "ETHUSDT",
+            "update_id": 40,
+            "bids": [["99.0", "3.0"]],
+            "asks": [["101.0", "3.0"]]
+        }, timestamp=40.0)
+
+        for i in range(20):
+            self.tracker._order_book_diff_stream.put_nowait(make_diff_message("ETHUSDT", 11 + i, [["98.0", str(i)]]))
+        queue_stats: Dict[str, int] = self.tracker.message_queue_stats["ETHUSDT"]
+        self.assertEqual(2, queue_stats["conflations"])
+        self.assertEqual(12, queue_stats["dropped_messages"])
+
+        # The dropped diffs are replaced by a resync snapshot.
+        self.ev_loop.run_until_complete(asyncio.sleep(0.1))
+        self.assertEqual(["ETHUSDT"], data_source.snapshot_requests)
+        self.assertEqual(40, self.order_book.snapshot_uid)
+        bids: Dict[float, float] = {row.price: row.amount for row in self.order_book.bid_entries()}
+        self.assertEqual({99.0: 3.0}, bids)
+
+
+class Level3OrderBookTrackerResyncUnitTest(unittest.TestCase):
+    """
+    Overflows the order book buffers of the level 3 trackers, which resync the order books from their exchange API
+    data sources.
+    """
+    def setUp(self):
+        self.ev_loop: asyncio.AbstractEventLoop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.ev_loop)
+        self.tracker: Optional[OrderBookTracker] = None
+        self.snapshot_requests: List[str] = []
+        for data_source_class in [DDEXAPIOrderBookDataSource, RadarRelayAPIOrderBookDataSource]:
+            data_source_class._request_scheduler = None
+
+    def tearDown(self):
+        if self.tracker is not None:
+            self.tracker._order_book_diff_router_task.cancel()
+            for task in list(self.tracker._tracking_tasks.values()) + list(self.tracker._resync_tasks.values()):
+                task.cancel()
+            self.ev_loop.run_until_complete(asyncio.sleep(0))
+        self.ev_loop.close()
+
+    def start_tracker(self, tracker: OrderBookTracker):
+        self.tracker = tracker
+        self.tracker.MESSAGE_BUFFER_MAX_SIZE = 5
+        self.tracker.SNAPSHOT_RESYNC_DELAY = 0.0
+        self.ev_loop.run_until_complete(self.tracker._refresh_tracking_tasks())
+        self.tracker._order_book_diff_router_task = self.ev_loop.create_task(self.tracker._order_book_diff_router())
+        self.ev_loop.run_until_complete(asyncio.sleep(0.01))
+
+    def overflow(self, symbol: str, diffs: List[OrderBookMessage]) -> Dict[str, int]:
+        for diff in diffs:
+            self.tracker._order_book_diff_stream.put_nowait(diff)
+        self.ev_loop.run_until_complete(asyncio.sleep(0.1))
+        return self.tracker.message_queue_stats[symbol]
+
+    def test_ddex_resync(self):
+        tracker: DDEXOrderBookTracker = DDEXOrderBookTracker(OrderBookTrackerDataSourceType.EXCHANGE_API,
+                                                             symbols=["WETH-DAI"])
+        snapshot_bids: List[Dict[str, str]] = [{"orderId": "a", "price": "100.0", "amount": "1.0"}]
+
+        async def get_snapshot(client, trading_pair: str, level: int = 3) -> Dict[str, any]:
+            self.snapshot_requests.append(trading_pair)
+            return {"data": {"orderBook": {"bids": list(snapshot_bids), "asks": []}}}
+
+        tracker.data_source.get_snapshot = get_snapshot
+        self.start_tracker(tracker)
+        self.assertTrue(tracker.data_source.supports_snapshot_messages)
+
+        snapshot_bids.append({"orderId": "b", "price": "99.0", "amount": "3.0"})
+        now_ms: int = int(time.time() * 1e3)
+        queue_stats: Dict[str, int] = self.overflow("WETH-DAI", [
+            DDEXOrderBookMessage(OrderBookMessageType.DIFF, {
+                "type": "receive", "orderType": "limit", "side": "buy", "orderId": f"diff_{i}", "price": "98.0",
+                "availableAmount": "1.0", "marketId": "WETH-DAI", "time": now_ms + 1000 + i
+            }) for i in range(20)
+        ])
+
+        # The dropped diffs are replaced by a resync snapshot from the exchange.
+        self.assertGreater(queue_stats["dropped_messages"], 0)
+        self.assertEqual(["WETH-DAI", "WETH-DAI"], self.snapshot_requests)
+        bids: Dict[float, float] = {row.price: row.amount for row in tracker.order_books["WETH-DAI"].bid_entries()}
+        self.assertEqual((1.0, 3.0), (bids[100.0], bids[99.0]))
+
+    def test_radar_relay_resync(self):
+        tracker: RadarRelayOrderBookTracker = RadarRelayOrderBookTracker(OrderBookTrackerDataSourceType.EXCHANGE_API,
+                                                                         symbols=["WETH-DAI"])
+        snapshot_bids: List[Dict[str, str]] = [{"orderHash": "a", "price": "100.0", "remainingBaseTokenAmount": "1.0"}]
+
+        async def get_snapshot(client, trading_pair: str) -> Dict[str, any]:
+            self.snapshot_requests.append(trading_pair)
+            return {"bids": list(snapshot_bids), "asks": []}
+
+        async def get_all_token_info() -> Dict[str, any]:
+            return {"0xweth": {"symbol": "WETH"}, "0xdai": {"symbol": "DAI"}}
+
+        tracker.data_source.get_snapshot = get_snapshot
+        tracker.data_source.get_all_token_info = get_all_token_info
+        tracker.data_source.http_client = lambda: None
+        self.start_tracker(tracker)
+        self.assertTrue(tracker.data_source.supports_snapshot_messages)
+
+        snapshot_bids.append({"orderHash": "b", "price": "99.0", "remainingBaseTokenAmount": "3.0"})
+        created_date: str = pd.Timestamp(time.time() + 1.0, unit="s").isoformat()
+        queue_stats: Dict[str, int] = self.overflow("WETH-DAI", [
+            RadarRelayOrderBookMessage(OrderBookMessageType.DIFF, {
+                "action": "NEW",
+                "event": {
+                    "order": {"type": "BID", "orderHash": f"diff_{i}", "price": "98.0",
+                              "remainingBaseTokenAmount": "1.0", "createdDate": created_date},
+                    "baseTokenAddress": "0xweth",
+                    "quoteTokenAddress": "0xdai"
+                }
+            }) for i in range(20)
+        ])
+
+        self.assertGreater(queue_stats["dropped_messages"], 0)
+        self.assertEqual(["WETH-DAI", "WETH-DAI"], self.snapshot_requests)
+        bids: Dict[float, float] = {row.price: row.amount for row in tracker.order_books["WETH-DAI"].bid_entries()}
+        self.assertEqual((1.0, 3.0), (bids[100.0], bids[99.0]))
+
+    def test_keep_diffs_without_resync(self):
+        # Trackers whose data sources can't fetch resync snapshots keep all the diffs instead of dropping them.
+        tracker: DDEXOrderBookTracker = DDEXOrderBookTracker(OrderBookTrackerDataSourceType.REMOTE_API)
+        self.assertFalse(tracker.data_source.supports_snapshot_messages)
+        self.assertIs(OrderBookConflationPolicy.KEEP_DIFFS, tracker._create_message_buffer()._conflation_policy)
+        tracker = DDEXOrderBookTracker(OrderBookTrackerDataSourceType.EXCHANGE_API)
+        self.assertIs(OrderBookConflationPolicy.RESYNC, tracker._create_message_buffer()._conflation_policy)
+
+
+class OrderBookTrackerSubscriptionUnitTest(unittest.TestCase):
+    def setUp(self):
+        self.ev_loop: asyncio.AbstractEventLoop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.ev_loop)
+        order_books: Dict[str, OrderBook] = {}
+        for symbol in ["ETHUSDT", "BTCUSDT", "XRPBTC"]:
+            order_books[symbol] = OrderBook()
+            order_books[symbol].apply_snapshot([OrderBookRow(100.0, 1.0, 10)], [OrderBookRow(101.0, 1.0, 10)], 10)
+        self.tracker: FixedOrderBookTracker = FixedOrderBookTracker(order_books)
+        self.refresh_task: Optional[asyncio.Task] = None
+
+    def tearDown(self):
+        if self.refresh_task is not None:
+            self.refresh_task.cancel()
+        for task in self.tracker._tracking_tasks.values():
+            task.cancel()
+        self.ev_loop.run_until_complete(asyncio.sleep(0))
+        self.ev_loop.close()
+
+    def test_subscriptions(self):
+        data_source: FixedOrderBookDataSource = self.tracker.data_source
+        self.assertIsNone(self.tracker.subscribed_symbols)
+        self.tracker.subscribe("ETHUSDT", "strategy")
+        self.tracker.subscribe("ETHUSDT", "market")
+        self.tracker.subscribe("BTCUSDT", "cli")
+        self.tracker.subscribe("ETHUSDT", "strategy")
+        self.assertEqual(["ETHUSDT", "BTCUSDT"], self.tracker.subscribed_symbols)
+        self.assertEqual(["ETHUSDT", "BTCUSDT"], data_source.subscribed_symbols)
+        self.assertEqual({"ETHUSDT": {"strategy": 2, "market": 1}, "BTCUSDT": {"cli": 1}},
+                         self.tracker.subscription_counts)
+
+        # Only the subscribed symbols are tracked.
+        self.refresh_task = self.ev_loop.create_task(self.tracker._refresh_tracking_loop())
+        self.ev_loop.run_until_complete(asyncio.sleep(0.01))
+        self.assertEqual({"ETHUSDT", "BTCUSDT"}, set(self.tracker.order_books.keys()))
+
+        # Symbols stay tracked until all their subscriptions are removed.
+        subscription_version: int = data_source.subscription_version
+        self.tracker.unsubscribe("ETHUSDT", "strategy")
+        self.tracker.unsubscribe("ETHUSDT", "market")
+        self.tracker.unsubscribe("BTCUSDT", "cli")
+        self.assertEqual(["ETHUSDT"], self.tracker.subscribed_symbols)
+        self.assertEqual(subscription_version + 1, data_source.subscription_version)
+        self.tracker.subscribe("XRPBTC")
+        self.ev_loop.run_until_complete(asyncio.sleep(0.01))
+        self.assertEqual({"ETHUSDT", "XRPBTC"}, set(self.tracker.order_books.keys()))
+
+        self.tracker.unsubscribe("ETHUSDT", "strategy")
+        self.tracker.unsubscribe("XRPBTC")
+        self.ev_loop.run_until_complete(asyncio.sleep(0.01))
+        self.assertEqual([], self.tracker.subscribed_symbols)
+        self.assertEqual({}, self.tracker.order_books)
+        with self.assertRaises(ValueError):
+            self.tracker.unsubscribe("ETHUSDT", "strategy")
+
+    def test_wait_for_subscription_change(self):
+        data_source: FixedOrderBookDataSource = self.tracker.data_source
+        wait_task: asyncio.Task = self.ev_loop.create_task(
+            data_source.wait_for_subscription_change(data_source.subscription_version)
+        )
+        self.ev_loop.run_until_complete(asyncio.sleep(0.01))
+        self.assertFalse(wait_task.done())
+        # Setting the same symbols again isn't a change.
+        data_source.set_subscribed_symbols(None)
+        self.ev_loop.run_until_complete(asyncio.sleep(0.01))
+        self.assertFalse(wait_task.done())
+        data_source.set_subscribed_symbols(["ETHUSDT"])
+        self.ev_loop.run_until_complete(asyncio.wait_for(wait_task, timeout=1))
+
+
+class OrderBookMessageBufferUnitTest(unittest.TestCase):
+    def test_drain(self):
+        ev_loop: asyncio.AbstractEventLoop = asyncio.new_event_loop()
+        asyncio.set_event_loop(ev_loop)
+        message_buffer: OrderBookMessageBuffer = OrderBookMessageBuffer()
+        drain_task: asyncio.Task = ev_loop.create_task(message_buffer.drain())
+        ev_loop.run_until_complete(asyncio.sleep(0))
+        self.assertFalse(drain_task.done())
+
+        messages: List[OrderBookMessage] = [make_diff_message("ETHUSDT", i, []) for i in range(3)]
+        for message in messages:
+            message_buffer.put(message)
+        self.assertEqual(messages, ev_loop.run_until_complete(drain_task))
+        self.assertEqual(0, len(message_buffer))
+        message_buffer.put(messages[0])
+        self.assertEqual([messages[0]], ev_loop.run_until_complete(message_buffer.drain()))
+        self.assertEqual({"wakeups": 2, "messages": 4, "messages_per_wakeup": 2.0, "max_batch_size": 3},
+                         message_buffer.stats)
+        ev_loop.close()
+
+    def test_conflation(self):
+        message_buffer: OrderBookMessageBuffer = OrderBookMessageBuffer(max_size=3)
+        for i in range(3):
+            diff: OrderBookMessage = make_diff_message("ETHUSDT", 11 + i, [["100.0", str(i)], [str(99 - i), "1.0"]],
+                                                       first_update_id=11 + i)
+            self.assertTrue(message_buffer.put(diff))
+        self.assertTrue(message_buffer.put(make_diff_message("ETHUSDT", 14, [["99.0", "0.0"]], first_update_id=14)))
+
+        # The pending diffs are merged into one, with the last amount of each price level.
+        self.assertEqual(1, len(message_buffer))
+        merged: OrderBookMessage = message_buffer._messages[0]
+        self.assertEqual((14, 11), (merged.update_id, merged.first_update_id))
+        self.assertEqual({100.0: 2.0, 99.0: 0.0, 98.0: 1.0, 97.0: 1.0},
+                         {price: amount for price, amount, _ in merged.bids_array.tolist()})
+
+        # Diffs older than a pending snapshot are dropped.
+        snapshot: OrderBookMessage = OrderBookMessage(OrderBookMessageType.SNAPSHOT, {
+            "symbol": "ETHUSDT",
+            "update_id": 15,
+            "bids": [],
+            "asks": []
+        }, timestamp=15.0)
+        message_buffer.put(snapshot)
+        message_buffer.put(make_diff_message("ETHUSDT", 16, [["100.0", "5.0"]]))
+        message_buffer.put(make_diff_message("ETHUSDT", 17, [["100.0", "6.0"]]))
+        self.assertEqual(2, len(message_buffer))
+        self.assertIs(snapshot, message_buffer._messages[0])
+        self.assertEqual(17, message_buffer._messages[1].update_id)
+        self.assertEqual([[100.0, 6.0, 17.0]], message_buffer._messages[1].bids_array.tolist())
+        self.assertEqual({"depth": 2, "max_depth": 3, "max_size": 3, "conflations": 2, "conflated_messages": 5,
+                          "dropped_messages": 0},
+                         message_buffer.queue_stats)
+
+        # The RESYNC policy drops the pending diffs instead.
+        message_buffer = OrderBookMessageBuffer(max_size=2, conflation_policy=OrderBookConflationPolicy.RESYNC)
+        self.assertTrue(message_buffer.put(snapshot))
+        self.assertTrue(message_buffer.put(make_diff_message("ETHUSDT", 16, [])))
+        self.assertFalse(message_buffer.put(make_diff_message("ETHUSDT", 17, [])))
+        self.assertEqual([snapshot], list(message_buffer._messages))
+        self.assertEqual(2, message_buffer.queue_stats["dropped_messages"])
+
+        # The KEEP_DIFFS policy keeps them, and only drops the ones older than a new snapshot.
+        message_buffer = OrderBookMessageBuffer(max_size=2, conflation_policy=OrderBookConflationPolicy.KEEP_DIFFS)
+        for i in range(4):
+            self.assertTrue(message_buffer.put(make_diff_message("ETHUSDT", 12 + 2 * i, [])))
+        self.assertEqual(4, len(message_buffer))
+        self.assertTrue(message_buffer.put(snapshot))
+        self.assertEqual([snapshot, 16, 18], [message_buffer._messages[0]] +
+                         [message.update_id for message in list(message_buffer._messages)[1:]])
+        self.assertEqual(0, message_buffer.queue_stats["dropped_messages"])
+
+
+def main():
+    unittest.main()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+
+from os.path import join, realpath
+import sys
+sys.path.insert(0, realpath(join(__file__, "../../")))
+
+import asyncio
+from typing import (
+    Dict,
+    List
+)
+import unittest
+
+from wings.data_source.order_book_tracker_data_source import OrderBookTrackerDataSource
+from wings.order_book import OrderBook
+from wings.order_book_message import OrderBookMessage
+from wings.order_book_row import OrderBookRow
+from wings.order_book_tracker import (
+    OrderBookTracker,
+    OrderBookTrackerDataSourceType
+)
+from wings.order_book_tracker_entry import OrderBookTrackerEntry
+from wings.tracker.order_book_tracker_registry import (
+    OrderBookTrackerRegistry,
+    SharedOrderBookTracker
+)
+
+
+class FixedOrderBookDataSource(OrderBookTrackerDataSource):
+    def __init__(self, order_books: Dict[str, OrderBook]):
+        self._order_books: Dict[str, OrderBook] = order_books
+
+    async def get_tracking_pairs(self) -> Dict[str, OrderBookTrackerEntry]:
+        return {
+            symbol: OrderBookTrackerEntry(symbol, 0.0, order_book)
+            for symbol, order_book in self._order_books.items()
+        }
+
+    async def get_snapshot_message(self, symbol: str) -> OrderBookMessage:
+        raise NotImplementedError
+
+    async def listen_for_order_book_diffs(self, ev_loop: asyncio.BaseEventLoop, output: asyncio.Queue):
+        pass
+
+    async def listen_for_order_book_snapshots(self, ev_loop: asyncio.BaseEventLoop, output: asyncio.Queue):
+        pass
+
+
+class FixedOrderBookTracker(OrderBookTracker):
+    start_count: int = 0
+
+    def __init__(self, data_source_type: OrderBookTrackerDataSourceType = OrderBookTrackerDataSourceType.EXCHANGE_API):
+        super().__init__(data_source_type=data_source_type)
+        order_books: Dict[str, OrderBook] = {}
+        for symbol in ["ETHUSDT", "BTCUSDT", "XRPBTC"]:
+            order_books[symbol] = OrderBook()
+            order_books[symbol].apply_snapshot([OrderBookRow(100.0, 1.0, 10)], [OrderBookRow(101.0, 1.0, 10)], 10)
+        self._data_source: FixedOrderBookDataSource = FixedOrderBookDataSource(order_books)
+
+    @property
+    def data_source(self) -> OrderBookTrackerDataSource:
+        return self._data_source
+
+    async def start(self):
+        FixedOrderBookTracker.start_count += 1
+        await self._refresh_tracking_loop()
+
+
+class OrderBookTrackerRegistryUnitTest(unittest.TestCase):
+    def setUp(self):
+        self.ev_loop: asyncio.AbstractEventLoop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.ev_loop)
+        FixedOrderBookTracker.start_count = 0
+
+    def tearDown(self):
+        for tracker_task in OrderBookTrackerRegistry._tracker_tasks.values():
+            tracker_task.cancel()
+        self.ev_loop.run_until_complete(asyncio.sleep(0))
+        OrderBookTrackerRegistry._trackers.clear()
+        OrderBookTrackerRegistry._tracker_tasks.clear()
+        OrderBookTrackerRegistry._tracker_consumers.clear()
+        self.ev_loop.close()
+
+    def test_shared_tracker(self):
+        market: SharedOrderBookTracker = OrderBookTrackerRegistry.get_tracker(FixedOrderBookTracker,
+                                                                              ["ETHUSDT", "BTCUSDT"],
+                                                                              consumer="market")
+        strategy: SharedOrderBookTracker = OrderBookTrackerRegistry.get_tracker(FixedOrderBookTracker,
+                                                                                ["ETHUSDT"],
+                                                                                consumer="strategy")
+        all_markets: SharedOrderBookTracker = OrderBookTrackerRegistry.get_tracker(FixedOrderBookTracker)
+        self.assertIs(market.tracker, strategy.tracker)
+        self.assertIsNot(market.tracker, all_markets.tracker)
+        self.assertEqual({"FixedOrderBookTracker/EXCHANGE_API": 2, "FixedOrderBookTracker/EXCHANGE_API/all": 1},
+                         OrderBookTrackerRegistry.consumer_counts())
+        self.assertEqual({"ETHUSDT": {"market": 1, "strategy": 1}, "BTCUSDT": {"market": 1}},
+                         market.tracker.subscription_counts)
+
+        # Starting the tracker from several consumers runs it once.
+        start_tasks: List[asyncio.Task] = [self.ev_loop.create_task(shared.start()) for shared in [market, strategy]]
+        self.ev_loop.run_until_complete(asyncio.sleep(0.01))
+        self.assertEqual(1, FixedOrderBookTracker.start_count)
+        self.assertEqual({"ETHUSDT", "BTCUSDT"}, set(market.order_books.keys()))
+        self.assertEqual({"ETHUSDT"}, set(strategy.order_books.keys()))
+        self.assertIs(market.order_books["ETHUSDT"], strategy.order_books["ETHUSDT"])
+
+        # Cancelling a consumer's start leaves the tracker running for the others.
+        start_tasks[1].cancel()
+        self.ev_loop.run_until_complete(asyncio.sleep(0.01))
+        self.assertFalse(start_tasks[0].done())
+
+        # Releasing a consumer removes its subscriptions, and releasing the last one stops the tracker.
+        tracker_task: asyncio.Task = OrderBookTrackerRegistry._tracker_tasks[market._tracker_key]
+        market.release()
+        market.release()
+        self.ev_loop.run_until_complete(asyncio.sleep(0.01))
+        self.assertEqual({"ETHUSDT": {"strategy": 1}}, strategy.tracker.subscription_counts)
+        self.assertEqual({"ETHUSDT"}, set(strategy.tracker.order_books.keys()))
+        self.assertFalse(tracker_task.done())
+        tracking_tasks: List[asyncio.Task] = list(strategy.tracker._tracking_tasks.values())
+        strategy.tracker._schedule_resync("ETHUSDT")
+        resync_task: asyncio.Task = strategy.tracker._resync_tasks["ETHUSDT"]
+        strategy.release()
+        self.ev_loop.run_until_complete(asyncio.sleep(0.01))
+        self.assertTrue(tracker_task.cancelled())
+        # The per symbol tracking and resync tasks are stopped along with the tracker.
+        self.assertEqual(1, len(tracking_tasks))
+        self.assertTrue(all(task.cancelled() for task in tracking_tasks + [resync_task]))
+        self.assertEqual({}, strategy.tracker._tracking_tasks)
+        self.assertEqual({"FixedOrderBookTracker/EXCHANGE_API/all": 1}, OrderBookTrackerRegistry.consumer_counts())
+
+        # A new consumer gets a new tracker.
+        new_market: SharedOrderBookTracker = OrderBookTrackerRegistry.get_tracker(FixedOrderBookTracker, ["XRPBTC"])
+        self.assertIsNot(market.tracker, new_market.tracker)
+
+
+if __name__ == "__main__":
+    unittest.main()
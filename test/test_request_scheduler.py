@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+
+from os.path import join, realpath
+import sys
+sys.path.insert(0, realpath(join(__file__, "../../")))
+
+import asyncio
+import time
+from typing import (
+    Any,
+    Dict,
+    List
+)
+import unittest
+
+from wings.request_scheduler import RequestScheduler
+
+
+class RequestSchedulerUnitTest(unittest.TestCase):
+    def setUp(self):
+        self.ev_loop: asyncio.AbstractEventLoop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.ev_loop)
+
+    def tearDown(self):
+        self.ev_loop.close()
+
+    def test_rate_limit(self):
+        # 100 weight per second, with a full budget to start with.
+        scheduler: RequestScheduler = RequestScheduler(100, 1.0, max_concurrency=4)
+        request_times: List[float] = []
+
+        async def fetch(key: str) -> str:
+            request_times.append(time.monotonic())
+            await asyncio.sleep(0.01)
+            return key.upper()
+
+        keys: List[str] = [f"symbol{i}" for i in range(20)]
+        start_time: float = time.monotonic()
+        results: Dict[str, Any] = self.ev_loop.run_until_complete(scheduler.fetch_all(keys, fetch, 10))
+        self.assertEqual({key: key.upper() for key in keys}, results)
+        # The first 10 requests spend the full budget, and the other 10 wait for it to refill.
+        self.assertLess(request_times[9] - start_time, 0.1)
+        self.assertGreater(request_times[-1] - start_time, 0.85)
+        self.assertLess(request_times[-1] - start_time, 1.5)
+        self.assertEqual(20, scheduler.stats["requests"])
+        self.assertEqual(200, scheduler.stats["weight"])
+
+    def test_concurrency(self):
+        scheduler: RequestScheduler = RequestScheduler(1000, 1.0, max_concurrency=3)
+        running: List[int] = [0, 0]
+
+        async def fetch(key: str) -> str:
+            running[0] += 1
+            running[1] = max(running[1], running[0])
+            await asyncio.sleep(0.02)
+            running[0] -= 1
+            return key
+
+        self.ev_loop.run_until_complete(scheduler.fetch_all([str(i) for i in range(10)], fetch, 1))
+        self.assertEqual(3, running[1])
+
+    def test_priority_and_errors(self):
+        scheduler: RequestScheduler = RequestScheduler(5, 0.5, max_concurrency=1)
+        fetched_keys: List[str] = []
+
+        async def fetch(key: str) -> str:
+            fetched_keys.append(key)
+            if key == "XRPBTC":
+                raise IOError("Error fetching snapshot.")
+            return key
+
+        keys: List[str] = ["ETHBTC", "LTCBTC", "XRPBTC", "ETHUSDT", "BNBBTC"]
+        results: Dict[str, Any] = self.ev_loop.run_until_complete(
+            scheduler.fetch_all(keys, fetch, 1, priority_keys=["BNBBTC", "ETHUSDT", "BNBBTC", "NEOBTC"])
+        )
+        self.assertEqual(["BNBBTC", "ETHUSDT", "ETHBTC", "LTCBTC", "XRPBTC"], fetched_keys)
+        self.assertEqual(["BNBBTC", "ETHUSDT", "ETHBTC", "LTCBTC"], list(results.keys()))
+
+    def test_pause_and_used_weight(self):
+        scheduler: RequestScheduler = RequestScheduler(100, 100.0)
+        scheduler.sync_used_weight(40)
+        self.assertAlmostEqual(60, scheduler.available_weight, delta=1)
+
+        scheduler.pause(0.2)
+        start_time: float = time.monotonic()
+        self.ev_loop.run_until_complete(scheduler.acquire(10))
+        self.assertGreater(time.monotonic() - start_time, 0.19)
+        self.assertAlmostEqual(50, scheduler.available_weight, delta=1)
+
+        # Requests heavier than the whole budget wait for a full budget.
+        scheduler = RequestScheduler(100, 0.5)
+        self.ev_loop.run_until_complete(scheduler.acquire(50))
+        start_time = time.monotonic()
+        self.ev_loop.run_until_complete(scheduler.acquire(1000))
+        self.assertGreater(time.monotonic() - start_time, 0.2)
+        self.assertAlmostEqual(0, scheduler.available_weight, delta=5)
+
+    def test_event_loops(self):
+        # Data sources keep their scheduler across event loops.
+        scheduler: RequestScheduler = RequestScheduler(1000, 1.0, max_concurrency=1)
+
+        async def fetch(key: str) -> str:
+            await asyncio.sleep(0.01)
+            return key
+
+        keys: List[str] = ["ETHBTC", "LTCBTC", "XRPBTC"]
+        self.assertEqual(keys, list(self.ev_loop.run_until_complete(scheduler.fetch_all(keys, fetch, 1)).keys()))
+        self.ev_loop.close()
+        self.ev_loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.ev_loop)
+        self.assertEqual(keys, list(self.ev_loop.run_until_complete(scheduler.fetch_all(keys, fetch, 1)).keys()))
+        self.assertEqual(6, scheduler.stats["requests"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,219 @@
+#!/usr/bin/env python
+
+from os.path import join, realpath
+import sys
+sys.path.insert(0, realpath(join(__file__, "../../")))
+
+import asyncio
+import math
+import multiprocessing
+import os
+import tempfile
+from typing import (
+    Dict,
+    List,
+    Optional
+)
+import unittest
+
+import numpy as np
+
+from wings.order_book import OrderBook
+from wings.order_book_row import OrderBookRow
+from wings.order_book_tracker import (
+    OrderBookTracker,
+    OrderBookTrackerDataSourceType
+)
+from wings.shared_order_books import SharedOrderBooks
+from wings.tracker.sharded_order_book_tracker import ShardedOrderBookTracker
+
+
+def _make_order_book(mid_price: float, levels: int, update_id: int) -> OrderBook:
+    order_book: OrderBook = OrderBook()
+    bids: List[OrderBookRow] = [OrderBookRow(mid_price - i - 1, float(i + 1), update_id) for i in range(levels)]
+    asks: List[OrderBookRow] = [OrderBookRow(mid_price + i + 1, float(i + 1), update_id) for i in range(levels)]
+    order_book.apply_snapshot(bids, asks, update_id)
+    return order_book
+
+
+def _publish_consistent_books(path: str, count: int):
+    """
+    Publishes order books whose every price and amount is derived from the update ID, so readers can check that they
+    never see rows from different updates.
+    """
+    shared_order_books: SharedOrderBooks = SharedOrderBooks(path)
+    for update_id in range(1, count + 1):
+        shared_order_books.publish("ETHUSDT", _make_order_book(update_id * 10.0, 1 + update_id % 10, update_id))
+    shared_order_books.close()
+
+
+class SyntheticOrderBookTracker(OrderBookTracker):
+    """
+    Tracks order books without a data source, publishing a new snapshot of each every few milliseconds.
+    """
+    def __init__(self,
+                 data_source_type: OrderBookTrackerDataSourceType = OrderBookTrackerDataSourceType.EXCHANGE_API,
+                 symbols: Optional[List[str]] = None,
+                 mid_price: float = 100.0):
+        super().__init__(data_source_type=data_source_type)
+        self._symbols: List[str] = symbols
+        self._mid_price: float = mid_price
+
+    @property
+    def data_source(self):
+        raise NotImplementedError
+
+    async def start(self):
+        update_id: int = 0
+        while True:
+            update_id += 1
+            for symbol in self._symbols:
+                self._order_books[symbol] = _make_order_book(self._mid_price, 5, update_id)
+                self._publish_order_book(symbol)
+            await asyncio.sleep(0.01)
+
+
+class SharedOrderBooksUnitTest(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".shm")
+        os.close(fd)
+        self.shared_order_books: SharedOrderBooks = SharedOrderBooks.create(self.path, ["ETHUSDT", "BTCUSDT"], 3)
+
+    def tearDown(self):
+        self.shared_order_books.close()
+        os.remove(self.path)
+
+    def test_publish(self):
+        self.assertEqual(["ETHUSDT", "BTCUSDT"], self.shared_order_books.symbols)
+        self.assertEqual(3, self.shared_order_books.depth)
+        self.assertEqual(0, self.shared_order_books.get_sequence("ETHUSDT"))
+
+        self.shared_order_books.publish("ETHUSDT", _make_order_book(100.0, 5, 7))
+        self.assertEqual(1, self.shared_order_books.get_sequence("ETHUSDT"))
+        self.assertEqual(0, self.shared_order_books.get_sequence("BTCUSDT"))
+        self.assertEqual((99.0, 1.0, 101.0, 1.0), self.shared_order_books.get_top_of_book("ETHUSDT"))
+
+        # Another process sees the same books.
+        reader: SharedOrderBooks = SharedOrderBooks(self.path)
+        bids, asks, update_id = reader.get_depth("ETHUSDT")
+        reader.close()
+        self.assertEqual(7, update_id)
+        self.assertEqual([[99.0, 1.0, 7], [98.0, 2.0, 7], [97.0, 3.0, 7]], bids.tolist())
+        self.assertEqual([[101.0, 1.0, 7], [102.0, 2.0, 7], [103.0, 3.0, 7]], asks.tolist())
+
+    def test_unchanged_order_book(self):
+        order_book: OrderBook = _make_order_book(100.0, 5, 7)
+        self.shared_order_books.publish("ETHUSDT", order_book)
+        self.shared_order_books.publish("ETHUSDT", order_book)
+        self.assertEqual(1, self.shared_order_books.get_sequence("ETHUSDT"))
+
+        order_book.apply_diffs([OrderBookRow(99.5, 2.0, 8)], [], 8)
+        self.shared_order_books.publish("ETHUSDT", order_book)
+        self.assertEqual(2, self.shared_order_books.get_sequence("ETHUSDT"))
+        self.assertEqual((99.5, 2.0, 101.0, 1.0), self.shared_order_books.get_top_of_book("ETHUSDT"))
+
+    def test_empty_order_book(self):
+        bids, asks, update_id = self.shared_order_books.get_depth("BTCUSDT")
+        self.assertEqual((0, 3), bids.shape)
+        self.assertEqual((0, 3), asks.shape)
+        self.assertTrue(all(math.isnan(value) for value in self.shared_order_books.get_top_of_book("BTCUSDT")))
+
+        order_book: OrderBook = OrderBook()
+        order_book.apply_snapshot([OrderBookRow(99.0, 1.0, 1)], [], 1)
+        self.shared_order_books.publish("BTCUSDT", order_book)
+        bid_price, bid_amount, ask_price, ask_amount = self.shared_order_books.get_top_of_book("BTCUSDT")
+        self.assertEqual((99.0, 1.0), (bid_price, bid_amount))
+        self.assertTrue(math.isnan(ask_price) and math.isnan(ask_amount))
+
+        with self.assertRaises(KeyError):
+            self.shared_order_books.get_top_of_book("XRPUSDT")
+
+    def test_invalid_file(self):
+        fd, path = tempfile.mkstemp()
+        os.write(fd, b"\0" * 128)
+        os.close(fd)
+        try:
+            with self.assertRaises(ValueError):
+                SharedOrderBooks(path)
+        finally:
+            os.remove(path)
+
+    def test_concurrent_reads(self):
+        writer: multiprocessing.Process = multiprocessing.get_context("spawn").Process(
+            target=_publish_consistent_books, args=(self.path, 20000)
+        )
+        writer.start()
+        reads: int = 0
+        while writer.is_alive() or reads == 0:
+            bids, asks, update_id = self.shared_order_books.get_depth("ETHUSDT")
+            if update_id == 0:
+                continue
+            reads += 1
+            self.assertEqual(min(3, 1 + update_id % 10), len(bids))
+            np.testing.assert_array_equal(update_id * 10.0 - np.arange(1, len(bids) + 1), bids[:, 0])
+            np.testing.assert_array_equal(update_id * 10.0 + np.arange(1, len(asks) + 1), asks[:, 0])
+            np.testing.assert_array_equal(update_id, bids[:, 2])
+            np.testing.assert_array_equal(update_id, asks[:, 2])
+        writer.join()
+        self.assertEqual(0, writer.exitcode)
+        self.assertEqual(20000, self.shared_order_books.get_depth("ETHUSDT")[2])
+
+
+class ShardedOrderBookTrackerUnitTest(unittest.TestCase):
+    def setUp(self):
+        self.ev_loop: asyncio.AbstractEventLoop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.ev_loop)
+
+    def tearDown(self):
+        self.ev_loop.close()
+
+    def test_sharded_tracking(self):
+        symbols: List[str] = ["ETHUSDT", "BTCUSDT", "XRPUSDT"]
+        tracker: ShardedOrderBookTracker = ShardedOrderBookTracker(SyntheticOrderBookTracker, symbols,
+                                                                   shard_count=2, depth=3,
+                                                                   tracker_kwargs={"mid_price": 50.0})
+        self.assertEqual([["ETHUSDT", "XRPUSDT"], ["BTCUSDT"]], [shard["symbols"] for shard in tracker.shard_status])
+        tracker_task: asyncio.Task = self.ev_loop.create_task(tracker.start())
+
+        async def wait_for_order_books():
+            while True:
+                await asyncio.sleep(0.05)
+                tracker.sync_order_books()
+                order_books: Dict[str, OrderBook] = tracker.order_books
+                if len(order_books) == 3 and all(order_book.snapshot_uid > 0 for order_book in order_books.values()):
+                    return order_books
+
+        try:
+            order_books: Dict[str, OrderBook] = self.ev_loop.run_until_complete(
+                asyncio.wait_for(wait_for_order_books(), timeout=30)
+            )
+            for symbol in symbols:
+                bids, asks = order_books[symbol].snapshot
+                self.assertEqual([49.0, 48.0, 47.0], bids.price.tolist())
+                self.assertEqual([51.0, 52.0, 53.0], asks.price.tolist())
+                self.assertEqual((49.0, 1.0, 51.0, 1.0), tracker.get_top_of_book(symbol))
+                # The shards' order books go deeper than the local copies, so quotes past them aren't possible.
+                self.assertEqual(3, order_books[symbol].max_depth)
+                with self.assertRaisesRegex(EnvironmentError, "price levels retained"):
+                    order_books[symbol].get_price_for_volume(True, 10.0)
+            self.assertTrue(all(shard["alive"] for shard in tracker.shard_status))
+
+            # Dead shards are restarted.
+            tracker._shard_processes[1].terminate()
+            tracker._shard_processes[1].join()
+            tracker._check_shards()
+            self.assertEqual([0, 1], [shard["restarts"] for shard in tracker.shard_status])
+            self.assertTrue(all(shard["alive"] for shard in tracker.shard_status))
+        finally:
+            path: str = tracker._shard_order_books.path
+            tracker_task.cancel()
+            try:
+                self.ev_loop.run_until_complete(tracker_task)
+            except asyncio.CancelledError:
+                pass
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(any(shard["alive"] for shard in tracker.shard_status))
+
+
+if __name__ == "__main__":
+    unittest.main()
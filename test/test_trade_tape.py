@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+
+from os.path import join, realpath
+import sys
+sys.path.insert(0, realpath(join(__file__, "../../")))
+
+import math
+import numpy as np
+import random
+from typing import (
+    Dict,
+    List,
+    Tuple
+)
+import unittest
+
+from wings.events import (
+    OrderBookTradeEvent,
+    TradeType
+)
+from wings.order_book import OrderBook
+from wings.trade_tape import TradeTape
+
+
+class TradeTapeUnitTest(unittest.TestCase):
+    def setUp(self):
+        self.random: random.Random = random.Random(7)
+        self.trades: List[Tuple[float, bool, float, float]] = []
+        timestamp: float = 1000.0
+        for _ in range(500):
+            timestamp += self.random.choice([0.0, self.random.uniform(0.0, 3.0)])
+            self.trades.append((timestamp,
+                                self.random.random() < 0.5,
+                                round(self.random.uniform(99.0, 101.0), 2),
+                                round(self.random.uniform(0.01, 5.0), 3)))
+
+    def expected_stats(self,
+                       trades: List[Tuple[float, bool, float, float]],
+                       seconds: float,
+                       timestamp: float) -> Dict[str, float]:
+        window: List[Tuple[float, bool, float, float]] = [trade for trade in trades
+                                                           if timestamp - seconds < trade[0] <= timestamp]
+        volume: float = sum(trade[3] for trade in window)
+        return {
+            "trade_count": len(window),
+            "buy_count": sum(1 for trade in window if trade[1]),
+            "sell_count": sum(1 for trade in window if not trade[1]),
+            "volume": volume,
+            "buy_volume": sum(trade[3] for trade in window if trade[1]),
+            "sell_volume": sum(trade[3] for trade in window if not trade[1]),
+            "vwap": sum(trade[2] * trade[3] for trade in window) / volume if volume > 0 else float("NaN")
+        }
+
+    def assert_stats_equal(self, expected: Dict[str, float], actual: Dict[str, float]):
+        self.assertEqual(sorted(expected.keys()), sorted(actual.keys()))
+        for key, expected_value in expected.items():
+            if math.isnan(expected_value):
+                self.assertTrue(math.isnan(actual[key]), key)
+            else:
+                self.assertAlmostEqual(expected_value, actual[key], places=6, msg=key)
+
+    def test_window_stats(self):
+        trade_tape: TradeTape = TradeTape(capacity=100, windows=(10.0, 60.0))
+        for i, trade in enumerate(self.trades):
+            trade_tape.add_trade(*trade)
+            # The tape only holds the last 100 trades.
+            held_trades: List[Tuple[float, bool, float, float]] = self.trades[max(0, i - 99):i + 1]
+            for seconds in [10.0, 60.0, 25.0]:
+                self.assert_stats_equal(self.expected_stats(held_trades, seconds, trade[0]),
+                                        trade_tape.get_stats(seconds))
+        self.assertEqual(100, trade_tape.size)
+
+        # Windows at later timestamps expire the older trades, and windows at earlier timestamps are computed from the
+        # trades on the tape.
+        last_timestamp: float = self.trades[-1][0]
+        held_trades = self.trades[-100:]
+        for timestamp in [last_timestamp + 5.0, last_timestamp - 20.0, last_timestamp + 100.0]:
+            for seconds in [10.0, 60.0, 25.0]:
+                self.assert_stats_equal(self.expected_stats(held_trades, seconds, timestamp),
+                                        trade_tape.get_stats(seconds, timestamp))
+        self.assertEqual(0, trade_tape.get_stats(60.0)["trade_count"])
+        self.assertTrue(math.isnan(trade_tape.get_vwap(60.0)))
+
+    def test_trades(self):
+        trade_tape: TradeTape = TradeTape(capacity=100)
+        self.assertEqual((0, 4), trade_tape.trades.shape)
+        for trade in self.trades[:30]:
+            trade_tape.add_trade(*trade)
+        expected_trades: np.ndarray = np.array([
+            [timestamp, TradeType.BUY.value if is_buy else TradeType.SELL.value, price, amount]
+            for timestamp, is_buy, price, amount in self.trades
+        ])
+        self.assertTrue(np.array_equal(expected_trades[:30], trade_tape.trades))
+        for trade in self.trades[30:]:
+            trade_tape.add_trade(*trade)
+        self.assertTrue(np.array_equal(expected_trades[-100:], trade_tape.trades))
+
+        with self.assertRaises(ValueError):
+            TradeTape(capacity=0)
+        with self.assertRaises(ValueError):
+            TradeTape(windows=(60.0, 0.0))
+
+    def test_order_book_trade_tape(self):
+        order_book: OrderBook = OrderBook()
+        self.assertIsNone(order_book.trade_tape)
+        order_book.enable_trade_tape(capacity=1000, windows=(30.0,))
+        for timestamp, is_buy, price, amount in self.trades:
+            order_book.apply_trade(OrderBookTradeEvent("ETHUSDT", timestamp,
+                                                       TradeType.BUY if is_buy else TradeType.SELL, price, amount))
+        self.assertEqual(500, order_book.trade_tape.size)
+        self.assert_stats_equal(self.expected_stats(self.trades, 30.0, self.trades[-1][0]),
+                                order_book.trade_tape.get_stats(30.0))
+        order_book.disable_trade_tape()
+        self.assertIsNone(order_book.trade_tape)
+
+
+def main():
+    unittest.main()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,14 @@
+# distutils: language=c++
+
+from libc.stdint cimport int64_t
+from libcpp cimport bool
+
+cdef extern from "cpp/FixedPointGrid.h":
+    cdef cppclass FixedPointGrid:
+        FixedPointGrid()
+        FixedPointGrid(int decimals, int64_t stepUnits)
+        bool toTicks(double value, int64_t &ticks)
+        double fromTicks(int64_t ticks)
+        double snap(double value)
+        int getDecimals()
+        int64_t getStepUnits()
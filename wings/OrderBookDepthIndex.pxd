@@ -0,0 +1,25 @@
+# distutils: language=c++
+
+from libcpp cimport bool
+
+cdef extern from "cpp/OrderBookDepthIndex.h":
+    cdef cppclass OrderBookDepthIndex:
+        OrderBookDepthIndex()
+        OrderBookDepthIndex(const OrderBookDepthIndex &other)
+        OrderBookDepthIndex &operator=(const OrderBookDepthIndex &other)
+        void setAmount(double price, double amount)
+        void erase(double price)
+        void eraseGreaterThan(double price, bool inclusive)
+        void eraseLessThan(double price, bool inclusive)
+        void clear()
+        size_t size()
+        size_t getMemoryUsage()
+        double getTotalAmount()
+        double getTotalQuoteAmount()
+        bool getPriceForVolume(bool ascending, double volume, double &price)
+        bool getPriceForQuoteVolume(bool ascending, double quote_volume, double &price)
+        bool getVWAPForVolume(bool ascending, double volume, double &vwap)
+        size_t getLevelsForVolume(bool ascending, double volume)
+        double getVolumeForPrice(bool ascending, double price)
+        double getQuoteVolumeForPrice(bool ascending, double price)
+        void getDepthCurve(bool ascending, const double *volumes, size_t count, double *prices, double *vwaps)
@@ -0,0 +1,33 @@
+# distutils: language=c++
+
+from libc.stdint cimport int64_t
+from libcpp cimport bool
+from libcpp.string cimport string
+from libcpp.vector cimport vector
+
+cdef extern from "cpp/OrderBookLevel3.h":
+    cdef struct OrderBookLevel3Change:
+        bool isBid
+        int64_t priceTicks
+        double amount
+
+    cdef cppclass OrderBookLevel3:
+        OrderBookLevel3()
+        OrderBookLevel3(int pricePrecision)
+        bool priceToTicks(const char *price, int64_t &priceTicks)
+        double ticksToPrice(int64_t priceTicks)
+        void addOrder(const string &orderId, bool isBid, int64_t priceTicks, double amount)
+        bool setOrderAmount(const string &orderId, double amount)
+        bool reduceOrderAmount(const string &orderId, double filledAmount)
+        bool removeOrder(const string &orderId)
+        void clear()
+        const vector[OrderBookLevel3Change] &getChanges()
+        void clearChanges()
+        void getLevelsSnapshot(bool isBid, vector[OrderBookLevel3Change] &output)
+        bool getOrder(const string &orderId, bool &isBid, int64_t &priceTicks, double &amount)
+        void getOrderIds(vector[string] &output)
+        double getLevelAmount(bool isBid, int64_t priceTicks)
+        size_t getLevelOrderCount(bool isBid, int64_t priceTicks)
+        size_t getOrderCount()
+        size_t getLevelCount(bool isBid)
+        int getPricePrecision()
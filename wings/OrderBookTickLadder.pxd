@@ -0,0 +1,26 @@
+# distutils: language=c++
+
+from libc.stdint cimport int64_t
+from libcpp cimport bool
+from .OrderBookEntry cimport OrderBookEntry
+
+cdef extern from "cpp/OrderBookTickLadder.h":
+    cdef cppclass OrderBookTickLadder:
+        OrderBookTickLadder()
+        OrderBookTickLadder(double tickSize, bool isBid)
+        OrderBookTickLadder(const OrderBookTickLadder &other)
+        OrderBookTickLadder &operator=(const OrderBookTickLadder &other)
+        bool setEntry(OrderBookEntry &entry)
+        void eraseBest()
+        double truncateToDepth(size_t depth)
+        void clear()
+        size_t size()
+        size_t capacity()
+        size_t getMemoryUsage()
+        double getTickSize()
+        int64_t getBestIndex()
+        int64_t getNextIndex(int64_t index)
+        double getLevelPrice(double price)
+        OrderBookEntry getEntry(int64_t index)
+
+    void truncateOverlapLadders(OrderBookTickLadder &bid_ladder, OrderBookTickLadder &ask_ladder)
@@ -0,0 +1,15 @@
+# distutils: language=c++
+
+from libc.stdint cimport uint64_t
+from libcpp cimport bool
+
+cdef extern from "cpp/SeqLock.h":
+    cdef cppclass SeqLock:
+        @staticmethod
+        uint64_t beginWrite(uint64_t *sequence) nogil
+        @staticmethod
+        void endWrite(uint64_t *sequence, uint64_t writeSequence) nogil
+        @staticmethod
+        uint64_t beginRead(const uint64_t *sequence) nogil
+        @staticmethod
+        bool validateRead(const uint64_t *sequence, uint64_t readSequence) nogil
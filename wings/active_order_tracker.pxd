@@ -0,0 +1,22 @@
+# distutils: language=c++
+
+from libc.stdint cimport int64_t
+from libcpp.vector cimport vector
+from .OrderBookLevel3 cimport (
+    OrderBookLevel3,
+    OrderBookLevel3Change
+)
+from .order_book cimport OrderBook
+
+cdef class ActiveOrderTracker:
+    cdef OrderBookLevel3 _level3_book
+
+    cdef int64_t c_price_to_ticks(self, object price) except? -1
+    cdef c_process_diff_message(self, object message)
+    cdef c_process_snapshot_message(self, object message)
+    cdef c_apply_diff_message(self, OrderBook order_book, object message)
+    cdef c_apply_snapshot_message(self, OrderBook order_book, object message)
+    cdef object c_changes_to_np_array(self, const vector[OrderBookLevel3Change] &changes, bint is_bid,
+                                      double timestamp, int64_t update_id)
+    cdef tuple c_convert_diff_message_to_np_arrays(self, object message)
+    cdef tuple c_convert_snapshot_message_to_np_arrays(self, object message)
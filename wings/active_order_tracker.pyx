@@ -0,0 +1,224 @@
+# distutils: language=c++
+# distutils: sources=wings/cpp/OrderBookEntry.cpp wings/cpp/OrderBookLevel3.cpp
+
+from decimal import (
+    Decimal,
+    ROUND_HALF_UP
+)
+from libc.stdint cimport int64_t
+from libcpp cimport bool as cpp_bool
+from libcpp.string cimport string
+from libcpp.vector cimport vector
+import numpy as np
+from typing import (
+    Dict,
+    List,
+    Tuple
+)
+
+from wings.order_book_row import OrderBookRow
+from .OrderBookEntry cimport OrderBookEntry
+from .OrderBookLevel3 cimport (
+    OrderBookLevel3,
+    OrderBookLevel3Change
+)
+from .order_book cimport OrderBook
+
+
+cdef class ActiveOrderTracker:
+    """
+    Base class of the order trackers of exchanges that publish individual orders rather than price levels.
+
+    Orders are tracked in a C++ OrderBookLevel3, which maintains the total amount of every price level as orders come
+    and go, so each message costs O(log n). The price levels changed by a message can be written directly into a
+    level 2 OrderBook with apply_diff_message() and apply_snapshot_message(), or returned as NumPy arrays or
+    OrderBookRow lists.
+
+    Prices are tracked as integers, with price_precision decimal places.
+
+    Subclasses implement c_process_diff_message() and c_process_snapshot_message() for the message formats of their
+    exchange.
+    """
+    def __init__(self, price_precision: int = 10):
+        if not 0 <= price_precision <= 15:
+            raise ValueError(f"price_precision must be between 0 and 15, got {price_precision}.")
+        self._level3_book = OrderBookLevel3(price_precision)
+
+    @property
+    def order_count(self) -> int:
+        return self._level3_book.getOrderCount()
+
+    @property
+    def active_asks(self) -> Dict[float, Dict[str, float]]:
+        """
+        Remaining amount of every tracked ask order, by price and order ID. This is a copy, built on every call.
+        """
+        return self._get_active_orders(False)
+
+    @property
+    def active_bids(self) -> Dict[float, Dict[str, float]]:
+        """
+        Same as active_asks, for the bid orders.
+        """
+        return self._get_active_orders(True)
+
+    def _get_active_orders(self, is_bid: bool) -> Dict[float, Dict[str, float]]:
+        retval: Dict[float, Dict[str, float]] = {}
+        for order_id, (order_is_bid, price, amount) in self.get_orders().items():
+            if order_is_bid == is_bid:
+                retval.setdefault(price, {})[order_id] = amount
+        return retval
+
+    def get_orders(self) -> Dict[str, Tuple[bool, float, float]]:
+        """
+        Returns the side (True for bids), price and remaining amount of every tracked order, by order ID.
+        """
+        cdef:
+            vector[string] order_ids
+            cpp_bool is_bid
+            int64_t price_ticks
+            double amount
+            dict retval = {}
+
+        self._level3_book.getOrderIds(order_ids)
+        for order_id in order_ids:
+            self._level3_book.getOrder(order_id, is_bid, price_ticks, amount)
+            retval[order_id.decode("utf8")] = (is_bid, self._level3_book.ticksToPrice(price_ticks), amount)
+        return retval
+
+    def volume_for_ask_price(self, price) -> float:
+        return self._level3_book.getLevelAmount(False, self.c_price_to_ticks(price))
+
+    def volume_for_bid_price(self, price) -> float:
+        return self._level3_book.getLevelAmount(True, self.c_price_to_ticks(price))
+
+    cdef int64_t c_price_to_ticks(self, object price) except? -1:
+        cdef:
+            bytes price_text = (price if isinstance(price, str) else str(price)).encode("utf8")
+            int64_t price_ticks
+
+        if self._level3_book.priceToTicks(price_text, price_ticks):
+            return price_ticks
+        # Exponents and other formats are rare - parse them with Decimal.
+        return int(Decimal(price).scaleb(self._level3_book.getPricePrecision()).to_integral_value(ROUND_HALF_UP))
+
+    cdef c_process_diff_message(self, object message):
+        raise NotImplementedError
+
+    cdef c_process_snapshot_message(self, object message):
+        raise NotImplementedError
+
+    cdef c_apply_diff_message(self, OrderBook order_book, object message):
+        cdef:
+            vector[OrderBookEntry] bids
+            vector[OrderBookEntry] asks
+            int64_t update_id = message.update_id
+            OrderBookLevel3Change change
+            size_t i
+
+        self._level3_book.clearChanges()
+        self.c_process_diff_message(message)
+        for i in range(self._level3_book.getChanges().size()):
+            change = self._level3_book.getChanges()[i]
+            if change.isBid:
+                bids.push_back(OrderBookEntry(self._level3_book.ticksToPrice(change.priceTicks), change.amount,
+                                              update_id))
+            else:
+                asks.push_back(OrderBookEntry(self._level3_book.ticksToPrice(change.priceTicks), change.amount,
+                                              update_id))
+        self._level3_book.clearChanges()
+        order_book.c_apply_diffs(bids, asks, update_id)
+
+    cdef c_apply_snapshot_message(self, OrderBook order_book, object message):
+        cdef:
+            vector[OrderBookLevel3Change] levels
+            vector[OrderBookEntry] bids
+            vector[OrderBookEntry] asks
+            int64_t update_id = message.update_id
+
+        self.c_process_snapshot_message(message)
+        self._level3_book.clearChanges()
+        self._level3_book.getLevelsSnapshot(True, levels)
+        for level in levels:
+            bids.push_back(OrderBookEntry(self._level3_book.ticksToPrice(level.priceTicks), level.amount, update_id))
+        self._level3_book.getLevelsSnapshot(False, levels)
+        for level in levels:
+            asks.push_back(OrderBookEntry(self._level3_book.ticksToPrice(level.priceTicks), level.amount, update_id))
+        order_book.c_apply_snapshot(bids, asks, update_id)
+
+    def apply_diff_message(self, OrderBook order_book, message):
+        """
+        Tracks the orders in a diff message, and applies the price levels they changed to the order book.
+        """
+        self.c_apply_diff_message(order_book, message)
+
+    def apply_snapshot_message(self, OrderBook order_book, message):
+        """
+        Replaces all tracked orders with the orders in a snapshot message, and applies the resulting price levels to
+        the order book as a snapshot.
+        """
+        self.c_apply_snapshot_message(order_book, message)
+
+    cdef object c_changes_to_np_array(self, const vector[OrderBookLevel3Change] &changes, bint is_bid,
+                                      double timestamp, int64_t update_id):
+        """
+        Returns the changes of one side as an (n, 4) array of [timestamp, price, amount, update_id] rows.
+        """
+        cdef:
+            size_t row_count = 0
+            object array
+            double[:, :] rows
+            OrderBookLevel3Change change
+            size_t i
+
+        for i in range(changes.size()):
+            if changes[i].isBid == is_bid:
+                row_count += 1
+        array = np.empty((row_count, 4), dtype="float64")
+        rows = array
+        row_count = 0
+        for i in range(changes.size()):
+            change = changes[i]
+            if change.isBid == is_bid:
+                rows[row_count, 0] = timestamp
+                rows[row_count, 1] = self._level3_book.ticksToPrice(change.priceTicks)
+                rows[row_count, 2] = change.amount
+                rows[row_count, 3] = update_id
+                row_count += 1
+        return array
+
+    cdef tuple c_convert_diff_message_to_np_arrays(self, object message):
+        cdef tuple retval
+
+        self._level3_book.clearChanges()
+        self.c_process_diff_message(message)
+        retval = (self.c_changes_to_np_array(self._level3_book.getChanges(), True, message.timestamp,
+                                             message.update_id),
+                  self.c_changes_to_np_array(self._level3_book.getChanges(), False, message.timestamp,
+                                             message.update_id))
+        self._level3_book.clearChanges()
+        return retval
+
+    cdef tuple c_convert_snapshot_message_to_np_arrays(self, object message):
+        cdef:
+            vector[OrderBookLevel3Change] bid_levels
+            vector[OrderBookLevel3Change] ask_levels
+
+        self.c_process_snapshot_message(message)
+        self._level3_book.clearChanges()
+        self._level3_book.getLevelsSnapshot(True, bid_levels)
+        self._level3_book.getLevelsSnapshot(False, ask_levels)
+        return (self.c_changes_to_np_array(bid_levels, True, message.timestamp, message.update_id),
+                self.c_changes_to_np_array(ask_levels, False, message.timestamp, message.update_id))
+
+    def convert_diff_message_to_order_book_row(self, message) -> Tuple[List[OrderBookRow], List[OrderBookRow]]:
+        np_bids, np_asks = self.c_convert_diff_message_to_np_arrays(message)
+        bids_row = [OrderBookRow(price, qty, update_id) for ts, price, qty, update_id in np_bids]
+        asks_row = [OrderBookRow(price, qty, update_id) for ts, price, qty, update_id in np_asks]
+        return bids_row, asks_row
+
+    def convert_snapshot_message_to_order_book_row(self, message) -> Tuple[List[OrderBookRow], List[OrderBookRow]]:
+        np_bids, np_asks = self.c_convert_snapshot_message_to_np_arrays(message)
+        bids_row = [OrderBookRow(price, qty, update_id) for ts, price, qty, update_id in np_bids]
+        asks_row = [OrderBookRow(price, qty, update_id) for ts, price, qty, update_id in np_asks]
+        return bids_row, asks_row
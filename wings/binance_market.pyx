@@ -48,6 +48,7 @@ from wings.order_book_tracker import (
 )
 from wings.order_book cimport OrderBook
 from wings.tracker.binance_order_book_tracker import BinanceOrderBookTracker
+from wings.tracker.order_book_tracker_registry import OrderBookTrackerRegistry
 from wings.tracker.binance_user_stream_tracker import BinanceUserStreamTracker
 from wings.user_stream_tracker import UserStreamTrackerDataSourceType
 from wings.cancellation_result import CancellationResult
@@ -329,8 +330,9 @@ cdef class BinanceMarket(MarketBase):
         self.monkey_patch_binance_time()
 
         super().__init__()
-        self._order_book_tracker = BinanceOrderBookTracker(data_source_type=order_book_tracker_data_source_type,
-                                                           symbols=symbols)
+        self._order_book_tracker = OrderBookTrackerRegistry.get_tracker(BinanceOrderBookTracker,
+                                                                        symbols,
+                                                                        order_book_tracker_data_source_type)
         self._binance_client = BinanceClient(binance_api_key, binance_api_secret)
         self._user_stream_tracker = BinanceUserStreamTracker(
             data_source_type=user_stream_tracker_data_source_type, binance_client=self._binance_client)
@@ -528,6 +530,9 @@ cdef class BinanceMarket(MarketBase):
             self._trading_rules.clear()
             for trading_rule in trading_rules_list:
                 self._trading_rules[trading_rule.symbol] = trading_rule
+                self._order_book_tracker.set_fixed_point(trading_rule.symbol,
+                                                         trading_rule.price_tick_size,
+                                                         trading_rule.order_step_size)
 
     async def _update_order_status(self):
         cdef:
@@ -804,6 +809,14 @@ cdef class BinanceMarket(MarketBase):
         self._user_stream_event_listener_task = asyncio.ensure_future(self._user_stream_event_listener())
         self._coro_scheduler_task = asyncio.ensure_future(self.coro_scheduler(self._coro_queue))
 
+    cdef c_stop(self, Clock clock):
+        MarketBase.c_stop(self, clock)
+        if self._order_tracker_task is not None:
+            self._order_tracker_task.cancel()
+            self._order_tracker_task = None
+        # Drop the market's subscriptions to the shared order book tracker, which stops after its last consumer.
+        self._order_book_tracker.release()
+
     cdef c_tick(self, double timestamp):
         cdef:
             int64_t last_tick = <int64_t>(self._last_timestamp / self._poll_interval)
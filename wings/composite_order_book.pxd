@@ -0,0 +1,54 @@
+# distutils: language=c++
+
+from libcpp.map cimport map
+from libcpp.vector cimport vector
+from .OrderBookEntry cimport OrderBookEntry
+from .order_book cimport (
+    OrderBook,
+    OrderBookLevelListener
+)
+
+
+cdef class CompositeOrderBook
+
+
+cdef class CompositeOrderBookVenueListener(OrderBookLevelListener):
+    cdef CompositeOrderBook _composite_order_book
+    cdef size_t _venue_index
+
+
+cdef class CompositeOrderBook(OrderBook):
+    cdef list _venue_names
+    cdef list _venue_order_books
+    cdef list _venue_listeners
+    cdef vector[double] _exchange_rates
+    cdef vector[map[double, double]] _venue_bids
+    cdef vector[map[double, double]] _venue_asks
+
+    cdef int c_get_venue_index(self, str venue) except -1
+    cdef c_set_venue_level(self,
+                           size_t venue_index,
+                           bint is_bid,
+                           double price,
+                           double amount,
+                           vector[OrderBookEntry] &changes)
+    cdef c_set_venue_tick_level(self,
+                                size_t venue_index,
+                                bint is_bid,
+                                double tick_size,
+                                double level_price,
+                                double amount,
+                                vector[OrderBookEntry] &changes)
+    cdef c_prune_venue_levels(self,
+                              size_t venue_index,
+                              bint is_bid,
+                              OrderBook order_book,
+                              vector[OrderBookEntry] &changes)
+    cdef c_clear_venue_levels(self, size_t venue_index, vector[OrderBookEntry] &bids, vector[OrderBookEntry] &asks)
+    cdef c_on_venue_diffs(self,
+                          size_t venue_index,
+                          OrderBook order_book,
+                          vector[OrderBookEntry] &bids,
+                          vector[OrderBookEntry] &asks)
+    cdef c_sync_venue(self, size_t venue_index)
+    cdef c_apply_composite_changes(self, vector[OrderBookEntry] &bids, vector[OrderBookEntry] &asks)
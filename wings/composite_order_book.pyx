@@ -0,0 +1,357 @@
+# distutils: language=c++
+# distutils: sources=wings/cpp/OrderBookEntry.cpp wings/cpp/OrderBookDepthIndex.cpp wings/cpp/OrderBookTickLadder.cpp
+
+from cython.operator cimport (
+    address as ref,
+    dereference as deref,
+    postincrement as inc
+)
+from libc.math cimport llround
+from libc.stdint cimport int64_t
+from libcpp.map cimport map
+from libcpp.vector cimport vector
+import logging
+from typing import (
+    Dict,
+    List
+)
+
+from .OrderBookEntry cimport OrderBookEntry
+from .order_book cimport (
+    OrderBook,
+    OrderBookLevelListener
+)
+
+cob_logger = None
+
+
+cdef class CompositeOrderBookVenueListener(OrderBookLevelListener):
+    def __init__(self, CompositeOrderBook composite_order_book, size_t venue_index):
+        self._composite_order_book = composite_order_book
+        self._venue_index = venue_index
+
+    cdef c_on_diffs(self, OrderBook order_book, vector[OrderBookEntry] &bids, vector[OrderBookEntry] &asks):
+        self._composite_order_book.c_on_venue_diffs(self._venue_index, order_book, bids, asks)
+
+    cdef c_on_snapshot(self, OrderBook order_book):
+        self._composite_order_book.c_sync_venue(self._venue_index)
+
+
+cdef class CompositeOrderBook(OrderBook):
+    """
+    Merged order book over the same market on several venues.
+
+    Every venue order book's prices are converted to a common quote currency with the venue's exchange rate, and the
+    amounts from all venues at the same converted price are added up into one price level. The merged levels are kept
+    up to date as the venue order books change - only the changed levels are applied on each diff - so best price and
+    depth queries against the composite order book cost the same as against a single order book.
+
+    Unlike single venue order books, the composite order book can be crossed - i.e. the best bid on one venue can be
+    above the best ask on another venue.
+    """
+    @classmethod
+    def logger(cls) -> logging.Logger:
+        global cob_logger
+        if cob_logger is None:
+            cob_logger = logging.getLogger(__name__)
+        return cob_logger
+
+    def __init__(self):
+        super().__init__()
+        self._truncate_overlaps = False
+        self._venue_names = []
+        self._venue_order_books = []
+        self._venue_listeners = []
+
+    @property
+    def venues(self) -> List[str]:
+        return list(self._venue_names)
+
+    def add_order_book(self, venue: str, order_book: OrderBook, exchange_rate: float = 1.0):
+        """
+        Merges the order book of a venue into the composite order book. exchange_rate converts the venue's prices to
+        the composite order book's quote currency.
+        """
+        cdef:
+            CompositeOrderBookVenueListener listener
+            map[double, double] empty_levels
+
+        if venue in self._venue_names:
+            raise ValueError(f"Venue {venue} is already part of the composite order book.")
+        if not exchange_rate > 0:
+            raise ValueError(f"exchange_rate must be positive, got {exchange_rate}.")
+        listener = CompositeOrderBookVenueListener(self, len(self._venue_names))
+        self._venue_names.append(venue)
+        self._venue_order_books.append(order_book)
+        self._venue_listeners.append(listener)
+        self._exchange_rates.push_back(exchange_rate)
+        self._venue_bids.push_back(empty_levels)
+        self._venue_asks.push_back(empty_levels)
+        order_book.c_add_level_listener(listener)
+        self.c_sync_venue(len(self._venue_names) - 1)
+
+    def remove_order_book(self, venue: str):
+        cdef:
+            int venue_index = self.c_get_venue_index(venue)
+            OrderBook order_book = self._venue_order_books[venue_index]
+            CompositeOrderBookVenueListener listener = self._venue_listeners[venue_index]
+            vector[OrderBookEntry] bid_changes
+            vector[OrderBookEntry] ask_changes
+
+        order_book.c_remove_level_listener(listener)
+        self.c_clear_venue_levels(venue_index, bid_changes, ask_changes)
+        del self._venue_names[venue_index]
+        del self._venue_order_books[venue_index]
+        del self._venue_listeners[venue_index]
+        self._exchange_rates.erase(self._exchange_rates.begin() + venue_index)
+        self._venue_bids.erase(self._venue_bids.begin() + venue_index)
+        self._venue_asks.erase(self._venue_asks.begin() + venue_index)
+        for listener in self._venue_listeners[venue_index:]:
+            listener._venue_index -= 1
+        self.c_apply_composite_changes(bid_changes, ask_changes)
+
+    def set_exchange_rate(self, venue: str, exchange_rate: float):
+        cdef:
+            int venue_index = self.c_get_venue_index(venue)
+            vector[OrderBookEntry] bid_changes
+            vector[OrderBookEntry] ask_changes
+
+        if not exchange_rate > 0:
+            raise ValueError(f"exchange_rate must be positive, got {exchange_rate}.")
+        self.c_clear_venue_levels(venue_index, bid_changes, ask_changes)
+        self._exchange_rates[venue_index] = exchange_rate
+        self.c_apply_composite_changes(bid_changes, ask_changes)
+        self.c_sync_venue(venue_index)
+
+    def get_exchange_rate(self, venue: str) -> float:
+        return self._exchange_rates[self.c_get_venue_index(venue)]
+
+    def get_venue_amounts(self, is_buy: bool, price: float) -> Dict[str, float]:
+        """
+        Returns the amount each venue contributes to the ask (is_buy) or bid price level at `price` - which is in the
+        composite order book's quote currency.
+        """
+        cdef:
+            map[double, double] *levels
+            map[double, double].iterator it
+            dict venue_amounts = {}
+            size_t i
+
+        for i in range(len(self._venue_names)):
+            levels = ref(self._venue_asks[i]) if is_buy else ref(self._venue_bids[i])
+            it = deref(levels).find(price)
+            if it != deref(levels).end():
+                venue_amounts[self._venue_names[i]] = deref(it).second
+        return venue_amounts
+
+    cdef int c_get_venue_index(self, str venue) except -1:
+        if venue not in self._venue_names:
+            raise ValueError(f"Venue {venue} is not part of the composite order book.")
+        return self._venue_names.index(venue)
+
+    cdef c_set_venue_level(self,
+                           size_t venue_index,
+                           bint is_bid,
+                           double price,
+                           double amount,
+                           vector[OrderBookEntry] &changes):
+        """
+        Sets a venue's amount at a converted price, and appends the resulting composite price level to `changes`.
+        """
+        cdef:
+            vector[map[double, double]] *venue_levels = ref(self._venue_bids) if is_bid else ref(self._venue_asks)
+            map[double, double].iterator it
+            double total_amount = 0
+            size_t i
+
+        if amount > 0:
+            deref(venue_levels)[venue_index][price] = amount
+        else:
+            deref(venue_levels)[venue_index].erase(price)
+        for i in range(deref(venue_levels).size()):
+            it = deref(venue_levels)[i].find(price)
+            if it != deref(venue_levels)[i].end():
+                total_amount += deref(it).second
+        changes.push_back(OrderBookEntry(price, total_amount, self._last_diff_uid + 1))
+
+    cdef c_set_venue_tick_level(self,
+                                size_t venue_index,
+                                bint is_bid,
+                                double tick_size,
+                                double level_price,
+                                double amount,
+                                vector[OrderBookEntry] &changes):
+        """
+        Sets a tick ladder venue's level, and removes the venue's levels within the same tick that were stored under a
+        different price - a diff can delete a level with any price that rounds to its tick.
+        """
+        cdef:
+            map[double, double] *levels = ref(self._venue_bids[venue_index]) if is_bid \
+                else ref(self._venue_asks[venue_index])
+            map[double, double].iterator it
+            double rate = self._exchange_rates[venue_index]
+            int64_t tick = llround(level_price / tick_size)
+            double high_price = (tick + 0.5) * tick_size * rate
+            vector[double] removed_prices
+
+        it = deref(levels).lower_bound((tick - 0.5) * tick_size * rate)
+        while it != deref(levels).end() and deref(it).first < high_price:
+            if deref(it).first != level_price * rate:
+                removed_prices.push_back(deref(it).first)
+            inc(it)
+        for price in removed_prices:
+            self.c_set_venue_level(venue_index, is_bid, price, 0, changes)
+        self.c_set_venue_level(venue_index, is_bid, level_price * rate, amount, changes)
+
+    cdef c_prune_venue_levels(self,
+                              size_t venue_index,
+                              bint is_bid,
+                              OrderBook order_book,
+                              vector[OrderBookEntry] &changes):
+        """
+        Removes the venue's levels that the venue order book doesn't have anymore, even though no diff deleted them
+        - i.e. levels removed by the venue order book's overlap truncation, or trimmed by its depth limit. Only the
+        removed levels are visited.
+        """
+        cdef:
+            map[double, double] *levels = ref(self._venue_bids[venue_index]) if is_bid \
+                else ref(self._venue_asks[venue_index])
+            map[double, double].iterator it
+            map[double, double].iterator end
+            double rate = self._exchange_rates[venue_index]
+            OrderBookEntry top_entry = order_book.c_get_top_entry(not is_bid)
+            vector[double] removed_prices
+
+        if top_entry.getAmount() <= 0:
+            it = deref(levels).begin()
+            end = deref(levels).end()
+            while it != end:
+                removed_prices.push_back(deref(it).first)
+                inc(it)
+        elif is_bid:
+            it = deref(levels).upper_bound(top_entry.getPrice() * rate)
+            while it != deref(levels).end():
+                removed_prices.push_back(deref(it).first)
+                inc(it)
+            if order_book._bid_depth_truncated:
+                it = deref(levels).begin()
+                end = deref(levels).upper_bound(order_book._bid_depth_limit_price * rate)
+                while it != end:
+                    removed_prices.push_back(deref(it).first)
+                    inc(it)
+        else:
+            it = deref(levels).begin()
+            end = deref(levels).lower_bound(top_entry.getPrice() * rate)
+            while it != end:
+                removed_prices.push_back(deref(it).first)
+                inc(it)
+            if order_book._ask_depth_truncated:
+                it = deref(levels).lower_bound(order_book._ask_depth_limit_price * rate)
+                while it != deref(levels).end():
+                    removed_prices.push_back(deref(it).first)
+                    inc(it)
+        for price in removed_prices:
+            self.c_set_venue_level(venue_index, is_bid, price, 0, changes)
+
+    cdef c_clear_venue_levels(self, size_t venue_index, vector[OrderBookEntry] &bids, vector[OrderBookEntry] &asks):
+        cdef:
+            map[double, double].iterator it
+            vector[double] prices
+
+        it = self._venue_bids[venue_index].begin()
+        while it != self._venue_bids[venue_index].end():
+            prices.push_back(deref(it).first)
+            inc(it)
+        for price in prices:
+            self.c_set_venue_level(venue_index, True, price, 0, bids)
+
+        prices.clear()
+        it = self._venue_asks[venue_index].begin()
+        while it != self._venue_asks[venue_index].end():
+            prices.push_back(deref(it).first)
+            inc(it)
+        for price in prices:
+            self.c_set_venue_level(venue_index, False, price, 0, asks)
+
+    cdef c_on_venue_diffs(self,
+                          size_t venue_index,
+                          OrderBook order_book,
+                          vector[OrderBookEntry] &bids,
+                          vector[OrderBookEntry] &asks):
+        cdef:
+            vector[OrderBookEntry] bid_changes
+            vector[OrderBookEntry] ask_changes
+            double rate = self._exchange_rates[venue_index]
+            double price
+
+        for bid in bids:
+            price = bid.getPrice()
+            if order_book.c_is_beyond_retained_depth(False, price):
+                continue
+            if order_book._use_tick_ladder:
+                self.c_set_venue_tick_level(venue_index, True, order_book._bid_ladder.getTickSize(),
+                                            order_book._bid_ladder.getLevelPrice(price), bid.getAmount(), bid_changes)
+            else:
+                self.c_set_venue_level(venue_index, True, price * rate, bid.getAmount(), bid_changes)
+        for ask in asks:
+            price = ask.getPrice()
+            if order_book.c_is_beyond_retained_depth(True, price):
+                continue
+            if order_book._use_tick_ladder:
+                self.c_set_venue_tick_level(venue_index, False, order_book._ask_ladder.getTickSize(),
+                                            order_book._ask_ladder.getLevelPrice(price), ask.getAmount(), ask_changes)
+            else:
+                self.c_set_venue_level(venue_index, False, price * rate, ask.getAmount(), ask_changes)
+        self.c_prune_venue_levels(venue_index, True, order_book, bid_changes)
+        self.c_prune_venue_levels(venue_index, False, order_book, ask_changes)
+        self.c_apply_composite_changes(bid_changes, ask_changes)
+
+    cdef c_sync_venue(self, size_t venue_index):
+        """
+        Replaces all of a venue's levels with the venue order book's current levels.
+        """
+        cdef:
+            OrderBook order_book = self._venue_order_books[venue_index]
+            double rate = self._exchange_rates[venue_index]
+            vector[OrderBookEntry] bid_changes
+            vector[OrderBookEntry] ask_changes
+            map[double, double] old_bids = self._venue_bids[venue_index]
+            map[double, double] old_asks = self._venue_asks[venue_index]
+            map[double, double].iterator it
+
+        self._venue_bids[venue_index].clear()
+        self._venue_asks[venue_index].clear()
+        bids_array, asks_array = order_book.snapshot_arrays()
+        for price, amount, _ in bids_array:
+            self.c_set_venue_level(venue_index, True, price * rate, amount, bid_changes)
+        for price, amount, _ in asks_array:
+            self.c_set_venue_level(venue_index, False, price * rate, amount, ask_changes)
+
+        # Levels the venue doesn't have anymore.
+        it = old_bids.begin()
+        while it != old_bids.end():
+            if self._venue_bids[venue_index].count(deref(it).first) == 0:
+                self.c_set_venue_level(venue_index, True, deref(it).first, 0, bid_changes)
+            inc(it)
+        it = old_asks.begin()
+        while it != old_asks.end():
+            if self._venue_asks[venue_index].count(deref(it).first) == 0:
+                self.c_set_venue_level(venue_index, False, deref(it).first, 0, ask_changes)
+            inc(it)
+        self.c_apply_composite_changes(bid_changes, ask_changes)
+
+    cdef c_apply_composite_changes(self, vector[OrderBookEntry] &bids, vector[OrderBookEntry] &asks):
+        if bids.size() > 0 or asks.size() > 0:
+            OrderBook.c_apply_diffs(self, bids, asks, self._last_diff_uid + 1)
+
+    cdef c_apply_diffs(self, vector[OrderBookEntry] bids, vector[OrderBookEntry] asks, int64_t update_id):
+        raise TypeError("Composite order books can only be changed through their venue order books.")
+
+    cdef c_apply_snapshot(self, vector[OrderBookEntry] bids, vector[OrderBookEntry] asks, int64_t update_id):
+        raise TypeError("Composite order books can only be changed through their venue order books.")
+
+    def use_tick_ladder(self, price_tick_size: float):
+        raise TypeError("Composite order books don't have a fixed price tick size.")
+
+    def use_fixed_point(self, price_tick_size, amount_lot_size = None):
+        raise TypeError("Composite order books don't have a fixed price tick size.")
@@ -0,0 +1,75 @@
+#include <math.h>
+#include "FixedPointGrid.h"
+
+const int FixedPointGrid::MAX_DECIMALS;
+
+// Largest number of units that is converted - beyond 2^52, a double can't hold every half unit exactly.
+static const double MAX_UNITS = 4503599627370496.0;
+
+FixedPointGrid::FixedPointGrid() {
+    this->decimals = 0;
+    this->stepUnits = 1;
+    this->scale = 1;
+}
+
+FixedPointGrid::FixedPointGrid(int decimals, int64_t stepUnits) {
+    this->decimals = decimals;
+    this->stepUnits = stepUnits;
+    this->scale = pow(10.0, decimals);
+}
+
+bool FixedPointGrid::toTicks(double value, int64_t &ticks) const {
+    if (!isfinite(value)) {
+        return false;
+    }
+
+    // units + error is exactly value * 10^decimals, since the scale is an exact power of ten.
+    double units = value * this->scale;
+    double error = fma(value, this->scale, -units);
+    if (fabs(units) >= MAX_UNITS) {
+        return false;
+    }
+
+    // Split the units into whole steps and a remainder. Both are exact below MAX_UNITS - only the quotient of the
+    // division may be off by one, which the remainder corrects.
+    double step = (double) this->stepUnits;
+    double quotient = floor(units / step);
+    double remainder = units - quotient * step;
+    if (remainder < 0) {
+        quotient -= 1;
+        remainder += step;
+    } else if (remainder >= step) {
+        quotient += 1;
+        remainder -= step;
+    }
+
+    // Round half to even. The remainder is a multiple of the units' ulp, so the error only matters on an exact tie.
+    double halfDifference = remainder - step / 2;
+    if (halfDifference > 0 ||
+        (halfDifference == 0 && (error > 0 || (error == 0 && fmod(quotient, 2) != 0)))) {
+        quotient += 1;
+    }
+    ticks = (int64_t) quotient;
+    return true;
+}
+
+double FixedPointGrid::fromTicks(int64_t ticks) const {
+    // Both operands are exact, so the division is correctly rounded to the double nearest to the decimal value.
+    return (double) (ticks * this->stepUnits) / this->scale;
+}
+
+double FixedPointGrid::snap(double value) const {
+    int64_t ticks;
+    if (!this->toTicks(value, ticks)) {
+        return value;
+    }
+    return this->fromTicks(ticks);
+}
+
+int FixedPointGrid::getDecimals() const {
+    return this->decimals;
+}
+
+int64_t FixedPointGrid::getStepUnits() const {
+    return this->stepUnits;
+}
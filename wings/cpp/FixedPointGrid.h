@@ -0,0 +1,35 @@
+#ifndef _FIXED_POINT_GRID_H
+#define _FIXED_POINT_GRID_H
+
+#include <stdint.h>
+
+/**
+ * Fixed-point grid of a market's price tick size or amount lot size.
+ *
+ * The step is stored as an integer number of units, where a unit is 10^-decimals - e.g. a step of 0.05 is 5 units of
+ * 0.01. Values are converted to an integer number of steps (ticks) by rounding half to even, on the exact binary value
+ * of the double - i.e. the same result as round(Decimal(value) / step) in Python - without going through Decimal.
+ *
+ * Converting ticks back to a double always gives the double nearest to the decimal value of the ticks - the same
+ * double that parsing the decimal value from text gives - so equal ticks always map to bit-identical prices.
+ */
+class FixedPointGrid {
+    int decimals;
+    int64_t stepUnits;
+    double scale;
+
+    public:
+        static const int MAX_DECIMALS = 15;
+
+        FixedPointGrid();
+        FixedPointGrid(int decimals, int64_t stepUnits);
+
+        bool toTicks(double value, int64_t &ticks) const;
+        double fromTicks(int64_t ticks) const;
+        double snap(double value) const;
+
+        int getDecimals() const;
+        int64_t getStepUnits() const;
+};
+
+#endif
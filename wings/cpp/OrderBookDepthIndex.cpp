@@ -0,0 +1,319 @@
+#include <math.h>
+#include "OrderBookDepthIndex.h"
+
+OrderBookDepthIndex::OrderBookDepthIndex() {
+    this->root = -1;
+    this->randomState = 2463534242u;
+}
+
+OrderBookDepthIndex::OrderBookDepthIndex(const OrderBookDepthIndex &other) {
+    this->nodes = other.nodes;
+    this->freeNodes = other.freeNodes;
+    this->root = other.root;
+    this->randomState = other.randomState;
+}
+
+OrderBookDepthIndex &OrderBookDepthIndex::operator=(const OrderBookDepthIndex &other) {
+    this->nodes = other.nodes;
+    this->freeNodes = other.freeNodes;
+    this->root = other.root;
+    this->randomState = other.randomState;
+    return *this;
+}
+
+int32_t OrderBookDepthIndex::allocateNode(double price, double amount) {
+    int32_t index;
+    Node node;
+
+    // xorshift32 - treap priorities only need to be cheap and well distributed.
+    this->randomState ^= this->randomState << 13;
+    this->randomState ^= this->randomState >> 17;
+    this->randomState ^= this->randomState << 5;
+
+    node.price = price;
+    node.amount = amount;
+    node.quoteAmount = price * amount;
+    node.sumAmount = node.amount;
+    node.sumQuoteAmount = node.quoteAmount;
+    node.levels = 1;
+    node.priority = this->randomState;
+    node.left = node.right = -1;
+
+    if (!this->freeNodes.empty()) {
+        index = this->freeNodes.back();
+        this->freeNodes.pop_back();
+        this->nodes[index] = node;
+    } else {
+        index = (int32_t) this->nodes.size();
+        this->nodes.push_back(node);
+    }
+    return index;
+}
+
+void OrderBookDepthIndex::releaseSubtree(int32_t node) {
+    if (node < 0) {
+        return;
+    }
+    this->releaseSubtree(this->nodes[node].left);
+    this->releaseSubtree(this->nodes[node].right);
+    this->freeNodes.push_back(node);
+}
+
+void OrderBookDepthIndex::update(int32_t node) {
+    Node &n = this->nodes[node];
+    n.sumAmount = n.amount + this->subtreeAmount(n.left) + this->subtreeAmount(n.right);
+    n.sumQuoteAmount = n.quoteAmount + this->subtreeQuoteAmount(n.left) + this->subtreeQuoteAmount(n.right);
+    n.levels = 1 + this->subtreeLevels(n.left) + this->subtreeLevels(n.right);
+}
+
+void OrderBookDepthIndex::split(int32_t node, double price, bool inclusive, int32_t &left, int32_t &right) {
+    if (node < 0) {
+        left = right = -1;
+        return;
+    }
+    double nodePrice = this->nodes[node].price;
+    if (nodePrice < price || (inclusive && nodePrice == price)) {
+        this->split(this->nodes[node].right, price, inclusive, this->nodes[node].right, right);
+        left = node;
+    } else {
+        this->split(this->nodes[node].left, price, inclusive, left, this->nodes[node].left);
+        right = node;
+    }
+    this->update(node);
+}
+
+int32_t OrderBookDepthIndex::merge(int32_t left, int32_t right) {
+    if (left < 0) {
+        return right;
+    }
+    if (right < 0) {
+        return left;
+    }
+    if (this->nodes[left].priority > this->nodes[right].priority) {
+        this->nodes[left].right = this->merge(this->nodes[left].right, right);
+        this->update(left);
+        return left;
+    }
+    this->nodes[right].left = this->merge(left, this->nodes[right].left);
+    this->update(right);
+    return right;
+}
+
+double OrderBookDepthIndex::subtreeAmount(int32_t node) const {
+    return node < 0 ? 0 : this->nodes[node].sumAmount;
+}
+
+double OrderBookDepthIndex::subtreeQuoteAmount(int32_t node) const {
+    return node < 0 ? 0 : this->nodes[node].sumQuoteAmount;
+}
+
+uint32_t OrderBookDepthIndex::subtreeLevels(int32_t node) const {
+    return node < 0 ? 0 : this->nodes[node].levels;
+}
+
+bool OrderBookDepthIndex::findCumulative(bool ascending, double target, bool quote, double &price, double &amount,
+                                         double &quoteAmount, size_t &levels) const {
+    int32_t node = this->root;
+    double cumulativeAmount = 0;
+    double cumulativeQuoteAmount = 0;
+    size_t cumulativeLevels = 0;
+
+    while (node >= 0) {
+        const Node &n = this->nodes[node];
+        int32_t nearChild = ascending ? n.left : n.right;
+        double nearAmount = this->subtreeAmount(nearChild);
+        double nearQuoteAmount = this->subtreeQuoteAmount(nearChild);
+
+        // If the target is reached within the levels closer to the top of the book, the answer is down there.
+        if (nearChild >= 0 &&
+                (quote ? cumulativeQuoteAmount + nearQuoteAmount : cumulativeAmount + nearAmount) >= target) {
+            node = nearChild;
+            continue;
+        }
+
+        cumulativeAmount += nearAmount + n.amount;
+        cumulativeQuoteAmount += nearQuoteAmount + n.quoteAmount;
+        cumulativeLevels += this->subtreeLevels(nearChild) + 1;
+        if ((quote ? cumulativeQuoteAmount : cumulativeAmount) >= target) {
+            price = n.price;
+            amount = cumulativeAmount;
+            quoteAmount = cumulativeQuoteAmount;
+            levels = cumulativeLevels;
+            return true;
+        }
+        node = ascending ? n.right : n.left;
+    }
+    return false;
+}
+
+void OrderBookDepthIndex::setAmount(double price, double amount) {
+    int32_t left, middle, right;
+
+    this->split(this->root, price, false, left, right);
+    this->split(right, price, true, middle, right);
+    this->releaseSubtree(middle);
+    middle = amount > 0 ? this->allocateNode(price, amount) : -1;
+    this->root = this->merge(this->merge(left, middle), right);
+}
+
+void OrderBookDepthIndex::erase(double price) {
+    this->setAmount(price, 0);
+}
+
+void OrderBookDepthIndex::eraseGreaterThan(double price, bool inclusive) {
+    int32_t left, right;
+
+    this->split(this->root, price, !inclusive, left, right);
+    this->releaseSubtree(right);
+    this->root = left;
+}
+
+void OrderBookDepthIndex::eraseLessThan(double price, bool inclusive) {
+    int32_t left, right;
+
+    this->split(this->root, price, inclusive, left, right);
+    this->releaseSubtree(left);
+    this->root = right;
+}
+
+void OrderBookDepthIndex::clear() {
+    this->nodes.clear();
+    this->freeNodes.clear();
+    this->root = -1;
+}
+
+size_t OrderBookDepthIndex::size() const {
+    return this->nodes.size() - this->freeNodes.size();
+}
+
+size_t OrderBookDepthIndex::getMemoryUsage() const {
+    return sizeof(OrderBookDepthIndex) + this->nodes.capacity() * sizeof(Node) +
+        this->freeNodes.capacity() * sizeof(int32_t);
+}
+
+double OrderBookDepthIndex::getTotalAmount() const {
+    return this->subtreeAmount(this->root);
+}
+
+double OrderBookDepthIndex::getTotalQuoteAmount() const {
+    return this->subtreeQuoteAmount(this->root);
+}
+
+bool OrderBookDepthIndex::getPriceForVolume(bool ascending, double volume, double &price) const {
+    double amount, quoteAmount;
+    size_t levels;
+    return this->findCumulative(ascending, volume, false, price, amount, quoteAmount, levels);
+}
+
+bool OrderBookDepthIndex::getPriceForQuoteVolume(bool ascending, double quoteVolume, double &price) const {
+    double amount, quoteAmount;
+    size_t levels;
+    return this->findCumulative(ascending, quoteVolume, true, price, amount, quoteAmount, levels);
+}
+
+bool OrderBookDepthIndex::getVWAPForVolume(bool ascending, double volume, double &vwap) const {
+    double price, amount, quoteAmount;
+    size_t levels;
+    if (!this->findCumulative(ascending, volume, false, price, amount, quoteAmount, levels)) {
+        return false;
+    }
+    vwap = quoteAmount / amount;
+    return true;
+}
+
+/**
+ * Number of price levels from the top of the book whose amounts add up to at least `volume`, or all of them if they
+ * don't.
+ */
+size_t OrderBookDepthIndex::getLevelsForVolume(bool ascending, double volume) const {
+    double price, amount, quoteAmount;
+    size_t levels;
+    if (!this->findCumulative(ascending, volume, false, price, amount, quoteAmount, levels)) {
+        return this->size();
+    }
+    return levels;
+}
+
+double OrderBookDepthIndex::getVolumeForPrice(bool ascending, double price) const {
+    int32_t node = this->root;
+    double cumulativeAmount = 0;
+
+    while (node >= 0) {
+        const Node &n = this->nodes[node];
+        if (ascending ? n.price <= price : n.price >= price) {
+            cumulativeAmount += this->subtreeAmount(ascending ? n.left : n.right) + n.amount;
+            node = ascending ? n.right : n.left;
+        } else {
+            node = ascending ? n.left : n.right;
+        }
+    }
+    return cumulativeAmount;
+}
+
+double OrderBookDepthIndex::getQuoteVolumeForPrice(bool ascending, double price) const {
+    int32_t node = this->root;
+    double cumulativeQuoteAmount = 0;
+
+    while (node >= 0) {
+        const Node &n = this->nodes[node];
+        if (ascending ? n.price <= price : n.price >= price) {
+            cumulativeQuoteAmount += this->subtreeQuoteAmount(ascending ? n.left : n.right) + n.quoteAmount;
+            node = ascending ? n.right : n.left;
+        } else {
+            node = ascending ? n.left : n.right;
+        }
+    }
+    return cumulativeQuoteAmount;
+}
+
+/**
+ * Answers getPriceForVolume() and getVWAPForVolume() for many volumes at once. The volumes must be sorted in ascending
+ * order. Volumes beyond the depth of the index get NaN prices and VWAPs.
+ *
+ * Small batches are answered with one descent per volume. Larger batches are answered with a single in-order sweep from
+ * the top of the book, which only visits each price level once - and stops at the level reaching the largest volume.
+ */
+void OrderBookDepthIndex::getDepthCurve(bool ascending, const double *volumes, size_t count, double *prices,
+                                        double *vwaps) const {
+    std::vector<int32_t> stack;
+    int32_t node = this->root;
+    size_t next = 0;
+    double cumulativeAmount = 0;
+    double cumulativeQuoteAmount = 0;
+
+    if (count * 2 * log2((double) this->size() + 1) < (double) this->size()) {
+        for (next = 0; next < count; next++) {
+            double price, amount, quoteAmount;
+            size_t levels;
+            if (this->findCumulative(ascending, volumes[next], false, price, amount, quoteAmount, levels)) {
+                prices[next] = price;
+                vwaps[next] = quoteAmount / amount;
+            } else {
+                prices[next] = vwaps[next] = NAN;
+            }
+        }
+        return;
+    }
+
+    while (next < count && (node >= 0 || !stack.empty())) {
+        while (node >= 0) {
+            stack.push_back(node);
+            node = ascending ? this->nodes[node].left : this->nodes[node].right;
+        }
+        node = stack.back();
+        stack.pop_back();
+
+        const Node &n = this->nodes[node];
+        cumulativeAmount += n.amount;
+        cumulativeQuoteAmount += n.quoteAmount;
+        while (next < count && cumulativeAmount >= volumes[next]) {
+            prices[next] = n.price;
+            vwaps[next] = cumulativeQuoteAmount / cumulativeAmount;
+            next++;
+        }
+        node = ascending ? n.right : n.left;
+    }
+    for (; next < count; next++) {
+        prices[next] = vwaps[next] = NAN;
+    }
+}
@@ -0,0 +1,75 @@
+#ifndef _ORDER_BOOK_DEPTH_INDEX_H
+#define _ORDER_BOOK_DEPTH_INDEX_H
+
+#include <stddef.h>
+#include <stdint.h>
+#include <vector>
+
+/**
+ * Cumulative volume index over one side of an order book.
+ *
+ * The index is a treap keyed by price, where every node also carries the total base and quote volume, and the
+ * number of price levels, of its subtree. This allows all the cumulative depth queries (price for volume, VWAP for
+ * volume, volume for price...) to be answered with a single root-to-leaf descent, in O(log n), without iterating over
+ * the price levels.
+ *
+ * Nodes are stored in a contiguous pool and addressed by index, so copying the index is a flat memory copy.
+ *
+ * The `ascending` argument in the queries selects the direction in which volume is accumulated - i.e. true for the
+ * ask book (lowest price first), and false for the bid book (highest price first).
+ */
+class OrderBookDepthIndex {
+    struct Node {
+        double price;
+        double amount;
+        double quoteAmount;
+        double sumAmount;
+        double sumQuoteAmount;
+        uint32_t levels;
+        uint32_t priority;
+        int32_t left;
+        int32_t right;
+    };
+
+    std::vector<Node> nodes;
+    std::vector<int32_t> freeNodes;
+    int32_t root;
+    uint32_t randomState;
+
+    int32_t allocateNode(double price, double amount);
+    void releaseSubtree(int32_t node);
+    void update(int32_t node);
+    void split(int32_t node, double price, bool inclusive, int32_t &left, int32_t &right);
+    int32_t merge(int32_t left, int32_t right);
+    double subtreeAmount(int32_t node) const;
+    double subtreeQuoteAmount(int32_t node) const;
+    uint32_t subtreeLevels(int32_t node) const;
+    bool findCumulative(bool ascending, double target, bool quote, double &price, double &amount,
+                        double &quoteAmount, size_t &levels) const;
+
+    public:
+        OrderBookDepthIndex();
+        OrderBookDepthIndex(const OrderBookDepthIndex &other);
+        OrderBookDepthIndex &operator=(const OrderBookDepthIndex &other);
+
+        void setAmount(double price, double amount);
+        void erase(double price);
+        void eraseGreaterThan(double price, bool inclusive);
+        void eraseLessThan(double price, bool inclusive);
+        void clear();
+
+        size_t size() const;
+        size_t getMemoryUsage() const;
+        double getTotalAmount() const;
+        double getTotalQuoteAmount() const;
+
+        bool getPriceForVolume(bool ascending, double volume, double &price) const;
+        bool getPriceForQuoteVolume(bool ascending, double quoteVolume, double &price) const;
+        bool getVWAPForVolume(bool ascending, double volume, double &vwap) const;
+        size_t getLevelsForVolume(bool ascending, double volume) const;
+        double getVolumeForPrice(bool ascending, double price) const;
+        double getQuoteVolumeForPrice(bool ascending, double price) const;
+        void getDepthCurve(bool ascending, const double *volumes, size_t count, double *prices, double *vwaps) const;
+};
+
+#endif
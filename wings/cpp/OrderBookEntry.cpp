@@ -39,9 +39,10 @@ void truncateOverlapEntries(std::set<OrderBookEntry> &bidBook, std::set<OrderBoo
             if (topBid.updateId > topAsk.updateId) {
                 askBook.erase(askIterator++);
             } else {
+                // Restart from the new top bid - stepping the reverse iterator here would skip over it.
                 std::set<OrderBookEntry>::iterator eraseIterator = (std::next(bidIterator)).base();
                 bidBook.erase(eraseIterator);
-                bidIterator++;
+                bidIterator = bidBook.rbegin();
             }
         } else {
             break;
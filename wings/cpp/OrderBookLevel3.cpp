@@ -0,0 +1,236 @@
+#include <math.h>
+#include "OrderBookLevel3.h"
+
+OrderBookLevel3::OrderBookLevel3() {
+    this->pricePrecision = 10;
+    this->priceScale = 1e10;
+}
+
+OrderBookLevel3::OrderBookLevel3(int pricePrecision) {
+    this->pricePrecision = pricePrecision;
+    this->priceScale = pow(10.0, pricePrecision);
+}
+
+bool OrderBookLevel3::priceToTicks(const char *price, int64_t &priceTicks) const {
+    // Parses plain decimals exactly - digits past the price precision are rounded half up. Anything else, e.g.
+    // exponents, is left to the caller.
+    const int64_t limit = INT64_MAX / 10;
+    int64_t ticks = 0;
+    int fractionDigits = 0;
+    bool hasDigits = false;
+    bool roundUp = false;
+    const char *p = price;
+
+    while (*p >= '0' && *p <= '9') {
+        if (ticks > limit) {
+            return false;
+        }
+        ticks = ticks * 10 + (*p - '0');
+        hasDigits = true;
+        p++;
+    }
+    if (*p == '.') {
+        p++;
+        while (*p >= '0' && *p <= '9') {
+            if (fractionDigits < this->pricePrecision) {
+                if (ticks > limit) {
+                    return false;
+                }
+                ticks = ticks * 10 + (*p - '0');
+                fractionDigits++;
+            } else if (fractionDigits == this->pricePrecision) {
+                roundUp = *p >= '5';
+                fractionDigits++;
+            }
+            hasDigits = true;
+            p++;
+        }
+    }
+    if (!hasDigits || *p != '\0') {
+        return false;
+    }
+    for (; fractionDigits < this->pricePrecision; fractionDigits++) {
+        if (ticks > limit) {
+            return false;
+        }
+        ticks *= 10;
+    }
+    if (roundUp) {
+        ticks++;
+    }
+    priceTicks = ticks;
+    return true;
+}
+
+double OrderBookLevel3::ticksToPrice(int64_t priceTicks) const {
+    return (double) priceTicks / this->priceScale;
+}
+
+std::map<int64_t, OrderBookLevel3::Level> &OrderBookLevel3::getLevels(bool isBid) {
+    return isBid ? this->bidLevels : this->askLevels;
+}
+
+void OrderBookLevel3::removeFromLevel(const Order &order) {
+    std::map<int64_t, Level> &levels = this->getLevels(order.isBid);
+    std::map<int64_t, Level>::iterator it = levels.find(order.priceTicks);
+    if (it == levels.end()) {
+        return;
+    }
+    if (it->second.orderCount <= 1) {
+        levels.erase(it);
+    } else {
+        it->second.amount -= order.amount;
+        it->second.orderCount--;
+    }
+}
+
+void OrderBookLevel3::recordLevel(bool isBid, int64_t priceTicks) {
+    OrderBookLevel3Change change;
+    change.isBid = isBid;
+    change.priceTicks = priceTicks;
+    change.amount = this->getLevelAmount(isBid, priceTicks);
+    this->changes.push_back(change);
+}
+
+void OrderBookLevel3::addOrder(const std::string &orderId, bool isBid, int64_t priceTicks, double amount) {
+    std::pair<std::unordered_map<std::string, Order>::iterator, bool> result;
+    Order order;
+    Order previousOrder;
+    bool replaced;
+
+    order.isBid = isBid;
+    order.priceTicks = priceTicks;
+    order.amount = amount;
+    result = this->orders.insert(std::make_pair(orderId, order));
+    replaced = !result.second;
+    if (replaced) {
+        previousOrder = result.first->second;
+        this->removeFromLevel(previousOrder);
+        result.first->second = order;
+    }
+
+    Level &level = this->getLevels(isBid)[priceTicks];
+    level.amount += amount;
+    level.orderCount++;
+
+    if (replaced && (previousOrder.isBid != isBid || previousOrder.priceTicks != priceTicks)) {
+        this->recordLevel(previousOrder.isBid, previousOrder.priceTicks);
+    }
+    this->recordLevel(isBid, priceTicks);
+}
+
+bool OrderBookLevel3::setOrderAmount(const std::string &orderId, double amount) {
+    std::unordered_map<std::string, Order>::iterator it = this->orders.find(orderId);
+    if (it == this->orders.end()) {
+        return false;
+    }
+    if (amount <= 0) {
+        return this->removeOrder(orderId);
+    }
+    Order &order = it->second;
+    this->getLevels(order.isBid)[order.priceTicks].amount += (long double) amount - order.amount;
+    order.amount = amount;
+    this->recordLevel(order.isBid, order.priceTicks);
+    return true;
+}
+
+bool OrderBookLevel3::reduceOrderAmount(const std::string &orderId, double filledAmount) {
+    std::unordered_map<std::string, Order>::iterator it = this->orders.find(orderId);
+    if (it == this->orders.end()) {
+        return false;
+    }
+    return this->setOrderAmount(orderId, it->second.amount - filledAmount);
+}
+
+bool OrderBookLevel3::removeOrder(const std::string &orderId) {
+    std::unordered_map<std::string, Order>::iterator it = this->orders.find(orderId);
+    if (it == this->orders.end()) {
+        return false;
+    }
+    Order order = it->second;
+    this->orders.erase(it);
+    this->removeFromLevel(order);
+    this->recordLevel(order.isBid, order.priceTicks);
+    return true;
+}
+
+void OrderBookLevel3::clear() {
+    this->orders.clear();
+    this->bidLevels.clear();
+    this->askLevels.clear();
+    this->changes.clear();
+}
+
+const std::vector<OrderBookLevel3Change> &OrderBookLevel3::getChanges() const {
+    return this->changes;
+}
+
+void OrderBookLevel3::clearChanges() {
+    this->changes.clear();
+}
+
+void OrderBookLevel3::getLevelsSnapshot(bool isBid, std::vector<OrderBookLevel3Change> &output) const {
+    // Best price first.
+    const std::map<int64_t, Level> &levels = isBid ? this->bidLevels : this->askLevels;
+    OrderBookLevel3Change change;
+    change.isBid = isBid;
+    output.clear();
+    output.reserve(levels.size());
+    if (isBid) {
+        for (std::map<int64_t, Level>::const_reverse_iterator it = levels.rbegin(); it != levels.rend(); ++it) {
+            change.priceTicks = it->first;
+            change.amount = (double) it->second.amount;
+            output.push_back(change);
+        }
+    } else {
+        for (std::map<int64_t, Level>::const_iterator it = levels.begin(); it != levels.end(); ++it) {
+            change.priceTicks = it->first;
+            change.amount = (double) it->second.amount;
+            output.push_back(change);
+        }
+    }
+}
+
+bool OrderBookLevel3::getOrder(const std::string &orderId, bool &isBid, int64_t &priceTicks, double &amount) const {
+    std::unordered_map<std::string, Order>::const_iterator it = this->orders.find(orderId);
+    if (it == this->orders.end()) {
+        return false;
+    }
+    isBid = it->second.isBid;
+    priceTicks = it->second.priceTicks;
+    amount = it->second.amount;
+    return true;
+}
+
+void OrderBookLevel3::getOrderIds(std::vector<std::string> &output) const {
+    output.clear();
+    output.reserve(this->orders.size());
+    for (std::unordered_map<std::string, Order>::const_iterator it = this->orders.begin(); it != this->orders.end();
+         ++it) {
+        output.push_back(it->first);
+    }
+}
+
+double OrderBookLevel3::getLevelAmount(bool isBid, int64_t priceTicks) const {
+    const std::map<int64_t, Level> &levels = isBid ? this->bidLevels : this->askLevels;
+    std::map<int64_t, Level>::const_iterator it = levels.find(priceTicks);
+    return it != levels.end() ? (double) it->second.amount : 0.0;
+}
+
+size_t OrderBookLevel3::getLevelOrderCount(bool isBid, int64_t priceTicks) const {
+    const std::map<int64_t, Level> &levels = isBid ? this->bidLevels : this->askLevels;
+    std::map<int64_t, Level>::const_iterator it = levels.find(priceTicks);
+    return it != levels.end() ? it->second.orderCount : 0;
+}
+
+size_t OrderBookLevel3::getOrderCount() const {
+    return this->orders.size();
+}
+
+size_t OrderBookLevel3::getLevelCount(bool isBid) const {
+    return isBid ? this->bidLevels.size() : this->askLevels.size();
+}
+
+int OrderBookLevel3::getPricePrecision() const {
+    return this->pricePrecision;
+}
@@ -0,0 +1,84 @@
+#ifndef _ORDER_BOOK_LEVEL3_H
+#define _ORDER_BOOK_LEVEL3_H
+
+#include <stddef.h>
+#include <stdint.h>
+#include <map>
+#include <string>
+#include <unordered_map>
+#include <vector>
+
+/**
+ * A price level of an OrderBookLevel3, with its price in integer ticks.
+ */
+struct OrderBookLevel3Change {
+    bool isBid;
+    int64_t priceTicks;
+    double amount;
+};
+
+/**
+ * Order by order (level 3) book, for exchanges that publish individual orders rather than price levels.
+ *
+ * Orders are keyed by order ID, and price levels by integer fixed-point price - i.e. the price multiplied by
+ * 10^pricePrecision - so the same price always maps to the same level regardless of how it was formatted. Every price
+ * level keeps its total amount and order count up to date as orders are added, changed and removed, so each order
+ * update is O(log n) in the number of price levels.
+ *
+ * Level totals are accumulated in long double, so adding and removing orders doesn't leave visible rounding residue
+ * in the remaining amount of a level. A level is removed as soon as its last order is.
+ *
+ * Every update records the new total amount of the price levels it changed - 0 for removed levels - until
+ * clearChanges() is called.
+ */
+class OrderBookLevel3 {
+    struct Order {
+        bool isBid;
+        int64_t priceTicks;
+        double amount;
+    };
+
+    struct Level {
+        long double amount;
+        size_t orderCount;
+    };
+
+    int pricePrecision;
+    double priceScale;
+    std::unordered_map<std::string, Order> orders;
+    std::map<int64_t, Level> bidLevels;
+    std::map<int64_t, Level> askLevels;
+    std::vector<OrderBookLevel3Change> changes;
+
+    std::map<int64_t, Level> &getLevels(bool isBid);
+    void removeFromLevel(const Order &order);
+    void recordLevel(bool isBid, int64_t priceTicks);
+
+    public:
+        static const int MAX_PRICE_PRECISION = 15;
+
+        OrderBookLevel3();
+        OrderBookLevel3(int pricePrecision);
+
+        bool priceToTicks(const char *price, int64_t &priceTicks) const;
+        double ticksToPrice(int64_t priceTicks) const;
+
+        void addOrder(const std::string &orderId, bool isBid, int64_t priceTicks, double amount);
+        bool setOrderAmount(const std::string &orderId, double amount);
+        bool reduceOrderAmount(const std::string &orderId, double filledAmount);
+        bool removeOrder(const std::string &orderId);
+        void clear();
+
+        const std::vector<OrderBookLevel3Change> &getChanges() const;
+        void clearChanges();
+        void getLevelsSnapshot(bool isBid, std::vector<OrderBookLevel3Change> &output) const;
+        bool getOrder(const std::string &orderId, bool &isBid, int64_t &priceTicks, double &amount) const;
+        void getOrderIds(std::vector<std::string> &output) const;
+        double getLevelAmount(bool isBid, int64_t priceTicks) const;
+        size_t getLevelOrderCount(bool isBid, int64_t priceTicks) const;
+        size_t getOrderCount() const;
+        size_t getLevelCount(bool isBid) const;
+        int getPricePrecision() const;
+};
+
+#endif
@@ -0,0 +1,384 @@
+#include "OrderBookTickLadder.h"
+#include <algorithm>
+#include <math.h>
+#if defined(_MSC_VER)
+#include <intrin.h>
+#endif
+
+const int64_t OrderBookTickLadder::INITIAL_LEVELS;
+const int64_t OrderBookTickLadder::MAX_LEVELS;
+const size_t OrderBookTickLadder::SHRINK_CHECK_INTERVAL;
+
+static inline int64_t lowestBit(uint64_t bits) {
+#if defined(_MSC_VER)
+    unsigned long index;
+    _BitScanForward64(&index, bits);
+    return (int64_t) index;
+#else
+    return (int64_t) __builtin_ctzll(bits);
+#endif
+}
+
+static inline int64_t highestBit(uint64_t bits) {
+#if defined(_MSC_VER)
+    unsigned long index;
+    _BitScanReverse64(&index, bits);
+    return (int64_t) index;
+#else
+    return 63 - (int64_t) __builtin_clzll(bits);
+#endif
+}
+
+/**
+ * The bits at and above (step > 0), or at and below (step < 0), the given bit position.
+ */
+static inline uint64_t bitsFrom(int64_t bit, int64_t step) {
+    return step > 0 ? ~0ULL << bit : ~0ULL >> (63 - bit);
+}
+
+OrderBookTickLadder::OrderBookTickLadder() {
+    this->tickSize = 1;
+    this->isBid = false;
+    this->baseTick = 0;
+    this->bestIndex = -1;
+    this->levelCount = 0;
+    this->deletionsSinceShrinkCheck = 0;
+}
+
+OrderBookTickLadder::OrderBookTickLadder(double tickSize, bool isBid) {
+    this->tickSize = tickSize;
+    this->isBid = isBid;
+    this->baseTick = 0;
+    this->bestIndex = -1;
+    this->levelCount = 0;
+    this->deletionsSinceShrinkCheck = 0;
+}
+
+OrderBookTickLadder::OrderBookTickLadder(const OrderBookTickLadder &other) {
+    this->tickSize = other.tickSize;
+    this->isBid = other.isBid;
+    this->baseTick = other.baseTick;
+    this->prices = other.prices;
+    this->amounts = other.amounts;
+    this->updateIds = other.updateIds;
+    this->occupiedWords = other.occupiedWords;
+    this->occupiedSummary = other.occupiedSummary;
+    this->bestIndex = other.bestIndex;
+    this->levelCount = other.levelCount;
+    this->deletionsSinceShrinkCheck = other.deletionsSinceShrinkCheck;
+}
+
+OrderBookTickLadder &OrderBookTickLadder::operator=(const OrderBookTickLadder &other) {
+    this->tickSize = other.tickSize;
+    this->isBid = other.isBid;
+    this->baseTick = other.baseTick;
+    this->prices = other.prices;
+    this->amounts = other.amounts;
+    this->updateIds = other.updateIds;
+    this->occupiedWords = other.occupiedWords;
+    this->occupiedSummary = other.occupiedSummary;
+    this->bestIndex = other.bestIndex;
+    this->levelCount = other.levelCount;
+    this->deletionsSinceShrinkCheck = other.deletionsSinceShrinkCheck;
+    return *this;
+}
+
+int64_t OrderBookTickLadder::priceToTick(double price) const {
+    return (int64_t) llround(price / this->tickSize);
+}
+
+bool OrderBookTickLadder::isBetter(int64_t index, int64_t otherIndex) const {
+    return this->isBid ? index > otherIndex : index < otherIndex;
+}
+
+void OrderBookTickLadder::setOccupied(int64_t index) {
+    this->occupiedWords[index >> 6] |= 1ULL << (index & 63);
+    this->occupiedSummary[index >> 12] |= 1ULL << ((index >> 6) & 63);
+}
+
+void OrderBookTickLadder::clearOccupied(int64_t index) {
+    this->occupiedWords[index >> 6] &= ~(1ULL << (index & 63));
+    if (this->occupiedWords[index >> 6] == 0) {
+        this->occupiedSummary[index >> 12] &= ~(1ULL << ((index >> 6) & 63));
+    }
+}
+
+/**
+ * Returns the first non-empty bitmap word from `word` on, in the direction of `step`, or -1 if there's none.
+ */
+int64_t OrderBookTickLadder::scanOccupiedWords(int64_t word, int64_t step) const {
+    int64_t summaryWord = word >> 6;
+    int64_t summaryEnd = (int64_t) this->occupiedSummary.size();
+    uint64_t bits;
+
+    if (word < 0 || summaryWord >= summaryEnd) {
+        return -1;
+    }
+    bits = this->occupiedSummary[summaryWord] & bitsFrom(word & 63, step);
+    while (bits == 0) {
+        summaryWord += step;
+        if (summaryWord < 0 || summaryWord >= summaryEnd) {
+            return -1;
+        }
+        bits = this->occupiedSummary[summaryWord];
+    }
+    return (summaryWord << 6) + (step > 0 ? lowestBit(bits) : highestBit(bits));
+}
+
+/**
+ * Returns the first occupied slot from `index` on, in the direction of `step` (1 or -1), or -1 if there's none.
+ */
+int64_t OrderBookTickLadder::scanOccupied(int64_t index, int64_t step) const {
+    int64_t word;
+    uint64_t bits;
+
+    if (index < 0 || index >= (int64_t) this->amounts.size()) {
+        return -1;
+    }
+    word = index >> 6;
+    bits = this->occupiedWords[word] & bitsFrom(index & 63, step);
+    if (bits == 0) {
+        word = this->scanOccupiedWords(word + step, step);
+        if (word < 0) {
+            return -1;
+        }
+        bits = this->occupiedWords[word];
+    }
+    return (word << 6) + (step > 0 ? lowestBit(bits) : highestBit(bits));
+}
+
+/**
+ * Moves the price levels into a new array of newLevels slots, starting at newBaseTick.
+ */
+void OrderBookTickLadder::relocate(int64_t newLevels, int64_t newBaseTick) {
+    int64_t offset = this->baseTick - newBaseTick;
+    std::vector<double> newPrices(newLevels, 0);
+    std::vector<double> newAmounts(newLevels, 0);
+    std::vector<int64_t> newUpdateIds(newLevels, 0);
+    std::vector<uint64_t> newWords((newLevels + 63) / 64, 0);
+    std::vector<uint64_t> newSummary((newLevels + 4095) / 4096, 0);
+
+    for (int64_t index = this->scanOccupied(0, 1); index >= 0; index = this->scanOccupied(index + 1, 1)) {
+        int64_t newIndex = index + offset;
+        newPrices[newIndex] = this->prices[index];
+        newAmounts[newIndex] = this->amounts[index];
+        newUpdateIds[newIndex] = this->updateIds[index];
+        newWords[newIndex >> 6] |= 1ULL << (newIndex & 63);
+        newSummary[newIndex >> 12] |= 1ULL << ((newIndex >> 6) & 63);
+    }
+    this->prices.swap(newPrices);
+    this->amounts.swap(newAmounts);
+    this->updateIds.swap(newUpdateIds);
+    this->occupiedWords.swap(newWords);
+    this->occupiedSummary.swap(newSummary);
+    this->baseTick = newBaseTick;
+    if (this->bestIndex >= 0) {
+        this->bestIndex += offset;
+    }
+}
+
+bool OrderBookTickLadder::reserve(int64_t tick) {
+    int64_t currentLevels = (int64_t) this->amounts.size();
+    int64_t lowTick, highTick, newLevels;
+
+    if (currentLevels > 0 && tick >= this->baseTick && tick < this->baseTick + currentLevels) {
+        return true;
+    }
+
+    // Empty ladder - just center the array around the new tick.
+    if (this->levelCount == 0) {
+        newLevels = currentLevels > 0 ? currentLevels : INITIAL_LEVELS;
+        this->baseTick = tick - newLevels / 2;
+        this->prices.assign(newLevels, 0);
+        this->amounts.assign(newLevels, 0);
+        this->updateIds.assign(newLevels, 0);
+        this->occupiedWords.assign((newLevels + 63) / 64, 0);
+        this->occupiedSummary.assign((newLevels + 4095) / 4096, 0);
+        this->bestIndex = -1;
+        return true;
+    }
+
+    // Find the range of ticks that needs to be covered after the re-centering.
+    lowTick = this->baseTick + this->scanOccupied(0, 1);
+    highTick = this->baseTick + this->scanOccupied(currentLevels - 1, -1);
+    lowTick = tick < lowTick ? tick : lowTick;
+    highTick = tick > highTick ? tick : highTick;
+    if (highTick - lowTick + 1 > MAX_LEVELS) {
+        return false;
+    }
+
+    // Keep half of the array as slack, so that a drifting market doesn't re-center on every new price level.
+    newLevels = currentLevels;
+    while (newLevels < 2 * (highTick - lowTick + 1) && newLevels < MAX_LEVELS) {
+        newLevels *= 2;
+    }
+    this->relocate(newLevels, lowTick - (newLevels - (highTick - lowTick + 1)) / 2);
+    return true;
+}
+
+/**
+ * Shrinks the array once the occupied range takes up less than an eighth of it - e.g. after a spike of far away price
+ * levels was deleted - keeping half of the new array as slack. This is checked every SHRINK_CHECK_INTERVAL deletions.
+ */
+void OrderBookTickLadder::shrinkIfSparse() {
+    int64_t currentLevels = (int64_t) this->amounts.size();
+    int64_t lowIndex, highIndex, span, newLevels;
+
+    if (currentLevels <= INITIAL_LEVELS || ++this->deletionsSinceShrinkCheck < SHRINK_CHECK_INTERVAL) {
+        return;
+    }
+    this->deletionsSinceShrinkCheck = 0;
+
+    if (this->levelCount == 0) {
+        this->relocate(INITIAL_LEVELS, this->baseTick + (currentLevels - INITIAL_LEVELS) / 2);
+        return;
+    }
+    lowIndex = this->scanOccupied(0, 1);
+    highIndex = this->scanOccupied(currentLevels - 1, -1);
+    span = highIndex - lowIndex + 1;
+    if (span * 8 > currentLevels) {
+        return;
+    }
+    newLevels = currentLevels;
+    while (newLevels > INITIAL_LEVELS && newLevels / 2 >= 2 * span) {
+        newLevels /= 2;
+    }
+    this->relocate(newLevels, this->baseTick + lowIndex - (newLevels - span) / 2);
+}
+
+bool OrderBookTickLadder::setEntry(OrderBookEntry &entry) {
+    int64_t tick = this->priceToTick(entry.getPrice());
+    int64_t index;
+    bool wasOccupied;
+
+    if (entry.getAmount() <= 0) {
+        // Deleting a price level outside of the covered range is a no-op.
+        index = tick - this->baseTick;
+        if (index < 0 || index >= (int64_t) this->amounts.size() || this->amounts[index] <= 0) {
+            return true;
+        }
+        this->amounts[index] = 0;
+        this->clearOccupied(index);
+        this->levelCount -= 1;
+        if (index == this->bestIndex) {
+            this->bestIndex = this->levelCount > 0 ? this->scanOccupied(index, this->isBid ? -1 : 1) : -1;
+        }
+        this->shrinkIfSparse();
+        return true;
+    }
+
+    if (!this->reserve(tick)) {
+        return false;
+    }
+    index = tick - this->baseTick;
+    wasOccupied = this->amounts[index] > 0;
+    this->amounts[index] = entry.getAmount();
+    this->updateIds[index] = entry.getUpdateId();
+    if (!wasOccupied) {
+        this->prices[index] = entry.getPrice();
+        this->setOccupied(index);
+        this->levelCount += 1;
+        if (this->bestIndex < 0 || this->isBetter(index, this->bestIndex)) {
+            this->bestIndex = index;
+        }
+    }
+    return true;
+}
+
+void OrderBookTickLadder::eraseBest() {
+    if (this->bestIndex < 0) {
+        return;
+    }
+    this->amounts[this->bestIndex] = 0;
+    this->clearOccupied(this->bestIndex);
+    this->levelCount -= 1;
+    this->bestIndex = this->levelCount > 0 ? this->scanOccupied(this->bestIndex, this->isBid ? -1 : 1) : -1;
+}
+
+double OrderBookTickLadder::truncateToDepth(size_t depth) {
+    int64_t step = this->isBid ? -1 : 1;
+    int64_t index = this->bestIndex;
+    double firstRemovedPrice = NAN;
+    size_t retained = 0;
+
+    if (this->levelCount <= depth) {
+        return firstRemovedPrice;
+    }
+    while (retained < depth) {
+        index = this->scanOccupied(index, step) + step;
+        retained += 1;
+    }
+    index = this->scanOccupied(index, step);
+    firstRemovedPrice = this->prices[index];
+    for (; index >= 0; index = this->scanOccupied(index + step, step)) {
+        this->amounts[index] = 0;
+        this->clearOccupied(index);
+    }
+    this->levelCount = depth;
+    if (depth == 0) {
+        this->bestIndex = -1;
+    }
+    return firstRemovedPrice;
+}
+
+void OrderBookTickLadder::clear() {
+    std::fill(this->amounts.begin(), this->amounts.end(), 0);
+    std::fill(this->occupiedWords.begin(), this->occupiedWords.end(), 0);
+    std::fill(this->occupiedSummary.begin(), this->occupiedSummary.end(), 0);
+    this->bestIndex = -1;
+    this->levelCount = 0;
+}
+
+size_t OrderBookTickLadder::size() const {
+    return this->levelCount;
+}
+
+size_t OrderBookTickLadder::capacity() const {
+    return this->amounts.size();
+}
+
+size_t OrderBookTickLadder::getMemoryUsage() const {
+    return sizeof(OrderBookTickLadder) + this->prices.capacity() * sizeof(double) +
+        this->amounts.capacity() * sizeof(double) + this->updateIds.capacity() * sizeof(int64_t) +
+        (this->occupiedWords.capacity() + this->occupiedSummary.capacity()) * sizeof(uint64_t);
+}
+
+double OrderBookTickLadder::getTickSize() const {
+    return this->tickSize;
+}
+
+int64_t OrderBookTickLadder::getBestIndex() const {
+    return this->bestIndex;
+}
+
+int64_t OrderBookTickLadder::getNextIndex(int64_t index) const {
+    int64_t step = this->isBid ? -1 : 1;
+    return this->scanOccupied(index + step, step);
+}
+
+double OrderBookTickLadder::getLevelPrice(double price) const {
+    int64_t index = this->priceToTick(price) - this->baseTick;
+    if (index < 0 || index >= (int64_t) this->amounts.size() || this->amounts[index] <= 0) {
+        return price;
+    }
+    return this->prices[index];
+}
+
+OrderBookEntry OrderBookTickLadder::getEntry(int64_t index) const {
+    return OrderBookEntry(this->prices[index], this->amounts[index], this->updateIds[index]);
+}
+
+void truncateOverlapLadders(OrderBookTickLadder &bidLadder, OrderBookTickLadder &askLadder) {
+    while (bidLadder.bestIndex >= 0 && askLadder.bestIndex >= 0) {
+        int64_t topBidIndex = bidLadder.bestIndex;
+        int64_t topAskIndex = askLadder.bestIndex;
+        if (bidLadder.prices[topBidIndex] < askLadder.prices[topAskIndex]) {
+            break;
+        }
+        if (bidLadder.updateIds[topBidIndex] > askLadder.updateIds[topAskIndex]) {
+            askLadder.eraseBest();
+        } else {
+            bidLadder.eraseBest();
+        }
+    }
+}
@@ -0,0 +1,78 @@
+#ifndef _ORDER_BOOK_TICK_LADDER_H
+#define _ORDER_BOOK_TICK_LADDER_H
+
+#include <stddef.h>
+#include <stdint.h>
+#include <vector>
+#include "OrderBookEntry.h"
+
+/**
+ * Array based storage for one side of an order book, for markets with a fixed price tick size.
+ *
+ * Every price is mapped to an integer tick, and every tick to a slot in a contiguous array. Setting or deleting a
+ * price level is a direct write to its slot. The occupied slots are also kept in a bitmap, with one bit per slot, and
+ * a summary bitmap with one bit per non-empty bitmap word - so finding the next occupied slot, e.g. the new best
+ * price level when the top of the book is deleted, skips over 64 empty slots per bit test and 4096 per summary bit,
+ * rather than scanning them one by one.
+ *
+ * The array only covers the ticks between the lowest and the highest price levels, plus some slack on both sides.
+ * When a price level falls outside of the covered range, the array is re-centered around the occupied price levels,
+ * or grown if the occupied range doesn't fit anymore - up to MAX_LEVELS slots. Every SHRINK_CHECK_INTERVAL deletions,
+ * an array that is more than 8 times as large as its occupied range is shrunk back, down to INITIAL_LEVELS slots.
+ *
+ * Prices that round to the same tick share one price level, which keeps the first price it was set with.
+ *
+ * Level indices are offsets into the array. They stay valid until the next call to setEntry().
+ */
+class OrderBookTickLadder {
+    double tickSize;
+    bool isBid;
+    int64_t baseTick;
+    std::vector<double> prices;
+    std::vector<double> amounts;
+    std::vector<int64_t> updateIds;
+    std::vector<uint64_t> occupiedWords;
+    std::vector<uint64_t> occupiedSummary;
+    int64_t bestIndex;
+    size_t levelCount;
+    size_t deletionsSinceShrinkCheck;
+
+    int64_t priceToTick(double price) const;
+    bool isBetter(int64_t index, int64_t otherIndex) const;
+    void setOccupied(int64_t index);
+    void clearOccupied(int64_t index);
+    int64_t scanOccupiedWords(int64_t word, int64_t step) const;
+    int64_t scanOccupied(int64_t index, int64_t step) const;
+    void relocate(int64_t newLevels, int64_t newBaseTick);
+    bool reserve(int64_t tick);
+    void shrinkIfSparse();
+
+    public:
+        static const int64_t INITIAL_LEVELS = 1024;
+        static const int64_t MAX_LEVELS = 1 << 21;
+        static const size_t SHRINK_CHECK_INTERVAL = 256;
+
+        OrderBookTickLadder();
+        OrderBookTickLadder(double tickSize, bool isBid);
+        OrderBookTickLadder(const OrderBookTickLadder &other);
+        OrderBookTickLadder &operator=(const OrderBookTickLadder &other);
+        friend void truncateOverlapLadders(OrderBookTickLadder &bidLadder, OrderBookTickLadder &askLadder);
+
+        bool setEntry(OrderBookEntry &entry);
+        void eraseBest();
+        double truncateToDepth(size_t depth);
+        void clear();
+
+        size_t size() const;
+        size_t capacity() const;
+        size_t getMemoryUsage() const;
+        double getTickSize() const;
+        int64_t getBestIndex() const;
+        int64_t getNextIndex(int64_t index) const;
+        double getLevelPrice(double price) const;
+        OrderBookEntry getEntry(int64_t index) const;
+};
+
+void truncateOverlapLadders(OrderBookTickLadder &bidLadder, OrderBookTickLadder &askLadder);
+
+#endif
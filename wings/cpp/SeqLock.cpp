@@ -0,0 +1,30 @@
+#include <atomic>
+#include "SeqLock.h"
+
+static_assert(sizeof(std::atomic<uint64_t>) == sizeof(uint64_t), "std::atomic<uint64_t> must be a plain uint64_t.");
+
+static inline std::atomic<uint64_t> *asAtomic(const uint64_t *sequence) {
+    return reinterpret_cast<std::atomic<uint64_t> *>(const_cast<uint64_t *>(sequence));
+}
+
+uint64_t SeqLock::beginWrite(uint64_t *sequence) {
+    uint64_t current = asAtomic(sequence)->load(std::memory_order_relaxed);
+    // An odd sequence is left behind by a writer that died halfway through - skip past it.
+    uint64_t writeSequence = (current | 1) + ((current & 1) ? 2 : 0);
+    asAtomic(sequence)->store(writeSequence, std::memory_order_relaxed);
+    std::atomic_thread_fence(std::memory_order_release);
+    return writeSequence;
+}
+
+void SeqLock::endWrite(uint64_t *sequence, uint64_t writeSequence) {
+    asAtomic(sequence)->store(writeSequence + 1, std::memory_order_release);
+}
+
+uint64_t SeqLock::beginRead(const uint64_t *sequence) {
+    return asAtomic(sequence)->load(std::memory_order_acquire);
+}
+
+bool SeqLock::validateRead(const uint64_t *sequence, uint64_t readSequence) {
+    std::atomic_thread_fence(std::memory_order_acquire);
+    return (readSequence & 1) == 0 && asAtomic(sequence)->load(std::memory_order_relaxed) == readSequence;
+}
@@ -0,0 +1,23 @@
+#ifndef _SEQ_LOCK_H
+#define _SEQ_LOCK_H
+
+#include <stdint.h>
+
+/**
+ * Seqlock over a 64-bit sequence number in memory shared between processes, e.g. a memory mapped file.
+ *
+ * The single writer makes the sequence odd while it changes the protected data, and even again once it's done.
+ * Readers never block the writer: they copy the data between beginRead() and validateRead(), and retry if the
+ * sequence was odd or changed in the meantime.
+ *
+ * The sequence must be 8-byte aligned. Atomic operations on it are lock-free, so they work across processes.
+ */
+class SeqLock {
+    public:
+        static uint64_t beginWrite(uint64_t *sequence);
+        static void endWrite(uint64_t *sequence, uint64_t writeSequence);
+        static uint64_t beginRead(const uint64_t *sequence);
+        static bool validateRead(const uint64_t *sequence, uint64_t readSequence);
+};
+
+#endif
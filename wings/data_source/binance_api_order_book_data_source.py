@@ -13,7 +13,6 @@ from typing import (
 )
 import re
 import time
-import ujson
 import websockets
 from websockets.exceptions import ConnectionClosed
 
@@ -21,6 +20,7 @@ from wings.orderbook.binance_order_book import BinanceOrderBook
 from .order_book_tracker_data_source import OrderBookTrackerDataSource
 from wings.order_book_tracker_entry import OrderBookTrackerEntry
 from wings.order_book_message import OrderBookMessage
+from wings.request_scheduler import RequestScheduler
 
 TRADING_PAIR_FILTER = re.compile(r"(BTC|ETH|USDT)$")
 
@@ -34,8 +34,19 @@ class BinanceAPIOrderBookDataSource(OrderBookTrackerDataSource):
 
     MESSAGE_TIMEOUT = 30.0
     PING_TIMEOUT = 10.0
+    # The order book tracker resyncs order books on gaps in their diff messages, so the periodic snapshots are only a
+    # safety net.
+    SNAPSHOT_REFRESH_INTERVAL = 6 * 3600.0
+    # Binance allows 1200 request weight per minute and IP address. Snapshot requests are limited to a part of it, to
+    # leave headroom for the market's own requests.
+    SNAPSHOT_WEIGHT_LIMIT = 1000
+    SNAPSHOT_WEIGHT_INTERVAL = 60.0
+    MAX_CONCURRENT_SNAPSHOTS = 10
+    # Request weight of a depth snapshot, by its limit.
+    SNAPSHOT_WEIGHTS = {100: 1, 500: 5, 1000: 10, 5000: 50}
 
     _raobds_logger: Optional[logging.Logger] = None
+    _request_scheduler: Optional[RequestScheduler] = None
 
     @classmethod
     def logger(cls) -> logging.Logger:
@@ -43,9 +54,40 @@ class BinanceAPIOrderBookDataSource(OrderBookTrackerDataSource):
             cls._raobds_logger = logging.getLogger(__name__)
         return cls._raobds_logger
 
-    def __init__(self, symbols: Optional[List[str]] = None):
+    @classmethod
+    def request_scheduler(cls) -> RequestScheduler:
+        """
+        The request weight budget shared by all Binance snapshot requests.
+        """
+        if cls._request_scheduler is None:
+            cls._request_scheduler = RequestScheduler(cls.SNAPSHOT_WEIGHT_LIMIT,
+                                                      cls.SNAPSHOT_WEIGHT_INTERVAL,
+                                                      cls.MAX_CONCURRENT_SNAPSHOTS)
+        return cls._request_scheduler
+
+    @classmethod
+    def get_snapshot_weight(cls, limit: int) -> int:
+        # Snapshots without a limit get Binance's default of 100 levels.
+        limit = limit if limit > 0 else 100
+        for max_limit, weight in sorted(cls.SNAPSHOT_WEIGHTS.items()):
+            if limit <= max_limit:
+                return weight
+        return max(cls.SNAPSHOT_WEIGHTS.values())
+
+    def __init__(self,
+                 symbols: Optional[List[str]] = None,
+                 snapshot_refresh_interval: Optional[float] = SNAPSHOT_REFRESH_INTERVAL,
+                 priority_symbols: Optional[List[str]] = None):
+        """
+        :param snapshot_refresh_interval: Seconds between the periodic snapshot refreshes of all order books. None
+            disables the periodic snapshots.
+        :param priority_symbols: Symbols whose snapshots are fetched first when bootstrapping the order books, e.g.
+            the ones the strategy trades.
+        """
         super().__init__()
         self._symbols: Optional[List[str]] = symbols
+        self._snapshot_refresh_interval: Optional[float] = snapshot_refresh_interval
+        self._priority_symbols: Optional[List[str]] = priority_symbols
 
     @classmethod
     async def get_active_exchange_markets(cls) -> pd.DataFrame:
@@ -98,18 +140,29 @@ class BinanceAPIOrderBookDataSource(OrderBookTrackerDataSource):
         return BinanceOrderBook
 
     async def get_trading_pairs(self) -> List[str]:
-        if self._symbols is None:
+        if self._subscribed_symbols is not None:
+            trading_pairs: List[str] = self._subscribed_symbols
+        elif self._symbols is None:
             active_markets: pd.DataFrame = await self.get_active_exchange_markets()
             trading_pairs: List[str] = active_markets.index.tolist()
         else:
             trading_pairs: List[str] = self._symbols
         return trading_pairs
 
-    @staticmethod
-    async def get_snapshot(client: aiohttp.ClientSession, trading_pair: str, limit: int = 1000) -> Dict[str, any]:
+    @classmethod
+    async def get_snapshot(cls,
+                           client: aiohttp.ClientSession,
+                           trading_pair: str,
+                           limit: int = 1000) -> Dict[str, any]:
             params: Dict = {"limit": str(limit), "symbol": trading_pair} if limit != 0 else {"symbol": trading_pair}
             async with client.get(SNAPSHOT_REST_URL, params=params) as response:
                 response: aiohttp.ClientResponse = response
+                used_weight: Optional[str] = response.headers.get("X-MBX-USED-WEIGHT")
+                if used_weight is not None:
+                    # Keeps the market's headroom, as the used weight counts against the snapshot budget in full.
+                    cls.request_scheduler().sync_used_weight(int(used_weight))
+                if response.status in (418, 429):
+                    cls.request_scheduler().pause(float(response.headers.get("Retry-After", 60)))
                 if response.status != 200:
                     raise IOError(f"Error fetching Binance market snapshot for {trading_pair}. "
                                   f"HTTP status is {response.status}.")
@@ -125,25 +178,33 @@ class BinanceAPIOrderBookDataSource(OrderBookTrackerDataSource):
         # Get the currently active markets
         async with aiohttp.ClientSession() as client:
             trading_pairs: List[str] = await self.get_trading_pairs()
-            retval: Dict[str, OrderBookTrackerEntry] = {}
 
-            for trading_pair in trading_pairs:
-                try:
-                    snapshot: Dict[str, any] = await self.get_snapshot(client, trading_pair, 1000)
-                    snapshot_timestamp: float = time.time()
-                    snapshot_msg: OrderBookMessage = self.order_book_class.snapshot_message_from_exchange(
-                        snapshot,
-                        snapshot_timestamp,
-                        metadata={"symbol": trading_pair}
-                    )
-                    order_book: BinanceOrderBook = self.order_book_class.from_snapshot(snapshot_msg)
-                    retval[trading_pair] = OrderBookTrackerEntry(trading_pair, snapshot_timestamp, order_book)
+            async def get_tracking_pair(trading_pair: str) -> OrderBookTrackerEntry:
+                snapshot: Dict[str, any] = await self.get_snapshot(client, trading_pair, 1000)
+                snapshot_timestamp: float = time.time()
+                snapshot_msg: OrderBookMessage = self.order_book_class.snapshot_message_from_exchange(
+                    snapshot,
+                    snapshot_timestamp,
+                    metadata={"symbol": trading_pair}
+                )
+                order_book: BinanceOrderBook = self.order_book_class.from_snapshot(snapshot_msg)
+                return OrderBookTrackerEntry(trading_pair, snapshot_timestamp, order_book)
 
-                    # Each 1000 limit snapshot costs 10 requests and Binance rate limit is 20 requests per second.
-                    await asyncio.sleep(0.6)
-                except Exception:
-                    self.logger().error(f"Error getting snapshot for {trading_pair}. ", exc_info=True)
-            return retval
+            # Fetch the snapshots concurrently, as fast as Binance's request weight limit allows.
+            return await self.request_scheduler().fetch_all(trading_pairs,
+                                                            get_tracking_pair,
+                                                            self.get_snapshot_weight(1000),
+                                                            self._priority_symbols)
+
+    async def get_snapshot_message(self, symbol: str) -> OrderBookMessage:
+        async with aiohttp.ClientSession() as client:
+            async with self.request_scheduler().request(self.get_snapshot_weight(1000)):
+                snapshot: Dict[str, any] = await self.get_snapshot(client, symbol, 1000)
+            return self.order_book_class.snapshot_message_from_exchange(
+                snapshot,
+                time.time(),
+                metadata={"symbol": symbol}
+            )
 
     async def _inner_messages(self,
                               ws: websockets.WebSocketClientProtocol) -> AsyncIterable[str]:
@@ -167,19 +228,34 @@ class BinanceAPIOrderBookDataSource(OrderBookTrackerDataSource):
         finally:
             await ws.close()
 
+    async def _close_on_subscription_change(self, ws: websockets.WebSocketClientProtocol, subscription_version: int):
+        await self.wait_for_subscription_change(subscription_version)
+        await ws.close()
+
     async def listen_for_order_book_diffs(self, ev_loop: asyncio.BaseEventLoop, output: asyncio.Queue):
         while True:
             try:
+                subscription_version: int = self.subscription_version
                 trading_pairs: List[str] = await self.get_trading_pairs()
+                if len(trading_pairs) == 0:
+                    await self.wait_for_subscription_change(subscription_version)
+                    continue
                 ws_path: str = "/".join([f"{trading_pair.lower()}@depth" for trading_pair in trading_pairs])
                 stream_url: str = f"{DIFF_STREAM_URL}/{ws_path}"
                 async with websockets.connect(stream_url) as ws:
                     ws: websockets.WebSocketClientProtocol = ws
-                    async for raw_msg in self._inner_messages(ws):
-                        msg = ujson.loads(raw_msg)
-                        order_book_message: OrderBookMessage = self.order_book_class.diff_message_from_exchange(
-                            msg, time.time())
-                        output.put_nowait(order_book_message)
+                    # The streams are part of the URL, so reconnect with the new ones when the subscribed symbols
+                    # change.
+                    subscription_task: asyncio.Task = asyncio.ensure_future(
+                        self._close_on_subscription_change(ws, subscription_version)
+                    )
+                    try:
+                        async for raw_msg in self._inner_messages(ws):
+                            order_book_message: OrderBookMessage = \
+                                self.order_book_class.diff_message_from_raw_exchange(raw_msg, time.time())
+                            output.put_nowait(order_book_message)
+                    finally:
+                        subscription_task.cancel()
             except asyncio.CancelledError:
                 raise
             except Exception:
@@ -188,13 +264,20 @@ class BinanceAPIOrderBookDataSource(OrderBookTrackerDataSource):
                 await asyncio.sleep(30.0)
 
     async def listen_for_order_book_snapshots(self, ev_loop: asyncio.BaseEventLoop, output: asyncio.Queue):
+        if self._snapshot_refresh_interval is None:
+            return
+        interval: float = self._snapshot_refresh_interval
         while True:
             try:
+                # The order books were just bootstrapped from snapshots, so wait for the next refresh first.
+                next_refresh: float = (int(time.time() / interval) + 1) * interval
+                await asyncio.sleep(next_refresh - time.time())
                 trading_pairs: List[str] = await self.get_trading_pairs()
                 async with aiohttp.ClientSession() as client:
                     for trading_pair in trading_pairs:
                         try:
-                            snapshot: Dict[str, any] = await self.get_snapshot(client, trading_pair)
+                            async with self.request_scheduler().request(self.get_snapshot_weight(1000)):
+                                snapshot: Dict[str, any] = await self.get_snapshot(client, trading_pair)
                             snapshot_timestamp: float = time.time()
                             snapshot_msg: OrderBookMessage = self.order_book_class.snapshot_message_from_exchange(
                                 snapshot,
@@ -210,10 +293,6 @@ class BinanceAPIOrderBookDataSource(OrderBookTrackerDataSource):
                         except Exception:
                             self.logger().error("Unexpected error.", exc_info=True)
                             await asyncio.sleep(5.0)
-                    this_hour: pd.Timestamp = pd.Timestamp.utcnow().replace(minute=0, second=0, microsecond=0)
-                    next_hour: pd.Timestamp = this_hour + pd.Timedelta(hours=1)
-                    delta: float = next_hour.timestamp() - time.time()
-                    await asyncio.sleep(delta)
             except asyncio.CancelledError:
                 raise
             except Exception:
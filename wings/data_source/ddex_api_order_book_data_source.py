@@ -25,6 +25,7 @@ from wings.order_book_tracker_entry import (
     OrderBookTrackerEntry
 )
 from wings.order_book_message import DDEXOrderBookMessage
+from wings.request_scheduler import RequestScheduler
 
 TRADING_PAIR_FILTER = re.compile(r"(TUSD|WETH|DAI)$")
 
@@ -38,8 +39,13 @@ class DDEXAPIOrderBookDataSource(OrderBookTrackerDataSource):
 
     MESSAGE_TIMEOUT = 30.0
     PING_TIMEOUT = 10.0
+    # Every DDEX REST request has a weight of 1.
+    REQUEST_RATE_LIMIT = 10
+    REQUEST_RATE_INTERVAL = 1.0
+    MAX_CONCURRENT_SNAPSHOTS = 5
 
     _raobds_logger: Optional[logging.Logger] = None
+    _request_scheduler: Optional[RequestScheduler] = None
 
     @classmethod
     def logger(cls) -> logging.Logger:
@@ -47,9 +53,25 @@ class DDEXAPIOrderBookDataSource(OrderBookTrackerDataSource):
             cls._raobds_logger = logging.getLogger(__name__)
         return cls._raobds_logger
 
-    def __init__(self, symbols: Optional[List[str]] = None):
+    @classmethod
+    def request_scheduler(cls) -> RequestScheduler:
+        """
+        The request rate budget shared by all DDEX snapshot requests.
+        """
+        if cls._request_scheduler is None:
+            cls._request_scheduler = RequestScheduler(cls.REQUEST_RATE_LIMIT,
+                                                      cls.REQUEST_RATE_INTERVAL,
+                                                      cls.MAX_CONCURRENT_SNAPSHOTS)
+        return cls._request_scheduler
+
+    def __init__(self, symbols: Optional[List[str]] = None, priority_symbols: Optional[List[str]] = None):
+        """
+        :param priority_symbols: Symbols whose snapshots are fetched first when bootstrapping the order books, e.g.
+            the ones the strategy trades.
+        """
         super().__init__()
         self._symbols: Optional[List[str]] = symbols
+        self._priority_symbols: Optional[List[str]] = priority_symbols
 
     @classmethod
     async def get_active_exchange_markets(cls) -> pd.DataFrame:
@@ -81,7 +103,9 @@ class DDEXAPIOrderBookDataSource(OrderBookTrackerDataSource):
         return DDEXOrderBook
 
     async def get_trading_pairs(self) -> List[str]:
-        if self._symbols is None:
+        if self._subscribed_symbols is not None:
+            trading_pairs: List[str] = self._subscribed_symbols
+        elif self._symbols is None:
             active_markets: pd.DataFrame = await self.get_active_exchange_markets()
             trading_pairs: List[str] = active_markets.index.tolist()
         else:
@@ -108,34 +132,38 @@ class DDEXAPIOrderBookDataSource(OrderBookTrackerDataSource):
         # Get the currently active markets
         async with aiohttp.ClientSession() as client:
             trading_pairs: List[str] = await self.get_trading_pairs()
-            retval: Dict[str, DDEXOrderBookTrackerEntry] = {}
-            for trading_pair in trading_pairs:
-                try:
-                    snapshot: Dict[str, any] = await self.get_snapshot(client, trading_pair, 3)
-                    snapshot_timestamp: float = time.time()
-                    snapshot_msg: DDEXOrderBookMessage = self.order_book_class.snapshot_message_from_exchange(
-                        snapshot,
-                        snapshot_timestamp,
-                        {"marketId": trading_pair}
-                    )
 
-                    ddex_order_book: DDEXOrderBook = DDEXOrderBook()
-                    ddex_active_order_tracker: DDEXActiveOrderTracker = DDEXActiveOrderTracker()
-                    bids, asks = ddex_active_order_tracker.convert_snapshot_message_to_order_book_row(snapshot_msg)
-                    ddex_order_book.apply_snapshot(bids, asks, snapshot_msg.update_id)
+            async def get_tracking_pair(trading_pair: str) -> DDEXOrderBookTrackerEntry:
+                snapshot: Dict[str, any] = await self.get_snapshot(client, trading_pair, 3)
+                snapshot_timestamp: float = time.time()
+                snapshot_msg: DDEXOrderBookMessage = self.order_book_class.snapshot_message_from_exchange(
+                    snapshot,
+                    snapshot_timestamp,
+                    {"marketId": trading_pair}
+                )
 
-                    retval[trading_pair] = DDEXOrderBookTrackerEntry(
-                        trading_pair,
-                        snapshot_timestamp,
-                        ddex_order_book,
-                        ddex_active_order_tracker
-                    )
+                ddex_order_book: DDEXOrderBook = DDEXOrderBook()
+                ddex_active_order_tracker: DDEXActiveOrderTracker = DDEXActiveOrderTracker()
+                ddex_active_order_tracker.apply_snapshot_message(ddex_order_book, snapshot_msg)
 
-                    # await asyncio.sleep(0.5)
+                return DDEXOrderBookTrackerEntry(
+                    trading_pair,
+                    snapshot_timestamp,
+                    ddex_order_book,
+                    ddex_active_order_tracker
+                )
 
-                except Exception:
-                    self.logger().error(f"Error getting snapshot for {trading_pair}. ", exc_info=True)
-            return retval
+            return await self.request_scheduler().fetch_all(trading_pairs, get_tracking_pair, 1, self._priority_symbols)
+
+    async def get_snapshot_message(self, symbol: str) -> DDEXOrderBookMessage:
+        async with aiohttp.ClientSession() as client:
+            async with self.request_scheduler().request(1):
+                snapshot: Dict[str, any] = await self.get_snapshot(client, symbol, 3)
+            return self.order_book_class.snapshot_message_from_exchange(
+                snapshot,
+                time.time(),
+                {"marketId": symbol}
+            )
 
     async def _inner_messages(self,
                               ws: websockets.WebSocketClientProtocol) -> AsyncIterable[str]:
@@ -159,26 +187,63 @@ class DDEXAPIOrderBookDataSource(OrderBookTrackerDataSource):
         finally:
             await ws.close()
 
+    @staticmethod
+    async def _send_subscription_request(ws: websockets.WebSocketClientProtocol,
+                                         request_type: str,
+                                         trading_pairs: List[str]):
+        if len(trading_pairs) == 0:
+            return
+        request: Dict[str, any] = {
+            "type": request_type,
+            "channels": [{
+                "name": "full",
+                "marketIds": trading_pairs
+            }]
+        }
+        await ws.send(ujson.dumps(request))
+
+    async def _follow_subscriptions(self,
+                                    ws: websockets.WebSocketClientProtocol,
+                                    trading_pairs: List[str],
+                                    subscription_version: int):
+        """
+        Subscribes to and unsubscribes from markets on the open connection, as the subscribed symbols change.
+        """
+        try:
+            while True:
+                await self.wait_for_subscription_change(subscription_version)
+                subscription_version = self.subscription_version
+                new_trading_pairs: List[str] = await self.get_trading_pairs()
+                await self._send_subscription_request(
+                    ws, "unsubscribe", [trading_pair for trading_pair in trading_pairs
+                                        if trading_pair not in new_trading_pairs])
+                await self._send_subscription_request(
+                    ws, "subscribe", [trading_pair for trading_pair in new_trading_pairs
+                                      if trading_pair not in trading_pairs])
+                trading_pairs = new_trading_pairs
+        except ConnectionClosed:
+            return
+
     async def listen_for_order_book_diffs(self, ev_loop: asyncio.BaseEventLoop, output: asyncio.Queue):
         while True:
             try:
+                subscription_version: int = self.subscription_version
                 trading_pairs: List[str] = await self.get_trading_pairs()
                 async with websockets.connect(WS_URL) as ws:
                     ws: websockets.WebSocketClientProtocol = ws
-                    request: Dict[str, any] = {
-                        "type": "subscribe",
-                        "channels": [{
-                            "name": "full",
-                            "marketIds": trading_pairs
-                        }]
-                    }
-                    await ws.send(ujson.dumps(request))
-                    async for raw_msg in self._inner_messages(ws):
-                        msg = ujson.loads(raw_msg)
-                        # only process receive and done diff messages from DDEX
-                        if msg["type"] == "receive" or msg["type"] == "done":
-                            diff_msg: DDEXOrderBookMessage = self.order_book_class.diff_message_from_exchange(msg)
-                            output.put_nowait(diff_msg)
+                    await self._send_subscription_request(ws, "subscribe", trading_pairs)
+                    subscription_task: asyncio.Task = asyncio.ensure_future(
+                        self._follow_subscriptions(ws, trading_pairs, subscription_version)
+                    )
+                    try:
+                        async for raw_msg in self._inner_messages(ws):
+                            msg = ujson.loads(raw_msg)
+                            # only process receive and done diff messages from DDEX
+                            if msg["type"] == "receive" or msg["type"] == "done":
+                                diff_msg: DDEXOrderBookMessage = self.order_book_class.diff_message_from_exchange(msg)
+                                output.put_nowait(diff_msg)
+                    finally:
+                        subscription_task.cancel()
             except asyncio.CancelledError:
                 raise
             except Exception:
@@ -193,7 +258,8 @@ class DDEXAPIOrderBookDataSource(OrderBookTrackerDataSource):
                 async with aiohttp.ClientSession() as client:
                     for trading_pair in trading_pairs:
                         try:
-                            snapshot: Dict[str, any] = await self.get_snapshot(client, trading_pair)
+                            async with self.request_scheduler().request(1):
+                                snapshot: Dict[str, any] = await self.get_snapshot(client, trading_pair)
                             snapshot_timestamp: float = time.time()
                             snapshot_msg: DDEXOrderBookMessage = self.order_book_class.snapshot_message_from_exchange(
                                 snapshot,
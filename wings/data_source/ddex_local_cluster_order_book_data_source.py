@@ -129,8 +129,7 @@ class DDEXLocalClusterOrderBookDataSource(LocalClusterOrderBookDataSource):
 
                     order_book: DDEXOrderBook = DDEXOrderBook()
                     ddex_active_order_tracker: DDEXActiveOrderTracker = DDEXActiveOrderTracker()
-                    bids, asks = ddex_active_order_tracker.convert_snapshot_message_to_order_book_row(snapshot_msg)
-                    order_book.apply_snapshot(bids, asks, snapshot_msg.update_id)
+                    ddex_active_order_tracker.apply_snapshot_message(order_book, snapshot_msg)
 
                     retval[symbol] = DDEXOrderBookTrackerEntry(
                         symbol,
@@ -147,9 +146,7 @@ class DDEXLocalClusterOrderBookDataSource(LocalClusterOrderBookDataSource):
                         for row in rows:
                             diff_msg: OrderBookMessage = self.order_book_class.diff_message_from_db(row)
                             if diff_msg.update_id > order_book.snapshot_uid:
-                                bids, asks = retval[symbol].active_order_tracker.\
-                                    convert_diff_message_to_order_book_row(diff_msg)
-                                order_book.apply_diffs(bids, asks, diff_msg.update_id)
+                                retval[symbol].active_order_tracker.apply_diff_message(order_book, diff_msg)
                     except DatabaseError:
                         continue
                     except ProgrammingError:
@@ -93,7 +93,7 @@ class LocalClusterOrderBookDataSource(OrderBookTrackerDataSource):
                         for row in rows:
                             diff_msg: OrderBookMessage = self.order_book_class.diff_message_from_db(row)
                             if diff_msg.update_id > order_book.snapshot_uid:
-                                order_book.apply_diffs(diff_msg.bids, diff_msg.asks, diff_msg.update_id)
+                                order_book.apply_diffs(diff_msg.bids_array, diff_msg.asks_array, diff_msg.update_id)
                     except DatabaseError:
                         continue
                     finally:
@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+
+import asyncio
+import logging
+import time
+from typing import (
+    AsyncIterable,
+    Dict,
+    List,
+    Optional,
+    Tuple
+)
+
+from wings.data_source.order_book_tracker_data_source import OrderBookTrackerDataSource
+from wings.order_book import OrderBook
+from wings.order_book_message import (
+    OrderBookMessage,
+    OrderBookMessageType
+)
+from wings.order_book_server import (
+    PROTOCOL_MAGIC,
+    PROTOCOL_VERSION,
+    OrderBookFrame,
+    OrderBookFrameType,
+    check_hello,
+    encode_frame,
+    open_connection,
+    read_frame
+)
+from wings.order_book_tracker_entry import OrderBookTrackerEntry
+
+
+class OrderBookServerDataSource(OrderBookTrackerDataSource):
+    """
+    Gets order books from an OrderBookServer - e.g. one running on the same host - rather than from the exchange, so
+    bots skip bootstrapping the order books themselves and share the server's upstream feed.
+
+    Snapshots are fetched over short-lived connections. The diff stream connection gets a snapshot of every order book
+    it subscribes to before its diffs, which is passed on through listen_for_order_book_snapshots(), so order books
+    resync whenever the stream reconnects.
+    """
+    MESSAGE_TIMEOUT = 30.0
+    RECONNECT_DELAY = 5.0
+
+    _obsds_logger: Optional[logging.Logger] = None
+
+    @classmethod
+    def logger(cls) -> logging.Logger:
+        if cls._obsds_logger is None:
+            cls._obsds_logger = logging.getLogger(__name__)
+        return cls._obsds_logger
+
+    def __init__(self, address: str, symbols: Optional[List[str]] = None):
+        super().__init__()
+        self._address: str = address
+        self._symbols: Optional[List[str]] = symbols
+        self._stream_snapshot_messages: asyncio.Queue = asyncio.Queue()
+
+    @property
+    def address(self) -> str:
+        return self._address
+
+    async def _connect(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        reader, writer = await open_connection(self._address)
+        try:
+            writer.write(encode_frame(OrderBookFrameType.HELLO, PROTOCOL_MAGIC, PROTOCOL_VERSION))
+            await asyncio.wait_for(check_hello(reader), timeout=self.MESSAGE_TIMEOUT)
+        except Exception:
+            writer.close()
+            raise
+        return reader, writer
+
+    @staticmethod
+    def _send_subscription_frames(writer: asyncio.StreamWriter, frame_type: OrderBookFrameType, symbols: List[str]):
+        for symbol in symbols:
+            writer.write(encode_frame(frame_type, symbol))
+
+    @staticmethod
+    def _frame_to_message(frame: OrderBookFrame) -> OrderBookMessage:
+        message_type: OrderBookMessageType = (OrderBookMessageType.SNAPSHOT
+                                              if frame.frame_type is OrderBookFrameType.SNAPSHOT
+                                              else OrderBookMessageType.DIFF)
+        return OrderBookMessage(message_type, {
+            "symbol": frame.symbol,
+            "update_id": frame.update_id,
+            "bids": frame.bids,
+            "asks": frame.asks
+        }, timestamp=frame.timestamp or time.time())
+
+    async def get_trading_pairs(self) -> List[str]:
+        if self._subscribed_symbols is not None:
+            return self._subscribed_symbols
+        if self._symbols is not None:
+            return self._symbols
+
+        reader, writer = await self._connect()
+        try:
+            writer.write(encode_frame(OrderBookFrameType.LIST_SYMBOLS))
+            while True:
+                frame: OrderBookFrame = await asyncio.wait_for(read_frame(reader), timeout=self.MESSAGE_TIMEOUT)
+                if frame.frame_type is OrderBookFrameType.SYMBOLS:
+                    return [symbol for symbol in frame.symbol.split(",") if len(symbol) > 0]
+        finally:
+            writer.close()
+
+    async def get_snapshot_messages(self, symbols: List[str]) -> Dict[str, OrderBookMessage]:
+        """
+        Subscribes to the symbols on a new connection, and returns the snapshots the server sends for them. Symbols
+        whose snapshots don't arrive within MESSAGE_TIMEOUT seconds - e.g. ones the server isn't tracking yet - are
+        left out.
+        """
+        retval: Dict[str, OrderBookMessage] = {}
+        if len(symbols) < 1:
+            return retval
+        reader, writer = await self._connect()
+        try:
+            self._send_subscription_frames(writer, OrderBookFrameType.SUBSCRIBE, symbols)
+            deadline: float = time.time() + self.MESSAGE_TIMEOUT
+            while len(retval) < len(set(symbols)):
+                frame: OrderBookFrame = await asyncio.wait_for(read_frame(reader), timeout=deadline - time.time())
+                if frame.frame_type is OrderBookFrameType.SNAPSHOT:
+                    retval[frame.symbol] = self._frame_to_message(frame)
+        except asyncio.TimeoutError:
+            self.logger().warning("Timed out waiting for the order book snapshots of %s from the order book server.",
+                                  ", ".join(symbol for symbol in symbols if symbol not in retval))
+        finally:
+            writer.close()
+        return retval
+
+    async def get_snapshot_message(self, symbol: str) -> OrderBookMessage:
+        snapshot_messages: Dict[str, OrderBookMessage] = await self.get_snapshot_messages([symbol])
+        if symbol not in snapshot_messages:
+            raise IOError(f"Error fetching the order book snapshot for {symbol} from the order book server.")
+        return snapshot_messages[symbol]
+
+    async def get_tracking_pairs(self) -> Dict[str, OrderBookTrackerEntry]:
+        trading_pairs: List[str] = await self.get_trading_pairs()
+        retval: Dict[str, OrderBookTrackerEntry] = {}
+        for symbol, snapshot_msg in (await self.get_snapshot_messages(trading_pairs)).items():
+            order_book: OrderBook = OrderBook()
+            order_book.apply_snapshot(snapshot_msg.bids_array, snapshot_msg.asks_array, snapshot_msg.update_id)
+            retval[symbol] = OrderBookTrackerEntry(symbol, snapshot_msg.timestamp, order_book)
+        return retval
+
+    async def _inner_frames(self, reader: asyncio.StreamReader) -> AsyncIterable[OrderBookFrame]:
+        # Terminate the loop when the server closes the connection, so the outer loop can reconnect.
+        try:
+            while True:
+                yield await read_frame(reader)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            return
+
+    async def _follow_subscriptions(self,
+                                    writer: asyncio.StreamWriter,
+                                    trading_pairs: List[str],
+                                    subscription_version: int):
+        """
+        Subscribes to and unsubscribes from symbols on the open connection, as the subscribed symbols change.
+        """
+        while True:
+            await self.wait_for_subscription_change(subscription_version)
+            subscription_version = self.subscription_version
+            new_trading_pairs: List[str] = await self.get_trading_pairs()
+            self._send_subscription_frames(writer, OrderBookFrameType.UNSUBSCRIBE,
+                                           [symbol for symbol in trading_pairs if symbol not in new_trading_pairs])
+            self._send_subscription_frames(writer, OrderBookFrameType.SUBSCRIBE,
+                                           [symbol for symbol in new_trading_pairs if symbol not in trading_pairs])
+            trading_pairs = new_trading_pairs
+
+    async def listen_for_order_book_diffs(self, ev_loop: asyncio.BaseEventLoop, output: asyncio.Queue):
+        while True:
+            try:
+                subscription_version: int = self.subscription_version
+                trading_pairs: List[str] = await self.get_trading_pairs()
+                reader, writer = await self._connect()
+                self._send_subscription_frames(writer, OrderBookFrameType.SUBSCRIBE, trading_pairs)
+                subscription_task: asyncio.Task = asyncio.ensure_future(
+                    self._follow_subscriptions(writer, trading_pairs, subscription_version)
+                )
+                try:
+                    async for frame in self._inner_frames(reader):
+                        if frame.frame_type is OrderBookFrameType.DIFF:
+                            output.put_nowait(self._frame_to_message(frame))
+                        elif frame.frame_type is OrderBookFrameType.SNAPSHOT:
+                            self._stream_snapshot_messages.put_nowait(self._frame_to_message(frame))
+                finally:
+                    subscription_task.cancel()
+                    writer.close()
+                self.logger().warning("Disconnected from the order book server. Reconnecting...")
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.logger().error(f"Unexpected error with the order book server connection. Retrying after "
+                                    f"{self.RECONNECT_DELAY:.0f} seconds...", exc_info=True)
+            await asyncio.sleep(self.RECONNECT_DELAY)
+
+    async def listen_for_order_book_snapshots(self, ev_loop: asyncio.BaseEventLoop, output: asyncio.Queue):
+        while True:
+            output.put_nowait(await self._stream_snapshot_messages.get())
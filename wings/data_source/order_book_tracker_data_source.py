@@ -5,15 +5,73 @@ from abc import (
     abstractmethod
 )
 import asyncio
-from typing import Dict
+from typing import (
+    Dict,
+    List,
+    Optional
+)
+from wings.order_book_message import OrderBookMessage
 from wings.order_book_tracker_entry import OrderBookTrackerEntry
 
 
 class OrderBookTrackerDataSource(metaclass=ABCMeta):
+    _subscribed_symbols: Optional[List[str]] = None
+    _subscription_version: int = 0
+    _subscription_event: Optional[asyncio.Event] = None
+
+    @property
+    def subscribed_symbols(self) -> Optional[List[str]]:
+        return self._subscribed_symbols
+
+    @property
+    def subscription_version(self) -> int:
+        """
+        Incremented on every change to the subscribed symbols.
+        """
+        return self._subscription_version
+
+    def set_subscribed_symbols(self, symbols: Optional[List[str]]):
+        """
+        Limits the order books the data source streams and fetches snapshots of to the given symbols, in place of the
+        ones it was created with - or all the exchange's active markets. None lifts the limit. Data sources that can't
+        change their symbols ignore it.
+        """
+        symbols = list(dict.fromkeys(symbols)) if symbols is not None else None
+        if symbols == self._subscribed_symbols:
+            return
+        self._subscribed_symbols = symbols
+        self._subscription_version += 1
+        if self._subscription_event is not None:
+            self._subscription_event.set()
+
+    async def wait_for_subscription_change(self, subscription_version: int):
+        """
+        Waits until the subscribed symbols change from the given subscription version.
+        """
+        if self._subscription_event is None:
+            self._subscription_event = asyncio.Event()
+        while self._subscription_version == subscription_version:
+            self._subscription_event.clear()
+            await self._subscription_event.wait()
+
+    @property
+    def supports_snapshot_messages(self) -> bool:
+        """
+        Whether the data source implements get_snapshot_message(), so its order books can be resynced on demand.
+        """
+        return type(self).get_snapshot_message is not OrderBookTrackerDataSource.get_snapshot_message
+
     @abstractmethod
     async def get_tracking_pairs(self) -> Dict[str, OrderBookTrackerEntry]:
         raise NotImplementedError
 
+    async def get_snapshot_message(self, symbol: str) -> OrderBookMessage:
+        """
+        Fetches a new snapshot message for a single symbol. The order book tracker uses this to resync an order book
+        after detecting a gap in its diff messages.
+        """
+        raise NotImplementedError
+
     @abstractmethod
     async def listen_for_order_book_diffs(self, ev_loop: asyncio.BaseEventLoop, output: asyncio.Queue):
         """
@@ -22,6 +22,7 @@ from wings.radar_relay_active_order_tracker import RadarRelayActiveOrderTracker
 from .order_book_tracker_data_source import OrderBookTrackerDataSource
 from wings.order_book_tracker_entry import OrderBookTrackerEntry, RadarRelayOrderBookTrackerEntry
 from wings.order_book_message import OrderBookMessage, RadarRelayOrderBookMessage
+from wings.request_scheduler import RequestScheduler
 
 TRADING_PAIR_FILTER = re.compile(r"(WETH|DAI)$")
 
@@ -35,9 +36,14 @@ class RadarRelayAPIOrderBookDataSource(OrderBookTrackerDataSource):
 
     MESSAGE_TIMEOUT = 30.0
     PING_TIMEOUT = 10.0
+    # Every Radar Relay REST request has a weight of 1.
+    REQUEST_RATE_LIMIT = 2
+    REQUEST_RATE_INTERVAL = 1.0
+    MAX_CONCURRENT_SNAPSHOTS = 2
 
     _rraobds_logger: Optional[logging.Logger] = None
     _client: Optional[aiohttp.ClientSession] = None
+    _request_scheduler: Optional[RequestScheduler] = None
 
     @classmethod
     def logger(cls) -> logging.Logger:
@@ -45,9 +51,25 @@ class RadarRelayAPIOrderBookDataSource(OrderBookTrackerDataSource):
             cls._rraobds_logger = logging.getLogger(__name__)
         return cls._rraobds_logger
 
-    def __init__(self, symbols: Optional[List[str]] = None):
+    @classmethod
+    def request_scheduler(cls) -> RequestScheduler:
+        """
+        The request rate budget shared by all Radar Relay snapshot requests.
+        """
+        if cls._request_scheduler is None:
+            cls._request_scheduler = RequestScheduler(cls.REQUEST_RATE_LIMIT,
+                                                      cls.REQUEST_RATE_INTERVAL,
+                                                      cls.MAX_CONCURRENT_SNAPSHOTS)
+        return cls._request_scheduler
+
+    def __init__(self, symbols: Optional[List[str]] = None, priority_symbols: Optional[List[str]] = None):
+        """
+        :param priority_symbols: Symbols whose snapshots are fetched first when bootstrapping the order books, e.g.
+            the ones the strategy trades.
+        """
         super().__init__()
         self._symbols: Optional[List[str]] = symbols
+        self._priority_symbols: Optional[List[str]] = priority_symbols
 
     @classmethod
     def http_client(cls) -> aiohttp.ClientSession:
@@ -109,7 +131,9 @@ class RadarRelayAPIOrderBookDataSource(OrderBookTrackerDataSource):
             return await response.json()
 
     async def get_trading_pairs(self) -> List[str]:
-        if self._symbols is None:
+        if self._subscribed_symbols is not None:
+            trading_pairs: List[str] = self._subscribed_symbols
+        elif self._symbols is None:
             active_markets: pd.DataFrame = await self.get_active_exchange_markets()
             trading_pairs: List[str] = active_markets.index.tolist()
         else:
@@ -120,35 +144,37 @@ class RadarRelayAPIOrderBookDataSource(OrderBookTrackerDataSource):
         # Get the currently active markets
         async with aiohttp.ClientSession() as client:
             trading_pairs: List[str] = await self.get_trading_pairs()
-            retval: Dict[str, OrderBookTrackerEntry] = {}
 
-            for trading_pair in trading_pairs:
-                try:
-                    snapshot: Dict[str, any] = await self.get_snapshot(client, trading_pair)
-                    snapshot_timestamp: float = time.time()
-                    snapshot_msg: RadarRelayOrderBookMessage = self.order_book_class.snapshot_message_from_exchange(
-                        snapshot,
-                        snapshot_timestamp,
-                        metadata={"symbol": trading_pair}
-                    )
+            async def get_tracking_pair(trading_pair: str) -> RadarRelayOrderBookTrackerEntry:
+                snapshot: Dict[str, any] = await self.get_snapshot(client, trading_pair)
+                snapshot_timestamp: float = time.time()
+                snapshot_msg: RadarRelayOrderBookMessage = self.order_book_class.snapshot_message_from_exchange(
+                    snapshot,
+                    snapshot_timestamp,
+                    metadata={"symbol": trading_pair}
+                )
 
-                    radar_relay_order_book: RadarRelayOrderBook = RadarRelayOrderBook()
-                    radar_relay_active_order_tracker: RadarRelayActiveOrderTracker = RadarRelayActiveOrderTracker()
-                    bids, asks = radar_relay_active_order_tracker.convert_snapshot_message_to_order_book_row(snapshot_msg)
-                    radar_relay_order_book.apply_snapshot(bids, asks, snapshot_msg.update_id)
+                radar_relay_order_book: RadarRelayOrderBook = RadarRelayOrderBook()
+                radar_relay_active_order_tracker: RadarRelayActiveOrderTracker = RadarRelayActiveOrderTracker()
+                radar_relay_active_order_tracker.apply_snapshot_message(radar_relay_order_book, snapshot_msg)
 
-                    retval[trading_pair] = RadarRelayOrderBookTrackerEntry(
-                        trading_pair,
-                        snapshot_timestamp,
-                        radar_relay_order_book,
-                        radar_relay_active_order_tracker
-                    )
+                return RadarRelayOrderBookTrackerEntry(
+                    trading_pair,
+                    snapshot_timestamp,
+                    radar_relay_order_book,
+                    radar_relay_active_order_tracker
+                )
 
-                    await asyncio.sleep(0.5)
+            return await self.request_scheduler().fetch_all(trading_pairs, get_tracking_pair, 1, self._priority_symbols)
 
-                except Exception:
-                    self.logger().error(f"Error getting snapshot for {trading_pair}. ", exc_info=True)
-            return retval
+    async def get_snapshot_message(self, symbol: str) -> RadarRelayOrderBookMessage:
+        async with self.request_scheduler().request(1):
+            snapshot: Dict[str, any] = await self.get_snapshot(self.http_client(), symbol)
+        return self.order_book_class.snapshot_message_from_exchange(
+            snapshot,
+            time.time(),
+            metadata={"symbol": symbol}
+        )
 
     async def _inner_messages(self,
                               ws: websockets.WebSocketClientProtocol) -> AsyncIterable[str]:
@@ -172,26 +198,61 @@ class RadarRelayAPIOrderBookDataSource(OrderBookTrackerDataSource):
         finally:
             await ws.close()
 
+    @staticmethod
+    async def _send_subscription_requests(ws: websockets.WebSocketClientProtocol,
+                                          request_type: str,
+                                          trading_pairs: List[str]):
+        for trading_pair in trading_pairs:
+            request: Dict[str, str] = {
+                "type": request_type,
+                "topic": "BOOK",
+                "market": trading_pair
+            }
+            await ws.send(ujson.dumps(request))
+
+    async def _follow_subscriptions(self,
+                                    ws: websockets.WebSocketClientProtocol,
+                                    trading_pairs: List[str],
+                                    subscription_version: int):
+        """
+        Subscribes to and unsubscribes from markets on the open connection, as the subscribed symbols change.
+        """
+        try:
+            while True:
+                await self.wait_for_subscription_change(subscription_version)
+                subscription_version = self.subscription_version
+                new_trading_pairs: List[str] = await self.get_trading_pairs()
+                await self._send_subscription_requests(
+                    ws, "UNSUBSCRIBE", [trading_pair for trading_pair in trading_pairs
+                                        if trading_pair not in new_trading_pairs])
+                await self._send_subscription_requests(
+                    ws, "SUBSCRIBE", [trading_pair for trading_pair in new_trading_pairs
+                                      if trading_pair not in trading_pairs])
+                trading_pairs = new_trading_pairs
+        except ConnectionClosed:
+            return
+
     async def listen_for_order_book_diffs(self, ev_loop: asyncio.BaseEventLoop, output: asyncio.Queue):
         while True:
             try:
+                subscription_version: int = self.subscription_version
                 trading_pairs: List[str] = await self.get_trading_pairs()
                 async with websockets.connect(WS_URL) as ws:
                     ws: websockets.WebSocketClientProtocol = ws
-                    for trading_pair in trading_pairs:
-                        request: Dict[str, str] = {
-                            "type": "SUBSCRIBE",
-                            "topic": "BOOK",
-                            "market": trading_pair
-                        }
-                        await ws.send(ujson.dumps(request))
-                    async for raw_msg in self._inner_messages(ws):
-                        msg = ujson.loads(raw_msg)
-                        # Valid Diff messages from RadarRelay have action key
-                        if "action" in msg:
-                            diff_msg: RadarRelayOrderBookMessage = self.order_book_class.diff_message_from_exchange(
-                                msg, time.time())
-                            output.put_nowait(diff_msg)
+                    await self._send_subscription_requests(ws, "SUBSCRIBE", trading_pairs)
+                    subscription_task: asyncio.Task = asyncio.ensure_future(
+                        self._follow_subscriptions(ws, trading_pairs, subscription_version)
+                    )
+                    try:
+                        async for raw_msg in self._inner_messages(ws):
+                            msg = ujson.loads(raw_msg)
+                            # Valid Diff messages from RadarRelay have action key
+                            if "action" in msg:
+                                diff_msg: RadarRelayOrderBookMessage = \
+                                    self.order_book_class.diff_message_from_exchange(msg, time.time())
+                                output.put_nowait(diff_msg)
+                    finally:
+                        subscription_task.cancel()
             except asyncio.CancelledError:
                 raise
             except Exception:
@@ -206,7 +267,8 @@ class RadarRelayAPIOrderBookDataSource(OrderBookTrackerDataSource):
                 client: aiohttp.ClientSession = self.http_client()
                 for trading_pair in trading_pairs:
                     try:
-                        snapshot: Dict[str, any] = await self.get_snapshot(client, trading_pair)
+                        async with self.request_scheduler().request(1):
+                            snapshot: Dict[str, any] = await self.get_snapshot(client, trading_pair)
                         snapshot_timestamp: float = time.time()
                         snapshot_msg: OrderBookMessage = self.order_book_class.snapshot_message_from_exchange(
                             snapshot,
@@ -134,9 +134,7 @@ class RadarRelayLocalClusterOrderBookDataSource(LocalClusterOrderBookDataSource)
 
                     order_book: RadarRelayOrderBook = RadarRelayOrderBook()
                     radar_relay_active_order_tracker: RadarRelayActiveOrderTracker = RadarRelayActiveOrderTracker()
-                    bids, asks = radar_relay_active_order_tracker.convert_snapshot_message_to_order_book_row(
-                        snapshot_msg)
-                    order_book.apply_snapshot(bids, asks, snapshot_msg.update_id)
+                    radar_relay_active_order_tracker.apply_snapshot_message(order_book, snapshot_msg)
 
                     retval[symbol] = RadarRelayOrderBookTrackerEntry(
                         symbol,
@@ -154,9 +152,7 @@ class RadarRelayLocalClusterOrderBookDataSource(LocalClusterOrderBookDataSource)
                         for row in rows:
                             diff_msg: OrderBookMessage = self.order_book_class.diff_message_from_db(row)
                             if diff_msg.update_id > order_book.snapshot_uid:
-                                bids, asks = retval[symbol].active_order_tracker.\
-                                    convert_diff_message_to_order_book_row(diff_msg)
-                                order_book.apply_diffs(bids, asks, diff_msg.update_id)
+                                retval[symbol].active_order_tracker.apply_diff_message(order_book, diff_msg)
                     except DatabaseError:
                         continue
                     except ProgrammingError:
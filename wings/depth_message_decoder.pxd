@@ -0,0 +1,36 @@
+# distutils: language=c++
+
+from libc.stdint cimport int64_t
+from libcpp.string cimport string
+from libcpp.unordered_map cimport unordered_map
+from libcpp.vector cimport vector
+
+
+cdef struct DepthMessageFields:
+    const char *symbol
+    size_t symbol_length
+    bint symbol_escaped
+    int64_t update_id
+    int64_t first_update_id
+    int64_t event_time
+
+
+cdef class DepthMessageDecoder:
+    cdef string _symbol_key
+    cdef string _bids_key
+    cdef string _asks_key
+    cdef string _update_id_key
+    cdef string _first_update_id_key
+    cdef string _event_time_key
+    cdef string _wrapper_key
+    cdef unordered_map[string, size_t] _symbol_indices
+    cdef list _symbols
+
+    cdef int c_parse_object(self,
+                            const char **cursor,
+                            DepthMessageFields *fields,
+                            vector[double] *bids,
+                            vector[double] *asks,
+                            bint is_top_level) except -1
+    cdef str c_get_symbol(self, DepthMessageFields *fields)
+    cdef object c_decode(self, const char *data, int64_t update_id, object timestamp)
@@ -0,0 +1,432 @@
+# distutils: language=c++
+
+from cython.operator cimport dereference as deref
+from libc.stdint cimport (
+    int64_t,
+    uint64_t
+)
+from libc.stdlib cimport (
+    strtod,
+    strtoll
+)
+from libc.string cimport memcmp
+from libcpp.string cimport string
+from libcpp.unordered_map cimport unordered_map
+from libcpp.vector cimport vector
+import numpy as np
+cimport numpy as np
+from typing import Optional
+import ujson
+
+from wings.order_book_message import (
+    OrderBookMessage,
+    OrderBookMessageType
+)
+
+np.import_array()
+
+# Nesting limit when skipping over values the decoder doesn't care about.
+cdef int MAX_SKIP_DEPTH = 64
+
+# Decimals with at most 15 significant digits and 22 fractional digits are exactly mantissa / 10^k, with both operands
+# exactly representable - so a single division gives the correctly rounded result, same as strtod().
+cdef int MAX_FAST_DIGITS = 15
+cdef double POWERS_OF_TEN[23]
+for _i in range(23):
+    POWERS_OF_TEN[_i] = 10.0 ** _i
+
+cdef object DIFF_MESSAGE_TYPE = OrderBookMessageType.DIFF
+
+
+cdef inline const char *skip_whitespace(const char *p) nogil:
+    while p[0] == b" " or p[0] == b"\n" or p[0] == b"\r" or p[0] == b"\t":
+        p += 1
+    return p
+
+
+cdef inline const char *skip_string(const char *p, bint *escaped) nogil:
+    """
+    Skips over a JSON string starting at the opening quote. Returns a pointer past the closing quote, or NULL if the
+    string is unterminated.
+    """
+    p += 1
+    while p[0] != b"\"":
+        if p[0] == 0:
+            return NULL
+        if p[0] == b"\\":
+            escaped[0] = True
+            p += 1
+            if p[0] == 0:
+                return NULL
+        p += 1
+    return p + 1
+
+
+cdef const char *skip_value(const char *p, int depth) nogil:
+    """
+    Skips over any JSON value. Returns NULL on malformed input.
+    """
+    cdef:
+        bint escaped = False
+        char closing
+
+    p = skip_whitespace(p)
+    if p[0] == b"\"":
+        return skip_string(p, &escaped)
+    if p[0] == b"{" or p[0] == b"[":
+        if depth >= MAX_SKIP_DEPTH:
+            return NULL
+        closing = b"}" if p[0] == b"{" else b"]"
+        p = skip_whitespace(p + 1)
+        if p[0] == closing:
+            return p + 1
+        while True:
+            if closing == b"}":
+                if p[0] != b"\"":
+                    return NULL
+                p = skip_string(p, &escaped)
+                if p == NULL:
+                    return NULL
+                p = skip_whitespace(p)
+                if p[0] != b":":
+                    return NULL
+                p += 1
+            p = skip_value(p, depth + 1)
+            if p == NULL:
+                return NULL
+            p = skip_whitespace(p)
+            if p[0] == closing:
+                return p + 1
+            if p[0] != b",":
+                return NULL
+            p = skip_whitespace(p + 1)
+    # Numbers, true, false and null.
+    if p[0] == 0 or p[0] == b"," or p[0] == b"}" or p[0] == b"]":
+        return NULL
+    while p[0] != 0 and p[0] != b"," and p[0] != b"}" and p[0] != b"]" and p[0] != b" " and p[0] != b"\n" \
+            and p[0] != b"\r" and p[0] != b"\t":
+        p += 1
+    return p
+
+
+cdef inline const char *parse_double(const char *p, double *value) nogil:
+    """
+    Parses a JSON number, or a string holding a number - exchanges send prices and amounts as either.
+    """
+    cdef:
+        char *end
+        bint quoted = p[0] == b"\""
+
+    if quoted:
+        p += 1
+    end = <char *> parse_decimal(p, value)
+    if end == NULL:
+        value[0] = strtod(p, &end)
+    if end == p:
+        return NULL
+    if quoted:
+        if end[0] != b"\"":
+            return NULL
+        end += 1
+    return end
+
+
+cdef inline const char *parse_decimal(const char *p, double *value) nogil:
+    """
+    Fast path of parse_double(), for plain decimals like "0.00241000". Returns NULL for anything else, including
+    exponents and too many significant digits.
+    """
+    cdef:
+        uint64_t mantissa = 0
+        int digits = 0
+        int fraction_digits = 0
+        bint negative = p[0] == b"-"
+        bint has_digits = False
+
+    if negative:
+        p += 1
+    while b"0" <= p[0] <= b"9":
+        if mantissa > 0 or p[0] != b"0":
+            digits += 1
+        mantissa = mantissa * 10 + <uint64_t> (p[0] - <char> b"0")
+        has_digits = True
+        p += 1
+    if p[0] == b".":
+        p += 1
+        while b"0" <= p[0] <= b"9":
+            if mantissa > 0 or p[0] != b"0":
+                digits += 1
+            mantissa = mantissa * 10 + <uint64_t> (p[0] - <char> b"0")
+            fraction_digits += 1
+            has_digits = True
+            p += 1
+    if not has_digits or digits > MAX_FAST_DIGITS or fraction_digits > 22 or p[0] == b"e" or p[0] == b"E":
+        return NULL
+    value[0] = <double> mantissa / POWERS_OF_TEN[fraction_digits]
+    if negative:
+        value[0] = -value[0]
+    return p
+
+
+cdef inline const char *parse_int64(const char *p, int64_t *value) nogil:
+    cdef:
+        char *end
+        bint quoted = p[0] == b"\""
+
+    if quoted:
+        p += 1
+    value[0] = strtoll(p, &end, 10)
+    if end == p:
+        return NULL
+    if quoted:
+        if end[0] != b"\"":
+            return NULL
+        end += 1
+    return end
+
+
+cdef const char *parse_price_levels(const char *p, vector[double] *levels) nogil:
+    """
+    Parses an array of [price, amount, ...] price levels into flat (price, amount) pairs. Any further fields of a
+    price level are skipped.
+    """
+    cdef:
+        double price
+        double amount
+
+    if p[0] != b"[":
+        return NULL
+    p = skip_whitespace(p + 1)
+    if p[0] == b"]":
+        return p + 1
+    while True:
+        if p[0] != b"[":
+            return NULL
+        p = parse_double(skip_whitespace(p + 1), &price)
+        if p == NULL:
+            return NULL
+        p = skip_whitespace(p)
+        if p[0] != b",":
+            return NULL
+        p = parse_double(skip_whitespace(p + 1), &amount)
+        if p == NULL:
+            return NULL
+        p = skip_whitespace(p)
+        while p[0] == b",":
+            p = skip_value(p + 1, 1)
+            if p == NULL:
+                return NULL
+            p = skip_whitespace(p)
+        if p[0] != b"]":
+            return NULL
+        levels.push_back(price)
+        levels.push_back(amount)
+        p = skip_whitespace(p + 1)
+        if p[0] == b"]":
+            return p + 1
+        if p[0] != b",":
+            return NULL
+        p = skip_whitespace(p + 1)
+
+
+cdef inline bint key_equals(const char *key, size_t key_length, const string &expected) nogil:
+    return expected.size() > 0 and key_length == expected.size() and \
+        memcmp(key, expected.c_str(), key_length) == 0
+
+
+cdef class DepthMessageDecoder:
+    """
+    Decodes the raw JSON of an exchange's order book diff messages straight into OrderBookMessage objects, whose
+    bids_array and asks_array are filled in directly from the message bytes.
+
+    Only the symbol, update ID, event time and price level fields of the message are looked at, and no Python objects
+    are created while parsing - the price levels are parsed with strtod() into C++ vectors, and every other field is
+    skipped over.
+    Symbols are interned, so each message reuses the same symbol str object.
+
+    The field names are given per exchange. wrapper_key names an object holding the actual message, e.g. the "data"
+    field of Binance's combined streams; the fields of the wrapper object itself are ignored then. event_time_key names
+    the exchange's event time field, in milliseconds since the epoch.
+    """
+    def __init__(self,
+                 symbol_key: str,
+                 bids_key: str,
+                 asks_key: str,
+                 update_id_key: Optional[str] = None,
+                 first_update_id_key: Optional[str] = None,
+                 wrapper_key: Optional[str] = None,
+                 event_time_key: Optional[str] = None):
+        self._symbol_key = symbol_key.encode("utf8")
+        self._bids_key = bids_key.encode("utf8")
+        self._asks_key = asks_key.encode("utf8")
+        self._update_id_key = update_id_key.encode("utf8") if update_id_key is not None else b""
+        self._first_update_id_key = first_update_id_key.encode("utf8") if first_update_id_key is not None else b""
+        self._wrapper_key = wrapper_key.encode("utf8") if wrapper_key is not None else b""
+        self._event_time_key = event_time_key.encode("utf8") if event_time_key is not None else b""
+        self._symbols = []
+
+    cdef int c_parse_object(self,
+                            const char **cursor,
+                            DepthMessageFields *fields,
+                            vector[double] *bids,
+                            vector[double] *asks,
+                            bint is_top_level) except -1:
+        cdef:
+            const char *p = skip_whitespace(cursor[0])
+            const char *key
+            const char *value_end
+            size_t key_length
+            bint escaped
+            bint found_wrapper = False
+
+        if p[0] != b"{":
+            raise ValueError("Depth message is not a JSON object.")
+        p = skip_whitespace(p + 1)
+        if p[0] == b"}":
+            cursor[0] = p + 1
+            return 0
+        while True:
+            if p[0] != b"\"":
+                raise ValueError("Expected a key in depth message.")
+            escaped = False
+            key = p + 1
+            p = skip_string(p, &escaped)
+            if p == NULL:
+                raise ValueError("Unterminated key in depth message.")
+            key_length = p - key - 1
+            p = skip_whitespace(p)
+            if p[0] != b":":
+                raise ValueError("Expected ':' after key in depth message.")
+            p = skip_whitespace(p + 1)
+
+            if escaped:
+                value_end = skip_value(p, 0)
+            elif is_top_level and key_equals(key, key_length, self._wrapper_key) and p[0] == b"{":
+                # Fields found in the wrapper object so far don't belong to the message.
+                bids.clear()
+                asks.clear()
+                fields.symbol = NULL
+                fields.update_id = -1
+                fields.first_update_id = -1
+                fields.event_time = -1
+                self.c_parse_object(&p, fields, bids, asks, False)
+                value_end = p
+                found_wrapper = True
+            elif found_wrapper:
+                value_end = skip_value(p, 0)
+            elif key_equals(key, key_length, self._bids_key):
+                value_end = parse_price_levels(p, bids)
+            elif key_equals(key, key_length, self._asks_key):
+                value_end = parse_price_levels(p, asks)
+            elif key_equals(key, key_length, self._symbol_key) and p[0] == b"\"":
+                fields.symbol_escaped = False
+                value_end = skip_string(p, &fields.symbol_escaped)
+                if value_end != NULL:
+                    fields.symbol = p + 1
+                    fields.symbol_length = value_end - p - 2
+            elif key_equals(key, key_length, self._update_id_key):
+                value_end = parse_int64(p, &fields.update_id)
+            elif key_equals(key, key_length, self._first_update_id_key):
+                value_end = parse_int64(p, &fields.first_update_id)
+            elif key_equals(key, key_length, self._event_time_key):
+                value_end = parse_int64(p, &fields.event_time)
+            else:
+                value_end = skip_value(p, 0)
+            if value_end == NULL:
+                raise ValueError(f"Malformed value for key '{key[:key_length].decode('utf8', 'replace')}' "
+                                 f"in depth message.")
+
+            p = skip_whitespace(value_end)
+            if p[0] == b"}":
+                cursor[0] = p + 1
+                return 0
+            if p[0] != b",":
+                raise ValueError("Expected ',' or '}' in depth message.")
+            p = skip_whitespace(p + 1)
+
+    cdef str c_get_symbol(self, DepthMessageFields *fields):
+        cdef:
+            string raw_symbol
+            unordered_map[string, size_t].iterator it
+            str symbol
+
+        if fields.symbol == NULL:
+            raise ValueError("Depth message has no symbol.")
+        if fields.symbol_escaped:
+            return ujson.loads((fields.symbol - 1)[:fields.symbol_length + 2].decode("utf8"))
+        raw_symbol = string(fields.symbol, fields.symbol_length)
+        it = self._symbol_indices.find(raw_symbol)
+        if it != self._symbol_indices.end():
+            return self._symbols[deref(it).second]
+        symbol = fields.symbol[:fields.symbol_length].decode("utf8")
+        self._symbol_indices[raw_symbol] = len(self._symbols)
+        self._symbols.append(symbol)
+        return symbol
+
+    cdef object c_decode(self, const char *data, int64_t update_id, object timestamp):
+        cdef:
+            DepthMessageFields fields
+            vector[double] bids
+            vector[double] asks
+            const char *p = data
+            dict content
+
+        fields.symbol = NULL
+        fields.symbol_length = 0
+        fields.symbol_escaped = False
+        fields.update_id = -1
+        fields.first_update_id = -1
+        fields.event_time = -1
+        self.c_parse_object(&p, &fields, &bids, &asks, True)
+        if skip_whitespace(p)[0] != 0:
+            raise ValueError("Unexpected data after depth message.")
+
+        if update_id < 0:
+            if fields.update_id < 0:
+                raise ValueError("Depth message has no update ID.")
+            update_id = fields.update_id
+        content = {
+            "symbol": self.c_get_symbol(&fields),
+            "update_id": update_id,
+            "bids": levels_to_array(&bids, update_id),
+            "asks": levels_to_array(&asks, update_id)
+        }
+        if fields.first_update_id >= 0:
+            content["first_update_id"] = fields.first_update_id
+        return OrderBookMessage(DIFF_MESSAGE_TYPE, content, timestamp=timestamp,
+                                exchange_timestamp_ns=fields.event_time * 1000000 if fields.event_time >= 0 else -1)
+
+    def decode(self, data, update_id: int = -1, timestamp: Optional[float] = None) -> OrderBookMessage:
+        """
+        Decodes a raw diff message into an OrderBookMessage.
+
+        :param data: The message JSON, as bytes or str.
+        :param update_id: The update ID of the message. If negative, it's read from the message's update_id_key field.
+        :param timestamp: The timestamp of the message.
+        """
+        cdef bytes raw = data.encode("utf8") if isinstance(data, str) else bytes(data)
+        return self.c_decode(raw, update_id, timestamp)
+
+
+cdef object levels_to_array(vector[double] *levels, int64_t update_id):
+    """
+    Converts flat (price, amount) pairs into an (n, 3) float64 array of [price, amount, update_id] rows, as used by
+    OrderBookMessage.bids_array and asks_array.
+    """
+    cdef:
+        size_t row_count = levels.size() // 2
+        np.npy_intp shape[2]
+        np.ndarray array
+        double *rows
+        double update_id_value = update_id
+        size_t i
+
+    shape[0] = row_count
+    shape[1] = 3
+    array = np.PyArray_EMPTY(2, shape, np.NPY_FLOAT64, 0)
+    rows = <double *> np.PyArray_DATA(array)
+    for i in range(row_count):
+        rows[3 * i] = levels[0][2 * i]
+        rows[3 * i + 1] = levels[0][2 * i + 1]
+        rows[3 * i + 2] = update_id_value
+    return array
@@ -54,6 +54,7 @@ class ERC20WatcherEvent(Enum):
 
 class OrderBookEvent(Enum):
     TradeEvent = 901
+    TopOfBookChanged = 902
 
 
 class MarketTransactionFailureEvent(NamedTuple):
@@ -175,6 +176,19 @@ class OrderBookTradeEvent(NamedTuple):
     amount: float
 
 
+class OrderBookTopOfBookChangedEvent(NamedTuple):
+    timestamp: float
+    update_id: int
+    old_bid_price: float
+    old_bid_amount: float
+    old_ask_price: float
+    old_ask_amount: float
+    bid_price: float
+    bid_amount: float
+    ask_price: float
+    ask_amount: float
+
+
 class OrderFilledEvent(NamedTuple):
     timestamp: float
     order_id: str
@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+
+import math
+from typing import (
+    Dict,
+    List
+)
+
+from wings.order_book_message import OrderBookMessage
+
+
+class LatencyHistogram:
+    """
+    A histogram of latencies in nanoseconds, over log-scaled buckets of 1/BUCKETS_PER_OCTAVE of a power of two each,
+    from 1 microsecond up to about 2 hours. Percentiles are given as the upper bound of their bucket, which is within
+    19% of the exact value. Negative latencies - from clock offsets between the exchange and the host - are counted in
+    the lowest bucket, and latencies past the last bucket in the last one.
+    """
+    BUCKETS_PER_OCTAVE: int = 4
+    BUCKET_COUNT: int = 1 + 33 * BUCKETS_PER_OCTAVE
+
+    def __init__(self):
+        self._counts: List[int] = [0] * self.BUCKET_COUNT
+        self._count: int = 0
+        self._total_ns: int = 0
+        self._max_ns: int = 0
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    def _bucket_index(self, latency_ns: int) -> int:
+        latency_us: float = latency_ns * 1e-3
+        if latency_us < 1.0:
+            return 0
+        return min(1 + int(math.log2(latency_us) * self.BUCKETS_PER_OCTAVE), self.BUCKET_COUNT - 1)
+
+    def _bucket_upper_bound_ns(self, index: int) -> float:
+        return 2.0 ** (index / self.BUCKETS_PER_OCTAVE) * 1e3
+
+    def record(self, latency_ns: int):
+        self._counts[self._bucket_index(latency_ns)] += 1
+        self._count += 1
+        self._total_ns += latency_ns
+        self._max_ns = max(self._max_ns, latency_ns)
+
+    def merge(self, other: "LatencyHistogram"):
+        for index, count in enumerate(other._counts):
+            self._counts[index] += count
+        self._count += other._count
+        self._total_ns += other._total_ns
+        self._max_ns = max(self._max_ns, other._max_ns)
+
+    def percentile(self, percentile: float) -> float:
+        """
+        Returns the latency in nanoseconds below which the given percentage of the latencies fall, or NaN if the
+        histogram is empty.
+        """
+        if self._count < 1:
+            return float("nan")
+        rank: float = self._count * percentile / 100.0
+        cumulative_count: int = 0
+        for index, count in enumerate(self._counts):
+            cumulative_count += count
+            if count > 0 and cumulative_count >= rank:
+                if index == self.BUCKET_COUNT - 1:
+                    return float(self._max_ns)
+                return min(self._bucket_upper_bound_ns(index), float(self._max_ns))
+        return float(self._max_ns)
+
+    @property
+    def stats(self) -> Dict[str, float]:
+        """
+        Number of latencies recorded, and their mean, median, 90th and 99th percentiles and maximum in milliseconds.
+        """
+        return {
+            "count": self._count,
+            "mean_ms": self._total_ns / self._count * 1e-6 if self._count > 0 else float("nan"),
+            "p50_ms": self.percentile(50) * 1e-6,
+            "p90_ms": self.percentile(90) * 1e-6,
+            "p99_ms": self.percentile(99) * 1e-6,
+            "max_ms": self._max_ns * 1e-6 if self._count > 0 else float("nan")
+        }
+
+
+class FeedLatencyStats:
+    """
+    Latencies of the order book messages applied to order books:
+    - feed: from the exchange event time to the local receive time. This compares the exchange's clock with the host's,
+      so it includes the offset between them.
+    - processing: from the local receive time to the time the message was applied to its order book.
+    - total: from the exchange event time to the time the message was applied.
+
+    Messages without an exchange event time only count towards the processing latency.
+    """
+    def __init__(self):
+        self.feed: LatencyHistogram = LatencyHistogram()
+        self.processing: LatencyHistogram = LatencyHistogram()
+        self.total: LatencyHistogram = LatencyHistogram()
+
+    def record(self, message: OrderBookMessage, clock_offset_ns: int):
+        """
+        Records the latencies of an applied message. clock_offset_ns is the wall clock time minus the monotonic time,
+        to convert the message's exchange event time to the monotonic clock of its receive and apply times.
+        """
+        self.processing.record(message.apply_timestamp_ns - message.receive_timestamp_ns)
+        if message.exchange_timestamp_ns >= 0:
+            exchange_timestamp_ns: int = message.exchange_timestamp_ns - clock_offset_ns
+            self.feed.record(message.receive_timestamp_ns - exchange_timestamp_ns)
+            self.total.record(message.apply_timestamp_ns - exchange_timestamp_ns)
+
+    def merge(self, other: "FeedLatencyStats"):
+        self.feed.merge(other.feed)
+        self.processing.merge(other.processing)
+        self.total.merge(other.total)
+
+    @property
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        return {
+            "feed": self.feed.stats,
+            "processing": self.processing.stats,
+            "total": self.total.stats
+        }
@@ -0,0 +1,18 @@
+# distutils: language=c++
+
+from libc.stdint cimport int64_t
+from .FixedPointGrid cimport FixedPointGrid
+
+
+cdef class FixedPointQuantizer:
+    cdef FixedPointGrid _grid
+    cdef object _step
+    cdef bint _exact
+
+    cdef int64_t c_to_ticks(self, double value) except? -1
+    cdef object c_ticks_to_decimal(self, int64_t ticks)
+    cdef object c_quantize(self, double value, int64_t step_offset=*)
+
+
+cdef FixedPointGrid c_fixed_point_grid(object step) except *
+cdef FixedPointQuantizer c_get_quantizer(object step)
@@ -0,0 +1,113 @@
+# distutils: language=c++
+# distutils: sources=wings/cpp/FixedPointGrid.cpp
+
+from decimal import Decimal
+from libc.stdint cimport int64_t
+
+from .FixedPointGrid cimport FixedPointGrid
+
+# Most decimal places and units of a step. 10^15 is the largest power of ten below the 2^52 units a grid converts
+# exactly.
+cdef enum:
+    MAX_DECIMALS = 15
+cdef int64_t MAX_STEP_UNITS = 1 << 52
+
+cdef dict _quantizers = {}
+
+
+cdef FixedPointGrid c_fixed_point_grid(object step) except *:
+    """
+    Builds the fixed-point grid of a price tick size or amount lot size, given as a Decimal, string or float. Floats
+    are read by their shortest repr - e.g. 0.01 is a step of exactly 0.01.
+    """
+    cdef:
+        object step_decimal = step if isinstance(step, Decimal) else Decimal(str(step))
+        int exponent
+
+    if not step_decimal.is_finite() or not step_decimal > 0:
+        raise ValueError(f"Fixed-point step must be positive, got {step}.")
+    exponent = step_decimal.as_tuple().exponent
+    if exponent < -MAX_DECIMALS:
+        raise ValueError(f"Fixed-point step {step} has more than {MAX_DECIMALS} decimal places.")
+    if exponent > 0:
+        exponent = 0
+    step_units = int(step_decimal.scaleb(-exponent))
+    if step_units >= MAX_STEP_UNITS:
+        raise ValueError(f"Fixed-point step {step} is too large.")
+    return FixedPointGrid(-exponent, step_units)
+
+
+cdef FixedPointQuantizer c_get_quantizer(object step):
+    """
+    Returns the shared quantizer for a step.
+    """
+    cdef:
+        str key = str(step)
+        FixedPointQuantizer quantizer = _quantizers.get(key)
+
+    if quantizer is None:
+        quantizer = FixedPointQuantizer(step)
+        _quantizers[key] = quantizer
+    return quantizer
+
+
+def get_quantizer(step) -> FixedPointQuantizer:
+    return c_get_quantizer(step)
+
+
+cdef class FixedPointQuantizer:
+    """
+    Rounds values to a fixed step - e.g. a market's price tick size - on an integer grid.
+
+    quantize() returns the same Decimal as round(Decimal(value) / step) * step, i.e. rounding half to even on the exact
+    value of the double, but only builds the result Decimal from an integer number of ticks. Steps that can't be
+    represented on the grid - e.g. with more than 15 decimal places, or a positive exponent - and values too large for
+    it fall back to Decimal arithmetic.
+    """
+    def __init__(self, step):
+        self._step = step if isinstance(step, Decimal) else Decimal(str(step))
+        if not self._step.is_finite() or not self._step > 0:
+            raise ValueError(f"Quantizer step must be positive, got {step}.")
+        self._exact = self._step.as_tuple().exponent <= 0
+        if self._exact:
+            try:
+                self._grid = c_fixed_point_grid(self._step)
+            except ValueError:
+                self._exact = False
+
+    @property
+    def step(self) -> Decimal:
+        return self._step
+
+    @property
+    def decimals(self) -> int:
+        return self._grid.getDecimals()
+
+    cdef int64_t c_to_ticks(self, double value) except? -1:
+        cdef int64_t ticks
+
+        if not self._exact or not self._grid.toTicks(value, ticks):
+            raise ValueError(f"{value} can't be represented in ticks of {self._step}.")
+        return ticks
+
+    cdef object c_ticks_to_decimal(self, int64_t ticks):
+        return Decimal(ticks * self._grid.getStepUnits()).scaleb(-self._grid.getDecimals())
+
+    cdef object c_quantize(self, double value, int64_t step_offset=0):
+        """
+        Rounds the value to the nearest multiple of the step, then moves it by step_offset steps.
+        """
+        cdef int64_t ticks
+
+        if self._exact and self._grid.toTicks(value, ticks):
+            return self.c_ticks_to_decimal(ticks + step_offset)
+        return (round(Decimal(value) / self._step) + step_offset) * self._step
+
+    def to_ticks(self, value: float) -> int:
+        return self.c_to_ticks(value)
+
+    def from_ticks(self, ticks: int) -> float:
+        return self._grid.fromTicks(ticks)
+
+    def quantize(self, value: float, step_offset: int = 0) -> Decimal:
+        return self.c_quantize(value, step_offset)
@@ -5,6 +5,7 @@ from typing import (
 )
 
 from wings.events import MarketEvent
+from wings.fixed_point cimport c_get_quantizer
 from wings.order_book import OrderBook
 from wings.cancellation_result import CancellationResult
 from .limit_order import LimitOrder
@@ -119,7 +120,7 @@ cdef class MarketBase(TimeIterator):
 
     cdef object c_quantize_order_price(self, str symbol, double price):
         price_quantum = self.c_get_order_price_quantum(symbol, price)
-        return round(Decimal(price) / price_quantum) * price_quantum
+        return c_get_quantizer(price_quantum).c_quantize(price)
 
     cdef object c_quantize_order_amount(self, str symbol, double amount):
         order_size_quantum = self.c_get_order_size_quantum(symbol, amount)
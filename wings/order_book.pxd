@@ -4,20 +4,98 @@ from libc.stdint cimport int64_t
 from libcpp.set cimport set
 from libcpp.vector cimport vector
 cimport numpy as np
+from .FixedPointGrid cimport FixedPointGrid
 from .OrderBookEntry cimport OrderBookEntry
+from .OrderBookDepthIndex cimport OrderBookDepthIndex
+from .OrderBookTickLadder cimport OrderBookTickLadder
 from .pubsub cimport PubSub
+from .trade_tape cimport TradeTape
+
+cdef class OrderBook
+
+
+cdef class OrderBookLevelListener:
+    cdef c_on_diffs(self, OrderBook order_book, vector[OrderBookEntry] &bids, vector[OrderBookEntry] &asks)
+    cdef c_on_snapshot(self, OrderBook order_book)
+
 
 cdef class OrderBook(PubSub):
     cdef set[OrderBookEntry] _bid_book
     cdef set[OrderBookEntry] _ask_book
+    cdef OrderBookDepthIndex _bid_depth_index
+    cdef OrderBookDepthIndex _ask_depth_index
+    cdef OrderBookTickLadder _bid_ladder
+    cdef OrderBookTickLadder _ask_ladder
+    cdef bint _use_tick_ladder
+    cdef FixedPointGrid _price_grid
+    cdef FixedPointGrid _amount_grid
+    cdef bint _use_fixed_point
+    cdef bint _use_fixed_point_amounts
+    cdef double _top_bid_price
+    cdef double _top_bid_amount
+    cdef double _top_ask_price
+    cdef double _top_ask_amount
+    cdef double _top_of_book_min_price_change
+    cdef double _top_of_book_min_size_change
+    cdef size_t _max_depth
+    cdef bint _bid_depth_truncated
+    cdef bint _ask_depth_truncated
+    cdef double _bid_depth_limit_price
+    cdef double _ask_depth_limit_price
     cdef int64_t _snapshot_uid
     cdef int64_t _last_diff_uid
     cdef double _best_bid
     cdef double _best_ask
+    cdef int64_t _version
+    cdef bint _analytics_enabled
+    cdef size_t _imbalance_depth
+    cdef double _ewma_alpha
+    cdef double _mid_price
+    cdef double _spread
+    cdef double _imbalance
+    cdef double _microprice
+    cdef double _trade_volume_ewma
+    cdef double _trade_variance_ewma
+    cdef double _last_trade_price
+    cdef TradeTape _trade_tape
+    cdef bint _truncate_overlaps
+    cdef list _level_listeners
+    cdef list _frozen_views
 
     cdef c_apply_diffs(self, vector[OrderBookEntry] bids, vector[OrderBookEntry] asks, int64_t update_id)
     cdef c_apply_snapshot(self, vector[OrderBookEntry] bids, vector[OrderBookEntry] asks, int64_t update_id)
+    cdef c_apply_ladder_diffs(self, vector[OrderBookEntry] bids, vector[OrderBookEntry] asks)
+    cdef c_apply_ladder_snapshot(self, vector[OrderBookEntry] bids, vector[OrderBookEntry] asks)
+    cdef c_snap_to_grid(self, vector[OrderBookEntry] &entries, bint drop_empty)
+    cdef double c_diff_level_key(self, double price)
+    cdef int64_t c_price_to_ticks(self, double price) except? -1
+    cdef double c_ticks_to_price(self, int64_t ticks) except? -1
     cdef c_apply_trade(self, object trade_event)
+    cdef size_t c_get_book_size(self, bint is_buy)
+    cdef OrderBookEntry c_get_top_entry(self, bint is_buy)
+    cdef c_check_top_of_book(self, int64_t update_id)
+    cdef bint c_is_beyond_retained_depth(self, bint is_buy, double price)
+    cdef c_check_retained_depth(self, bint is_buy, str request_description)
+    cdef c_trim_depth(self)
+    cdef c_prepare_mutation(self)
+    cdef c_add_level_listener(self, OrderBookLevelListener listener)
+    cdef c_remove_level_listener(self, OrderBookLevelListener listener)
+    cdef c_notify_snapshot(self)
+    cdef double c_get_top_levels_volume(self, bint is_buy, size_t depth)
+    cdef c_reset_analytics(self)
+    cdef c_update_analytics(self)
+    cdef size_t c_fill_snapshot_array(self,
+                                      bint is_buy,
+                                      np.float64_t[:, :] output,
+                                      size_t depth,
+                                      double max_volume) except? 0
+    cdef size_t c_get_levels_for_volume(self, bint is_buy, double volume)
+    cdef np.ndarray c_simulate_fills(self, bint is_buy, double amount)
+    cdef c_fill_depth_curve(self,
+                            bint is_buy,
+                            np.float64_t[:] sorted_volumes,
+                            np.float64_t[:] prices,
+                            np.float64_t[:] vwaps)
     cdef c_apply_numpy_diffs(self,
                              np.ndarray[np.float64_t, ndim=2] bids_array,
                              np.ndarray[np.float64_t, ndim=2] asks_array)
@@ -30,3 +108,9 @@ cdef class OrderBook(PubSub):
     cdef double c_get_volume_for_price(self, bint is_buy, double price) except? -1
     cdef double c_get_quote_volume_for_price(self, bint is_buy, double price) except? -1
     cdef double c_get_vwap_for_volume(self, bint is_buy, double volume) except? -1
+
+
+cdef class FrozenOrderBook(OrderBook):
+    cdef OrderBook _source
+
+    cdef c_materialize(self)
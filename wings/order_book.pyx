@@ -1,10 +1,22 @@
 # distutils: language=c++
-# distutils: sources=wings/cpp/OrderBookEntry.cpp
+# distutils: sources=wings/cpp/OrderBookEntry.cpp wings/cpp/OrderBookDepthIndex.cpp wings/cpp/OrderBookTickLadder.cpp wings/cpp/FixedPointGrid.cpp
 import bisect
 import logging
+import struct
+import time
+import weakref
 
+from libc.math cimport (
+    INFINITY,
+    isnan,
+    llround,
+    log,
+    sqrt
+)
+from libcpp.unordered_map cimport unordered_map
 from cython.operator cimport (
     postincrement as inc,
+    predecrement as dec,
     dereference as deref,
     address as ref
 )
@@ -17,23 +29,96 @@ from typing import (
     Iterator,
     Tuple,
     Optional,
-    Dict
+    Dict,
+    Union
 )
 from .events import (
     OrderBookEvent,
-    OrderBookTradeEvent
+    OrderBookTopOfBookChangedEvent,
+    OrderBookTradeEvent,
+    TradeType
 )
 
 from sqlalchemy.engine import RowProxy
 
+from .fixed_point cimport c_fixed_point_grid
 from .order_book_message import OrderBookMessage
 from .OrderBookEntry cimport truncateOverlapEntries
+from .OrderBookTickLadder cimport truncateOverlapLadders
 from .order_book_row import OrderBookRow
+from .trade_tape cimport TradeTape
 
 ob_logger = None
 
+# Per node bookkeeping of a std::set red-black tree node (color, parent, left and right pointers) on 64-bit platforms.
+SET_NODE_OVERHEAD_BYTES = 32
+
+# Binary layout of OrderBook.to_bytes(). The header holds the magic bytes, format version, flags, snapshot_uid,
+# last_diff_uid, number of bid and ask levels, price tick size, max depth, the bid and ask depth limit prices, and the
+# fixed-point price tick size and amount lot size - NaN if the order book has no such grid. It is followed by the bid
+# and then the ask levels as little endian float64 [price, amount, update_id] rows, from the best price level
+# downwards. The header is a multiple of 8 bytes long, so the rows stay aligned when the data is memory mapped.
+ORDER_BOOK_BYTES_MAGIC = b"HBOB"
+ORDER_BOOK_BYTES_VERSION = 2
+ORDER_BOOK_BYTES_HEADER = struct.Struct("<4sHHqqQQdQdddd")
+ORDER_BOOK_BYTES_TICK_LADDER = 0x1
+ORDER_BOOK_BYTES_BID_DEPTH_TRUNCATED = 0x2
+ORDER_BOOK_BYTES_ASK_DEPTH_TRUNCATED = 0x4
+ORDER_BOOK_BYTES_FIXED_POINT = 0x8
+ORDER_BOOK_BYTES_FIXED_POINT_AMOUNTS = 0x10
+
+
+cdef inline bint _top_of_book_value_changed(double old_value, double new_value, double min_change):
+    if isnan(old_value) or isnan(new_value):
+        return isnan(old_value) != isnan(new_value)
+    return old_value != new_value and abs(new_value - old_value) >= min_change
+
+
+cdef vector[OrderBookEntry] _entries_from_array(const np.float64_t[:, :] array):
+    cdef:
+        vector[OrderBookEntry] entries
+        size_t i
+    entries.reserve(array.shape[0])
+    for i in range(array.shape[0]):
+        entries.push_back(OrderBookEntry(array[i, 0], array[i, 1], <int64_t>array[i, 2]))
+    return entries
+
+
+cdef vector[OrderBookEntry] _entries_from_rows(object rows):
+    """
+    Converts either a list of OrderBookRow, or an (n, 3) float64 array of [price, amount, update_id] rows - like
+    OrderBookMessage.bids_array - into order book entries.
+    """
+    cdef vector[OrderBookEntry] entries
+    if isinstance(rows, np.ndarray):
+        return _entries_from_array(rows)
+    for row in rows:
+        entries.push_back(OrderBookEntry(row.price, row.amount, row.update_id))
+    return entries
+
+
+cdef class OrderBookLevelListener:
+    """
+    Receives the price level changes of the order books it's added to, right after they are applied - see
+    OrderBook.c_add_level_listener().
+    """
+    cdef c_on_diffs(self, OrderBook order_book, vector[OrderBookEntry] &bids, vector[OrderBookEntry] &asks):
+        """
+        Called with the diffs applied to the order book. Levels that were beyond the order book's retained depth have
+        been ignored by it, and the order book may have also removed overlapping levels from the top of the books.
+        """
+        pass
+
+    cdef c_on_snapshot(self, OrderBook order_book):
+        """
+        Called when all the order book's price levels may have changed - e.g. after a snapshot.
+        """
+        pass
+
+
 cdef class OrderBook(PubSub):
     ORDER_BOOK_TRADE_EVENT_TAG = OrderBookEvent.TradeEvent.value
+    ORDER_BOOK_TOP_OF_BOOK_CHANGED_EVENT_TAG = OrderBookEvent.TopOfBookChanged.value
 
     @classmethod
     def logger(cls) -> logging.Logger:
@@ -47,6 +132,23 @@ cdef class OrderBook(PubSub):
         self._snapshot_uid = 0
         self._last_diff_uid = 0
         self._best_bid = self._best_ask = float("NaN")
+        self._use_tick_ladder = False
+        self._use_fixed_point = self._use_fixed_point_amounts = False
+        self._top_bid_price = self._top_ask_price = float("NaN")
+        self._top_bid_amount = self._top_ask_amount = 0
+        self._top_of_book_min_price_change = self._top_of_book_min_size_change = 0
+        self._max_depth = 0
+        self._bid_depth_truncated = self._ask_depth_truncated = False
+        self._bid_depth_limit_price = self._ask_depth_limit_price = float("NaN")
+        self._version = 0
+        self._frozen_views = []
+        self._analytics_enabled = False
+        self._imbalance_depth = 0
+        self._ewma_alpha = 0
+        self.c_reset_analytics()
+        self._truncate_overlaps = True
+        self._level_listeners = []
+        self._trade_tape = None
 
     cdef c_apply_diffs(self, vector[OrderBookEntry] bids, vector[OrderBookEntry] asks, int64_t update_id):
         cdef:
@@ -57,51 +159,187 @@ cdef class OrderBook(PubSub):
             set[OrderBookEntry].iterator result
             OrderBookEntry top_bid
             OrderBookEntry top_ask
+            size_t bid_book_size
+            size_t ask_book_size
 
-        # Apply the diffs. Diffs with 0 amounts mean deletion.
-        for bid in bids:
-            result = self._bid_book.find(bid)
-            if result != bid_book_end:
-                self._bid_book.erase(result)
-            if bid.getAmount() > 0:
-                self._bid_book.insert(bid)
-        for ask in asks:
-            result = self._ask_book.find(ask)
-            if result != ask_book_end:
-                self._ask_book.erase(result)
-            if ask.getAmount() > 0:
-                self._ask_book.insert(ask)
+        self.c_prepare_mutation()
+        if self._use_fixed_point:
+            self.c_snap_to_grid(bids, False)
+            self.c_snap_to_grid(asks, False)
+        if self._use_tick_ladder:
+            bid_book_size, ask_book_size = self.c_apply_ladder_diffs(bids, asks)
+        else:
+            # Apply the diffs. Diffs with 0 amounts mean deletion.
+            for bid in bids:
+                if self.c_is_beyond_retained_depth(False, bid.getPrice()):
+                    continue
+                result = self._bid_book.find(bid)
+                if result != bid_book_end:
+                    self._bid_book.erase(result)
+                if bid.getAmount() > 0:
+                    self._bid_book.insert(bid)
+                self._bid_depth_index.setAmount(bid.getPrice(), bid.getAmount())
+            for ask in asks:
+                if self.c_is_beyond_retained_depth(True, ask.getPrice()):
+                    continue
+                result = self._ask_book.find(ask)
+                if result != ask_book_end:
+                    self._ask_book.erase(result)
+                if ask.getAmount() > 0:
+                    self._ask_book.insert(ask)
+                self._ask_depth_index.setAmount(ask.getPrice(), ask.getAmount())
 
-        # If there's any overlapping entries between the bid and ask books, the newer entries win.
-        truncateOverlapEntries(self._bid_book, self._ask_book)
+            # If there's any overlapping entries between the bid and ask books, the newer entries win.
+            bid_book_size = self._bid_book.size()
+            ask_book_size = self._ask_book.size()
+            if self._truncate_overlaps:
+                truncateOverlapEntries(self._bid_book, self._ask_book)
 
-        # Record the current best prices, for faster c_get_price() calls.
-        bid_iterator = self._bid_book.rbegin()
-        ask_iterator = self._ask_book.begin()
-        if bid_iterator != self._bid_book.rend():
-            top_bid = deref(bid_iterator)
-            self._best_bid = top_bid.getPrice()
-        if ask_iterator != self._ask_book.end():
-            top_ask = deref(ask_iterator)
-            self._best_ask = top_ask.getPrice()
+            # Record the current best prices, for faster c_get_price() calls.
+            bid_iterator = self._bid_book.rbegin()
+            ask_iterator = self._ask_book.begin()
+            if bid_iterator != self._bid_book.rend():
+                top_bid = deref(bid_iterator)
+                self._best_bid = top_bid.getPrice()
+            if ask_iterator != self._ask_book.end():
+                top_ask = deref(ask_iterator)
+                self._best_ask = top_ask.getPrice()
+
+        # Overlap truncation only ever removes entries from the top of the books - trim the depth indices to match.
+        if self.c_get_book_size(False) != bid_book_size:
+            if self.c_get_book_size(False) > 0:
+                self._bid_depth_index.eraseGreaterThan(self._best_bid, False)
+            else:
+                self._bid_depth_index.clear()
+        if self.c_get_book_size(True) != ask_book_size:
+            if self.c_get_book_size(True) > 0:
+                self._ask_depth_index.eraseLessThan(self._best_ask, False)
+            else:
+                self._ask_depth_index.clear()
+
+        if self._max_depth > 0:
+            self.c_trim_depth()
 
         # Remember the last diff update ID.
         self._last_diff_uid = update_id
 
+        if self._analytics_enabled:
+            self.c_update_analytics()
+        self.c_check_top_of_book(update_id)
+
+        for listener in self._level_listeners:
+            (<OrderBookLevelListener>listener).c_on_diffs(self, bids, asks)
+
+    cdef c_apply_ladder_diffs(self, vector[OrderBookEntry] bids, vector[OrderBookEntry] asks):
+        """
+        Applies diffs to the tick ladders, including the overlap truncation and the best price updates.
+
+        Returns the sizes of the bid and ask books before the overlap truncation.
+        """
+        cdef:
+            list rejected_prices = []
+            double price
+            size_t bid_book_size
+            size_t ask_book_size
+
+        for bid in bids:
+            if self.c_is_beyond_retained_depth(False, bid.getPrice()):
+                continue
+            price = self._bid_ladder.getLevelPrice(bid.getPrice())
+            if self._bid_ladder.setEntry(bid):
+                self._bid_depth_index.setAmount(price, bid.getAmount())
+            else:
+                rejected_prices.append(price)
+        for ask in asks:
+            if self.c_is_beyond_retained_depth(True, ask.getPrice()):
+                continue
+            price = self._ask_ladder.getLevelPrice(ask.getPrice())
+            if self._ask_ladder.setEntry(ask):
+                self._ask_depth_index.setAmount(price, ask.getAmount())
+            else:
+                rejected_prices.append(price)
+
+        bid_book_size = self._bid_ladder.size()
+        ask_book_size = self._ask_ladder.size()
+        if self._truncate_overlaps:
+            truncateOverlapLadders(self._bid_ladder, self._ask_ladder)
+        if self._bid_ladder.getBestIndex() >= 0:
+            self._best_bid = self._bid_ladder.getEntry(self._bid_ladder.getBestIndex()).getPrice()
+        if self._ask_ladder.getBestIndex() >= 0:
+            self._best_ask = self._ask_ladder.getEntry(self._ask_ladder.getBestIndex()).getPrice()
+
+        if len(rejected_prices) > 0:
+            self.logger().warning(f"Price levels {rejected_prices} are too far away from the rest of the order book "
+                                  f"for the tick ladder, and have been ignored.")
+        return bid_book_size, ask_book_size
+
+    cdef c_apply_ladder_snapshot(self, vector[OrderBookEntry] bids, vector[OrderBookEntry] asks):
+        cdef:
+            list rejected_prices = []
+
+        self._bid_ladder.clear()
+        self._ask_ladder.clear()
+        for bid in bids:
+            if self._bid_ladder.setEntry(bid):
+                self._bid_depth_index.setAmount(self._bid_ladder.getLevelPrice(bid.getPrice()), bid.getAmount())
+            else:
+                rejected_prices.append(bid.getPrice())
+        for ask in asks:
+            if self._ask_ladder.setEntry(ask):
+                self._ask_depth_index.setAmount(self._ask_ladder.getLevelPrice(ask.getPrice()), ask.getAmount())
+            else:
+                rejected_prices.append(ask.getPrice())
+
+        self._best_bid = self._best_ask = float("NaN")
+        if self._bid_ladder.getBestIndex() >= 0:
+            self._best_bid = self._bid_ladder.getEntry(self._bid_ladder.getBestIndex()).getPrice()
+        if self._ask_ladder.getBestIndex() >= 0:
+            self._best_ask = self._ask_ladder.getEntry(self._ask_ladder.getBestIndex()).getPrice()
+
+        if len(rejected_prices) > 0:
+            self.logger().warning(f"Price levels {rejected_prices} are too far away from the rest of the order book "
+                                  f"for the tick ladder, and have been ignored.")
+
     cdef c_apply_snapshot(self, vector[OrderBookEntry] bids, vector[OrderBookEntry] asks, int64_t update_id):
         cdef:
             double best_bid_price = float("NaN")
             double best_ask_price = float("NaN")
 
+        self.c_prepare_mutation()
+        if self._use_fixed_point:
+            self.c_snap_to_grid(bids, True)
+            self.c_snap_to_grid(asks, True)
+
+        # A snapshot brings back the full depth of the order book.
+        self._bid_depth_truncated = self._ask_depth_truncated = False
+        self._bid_depth_limit_price = self._ask_depth_limit_price = float("NaN")
+
+        if self._use_tick_ladder:
+            self._bid_depth_index.clear()
+            self._ask_depth_index.clear()
+            self.c_apply_ladder_snapshot(bids, asks)
+            if self._max_depth > 0:
+                self.c_trim_depth()
+            self._snapshot_uid = update_id
+            if self._analytics_enabled:
+                self.c_update_analytics()
+            self.c_check_top_of_book(update_id)
+            self.c_notify_snapshot()
+            return
+
         # Start with an empty order book, and then insert all entries.
         self._bid_book.clear()
         self._ask_book.clear()
+        self._bid_depth_index.clear()
+        self._ask_depth_index.clear()
         for bid in bids:
-            self._bid_book.insert(bid)
+            if self._bid_book.insert(bid).second:
+                self._bid_depth_index.setAmount(bid.getPrice(), bid.getAmount())
             if not (bid.getPrice() <= best_bid_price):
                 best_bid_price = bid.getPrice()
         for ask in asks:
-            self._ask_book.insert(ask)
+            if self._ask_book.insert(ask).second:
+                self._ask_depth_index.setAmount(ask.getPrice(), ask.getAmount())
             if not (ask.getPrice() >= best_ask_price):
                 best_ask_price = ask.getPrice()
 
@@ -109,47 +347,788 @@ cdef class OrderBook(PubSub):
         self._best_bid = best_bid_price
         self._best_ask = best_ask_price
 
+        if self._max_depth > 0:
+            self.c_trim_depth()
+
         # Remember the last snapshot update ID.
         self._snapshot_uid = update_id
 
+        if self._analytics_enabled:
+            self.c_update_analytics()
+        self.c_check_top_of_book(update_id)
+        self.c_notify_snapshot()
+
+    cdef c_snap_to_grid(self, vector[OrderBookEntry] &entries, bint drop_empty):
+        """
+        Rounds the prices, and amounts if there is an amount grid, of the entries to the order book's fixed-point
+        grids. Entries whose amounts round to 0 are dropped if drop_empty is set, and become deletions otherwise.
+        """
+        cdef:
+            size_t i
+            size_t kept = 0
+            double amount
+
+        for i in range(entries.size()):
+            amount = entries[i].getAmount()
+            if self._use_fixed_point_amounts:
+                amount = self._amount_grid.snap(amount)
+            if drop_empty and not amount > 0:
+                continue
+            entries[kept] = OrderBookEntry(self._price_grid.snap(entries[i].getPrice()), amount,
+                                           entries[i].getUpdateId())
+            kept += 1
+        entries.resize(kept)
+
+    cdef double c_diff_level_key(self, double price):
+        """
+        Identifies the price level a diff entry is applied to - its price on the fixed-point grid, and then its tick on
+        the tick ladder - so entries whose raw prices differ but land on the same level can be merged.
+        """
+        if self._use_fixed_point:
+            price = self._price_grid.snap(price)
+        if self._use_tick_ladder:
+            price = <double>llround(price / self._bid_ladder.getTickSize())
+        return price
+
+    cdef int64_t c_price_to_ticks(self, double price) except? -1:
+        cdef int64_t ticks
+
+        if not self._use_fixed_point:
+            raise ValueError("The order book doesn't have a fixed-point price grid.")
+        if not self._price_grid.toTicks(price, ticks):
+            raise ValueError(f"{price} is out of the range of the fixed-point price grid.")
+        return ticks
+
+    cdef double c_ticks_to_price(self, int64_t ticks) except? -1:
+        if not self._use_fixed_point:
+            raise ValueError("The order book doesn't have a fixed-point price grid.")
+        return self._price_grid.fromTicks(ticks)
+
     cdef c_apply_trade(self, object trade_event):
+        cdef:
+            double price = trade_event.price
+            double amount = trade_event.amount
+            double log_return
+
+        if self._analytics_enabled:
+            if isnan(self._trade_volume_ewma):
+                self._trade_volume_ewma = amount
+                self._trade_variance_ewma = 0
+            else:
+                self._trade_volume_ewma += self._ewma_alpha * (amount - self._trade_volume_ewma)
+                if self._last_trade_price > 0 and price > 0:
+                    log_return = log(price / self._last_trade_price)
+                    self._trade_variance_ewma += self._ewma_alpha * (log_return * log_return -
+                                                                     self._trade_variance_ewma)
+            self._last_trade_price = price
+        if self._trade_tape is not None:
+            self._trade_tape.c_add_trade(trade_event.timestamp, trade_event.type is TradeType.BUY, price, amount)
         self.c_trigger_event(self.ORDER_BOOK_TRADE_EVENT_TAG, trade_event)
 
+    cdef size_t c_get_book_size(self, bint is_buy):
+        if self._use_tick_ladder:
+            return self._ask_ladder.size() if is_buy else self._bid_ladder.size()
+        return self._ask_book.size() if is_buy else self._bid_book.size()
+
+    cdef inline bint c_is_beyond_retained_depth(self, bint is_buy, double price):
+        """
+        Whether the price is at or beyond the first price level that has been trimmed away by the depth limit.
+        Order book data at such prices is incomplete, and so is not stored nor used for quotes.
+        """
+        if is_buy:
+            return self._ask_depth_truncated and price >= self._ask_depth_limit_price
+        return self._bid_depth_truncated and price <= self._bid_depth_limit_price
+
+    cdef c_check_retained_depth(self, bint is_buy, str request_description):
+        """
+        Raises an EnvironmentError if price levels have been trimmed away from the ask (is_buy) or bid book.
+        """
+        if self._ask_depth_truncated if is_buy else self._bid_depth_truncated:
+            raise EnvironmentError(f"{request_description} is beyond the {self._max_depth} price levels retained in "
+                                   f"the order book - no price quote is possible.")
+
+    cdef c_trim_depth(self):
+        """
+        Removes the price levels beyond max_depth from both sides of the order book.
+        """
+        cdef:
+            double first_removed_price = float("NaN")
+            set[OrderBookEntry].iterator it
+            OrderBookEntry entry
+
+        if self._use_tick_ladder:
+            first_removed_price = self._bid_ladder.truncateToDepth(self._max_depth)
+        else:
+            while self._bid_book.size() > self._max_depth:
+                it = self._bid_book.begin()
+                entry = deref(it)
+                first_removed_price = entry.getPrice()
+                self._bid_book.erase(it)
+        if not isnan(first_removed_price):
+            self._bid_depth_index.eraseLessThan(first_removed_price, True)
+            self._bid_depth_truncated = True
+            self._bid_depth_limit_price = first_removed_price
+
+        first_removed_price = float("NaN")
+        if self._use_tick_ladder:
+            first_removed_price = self._ask_ladder.truncateToDepth(self._max_depth)
+        else:
+            while self._ask_book.size() > self._max_depth:
+                it = self._ask_book.end()
+                dec(it)
+                entry = deref(it)
+                first_removed_price = entry.getPrice()
+                self._ask_book.erase(it)
+        if not isnan(first_removed_price):
+            self._ask_depth_index.eraseGreaterThan(first_removed_price, True)
+            self._ask_depth_truncated = True
+            self._ask_depth_limit_price = first_removed_price
+
+    cdef c_prepare_mutation(self):
+        """
+        Called before every change to the order book's price levels. Bumps the version number, and hands a private
+        copy of the current price levels to any frozen views that were still sharing them with this order book.
+
+        The copy is O(n) in the number of price levels, so a book that is frozen between every pair of diffs pays it
+        on every diff - see test/benchmark_order_book.py for how it compares with a diff and with a snapshot copy.
+        """
+        cdef:
+            FrozenOrderBook frozen_view
+
+        for view_ref in self._frozen_views:
+            frozen_view = view_ref()
+            if frozen_view is not None:
+                frozen_view.c_materialize()
+        self._frozen_views.clear()
+        self._version += 1
+
+    cdef c_add_level_listener(self, OrderBookLevelListener listener):
+        """
+        Registers a listener to be called with every change to the order book's price levels. Unlike event listeners,
+        level listeners are strongly referenced, and are called with the C++ diff vectors directly.
+        """
+        if listener not in self._level_listeners:
+            self._level_listeners.append(listener)
+
+    cdef c_remove_level_listener(self, OrderBookLevelListener listener):
+        if listener in self._level_listeners:
+            self._level_listeners.remove(listener)
+
+    cdef c_notify_snapshot(self):
+        for listener in self._level_listeners:
+            (<OrderBookLevelListener>listener).c_on_snapshot(self)
+
     @property
-    def snapshot_uid(self) -> int:
-        return self._snapshot_uid
+    def version(self) -> int:
+        """
+        A counter that is incremented on every change to the order book's price levels. Values derived from the order
+        book can be cached for as long as the version stays the same.
+        """
+        return self._version
+
+    def freeze(self) -> "FrozenOrderBook":
+        """
+        Returns a read-only view of the order book at its current version, for running several queries against one
+        consistent state.
+
+        The view shares the price levels with this order book, so freezing is cheap. They are only copied into the
+        view if this order book changes while the view is still alive. Freezing again before the next change returns
+        the same view.
+
+        That copy costs more than a snapshot_arrays() call - the sets and depth indices are copied node by node - so
+        views should be released once their queries are done. To keep a consistent state across updates, take a
+        snapshot instead.
+        """
+        cdef:
+            FrozenOrderBook frozen_view
+
+        if len(self._frozen_views) > 0:
+            frozen_view = self._frozen_views[-1]()
+            if frozen_view is not None:
+                return frozen_view
+        frozen_view = FrozenOrderBook(self)
+        self._frozen_views.append(weakref.ref(frozen_view))
+        return frozen_view
+
+    def set_max_depth(self, max_depth: Optional[int]):
+        """
+        Only keep the top max_depth price levels on each side of the order book, or all of them if max_depth is None
+        or 0.
+
+        Once price levels have been trimmed from a side, depth queries that need levels at or beyond the first
+        trimmed price raise an EnvironmentError - rather than quoting from an incomplete order book - until the next
+        snapshot.
+        """
+        if max_depth is not None and max_depth < 0:
+            raise ValueError(f"max_depth must not be negative, got {max_depth}.")
+        self.c_prepare_mutation()
+        self._max_depth = max_depth or 0
+        if self._max_depth > 0:
+            self.c_trim_depth()
+            if self._analytics_enabled:
+                self.c_update_analytics()
+            self.c_notify_snapshot()
 
     @property
-    def last_diff_uid(self) -> int:
-        return self._last_diff_uid
+    def max_depth(self) -> Optional[int]:
+        return self._max_depth if self._max_depth > 0 else None
 
     @property
-    def snapshot(self) -> Tuple[pd.DataFrame, pd.DataFrame]:
-        bids_rows = list(self.bid_entries())
-        asks_rows = list(self.ask_entries())
-        bids_df = pd.DataFrame(data=bids_rows, columns=OrderBookRow._fields, dtype="float64")
-        asks_df = pd.DataFrame(data=asks_rows, columns=OrderBookRow._fields, dtype="float64")
-        return bids_df, asks_df
+    def bid_depth_truncated(self) -> bool:
+        return self._bid_depth_truncated
+
+    @property
+    def ask_depth_truncated(self) -> bool:
+        return self._ask_depth_truncated
+
+    @property
+    def memory_usage(self) -> Dict[str, int]:
+        """
+        Estimated memory used by the order book's price level storage and depth indices, in bytes.
+        """
+        cdef:
+            size_t bid_storage_bytes
+            size_t ask_storage_bytes
+        if self._use_tick_ladder:
+            bid_storage_bytes = self._bid_ladder.getMemoryUsage()
+            ask_storage_bytes = self._ask_ladder.getMemoryUsage()
+        else:
+            bid_storage_bytes = self._bid_book.size() * (sizeof(OrderBookEntry) + SET_NODE_OVERHEAD_BYTES)
+            ask_storage_bytes = self._ask_book.size() * (sizeof(OrderBookEntry) + SET_NODE_OVERHEAD_BYTES)
+        return {
+            "bid_levels": self.c_get_book_size(False),
+            "ask_levels": self.c_get_book_size(True),
+            "bid_storage_bytes": bid_storage_bytes,
+            "ask_storage_bytes": ask_storage_bytes,
+            "bid_index_bytes": self._bid_depth_index.getMemoryUsage(),
+            "ask_index_bytes": self._ask_depth_index.getMemoryUsage(),
+            "total_bytes": (bid_storage_bytes + ask_storage_bytes + self._bid_depth_index.getMemoryUsage() +
+                            self._ask_depth_index.getMemoryUsage())
+        }
+
+    cdef OrderBookEntry c_get_top_entry(self, bint is_buy):
+        """
+        Returns the best ask (is_buy) or bid price level, or an entry with 0 amount if that side is empty.
+        """
+        cdef:
+            OrderBookTickLadder *ladder = ref(self._ask_ladder) if is_buy else ref(self._bid_ladder)
+            OrderBookEntry empty_entry
+        if self._use_tick_ladder:
+            if deref(ladder).getBestIndex() < 0:
+                return empty_entry
+            return deref(ladder).getEntry(deref(ladder).getBestIndex())
+        if is_buy:
+            return deref(self._ask_book.begin()) if self._ask_book.size() > 0 else empty_entry
+        return deref(self._bid_book.rbegin()) if self._bid_book.size() > 0 else empty_entry
+
+    cdef c_check_top_of_book(self, int64_t update_id):
+        """
+        Emits a TopOfBookChanged event if the best bid or ask moved from the last reported one, by at least the
+        configured price or size thresholds.
+        """
+        cdef:
+            OrderBookEntry top_bid = self.c_get_top_entry(False)
+            OrderBookEntry top_ask = self.c_get_top_entry(True)
+            double bid_price = top_bid.getPrice() if top_bid.getAmount() > 0 else float("NaN")
+            double ask_price = top_ask.getPrice() if top_ask.getAmount() > 0 else float("NaN")
+            double bid_amount = top_bid.getAmount()
+            double ask_amount = top_ask.getAmount()
+
+        if not (_top_of_book_value_changed(self._top_bid_price, bid_price, self._top_of_book_min_price_change) or
+                _top_of_book_value_changed(self._top_ask_price, ask_price, self._top_of_book_min_price_change) or
+                _top_of_book_value_changed(self._top_bid_amount, bid_amount, self._top_of_book_min_size_change) or
+                _top_of_book_value_changed(self._top_ask_amount, ask_amount, self._top_of_book_min_size_change)):
+            return
+
+        event = OrderBookTopOfBookChangedEvent(time.time(), update_id,
+                                               self._top_bid_price, self._top_bid_amount,
+                                               self._top_ask_price, self._top_ask_amount,
+                                               bid_price, bid_amount,
+                                               ask_price, ask_amount)
+        self._top_bid_price = bid_price
+        self._top_bid_amount = bid_amount
+        self._top_ask_price = ask_price
+        self._top_ask_amount = ask_amount
+        self.c_trigger_event(self.ORDER_BOOK_TOP_OF_BOOK_CHANGED_EVENT_TAG, event)
+
+    cdef double c_get_top_levels_volume(self, bint is_buy, size_t depth):
+        """
+        Total amount over the top `depth` price levels of the ask (is_buy) or bid book.
+        """
+        cdef:
+            set[OrderBookEntry].iterator ask_it = self._ask_book.begin()
+            set[OrderBookEntry].reverse_iterator bid_it = self._bid_book.rbegin()
+            OrderBookTickLadder *ladder = ref(self._ask_ladder) if is_buy else ref(self._bid_ladder)
+            OrderBookEntry entry
+            int64_t index
+            size_t levels = 0
+            double volume = 0
+
+        if self._use_tick_ladder:
+            index = deref(ladder).getBestIndex()
+            while index >= 0 and levels < depth:
+                volume += deref(ladder).getEntry(index).getAmount()
+                levels += 1
+                index = deref(ladder).getNextIndex(index)
+        elif is_buy:
+            while ask_it != self._ask_book.end() and levels < depth:
+                entry = deref(ask_it)
+                volume += entry.getAmount()
+                levels += 1
+                inc(ask_it)
+        else:
+            while bid_it != self._bid_book.rend() and levels < depth:
+                entry = deref(bid_it)
+                volume += entry.getAmount()
+                levels += 1
+                inc(bid_it)
+        return volume
+
+    cdef c_reset_analytics(self):
+        self._mid_price = self._spread = self._imbalance = self._microprice = float("NaN")
+        self._trade_volume_ewma = self._trade_variance_ewma = self._last_trade_price = float("NaN")
+
+    cdef c_update_analytics(self):
+        """
+        Refreshes the order book analytics after a change to the price levels. This only looks at the top
+        imbalance_depth levels of each side, so it costs the same regardless of the order book size.
+        """
+        cdef:
+            OrderBookEntry top_bid = self.c_get_top_entry(False)
+            OrderBookEntry top_ask = self.c_get_top_entry(True)
+            double bid_volume
+            double ask_volume
+
+        if top_bid.getAmount() > 0 and top_ask.getAmount() > 0:
+            self._mid_price = (top_bid.getPrice() + top_ask.getPrice()) / 2
+            self._spread = top_ask.getPrice() - top_bid.getPrice()
+            self._microprice = ((top_bid.getPrice() * top_ask.getAmount() + top_ask.getPrice() * top_bid.getAmount()) /
+                                (top_bid.getAmount() + top_ask.getAmount()))
+        else:
+            self._mid_price = self._spread = self._microprice = float("NaN")
+
+        bid_volume = self.c_get_top_levels_volume(False, self._imbalance_depth)
+        ask_volume = self.c_get_top_levels_volume(True, self._imbalance_depth)
+        if bid_volume + ask_volume > 0:
+            self._imbalance = (bid_volume - ask_volume) / (bid_volume + ask_volume)
+        else:
+            self._imbalance = float("NaN")
+
+    def enable_analytics(self, imbalance_depth: int = 5, ewma_alpha: float = 0.05):
+        """
+        Starts maintaining the mid price, spread, microprice, and the bid/ask volume imbalance over the top
+        imbalance_depth price levels - plus exponentially weighted moving averages of the trade amounts and of the
+        squared log returns between trade prices, which give every new trade a weight of ewma_alpha.
+
+        The analytics are updated as diffs, snapshots and trades are applied, and are read in constant time from the
+        analytics property or the individual properties. They're NaN while they can't be computed.
+        """
+        if imbalance_depth < 1:
+            raise ValueError(f"imbalance_depth must be positive, got {imbalance_depth}.")
+        if not 0 < ewma_alpha <= 1:
+            raise ValueError(f"ewma_alpha must be within (0, 1], got {ewma_alpha}.")
+        self._analytics_enabled = True
+        self._imbalance_depth = imbalance_depth
+        self._ewma_alpha = ewma_alpha
+        self.c_reset_analytics()
+        self.c_update_analytics()
+
+    def disable_analytics(self):
+        self._analytics_enabled = False
+        self.c_reset_analytics()
+
+    @property
+    def analytics_enabled(self) -> bool:
+        return self._analytics_enabled
+
+    @property
+    def mid_price(self) -> float:
+        return self._mid_price
+
+    @property
+    def spread(self) -> float:
+        return self._spread
+
+    @property
+    def imbalance(self) -> float:
+        """
+        (bid volume - ask volume) / (bid volume + ask volume) over the top imbalance_depth price levels, from -1 (only
+        asks) to 1 (only bids).
+        """
+        return self._imbalance
+
+    @property
+    def microprice(self) -> float:
+        """
+        The best bid and ask prices weighted by the size on the opposite side of the book.
+        """
+        return self._microprice
+
+    @property
+    def trade_volume_ewma(self) -> float:
+        return self._trade_volume_ewma
+
+    @property
+    def trade_volatility_ewma(self) -> float:
+        """
+        Square root of the moving average of squared log returns between consecutive trade prices.
+        """
+        return sqrt(self._trade_variance_ewma)
+
+    @property
+    def analytics(self) -> Dict[str, float]:
+        return {
+            "mid_price": self._mid_price,
+            "spread": self._spread,
+            "imbalance": self._imbalance,
+            "microprice": self._microprice,
+            "trade_volume_ewma": self._trade_volume_ewma,
+            "trade_volatility_ewma": sqrt(self._trade_variance_ewma)
+        }
+
+    def enable_trade_tape(self, capacity: int = 4096, windows: Tuple[float, ...] = (60.0, 300.0)):
+        """
+        Starts recording the trades applied to the order book into a TradeTape, which keeps the rolling VWAP, buy /
+        sell volume and trade counts over the given time windows. This replaces any previous trade tape.
+        """
+        self._trade_tape = TradeTape(capacity, windows)
+
+    def disable_trade_tape(self):
+        self._trade_tape = None
+
+    @property
+    def trade_tape(self) -> Optional[TradeTape]:
+        return self._trade_tape
+
+    def set_top_of_book_thresholds(self, min_price_change: float = 0.0, min_size_change: float = 0.0):
+        """
+        Only emit TopOfBookChanged events when the best bid or ask price moved by at least min_price_change, or
+        their sizes changed by at least min_size_change, since the last event. A side becoming empty or non-empty
+        always counts as a change.
+        """
+        self._top_of_book_min_price_change = min_price_change
+        self._top_of_book_min_size_change = min_size_change
+
+    def use_tick_ladder(self, price_tick_size: float):
+        """
+        Switches the order book's storage to tick ladders, which map every price on the market's fixed price grid to
+        a slot in a contiguous array. Any existing price levels are carried over.
 
-    def apply_diffs(self, bids: List[OrderBookRow], asks: List[OrderBookRow], update_id: int):
+        This makes applying diffs a direct array write rather than a tree search, at the cost of memory proportional
+        to the price range covered by the order book rather than the number of price levels.
+        """
         cdef:
             vector[OrderBookEntry] cpp_bids
             vector[OrderBookEntry] cpp_asks
-        for row in bids:
+
+        if not price_tick_size > 0:
+            raise ValueError(f"price_tick_size must be positive, got {price_tick_size}.")
+        for row in self.bid_entries():
             cpp_bids.push_back(OrderBookEntry(row.price, row.amount, row.update_id))
-        for row in asks:
+        for row in self.ask_entries():
             cpp_asks.push_back(OrderBookEntry(row.price, row.amount, row.update_id))
-        self.c_apply_diffs(cpp_bids, cpp_asks, update_id)
 
-    def apply_snapshot(self, bids: List[OrderBookRow], asks: List[OrderBookRow], update_id: int):
+        self.c_prepare_mutation()
+        self._bid_book.clear()
+        self._ask_book.clear()
+        self._bid_ladder = OrderBookTickLadder(price_tick_size, True)
+        self._ask_ladder = OrderBookTickLadder(price_tick_size, False)
+        self._use_tick_ladder = True
+        self.c_apply_snapshot(cpp_bids, cpp_asks, self._snapshot_uid)
+
+    @property
+    def price_tick_size(self) -> float:
+        """
+        The tick size used by the tick ladder storage, or NaN if the order book is stored as price level sets.
+        """
+        return self._bid_ladder.getTickSize() if self._use_tick_ladder else float("NaN")
+
+    def use_fixed_point(self, price_tick_size, amount_lot_size = None):
+        """
+        Rounds the prices of all price levels to the market's price tick size, and their amounts to its amount lot size
+        if one is given, on integer fixed-point grids. The sizes can be Decimals, strings or floats. Any existing price
+        levels are rounded as well.
+
+        Every price on the grid is stored as the double nearest to its decimal value, so a price level is always found
+        by the exact same price, regardless of how the exchange formatted it. price_to_ticks() and ticks_to_price()
+        convert between prices and integer ticks of the grid.
+        """
         cdef:
             vector[OrderBookEntry] cpp_bids
             vector[OrderBookEntry] cpp_asks
-        for row in bids:
+
+        self._price_grid = c_fixed_point_grid(price_tick_size)
+        if amount_lot_size is not None:
+            self._amount_grid = c_fixed_point_grid(amount_lot_size)
+        for row in self.bid_entries():
             cpp_bids.push_back(OrderBookEntry(row.price, row.amount, row.update_id))
-        for row in asks:
+        for row in self.ask_entries():
             cpp_asks.push_back(OrderBookEntry(row.price, row.amount, row.update_id))
-        self.c_apply_snapshot(cpp_bids, cpp_asks, update_id)
+
+        self._use_fixed_point = True
+        self._use_fixed_point_amounts = amount_lot_size is not None
+        self.c_apply_snapshot(cpp_bids, cpp_asks, self._snapshot_uid)
+
+    @property
+    def fixed_point_tick_size(self) -> float:
+        """
+        The tick size of the fixed-point price grid, or NaN if the order book doesn't use one.
+        """
+        return self._price_grid.fromTicks(1) if self._use_fixed_point else float("NaN")
+
+    @property
+    def fixed_point_lot_size(self) -> float:
+        """
+        The lot size of the fixed-point amount grid, or NaN if the order book doesn't use one.
+        """
+        return self._amount_grid.fromTicks(1) if self._use_fixed_point_amounts else float("NaN")
+
+    def price_to_ticks(self, price: float) -> int:
+        """
+        Converts a price to the nearest integer tick of the fixed-point price grid, rounding half to even.
+        """
+        return self.c_price_to_ticks(price)
+
+    def ticks_to_price(self, ticks: int) -> float:
+        return self.c_ticks_to_price(ticks)
+
+    @property
+    def snapshot_uid(self) -> int:
+        return self._snapshot_uid
+
+    @property
+    def last_diff_uid(self) -> int:
+        return self._last_diff_uid
+
+    @property
+    def snapshot(self) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        bids_array, asks_array = self.snapshot_arrays()
+        bids_df = pd.DataFrame(data=bids_array, columns=OrderBookRow._fields, dtype="float64")
+        asks_df = pd.DataFrame(data=asks_array, columns=OrderBookRow._fields, dtype="float64")
+        return bids_df, asks_df
+
+    def snapshot_arrays(self,
+                        depth: Optional[int] = None,
+                        bids_array: Optional[np.ndarray] = None,
+                        asks_array: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the bid and ask books as 2D float64 arrays with 3 columns, [price, amount, update_id], from the best
+        price level downwards.
+
+        If depth is given, only the top `depth` levels of each side are returned. If bids_array or asks_array are
+        given, the levels are written into them instead of newly allocated arrays - the depth is then also limited
+        by the number of rows in the buffers. The returned arrays are views into the buffers, covering only the rows
+        that were filled.
+        """
+        cdef:
+            size_t max_depth
+            size_t bids_filled
+            size_t asks_filled
+
+        if depth is not None and depth < 0:
+            raise ValueError(f"depth must not be negative, got {depth}.")
+        if bids_array is None:
+            max_depth = self.c_get_book_size(False) if depth is None else min(depth, self.c_get_book_size(False))
+            bids_array = np.empty((max_depth, 3), dtype="float64")
+        if asks_array is None:
+            max_depth = self.c_get_book_size(True) if depth is None else min(depth, self.c_get_book_size(True))
+            asks_array = np.empty((max_depth, 3), dtype="float64")
+
+        bids_filled = self.c_fill_snapshot_array(False, bids_array, bids_array.shape[0] if depth is None
+                                                 else min(depth, bids_array.shape[0]), INFINITY)
+        asks_filled = self.c_fill_snapshot_array(True, asks_array, asks_array.shape[0] if depth is None
+                                                 else min(depth, asks_array.shape[0]), INFINITY)
+        return bids_array[:bids_filled], asks_array[:asks_filled]
+
+    cdef size_t c_fill_snapshot_array(self,
+                                      bint is_buy,
+                                      np.float64_t[:, :] output,
+                                      size_t depth,
+                                      double max_volume) except? 0:
+        """
+        Writes up to `depth` price levels from the top of the ask (is_buy) or bid book into `output`, stopping early
+        once the levels written add up to max_volume.
+
+        Returns the number of rows written.
+        """
+        cdef:
+            double cumulative_volume = 0
+            set[OrderBookEntry].iterator ask_it = self._ask_book.begin()
+            set[OrderBookEntry].reverse_iterator bid_it = self._bid_book.rbegin()
+            OrderBookTickLadder *ladder = ref(self._ask_ladder) if is_buy else ref(self._bid_ladder)
+            OrderBookEntry entry
+            int64_t index
+            size_t filled = 0
+
+        if output.shape[1] != 3:
+            raise ValueError(f"Snapshot arrays must have 3 columns, [price, amount, update_id], got "
+                             f"{output.shape[1]} columns.")
+        if self._use_tick_ladder:
+            index = deref(ladder).getBestIndex()
+            while index >= 0 and filled < depth and cumulative_volume < max_volume:
+                entry = deref(ladder).getEntry(index)
+                output[filled, 0] = entry.getPrice()
+                output[filled, 1] = entry.getAmount()
+                output[filled, 2] = entry.getUpdateId()
+                cumulative_volume += entry.getAmount()
+                filled += 1
+                index = deref(ladder).getNextIndex(index)
+        elif is_buy:
+            while ask_it != self._ask_book.end() and filled < depth and cumulative_volume < max_volume:
+                entry = deref(ask_it)
+                output[filled, 0] = entry.getPrice()
+                output[filled, 1] = entry.getAmount()
+                output[filled, 2] = entry.getUpdateId()
+                cumulative_volume += entry.getAmount()
+                filled += 1
+                inc(ask_it)
+        else:
+            while bid_it != self._bid_book.rend() and filled < depth and cumulative_volume < max_volume:
+                entry = deref(bid_it)
+                output[filled, 0] = entry.getPrice()
+                output[filled, 1] = entry.getAmount()
+                output[filled, 2] = entry.getUpdateId()
+                cumulative_volume += entry.getAmount()
+                filled += 1
+                inc(bid_it)
+        return filled
+
+    def to_bytes(self) -> bytes:
+        """
+        Serializes the order book into a compact fixed width binary layout. See ORDER_BOOK_BYTES_HEADER.
+        """
+        cdef:
+            int flags = 0
+
+        bids_array, asks_array = self.snapshot_arrays()
+        if self._use_tick_ladder:
+            flags |= ORDER_BOOK_BYTES_TICK_LADDER
+        if self._bid_depth_truncated:
+            flags |= ORDER_BOOK_BYTES_BID_DEPTH_TRUNCATED
+        if self._ask_depth_truncated:
+            flags |= ORDER_BOOK_BYTES_ASK_DEPTH_TRUNCATED
+        if self._use_fixed_point:
+            flags |= ORDER_BOOK_BYTES_FIXED_POINT
+        if self._use_fixed_point_amounts:
+            flags |= ORDER_BOOK_BYTES_FIXED_POINT_AMOUNTS
+        header = ORDER_BOOK_BYTES_HEADER.pack(ORDER_BOOK_BYTES_MAGIC, ORDER_BOOK_BYTES_VERSION, flags,
+                                              self._snapshot_uid, self._last_diff_uid,
+                                              len(bids_array), len(asks_array),
+                                              self.price_tick_size, self._max_depth,
+                                              self._bid_depth_limit_price, self._ask_depth_limit_price,
+                                              self.fixed_point_tick_size, self.fixed_point_lot_size)
+        return b"".join([header, bids_array.astype("<f8", copy=False).tobytes(),
+                         asks_array.astype("<f8", copy=False).tobytes()])
+
+    @classmethod
+    def from_bytes(cls, data) -> "OrderBook":
+        """
+        Creates an order book from the output of to_bytes(). `data` can be any object supporting the buffer protocol -
+        e.g. bytes, a memoryview, or a memory mapped file.
+        """
+        cdef:
+            OrderBook order_book = cls()
+            size_t header_size = ORDER_BOOK_BYTES_HEADER.size
+
+        if len(data) < header_size:
+            raise ValueError(f"Serialized order book is too short - expected at least {header_size} bytes, "
+                             f"got {len(data)}.")
+        (magic, format_version, flags, snapshot_uid, last_diff_uid, bid_levels, ask_levels, price_tick_size,
+         max_depth, bid_depth_limit_price, ask_depth_limit_price, fixed_point_tick_size,
+         fixed_point_lot_size) = ORDER_BOOK_BYTES_HEADER.unpack_from(data, 0)
+        if magic != ORDER_BOOK_BYTES_MAGIC:
+            raise ValueError(f"Invalid serialized order book magic bytes {magic}.")
+        if format_version != ORDER_BOOK_BYTES_VERSION:
+            raise ValueError(f"Unsupported serialized order book format version {format_version}.")
+        if len(data) < header_size + (bid_levels + ask_levels) * 3 * sizeof(np.float64_t):
+            raise ValueError(f"Serialized order book is truncated - expected {bid_levels} bid and {ask_levels} ask "
+                             f"levels, got {len(data)} bytes.")
+
+        bids_array = np.frombuffer(data, dtype="<f8", count=bid_levels * 3, offset=header_size)
+        asks_array = np.frombuffer(data, dtype="<f8", count=ask_levels * 3,
+                                   offset=header_size + bid_levels * 3 * sizeof(np.float64_t))
+        if flags & ORDER_BOOK_BYTES_TICK_LADDER:
+            order_book.use_tick_ladder(price_tick_size)
+        if flags & ORDER_BOOK_BYTES_FIXED_POINT:
+            # The sizes are stored as the doubles nearest to them, whose shortest reprs are the decimal sizes.
+            order_book.use_fixed_point(fixed_point_tick_size,
+                                       fixed_point_lot_size if flags & ORDER_BOOK_BYTES_FIXED_POINT_AMOUNTS else None)
+        order_book._max_depth = max_depth
+        order_book.c_apply_snapshot(_entries_from_array(bids_array.reshape((bid_levels, 3))),
+                                    _entries_from_array(asks_array.reshape((ask_levels, 3))),
+                                    snapshot_uid)
+        order_book._last_diff_uid = last_diff_uid
+        order_book._bid_depth_truncated = flags & ORDER_BOOK_BYTES_BID_DEPTH_TRUNCATED != 0
+        order_book._ask_depth_truncated = flags & ORDER_BOOK_BYTES_ASK_DEPTH_TRUNCATED != 0
+        order_book._bid_depth_limit_price = bid_depth_limit_price
+        order_book._ask_depth_limit_price = ask_depth_limit_price
+        return order_book
+
+    def apply_diffs(self,
+                    bids: Union[List[OrderBookRow], np.ndarray],
+                    asks: Union[List[OrderBookRow], np.ndarray],
+                    update_id: int):
+        """
+        The bids and asks are either lists of OrderBookRow, or (n, 3) float64 arrays of [price, amount, update_id]
+        rows - like OrderBookMessage.bids_array and asks_array.
+        """
+        self.c_apply_diffs(_entries_from_rows(bids), _entries_from_rows(asks), update_id)
+
+    def apply_diff_batch(self, messages: List[OrderBookMessage]) -> int:
+        """
+        Applies a batch of diff messages, in order, as if they were one diff.
+
+        The price levels from all messages are merged first, with the latest message winning for any price level, and
+        the merged levels are then applied in a single pass - so the overlap truncation and the best price refresh
+        only happen once for the whole batch. Levels are merged after the prices are snapped to the fixed-point grid or
+        tick ladder, like c_apply_diffs() does.
+
+        Returns the number of distinct price levels touched by the batch.
+        """
+        cdef:
+            unordered_map[double, OrderBookEntry] bid_updates
+            unordered_map[double, OrderBookEntry] ask_updates
+            unordered_map[double, OrderBookEntry].iterator it
+            vector[OrderBookEntry] cpp_bids
+            vector[OrderBookEntry] cpp_asks
+            const np.float64_t[:, :] price_levels
+            int64_t last_update_id = 0
+            size_t i
+
+        if len(messages) < 1:
+            return 0
+        for message in messages:
+            price_levels = message.bids_array
+            for i in range(price_levels.shape[0]):
+                bid_updates[self.c_diff_level_key(price_levels[i, 0])] = OrderBookEntry(
+                    price_levels[i, 0], price_levels[i, 1], <int64_t>price_levels[i, 2])
+            price_levels = message.asks_array
+            for i in range(price_levels.shape[0]):
+                ask_updates[self.c_diff_level_key(price_levels[i, 0])] = OrderBookEntry(
+                    price_levels[i, 0], price_levels[i, 1], <int64_t>price_levels[i, 2])
+            last_update_id = max(last_update_id, message.update_id)
+
+        cpp_bids.reserve(bid_updates.size())
+        cpp_asks.reserve(ask_updates.size())
+        it = bid_updates.begin()
+        while it != bid_updates.end():
+            cpp_bids.push_back(deref(it).second)
+            inc(it)
+        it = ask_updates.begin()
+        while it != ask_updates.end():
+            cpp_asks.push_back(deref(it).second)
+            inc(it)
+        self.c_apply_diffs(cpp_bids, cpp_asks, last_update_id)
+        return cpp_bids.size() + cpp_asks.size()
+
+    def apply_snapshot(self,
+                       bids: Union[List[OrderBookRow], np.ndarray],
+                       asks: Union[List[OrderBookRow], np.ndarray],
+                       update_id: int):
+        """
+        The bids and asks are either lists of OrderBookRow, or (n, 3) float64 arrays - see apply_diffs().
+        """
+        self.c_apply_snapshot(_entries_from_rows(bids), _entries_from_rows(asks), update_id)
 
     def apply_trade(self, trade: OrderBookTradeEvent):
         self.c_apply_trade(trade)
@@ -220,6 +1199,14 @@ cdef class OrderBook(PubSub):
         cdef:
             set[OrderBookEntry].reverse_iterator it = self._bid_book.rbegin()
             OrderBookEntry entry
+            int64_t index
+        if self._use_tick_ladder:
+            index = self._bid_ladder.getBestIndex()
+            while index >= 0:
+                entry = self._bid_ladder.getEntry(index)
+                yield OrderBookRow(entry.getPrice(), entry.getAmount(), entry.getUpdateId())
+                index = self._bid_ladder.getNextIndex(index)
+            return
         while it != self._bid_book.rend():
             entry = deref(it)
             yield OrderBookRow(entry.getPrice(), entry.getAmount(), entry.getUpdateId())
@@ -229,43 +1216,59 @@ cdef class OrderBook(PubSub):
         cdef:
             set[OrderBookEntry].iterator it = self._ask_book.begin()
             OrderBookEntry entry
+            int64_t index
+        if self._use_tick_ladder:
+            index = self._ask_ladder.getBestIndex()
+            while index >= 0:
+                entry = self._ask_ladder.getEntry(index)
+                yield OrderBookRow(entry.getPrice(), entry.getAmount(), entry.getUpdateId())
+                index = self._ask_ladder.getNextIndex(index)
+            return
         while it != self._ask_book.end():
             entry = deref(it)
             yield OrderBookRow(entry.getPrice(), entry.getAmount(), entry.getUpdateId())
             inc(it)
 
-    def simulate_buy(self, amount: float) -> List[OrderBookRow]:
-        amount_left = amount
-        retval = []
-        for ask_entry in self.ask_entries():
-            ask_entry = ask_entry
-            if ask_entry.amount < amount_left:
-                retval.append(ask_entry)
-                amount_left -= ask_entry.amount
-            else:
-                retval.append(OrderBookRow(ask_entry.price, amount_left, ask_entry.update_id))
-                amount_left = 0.0
-                break
-        return retval
-
-    def simulate_sell(self, amount: float) -> List[OrderBookRow]:
-        amount_left = amount
-        retval = []
-        for bid_entry in self.bid_entries():
-            bid_entry = bid_entry
-            if bid_entry.amount < amount_left:
-                retval.append(bid_entry)
-                amount_left -= bid_entry.amount
-            else:
-                retval.append(OrderBookRow(bid_entry.price, amount_left, bid_entry.update_id))
-                amount_left = 0.0
-                break
-        return retval
+    cdef size_t c_get_levels_for_volume(self, bint is_buy, double volume):
+        """
+        Number of price levels from the top of the ask (is_buy) or bid book that add up to at least `volume`, or the
+        whole book if they don't.
+        """
+        if is_buy:
+            return self._ask_depth_index.getLevelsForVolume(True, volume)
+        return self._bid_depth_index.getLevelsForVolume(False, volume)
 
-    cdef double c_get_price(self, bint is_buy) except? -1:
+    cdef np.ndarray c_simulate_fills(self, bint is_buy, double amount):
         cdef:
-            set[OrderBookEntry] *book = ref(self._ask_book) if is_buy else ref(self._bid_book)
-        if deref(book).size() < 1:
+            # One spare row, in case the index's subtree sums round differently from the walk over the levels.
+            size_t levels = min(self.c_get_levels_for_volume(is_buy, amount) + 1, self.c_get_book_size(is_buy))
+            np.ndarray[np.float64_t, ndim=2] fills = np.empty((levels, 3), dtype="float64")
+            size_t filled = self.c_fill_snapshot_array(is_buy, fills, levels, amount)
+            double filled_amount
+
+        fills = fills[:filled]
+        if filled > 0:
+            filled_amount = fills[:, 1].sum()
+            if filled_amount > amount:
+                fills[filled - 1, 1] -= filled_amount - amount
+        return fills
+
+    def simulate_buy(self, amount: float) -> np.ndarray:
+        """
+        Returns the price levels a market buy order of `amount` would fill against, as a float64 array with 3 columns,
+        [price, amount, update_id] - with the last row clipped to the amount remaining. If the ask book is not deep
+        enough, the whole ask book is returned.
+        """
+        return self.c_simulate_fills(True, amount)
+
+    def simulate_sell(self, amount: float) -> np.ndarray:
+        """
+        Same as simulate_buy(), against the bid book.
+        """
+        return self.c_simulate_fills(False, amount)
+
+    cdef double c_get_price(self, bint is_buy) except? -1:
+        if self.c_get_book_size(is_buy) < 1:
             raise EnvironmentError("Order book is empty - no price quote is possible.")
         return self._best_ask if is_buy else self._best_bid
 
@@ -274,57 +1277,74 @@ cdef class OrderBook(PubSub):
 
     cdef double c_get_price_for_volume(self, bint is_buy, double volume) except? -1:
         cdef:
-            double cumulative_volume = 0
-        if is_buy:
-            for order_book_row in self.ask_entries():
-                cumulative_volume += order_book_row.amount
-                if cumulative_volume >= volume:
-                    return order_book_row.price
-        else:
-            for order_book_row in self.bid_entries():
-                cumulative_volume += order_book_row.amount
-                if cumulative_volume >= volume:
-                    return order_book_row.price
+            OrderBookDepthIndex *depth_index = ref(self._ask_depth_index) if is_buy else ref(self._bid_depth_index)
+            double price
+        if deref(depth_index).getPriceForVolume(is_buy, volume, price):
+            return price
+        self.c_check_retained_depth(is_buy, f"Requested volume {volume}")
         raise EnvironmentError(f"Requested volume {volume} is beyond order book depth - no price quote is possible.")
 
     cdef double c_get_vwap_for_volume(self, bint is_buy, double volume) except? -1:
         cdef:
-            double total_cost  = 0
-            double total_volume = 0
-        if is_buy:
-            for order_book_row in self.ask_entries():
-                total_cost += order_book_row.amount * order_book_row.price
-                total_volume += order_book_row.amount
-                if total_volume >= volume:
-                    return total_cost/total_volume
-        else:
-            for order_book_row in self.bid_entries():
-                total_cost += order_book_row.amount * order_book_row.price
-                total_volume += order_book_row.amount
-                if total_volume >= volume:
-                    return total_cost/total_volume
+            OrderBookDepthIndex *depth_index = ref(self._ask_depth_index) if is_buy else ref(self._bid_depth_index)
+            double vwap
+        if deref(depth_index).getVWAPForVolume(is_buy, volume, vwap):
+            return vwap
+        self.c_check_retained_depth(is_buy, f"Requested volume {volume}")
         raise EnvironmentError(f"Requested volume {volume} is beyond order book depth - no price quote is "
                                f"possible")
 
     cdef double c_get_price_for_quote_volume(self, bint is_buy, double quote_volume) except? -1:
         cdef:
-            double cumulative_volume = 0
-        if is_buy:
-            for order_book_row in self.ask_entries():
-                cumulative_volume += order_book_row.amount * order_book_row.price
-                if cumulative_volume >= quote_volume:
-                    return order_book_row.price
-        else:
-            for order_book_row in self.bid_entries():
-                cumulative_volume += order_book_row.amount * order_book_row.price
-                if cumulative_volume >= quote_volume:
-                    return order_book_row.price
+            OrderBookDepthIndex *depth_index = ref(self._ask_depth_index) if is_buy else ref(self._bid_depth_index)
+            double price
+        if deref(depth_index).getPriceForQuoteVolume(is_buy, quote_volume, price):
+            return price
+        self.c_check_retained_depth(is_buy, f"Requested quote volume {quote_volume}")
         raise EnvironmentError(f"Requested quote volume {quote_volume} is beyond order book depth - no price quote is "
                                f"possible")
 
     def get_price_for_volume(self, is_buy: bool, volume: float) -> float:
         return self.c_get_price_for_volume(is_buy, volume)
 
+    cdef c_fill_depth_curve(self,
+                            bint is_buy,
+                            np.float64_t[:] sorted_volumes,
+                            np.float64_t[:] prices,
+                            np.float64_t[:] vwaps):
+        cdef:
+            OrderBookDepthIndex *depth_index = ref(self._ask_depth_index) if is_buy else ref(self._bid_depth_index)
+        if sorted_volumes.shape[0] > 0:
+            deref(depth_index).getDepthCurve(is_buy, &sorted_volumes[0], sorted_volumes.shape[0],
+                                             &prices[0], &vwaps[0])
+
+    def get_depth_curve(self, is_buy: bool, volumes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Vectorized get_price_for_volume() and get_vwap_for_volume(), computed for all the volumes together - in one
+        sweep from the top of the book, or with one O(log n) lookup per volume, whichever is cheaper.
+
+        Returns the prices and VWAPs arrays, in the same order as volumes. Volumes beyond the order book depth get NaN
+        prices and VWAPs, rather than raising an EnvironmentError.
+        """
+        cdef:
+            np.ndarray[np.float64_t, ndim=1] volumes_array = np.asarray(volumes, dtype="float64").ravel()
+            np.ndarray order = np.argsort(volumes_array, kind="stable")
+            np.ndarray[np.float64_t, ndim=1] sorted_prices = np.empty(len(volumes_array), dtype="float64")
+            np.ndarray[np.float64_t, ndim=1] sorted_vwaps = np.empty(len(volumes_array), dtype="float64")
+            np.ndarray[np.float64_t, ndim=1] prices = np.empty(len(volumes_array), dtype="float64")
+            np.ndarray[np.float64_t, ndim=1] vwaps = np.empty(len(volumes_array), dtype="float64")
+
+        self.c_fill_depth_curve(is_buy, np.ascontiguousarray(volumes_array[order]), sorted_prices, sorted_vwaps)
+        prices[order] = sorted_prices
+        vwaps[order] = sorted_vwaps
+        return prices, vwaps
+
+    def get_prices_for_volumes(self, is_buy: bool, volumes: np.ndarray) -> np.ndarray:
+        return self.get_depth_curve(is_buy, volumes)[0]
+
+    def get_vwaps_for_volumes(self, is_buy: bool, volumes: np.ndarray) -> np.ndarray:
+        return self.get_depth_curve(is_buy, volumes)[1]
+
     def get_vwap_for_volume(self, is_buy: bool, volume: float) -> float:
         return self.c_get_vwap_for_volume(is_buy, volume)
 
@@ -333,33 +1353,17 @@ cdef class OrderBook(PubSub):
 
     cdef double c_get_volume_for_price(self, bint is_buy, double price) except? -1:
         cdef:
-            double cumulative_volume = 0
-        if is_buy:
-            for order_book_row in self.ask_entries():
-                if order_book_row.price > price:
-                    return cumulative_volume
-                cumulative_volume += order_book_row.amount
-        else:
-            for order_book_row in self.bid_entries():
-                if order_book_row.price < price:
-                    return cumulative_volume
-                cumulative_volume += order_book_row.amount
-        return cumulative_volume
+            OrderBookDepthIndex *depth_index = ref(self._ask_depth_index) if is_buy else ref(self._bid_depth_index)
+        if self.c_is_beyond_retained_depth(is_buy, price):
+            self.c_check_retained_depth(is_buy, f"Requested price {price}")
+        return deref(depth_index).getVolumeForPrice(is_buy, price)
 
     cdef double c_get_quote_volume_for_price(self, bint is_buy, double price) except? -1:
         cdef:
-            double cumulative_volume = 0
-        if is_buy:
-            for order_book_row in self.ask_entries():
-                if order_book_row.price > price:
-                    return cumulative_volume
-                cumulative_volume += order_book_row.amount * order_book_row.price
-        else:
-            for order_book_row in self.bid_entries():
-                if order_book_row.price < price:
-                    return cumulative_volume
-                cumulative_volume += order_book_row.amount * order_book_row.price
-        return cumulative_volume
+            OrderBookDepthIndex *depth_index = ref(self._ask_depth_index) if is_buy else ref(self._bid_depth_index)
+        if self.c_is_beyond_retained_depth(is_buy, price):
+            self.c_check_retained_depth(is_buy, f"Requested price {price}")
+        return deref(depth_index).getQuoteVolumeForPrice(is_buy, price)
 
     def get_volume_for_price(self, bint is_buy, double price) -> float:
         return self.c_get_volume_for_price(is_buy, price)
@@ -390,7 +1394,182 @@ cdef class OrderBook(PubSub):
     def restore_from_snapshot_and_diffs(self, snapshot: OrderBookMessage, diffs: List[OrderBookMessage]):
         replay_position = bisect.bisect_right(diffs, snapshot)
         replay_diffs = diffs[replay_position:]
-        self.apply_snapshot(snapshot.bids, snapshot.asks, snapshot.update_id)
+        self.apply_snapshot(snapshot.bids_array, snapshot.asks_array, snapshot.update_id)
         for diff in replay_diffs:
-            self.apply_diffs(diff.bids, diff.asks, diff.update_id)
+            self.apply_diffs(diff.bids_array, diff.asks_array, diff.update_id)
+
+
 
+cdef class FrozenOrderBook(OrderBook):
+    """
+    A read-only view of an order book at a fixed version, returned by OrderBook.freeze().
+
+    Queries are answered from the source order book's price levels for as long as it stays at the frozen version.
+    The source copies its price levels into the view right before its next change, after which the view answers from
+    its own copy.
+    """
+    def __init__(self, OrderBook source):
+        super().__init__()
+        self._source = source
+        self._use_tick_ladder = source._use_tick_ladder
+        self._use_fixed_point = source._use_fixed_point
+        self._use_fixed_point_amounts = source._use_fixed_point_amounts
+        self._price_grid = source._price_grid
+        self._amount_grid = source._amount_grid
+        self._snapshot_uid = source._snapshot_uid
+        self._last_diff_uid = source._last_diff_uid
+        self._best_bid = source._best_bid
+        self._best_ask = source._best_ask
+        self._max_depth = source._max_depth
+        self._bid_depth_truncated = source._bid_depth_truncated
+        self._ask_depth_truncated = source._ask_depth_truncated
+        self._bid_depth_limit_price = source._bid_depth_limit_price
+        self._ask_depth_limit_price = source._ask_depth_limit_price
+        self._version = source._version
+        self._analytics_enabled = source._analytics_enabled
+        self._imbalance_depth = source._imbalance_depth
+        self._ewma_alpha = source._ewma_alpha
+        self._mid_price = source._mid_price
+        self._spread = source._spread
+        self._imbalance = source._imbalance
+        self._microprice = source._microprice
+        self._trade_volume_ewma = source._trade_volume_ewma
+        self._trade_variance_ewma = source._trade_variance_ewma
+        self._last_trade_price = source._last_trade_price
+
+    cdef c_materialize(self):
+        if self._source is None:
+            return
+        self._bid_book = self._source._bid_book
+        self._ask_book = self._source._ask_book
+        self._bid_depth_index = self._source._bid_depth_index
+        self._ask_depth_index = self._source._ask_depth_index
+        self._bid_ladder = self._source._bid_ladder
+        self._ask_ladder = self._source._ask_ladder
+        self._source = None
+
+    @property
+    def is_shared(self) -> bool:
+        """
+        Whether the view still shares its price levels with the source order book, rather than holding a copy.
+        """
+        return self._source is not None
+
+    cdef c_prepare_mutation(self):
+        raise TypeError("Frozen order books are read-only.")
+
+    cdef c_apply_diffs(self, vector[OrderBookEntry] bids, vector[OrderBookEntry] asks, int64_t update_id):
+        self.c_prepare_mutation()
+
+    cdef c_apply_snapshot(self, vector[OrderBookEntry] bids, vector[OrderBookEntry] asks, int64_t update_id):
+        self.c_prepare_mutation()
+
+    cdef c_apply_trade(self, object trade_event):
+        self.c_prepare_mutation()
+
+    def set_max_depth(self, max_depth: Optional[int]):
+        self.c_prepare_mutation()
+
+    def use_tick_ladder(self, price_tick_size: float):
+        self.c_prepare_mutation()
+
+    def use_fixed_point(self, price_tick_size, amount_lot_size = None):
+        self.c_prepare_mutation()
+
+    def enable_analytics(self, imbalance_depth: int = 5, ewma_alpha: float = 0.05):
+        self.c_prepare_mutation()
+
+    def disable_analytics(self):
+        self.c_prepare_mutation()
+
+    def enable_trade_tape(self, capacity: int = 4096, windows: Tuple[float, ...] = (60.0, 300.0)):
+        self.c_prepare_mutation()
+
+    def disable_trade_tape(self):
+        self.c_prepare_mutation()
+
+    def set_top_of_book_thresholds(self, min_price_change: float = 0.0, min_size_change: float = 0.0):
+        self.c_prepare_mutation()
+
+    def freeze(self) -> "FrozenOrderBook":
+        return self
+
+    @property
+    def memory_usage(self) -> Dict[str, int]:
+        if self._source is not None:
+            return self._source.memory_usage
+        return OrderBook.memory_usage.__get__(self)
+
+    cdef size_t c_get_book_size(self, bint is_buy):
+        if self._source is not None:
+            return self._source.c_get_book_size(is_buy)
+        return OrderBook.c_get_book_size(self, is_buy)
+
+    cdef size_t c_get_levels_for_volume(self, bint is_buy, double volume):
+        if self._source is not None:
+            return self._source.c_get_levels_for_volume(is_buy, volume)
+        return OrderBook.c_get_levels_for_volume(self, is_buy, volume)
+
+    cdef OrderBookEntry c_get_top_entry(self, bint is_buy):
+        if self._source is not None:
+            return self._source.c_get_top_entry(is_buy)
+        return OrderBook.c_get_top_entry(self, is_buy)
+
+    cdef double c_get_top_levels_volume(self, bint is_buy, size_t depth):
+        if self._source is not None:
+            return self._source.c_get_top_levels_volume(is_buy, depth)
+        return OrderBook.c_get_top_levels_volume(self, is_buy, depth)
+
+    cdef size_t c_fill_snapshot_array(self,
+                                      bint is_buy,
+                                      np.float64_t[:, :] output,
+                                      size_t depth,
+                                      double max_volume) except? 0:
+        if self._source is not None:
+            return self._source.c_fill_snapshot_array(is_buy, output, depth, max_volume)
+        return OrderBook.c_fill_snapshot_array(self, is_buy, output, depth, max_volume)
+
+    cdef c_fill_depth_curve(self,
+                            bint is_buy,
+                            np.float64_t[:] sorted_volumes,
+                            np.float64_t[:] prices,
+                            np.float64_t[:] vwaps):
+        if self._source is not None:
+            return self._source.c_fill_depth_curve(is_buy, sorted_volumes, prices, vwaps)
+        return OrderBook.c_fill_depth_curve(self, is_buy, sorted_volumes, prices, vwaps)
+
+    def bid_entries(self) -> Iterator[OrderBookRow]:
+        # The rows are read eagerly while shared, since the source may change before a generator is exhausted.
+        if self._source is not None:
+            return iter(list(self._source.bid_entries()))
+        return OrderBook.bid_entries(self)
+
+    def ask_entries(self) -> Iterator[OrderBookRow]:
+        if self._source is not None:
+            return iter(list(self._source.ask_entries()))
+        return OrderBook.ask_entries(self)
+
+    cdef double c_get_price_for_volume(self, bint is_buy, double volume) except? -1:
+        if self._source is not None:
+            return self._source.c_get_price_for_volume(is_buy, volume)
+        return OrderBook.c_get_price_for_volume(self, is_buy, volume)
+
+    cdef double c_get_vwap_for_volume(self, bint is_buy, double volume) except? -1:
+        if self._source is not None:
+            return self._source.c_get_vwap_for_volume(is_buy, volume)
+        return OrderBook.c_get_vwap_for_volume(self, is_buy, volume)
+
+    cdef double c_get_price_for_quote_volume(self, bint is_buy, double quote_volume) except? -1:
+        if self._source is not None:
+            return self._source.c_get_price_for_quote_volume(is_buy, quote_volume)
+        return OrderBook.c_get_price_for_quote_volume(self, is_buy, quote_volume)
+
+    cdef double c_get_volume_for_price(self, bint is_buy, double price) except? -1:
+        if self._source is not None:
+            return self._source.c_get_volume_for_price(is_buy, price)
+        return OrderBook.c_get_volume_for_price(self, is_buy, price)
+
+    cdef double c_get_quote_volume_for_price(self, bint is_buy, double price) except? -1:
+        if self._source is not None:
+            return self._source.c_get_quote_volume_for_price(is_buy, price)
+        return OrderBook.c_get_quote_volume_for_price(self, is_buy, price)
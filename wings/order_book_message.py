@@ -1,10 +1,12 @@
 #!/usr/bin/env python
 
-from collections import namedtuple
 from enum import Enum
 from functools import total_ordering
+import numpy as np
 import pandas as pd
+import time
 from typing import (
+    Callable,
     Optional,
     List,
     Dict
@@ -13,21 +15,81 @@ from typing import (
 from wings.order_book_row import OrderBookRow
 
 
+def clock_ns(clock: Callable[[], float] = time.monotonic) -> int:
+    """
+    Reads a clock in seconds - time.monotonic() by default, or e.g. time.time() - as integer nanoseconds. This stands in
+    for time.monotonic_ns() and time.time_ns(), which need Python 3.7.
+    """
+    return int(clock() * 1e9)
+
+
 class OrderBookMessageType(Enum):
     SNAPSHOT = 1
     DIFF = 2
     TRADE = 3
 
 
+def _price_levels_to_array(price_levels: List[List[any]], update_id: int) -> np.ndarray:
+    """
+    Parses the [price, amount, ...] price levels of an exchange message into an (n, 3) float64 array of
+    [price, amount, update_id] rows.
+
+    Messages decoded by DepthMessageDecoder already hold their price levels as such arrays, which are returned as is.
+    """
+    if isinstance(price_levels, np.ndarray):
+        return price_levels
+    array: np.ndarray = np.empty((len(price_levels), 3), dtype="float64")
+    # NumPy parses the price and amount strings itself when assigning whole columns, which is faster than float().
+    array[:, 0] = [price_level[0] for price_level in price_levels]
+    array[:, 1] = [price_level[1] for price_level in price_levels]
+    array[:, 2] = update_id
+    return array
+
+
 @total_ordering
-class OrderBookMessage(namedtuple("_OrderBookMessage", "type, content, timestamp")):
+class OrderBookMessage:
+    """
+    An order book snapshot, diff or trade message, holding the exchange's message content as is.
+
+    The price levels of snapshot and diff messages are parsed on first access into float64 arrays, which are cached -
+    see bids_array and asks_array.
+
+    For feed latency stats, messages also carry their exchange event time as nanoseconds since the epoch (-1 if the
+    exchange doesn't publish it), the time they were received - i.e. created - and the time they were applied to their
+    order book, both from clock_ns() (-1 if not applied yet).
+    """
+    __slots__ = ("type", "content", "timestamp", "_bids_array", "_asks_array",
+                 "exchange_timestamp_ns", "receive_timestamp_ns", "apply_timestamp_ns")
+
     type: OrderBookMessageType
     content: Dict[str, any]
     timestamp: float
+    exchange_timestamp_ns: int
+    receive_timestamp_ns: int
+    apply_timestamp_ns: int
 
     def __new__(cls, message_type: OrderBookMessageType, content: Dict[str, any], timestamp: Optional[float] = None,
-                *args, **kwargs):
-        return super(OrderBookMessage, cls).__new__(cls, message_type, content, timestamp, *args, **kwargs)
+                exchange_timestamp_ns: int = -1, *args, **kwargs):
+        self: "OrderBookMessage" = super(OrderBookMessage, cls).__new__(cls)
+        self.type = message_type
+        self.content = content
+        self.timestamp = timestamp
+        self._bids_array = None
+        self._asks_array = None
+        self.exchange_timestamp_ns = exchange_timestamp_ns
+        self.receive_timestamp_ns = clock_ns()
+        self.apply_timestamp_ns = -1
+        return self
+
+    def __reduce__(self):
+        return self.__class__, (self.type, self.content, self.timestamp), (None, {
+            "exchange_timestamp_ns": self.exchange_timestamp_ns,
+            "receive_timestamp_ns": self.receive_timestamp_ns,
+            "apply_timestamp_ns": self.apply_timestamp_ns
+        })
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(type={self.type!r}, content={self.content!r}, timestamp={self.timestamp!r})"
 
     @property
     def update_id(self) -> int:
@@ -36,6 +98,15 @@ class OrderBookMessage(namedtuple("_OrderBookMessage", "type, content, timestamp
         else:
             return -1
 
+    @property
+    def first_update_id(self) -> int:
+        """
+        The update ID of the first change in a diff message, for exchanges that publish it. -1 otherwise.
+        """
+        if self.type is OrderBookMessageType.DIFF:
+            return self.content.get("first_update_id", -1)
+        return -1
+
     @property
     def trade_id(self) -> int:
         if self.type is OrderBookMessageType.TRADE:
@@ -46,15 +117,34 @@ class OrderBookMessage(namedtuple("_OrderBookMessage", "type, content, timestamp
     def symbol(self) -> str:
         return self.content["symbol"]
 
+    @property
+    def asks_array(self) -> np.ndarray:
+        """
+        The ask price levels as an (n, 3) float64 array of [price, amount, update_id] rows, which can be passed to
+        OrderBook directly. The array is cached, and must not be modified.
+        """
+        if self._asks_array is None:
+            self._asks_array = _price_levels_to_array(self.content["asks"], self.update_id)
+        return self._asks_array
+
+    @property
+    def bids_array(self) -> np.ndarray:
+        """
+        Same as asks_array, for the bid price levels.
+        """
+        if self._bids_array is None:
+            self._bids_array = _price_levels_to_array(self.content["bids"], self.update_id)
+        return self._bids_array
+
     @property
     def asks(self) -> List[OrderBookRow]:
-        return [OrderBookRow(float(price), float(amount), self.update_id)
-                for price, amount, *trash in self.content["asks"]]
+        update_id: int = self.update_id
+        return [OrderBookRow(price, amount, update_id) for price, amount, _ in self.asks_array.tolist()]
 
     @property
     def bids(self) -> List[OrderBookRow]:
-        return [OrderBookRow(float(price), float(amount), self.update_id)
-                for price, amount, *trash in self.content["bids"]]
+        update_id: int = self.update_id
+        return [OrderBookRow(price, amount, update_id) for price, amount, _ in self.bids_array.tolist()]
 
     @property
     def has_update_id(self) -> bool:
@@ -86,12 +176,16 @@ class OrderBookMessage(namedtuple("_OrderBookMessage", "type, content, timestamp
 
 
 class DDEXOrderBookMessage(OrderBookMessage):
+    __slots__ = ()
+
     def __new__(cls, message_type: OrderBookMessageType, content: Dict[str, any], timestamp: Optional[float] = None,
                 *args, **kwargs):
         if timestamp is None:
             if message_type is OrderBookMessageType.SNAPSHOT:
                 raise ValueError("timestamp must not be None when initializing snapshot messages.")
             timestamp = content["time"] * 1e-3
+        if "time" in content and "exchange_timestamp_ns" not in kwargs:
+            kwargs["exchange_timestamp_ns"] = int(content["time"]) * 1000000
         return super(DDEXOrderBookMessage, cls).__new__(cls, message_type, content,
                                                         timestamp=timestamp, *args, **kwargs)
     @property
@@ -106,6 +200,14 @@ class DDEXOrderBookMessage(OrderBookMessage):
     def symbol(self) -> str:
         return self.content["marketId"]
 
+    @property
+    def asks_array(self) -> np.ndarray:
+        raise NotImplementedError("DDEX order book messages have different semantics.")
+
+    @property
+    def bids_array(self) -> np.ndarray:
+        raise NotImplementedError("DDEX order book messages have different semantics.")
+
     @property
     def asks(self) -> List[OrderBookRow]:
         raise NotImplementedError("DDEX order book messages have different semantics.")
@@ -136,6 +238,8 @@ class DDEXOrderBookMessage(OrderBookMessage):
 
 
 class RadarRelayOrderBookMessage(OrderBookMessage):
+    __slots__ = ()
+
     def __new__(cls, message_type: OrderBookMessageType, content: Dict[str, any], timestamp: Optional[float] = None,
                 *args, **kwargs):
         if message_type is OrderBookMessageType.SNAPSHOT and timestamp is None:
@@ -143,8 +247,10 @@ class RadarRelayOrderBookMessage(OrderBookMessage):
 
         elif message_type is OrderBookMessageType.DIFF and content["action"] in ["NEW"]:
             timestamp = pd.Timestamp(content["event"]["order"]["createdDate"], tz="UTC").timestamp()
+            kwargs.setdefault("exchange_timestamp_ns", int(timestamp * 1e9))
         elif message_type is OrderBookMessageType.DIFF and content["action"] in ["FILL"]:
             timestamp = content["event"]["timestamp"]
+            kwargs.setdefault("exchange_timestamp_ns", int(timestamp * 1e9))
         elif message_type is OrderBookMessageType.TRADE:
             timestamp = content["event"]["timestamp"]
         elif timestamp is None:
@@ -165,6 +271,14 @@ class RadarRelayOrderBookMessage(OrderBookMessage):
     def symbol(self) -> str:
         return self.content["symbol"]
 
+    @property
+    def asks_array(self) -> np.ndarray:
+        raise NotImplementedError("RadarRelay order book messages have different semantics.")
+
+    @property
+    def bids_array(self) -> np.ndarray:
+        raise NotImplementedError("RadarRelay order book messages have different semantics.")
+
     @property
     def asks(self) -> List[OrderBookRow]:
         raise NotImplementedError("RadarRelay order book messages have different semantics.")
@@ -192,3 +306,40 @@ class RadarRelayOrderBookMessage(OrderBookMessage):
             If timestamp is the same, the ordering is snapshot < diff < trade
             """
             return self.type.value < other.type.value
+
+
+def _net_price_levels(price_levels: List[np.ndarray]) -> np.ndarray:
+    """
+    Concatenates price level arrays, keeping only the last row of each price.
+    """
+    rows: np.ndarray = np.concatenate(price_levels)
+    if len(rows) < 2:
+        return rows
+    # np.unique() returns the index of the first occurrence of each price, so search the rows in reverse.
+    _, reversed_index = np.unique(rows[::-1, 0], return_index=True)
+    return rows[len(rows) - 1 - reversed_index]
+
+
+def merge_diff_messages(messages: List[OrderBookMessage]) -> OrderBookMessage:
+    """
+    Merges consecutive diff messages of an order book into a single net diff message - with the last amount of every
+    changed price level, the update ID and timestamp of the last message, and the first update ID of the first message.
+    Applying the merged message gives the same order book as applying the messages one by one.
+    """
+    if len(messages) == 1:
+        return messages[0]
+    last_message: OrderBookMessage = messages[-1]
+    content: Dict[str, any] = {
+        "symbol": last_message.symbol,
+        "update_id": last_message.update_id,
+        "bids": _net_price_levels([message.bids_array for message in messages]),
+        "asks": _net_price_levels([message.asks_array for message in messages])
+    }
+    if messages[0].first_update_id >= 0:
+        content["first_update_id"] = messages[0].first_update_id
+    # The merged message keeps the exchange and receive times of the first message, so the feed latency stats count
+    # the time its changes spent waiting.
+    merged: OrderBookMessage = OrderBookMessage(OrderBookMessageType.DIFF, content, timestamp=last_message.timestamp,
+                                                exchange_timestamp_ns=messages[0].exchange_timestamp_ns)
+    merged.receive_timestamp_ns = messages[0].receive_timestamp_ns
+    return merged
@@ -0,0 +1,365 @@
+#!/usr/bin/env python
+
+import asyncio
+from enum import Enum
+import logging
+import numpy as np
+import os
+import struct
+from typing import (
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple
+)
+
+from wings.order_book import OrderBook
+from wings.order_book_message import (
+    OrderBookMessage,
+    OrderBookMessageType
+)
+from wings.order_book_tracker import OrderBookTracker
+
+# Binary protocol of the order book server. Every frame starts with a fixed header holding the frame type, the
+# symbol's length in bytes, the number of bid and ask rows, the update ID and the timestamp. It's followed by the
+# UTF-8 symbol, padded to a multiple of 8 bytes, and then the bid and ask rows. Rows are [price, amount, update_id]
+# float64 triples - the layout of OrderBookMessage.bids_array - so they're decoded without copies or parsing.
+#
+# A connection starts with both sides sending a HELLO frame, with PROTOCOL_MAGIC as its symbol and PROTOCOL_VERSION as
+# its update ID. Clients then send SUBSCRIBE and UNSUBSCRIBE frames for single symbols, and LIST_SYMBOLS frames which
+# are answered with a SYMBOLS frame - with the symbols tracked by the server, separated by commas, as its symbol.
+# For every subscribed symbol, the server sends a SNAPSHOT frame with the full order book as soon as it's available,
+# followed by a DIFF frame after every update. Frames from clients carry no rows, and symbols of at most
+# MAX_CLIENT_SYMBOL_LENGTH bytes.
+PROTOCOL_MAGIC = "HBOB"
+PROTOCOL_VERSION = 1
+FRAME_HEADER = struct.Struct("<BxxxIIIqd")
+ROW_SIZE = 24
+MAX_SYMBOL_LENGTH = 1 << 20
+MAX_FRAME_ROWS = 1 << 22
+MAX_CLIENT_SYMBOL_LENGTH = 64
+EMPTY_ROWS = np.empty((0, 3), dtype="float64")
+
+
+class OrderBookFrameType(Enum):
+    HELLO = 1
+    SUBSCRIBE = 2
+    UNSUBSCRIBE = 3
+    LIST_SYMBOLS = 4
+    SYMBOLS = 5
+    SNAPSHOT = 6
+    DIFF = 7
+
+
+class OrderBookFrame(NamedTuple):
+    frame_type: OrderBookFrameType
+    symbol: str
+    update_id: int
+    timestamp: float
+    bids: np.ndarray
+    asks: np.ndarray
+
+
+def _frame_padding(length: int) -> int:
+    return -length % 8
+
+
+def parse_address(address: str) -> Tuple[Optional[str], Optional[str], Optional[int]]:
+    """
+    Parses an order book server address - either a Unix socket path, or a "host:port" TCP address - into the socket
+    path, host and port. The ones that don't apply are None.
+    """
+    host, separator, port = address.rpartition(":")
+    if separator and "/" not in address and port.isdigit():
+        return None, host or "127.0.0.1", int(port)
+    return address, None, None
+
+
+async def open_connection(address: str) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+    path, host, port = parse_address(address)
+    if path is not None:
+        return await asyncio.open_unix_connection(path)
+    return await asyncio.open_connection(host, port)
+
+
+def encode_frame(frame_type: OrderBookFrameType,
+                 symbol: str = "",
+                 update_id: int = 0,
+                 timestamp: float = 0.0,
+                 bids: Optional[np.ndarray] = None,
+                 asks: Optional[np.ndarray] = None) -> bytes:
+    """
+    Encodes a frame of the order book server protocol. bids and asks are (n, 3) float64 arrays of
+    [price, amount, update_id] rows.
+    """
+    symbol_bytes: bytes = symbol.encode("utf8")
+    bids = EMPTY_ROWS if bids is None else np.ascontiguousarray(bids, dtype="float64")
+    asks = EMPTY_ROWS if asks is None else np.ascontiguousarray(asks, dtype="float64")
+    return b"".join([
+        FRAME_HEADER.pack(frame_type.value, len(symbol_bytes), len(bids), len(asks), update_id, timestamp),
+        symbol_bytes,
+        bytes(_frame_padding(len(symbol_bytes))),
+        bids.tobytes(),
+        asks.tobytes()
+    ])
+
+
+async def read_frame(reader: asyncio.StreamReader,
+                     max_symbol_length: int = MAX_SYMBOL_LENGTH,
+                     max_rows: int = MAX_FRAME_ROWS) -> OrderBookFrame:
+    """
+    Reads the next frame of the order book server protocol. The bid and ask arrays of the frame are read-only views of
+    the received bytes.
+
+    Raises asyncio.IncompleteReadError when the connection is closed, and ValueError for malformed frames - including
+    ones with a longer symbol or more rows than allowed, which are rejected before their body is read.
+    """
+    header: bytes = await reader.readexactly(FRAME_HEADER.size)
+    frame_type_value, symbol_length, bid_count, ask_count, update_id, timestamp = FRAME_HEADER.unpack(header)
+    if symbol_length > max_symbol_length or bid_count + ask_count > max_rows:
+        raise ValueError(f"Order book server frame is too large: {symbol_length} symbol bytes, "
+                         f"{bid_count + ask_count} rows.")
+    frame_type: OrderBookFrameType = OrderBookFrameType(frame_type_value)
+    rows_offset: int = symbol_length + _frame_padding(symbol_length)
+    body: bytes = await reader.readexactly(rows_offset + (bid_count + ask_count) * ROW_SIZE)
+    rows: np.ndarray = np.frombuffer(body, dtype="float64", offset=rows_offset).reshape(-1, 3)
+    return OrderBookFrame(frame_type, body[:symbol_length].decode("utf8"), update_id, timestamp,
+                          rows[:bid_count], rows[bid_count:])
+
+
+async def check_hello(reader: asyncio.StreamReader,
+                      max_symbol_length: int = MAX_SYMBOL_LENGTH,
+                      max_rows: int = MAX_FRAME_ROWS):
+    """
+    Reads the HELLO frame at the start of a connection, and checks the peer's protocol.
+    """
+    frame: OrderBookFrame = await read_frame(reader, max_symbol_length, max_rows)
+    if frame.frame_type is not OrderBookFrameType.HELLO or frame.symbol != PROTOCOL_MAGIC:
+        raise ValueError("The peer doesn't speak the order book server protocol.")
+    if frame.update_id != PROTOCOL_VERSION:
+        raise ValueError(f"Unsupported order book server protocol version {frame.update_id}.")
+
+
+class OrderBookServerClient:
+    """
+    The state of a client connection to the order book server.
+    """
+    def __init__(self, client_id: int, writer: asyncio.StreamWriter):
+        self.client_id: int = client_id
+        self.consumer: str = f"order_book_server_client_{client_id}"
+        self.writer: asyncio.StreamWriter = writer
+        # Subscribed symbols, and the ones of them the client has received a snapshot for.
+        self.symbols: Set[str] = set()
+        self.synced_symbols: Set[str] = set()
+        self.frames_sent: int = 0
+        self.bytes_sent: int = 0
+
+    def send(self, frame: bytes):
+        self.writer.write(frame)
+        self.frames_sent += 1
+        self.bytes_sent += len(frame)
+
+    @property
+    def write_buffer_size(self) -> int:
+        return self.writer.transport.get_write_buffer_size()
+
+
+class OrderBookServer:
+    """
+    Serves the order books of a tracker to other processes - e.g. bots on the same host - over a Unix socket or TCP,
+    so they share the tracker's upstream feed instead of each bootstrapping its own from the exchange. Clients connect
+    with OrderBookServerDataSource.
+
+    Each client subscribes to the symbols it needs. The server subscribes to them in the tracker on the client's behalf,
+    see OrderBookTracker.subscribe(), and sends the client a snapshot of each order book followed by its diffs, in the
+    compact binary frames described at the top of this module. Diffs are sent as the price levels of the messages the
+    tracker applied; updates without them - e.g. from the level 3 order book trackers, or ones that included a
+    snapshot - are sent as a new snapshot, limited to snapshot_depth levels if given.
+
+    Clients that don't keep up - whose unsent frames exceed MAX_CLIENT_WRITE_BUFFER_SIZE bytes - are disconnected, and
+    resync from a new snapshot when they reconnect.
+    """
+    MAX_CLIENT_WRITE_BUFFER_SIZE: int = 64 * 1024 * 1024
+    _obs_logger: Optional[logging.Logger] = None
+
+    @classmethod
+    def logger(cls) -> logging.Logger:
+        if cls._obs_logger is None:
+            cls._obs_logger = logging.getLogger(__name__)
+        return cls._obs_logger
+
+    def __init__(self, tracker: OrderBookTracker, address: str, snapshot_depth: Optional[int] = None):
+        self._tracker: OrderBookTracker = tracker
+        self._address: str = address
+        self._snapshot_depth: Optional[int] = snapshot_depth
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._clients: Dict[int, OrderBookServerClient] = {}
+        self._client_count: int = 0
+        self._dropped_client_count: int = 0
+
+    @property
+    def address(self) -> str:
+        return self._address
+
+    @property
+    def tracker(self) -> OrderBookTracker:
+        return self._tracker
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {
+            "clients": len(self._clients),
+            "dropped_clients": self._dropped_client_count,
+            "frames_sent": sum(client.frames_sent for client in self._clients.values()),
+            "bytes_sent": sum(client.bytes_sent for client in self._clients.values())
+        }
+
+    def _encode_snapshot(self, symbol: str, order_book: OrderBook, timestamp: float) -> bytes:
+        bids, asks = order_book.snapshot_arrays(self._snapshot_depth)
+        return encode_frame(OrderBookFrameType.SNAPSHOT, symbol, max(order_book.snapshot_uid, order_book.last_diff_uid),
+                            timestamp, bids, asks)
+
+    @staticmethod
+    def _encode_diff(symbol: str, order_book: OrderBook, messages: Optional[List[OrderBookMessage]]) -> Optional[bytes]:
+        """
+        Encodes the price levels of the diff messages applied to an order book as a single DIFF frame. Returns None if
+        the update has to be sent as a snapshot.
+        """
+        if not messages or any(message.type is not OrderBookMessageType.DIFF for message in messages):
+            return None
+        try:
+            bids: np.ndarray = np.concatenate([message.bids_array for message in messages])
+            asks: np.ndarray = np.concatenate([message.asks_array for message in messages])
+        except NotImplementedError:
+            return None
+        return encode_frame(OrderBookFrameType.DIFF, symbol, max(order_book.snapshot_uid, order_book.last_diff_uid),
+                            messages[-1].timestamp or 0.0, bids, asks)
+
+    def _send(self, client: OrderBookServerClient, frame: bytes):
+        client.send(frame)
+        if client.write_buffer_size > self.MAX_CLIENT_WRITE_BUFFER_SIZE:
+            self.logger().warning("Order book server client %d isn't keeping up, with %d bytes unsent. "
+                                  "Disconnecting it.", client.client_id, client.write_buffer_size)
+            self._dropped_client_count += 1
+            client.writer.transport.abort()
+
+    def _send_snapshot(self, client: OrderBookServerClient, symbol: str):
+        order_book: Optional[OrderBook] = self._tracker.order_books.get(symbol)
+        if order_book is None or max(order_book.snapshot_uid, order_book.last_diff_uid) <= 0:
+            return
+        self._send(client, self._encode_snapshot(symbol, order_book, 0.0))
+        client.synced_symbols.add(symbol)
+
+    def _on_order_book_update(self,
+                              symbol: str,
+                              order_book: OrderBook,
+                              messages: Optional[List[OrderBookMessage]]):
+        """
+        Order book listener of the tracker. Encodes the update once, and sends it to all subscribed clients.
+        """
+        try:
+            diff_frame: Optional[bytes] = None
+            snapshot_frame: Optional[bytes] = None
+            for client in list(self._clients.values()):
+                if symbol not in client.symbols or client.writer.transport.is_closing():
+                    continue
+                if symbol in client.synced_symbols:
+                    if diff_frame is None:
+                        diff_frame = self._encode_diff(symbol, order_book, messages) or b""
+                    if len(diff_frame) > 0:
+                        self._send(client, diff_frame)
+                        continue
+                if snapshot_frame is None:
+                    timestamp: float = (messages[-1].timestamp or 0.0) if messages else 0.0
+                    snapshot_frame = self._encode_snapshot(symbol, order_book, timestamp)
+                self._send(client, snapshot_frame)
+                client.synced_symbols.add(symbol)
+        except Exception:
+            self.logger().error("Unexpected error sending the order book update for %s.", symbol, exc_info=True)
+
+    def _subscribe(self, client: OrderBookServerClient, symbol: str):
+        if symbol in client.symbols:
+            return
+        client.symbols.add(symbol)
+        self._tracker.subscribe(symbol, client.consumer)
+        self._send_snapshot(client, symbol)
+
+    def _unsubscribe(self, client: OrderBookServerClient, symbol: str):
+        if symbol not in client.symbols:
+            return
+        client.symbols.discard(symbol)
+        client.synced_symbols.discard(symbol)
+        self._tracker.unsubscribe(symbol, client.consumer)
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._client_count += 1
+        client: OrderBookServerClient = OrderBookServerClient(self._client_count, writer)
+        try:
+            writer.write(encode_frame(OrderBookFrameType.HELLO, PROTOCOL_MAGIC, PROTOCOL_VERSION))
+            # The port isn't authenticated, so client frames are limited to what subscribing takes.
+            await check_hello(reader, MAX_CLIENT_SYMBOL_LENGTH, 0)
+            self._clients[client.client_id] = client
+            self.logger().info("Order book server client %d connected.", client.client_id)
+            while True:
+                frame: OrderBookFrame = await read_frame(reader, MAX_CLIENT_SYMBOL_LENGTH, 0)
+                if frame.frame_type is OrderBookFrameType.SUBSCRIBE:
+                    self._subscribe(client, frame.symbol)
+                elif frame.frame_type is OrderBookFrameType.UNSUBSCRIBE:
+                    self._unsubscribe(client, frame.symbol)
+                elif frame.frame_type is OrderBookFrameType.LIST_SYMBOLS:
+                    symbols: List[str] = sorted(self._tracker.order_books.keys())
+                    self._send(client, encode_frame(OrderBookFrameType.SYMBOLS, ",".join(symbols)))
+                else:
+                    raise ValueError(f"Unexpected {frame.frame_type.name} frame from the client.")
+                await writer.drain()
+        except asyncio.CancelledError:
+            raise
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except Exception:
+            self.logger().error("Error handling order book server client %d. Disconnecting it.", client.client_id,
+                                exc_info=True)
+        finally:
+            self._clients.pop(client.client_id, None)
+            for symbol in list(client.symbols):
+                self._unsubscribe(client, symbol)
+            writer.close()
+            self.logger().info("Order book server client %d disconnected.", client.client_id)
+
+    async def start_serving(self):
+        """
+        Starts accepting clients, without starting the tracker.
+        """
+        path, host, port = parse_address(self._address)
+        if path is not None:
+            if os.path.exists(path):
+                os.remove(path)
+            self._server = await asyncio.start_unix_server(self._handle_client, path)
+        else:
+            self._server = await asyncio.start_server(self._handle_client, host, port)
+        self._tracker.add_order_book_listener(self._on_order_book_update)
+        self.logger().info("Serving order books at %s.", self._address)
+
+    async def start(self):
+        """
+        Starts accepting clients, and runs the tracker.
+        """
+        await self.start_serving()
+        try:
+            await self._tracker.start()
+        finally:
+            self.stop()
+
+    def stop(self):
+        if self._server is None:
+            return
+        self._tracker.remove_order_book_listener(self._on_order_book_update)
+        self._server.close()
+        self._server = None
+        for client in list(self._clients.values()):
+            client.writer.transport.abort()
+        path, _, _ = parse_address(self._address)
+        if path is not None and os.path.exists(path):
+            os.remove(path)
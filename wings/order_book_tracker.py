@@ -1,38 +1,250 @@
 #!/usr/bin/env python
 import asyncio
 from abc import abstractmethod, ABC
-from collections import deque
+from collections import (
+    Counter,
+    deque
+)
 from enum import Enum
 import logging
+import mmap
+import numpy as np
+import os
 import pandas as pd
 import re
+import struct
 import time
 from typing import (
+    Any,
+    Callable,
     Dict,
     Set,
     Deque,
     Optional,
     Tuple,
-    List)
+    List,
+    Type)
+from wings.feed_latency import FeedLatencyStats
 from wings.order_book import OrderBook
 from wings.order_book_tracker_entry import OrderBookTrackerEntry
+from wings.shared_order_books import SharedOrderBooks
 from .order_book_message import (
     OrderBookMessageType,
     OrderBookMessage,
+    clock_ns,
+    merge_diff_messages,
     )
 from wings.data_source.order_book_tracker_data_source import OrderBookTrackerDataSource
 
 TRADING_PAIR_FILTER = re.compile(r"(BTC|ETH|USDT)$")
 
+# Binary layout of OrderBookTracker.checkpoint(). The header holds the magic bytes, format version and number of order
+# books. It is followed by one record per order book - the symbol length and serialized order book length, the UTF-8
+# symbol, and the OrderBook.to_bytes() output. Every part starts at a multiple of 8 bytes, so the order book data
+# stays aligned when the checkpoint is memory mapped.
+CHECKPOINT_MAGIC = b"HBOT"
+CHECKPOINT_VERSION = 1
+CHECKPOINT_HEADER = struct.Struct("<4sHxxQ")
+CHECKPOINT_RECORD_HEADER = struct.Struct("<QQ")
+
+
+def _checkpoint_padding(length: int) -> int:
+    return -length % 8
+
+
+class OrderBookConflationPolicy(Enum):
+    # Merge the pending diffs into a single net diff message.
+    MERGE_DIFFS = 1
+    # Drop the pending diffs, and resync the order book from a snapshot.
+    RESYNC = 2
+    # Keep the pending diffs, letting the buffer grow beyond its limit. This is for order books that can't merge their
+    # diffs, and whose data sources can't fetch resync snapshots.
+    KEEP_DIFFS = 3
+
+
+class OrderBookMessageBuffer:
+    """
+    The messages waiting to be applied to a tracked order book.
+
+    Messages are added synchronously with put(), and drain() returns all of the buffered messages at once - so routing
+    a message doesn't cost an event loop hop, and a tracking task that falls behind catches up in a single wakeup
+    rather than one wakeup per message. The number of wakeups and drained messages are recorded for stats.
+
+    The buffer holds at most max_size messages. When it's exceeded, the pending messages are conflated according to
+    the buffer's policy:
+    - Pending messages older than the last pending snapshot are dropped, since the snapshot replaces them.
+    - With MERGE_DIFFS, the remaining diffs are merged into a single net diff message.
+    - With RESYNC, the remaining diffs are dropped as well, and put() returns False to have the order book resynced.
+      This is for order books that can't merge their diffs, e.g. level 3 order books.
+    - With KEEP_DIFFS, the remaining diffs are kept as they are, so the buffer may hold more than max_size messages.
+    """
+    def __init__(self,
+                 max_size: int = 1000,
+                 conflation_policy: OrderBookConflationPolicy = OrderBookConflationPolicy.MERGE_DIFFS):
+        self._messages: Deque[OrderBookMessage] = deque()
+        self._max_size: int = max_size
+        self._conflation_policy: OrderBookConflationPolicy = conflation_policy
+        self._waiter: Optional[asyncio.Future] = None
+        self._wakeup_count: int = 0
+        self._message_count: int = 0
+        self._max_batch_size: int = 0
+        self._max_depth: int = 0
+        self._conflation_count: int = 0
+        self._conflated_message_count: int = 0
+        self._dropped_message_count: int = 0
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    @property
+    def max_size(self) -> int:
+        return self._max_size
+
+    @property
+    def conflation_policy(self) -> OrderBookConflationPolicy:
+        return self._conflation_policy
+
+    @property
+    def stats(self) -> Dict[str, float]:
+        return {
+            "wakeups": self._wakeup_count,
+            "messages": self._message_count,
+            "messages_per_wakeup": self._message_count / self._wakeup_count if self._wakeup_count > 0 else 0.0,
+            "max_batch_size": self._max_batch_size
+        }
+
+    @property
+    def queue_stats(self) -> Dict[str, int]:
+        return {
+            "depth": len(self._messages),
+            "max_depth": self._max_depth,
+            "max_size": self._max_size,
+            "conflations": self._conflation_count,
+            "conflated_messages": self._conflated_message_count,
+            "dropped_messages": self._dropped_message_count
+        }
+
+    def put(self, message: OrderBookMessage) -> bool:
+        """
+        Adds a message to the buffer, conflating the pending messages if there are more than max_size of them.
+
+        Returns False if pending diffs were dropped by the RESYNC policy, in which case the order book must be resynced.
+        """
+        self._messages.append(message)
+        keeps_diffs: bool = True
+        if len(self._messages) > self._max_size and (
+                self._conflation_policy is not OrderBookConflationPolicy.KEEP_DIFFS or
+                message.type is OrderBookMessageType.SNAPSHOT):
+            # Kept diffs can only be dropped in favour of a new snapshot, so they're not rescanned on every put().
+            keeps_diffs = self._conflate()
+        self._max_depth = max(self._max_depth, len(self._messages))
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+        return keeps_diffs
+
+    def _conflate(self) -> bool:
+        messages: List[OrderBookMessage] = list(self._messages)
+        self._messages.clear()
+
+        # Everything before the last snapshot is replaced by it, except for the diffs newer than the snapshot - e.g. the
+        # diffs received while a resync snapshot was being fetched.
+        diffs: List[OrderBookMessage] = []
+        snapshot: Optional[OrderBookMessage] = None
+        for message in messages:
+            if message.type is OrderBookMessageType.SNAPSHOT:
+                snapshot = message
+                diffs = [diff for diff in diffs if diff.update_id > snapshot.update_id]
+            elif snapshot is None or message.update_id > snapshot.update_id:
+                diffs.append(message)
+        if snapshot is not None:
+            self._messages.append(snapshot)
+
+        keeps_diffs: bool = True
+        if self._conflation_policy is OrderBookConflationPolicy.MERGE_DIFFS:
+            if len(diffs) > 0:
+                self._messages.append(merge_diff_messages(diffs))
+        elif self._conflation_policy is OrderBookConflationPolicy.KEEP_DIFFS:
+            self._messages.extend(diffs)
+        elif len(diffs) > 0:
+            self._dropped_message_count += len(diffs)
+            keeps_diffs = False
+        self._conflation_count += 1
+        self._conflated_message_count += len(messages) - len(self._messages)
+        return keeps_diffs
+
+    async def drain(self) -> List[OrderBookMessage]:
+        """
+        Waits until there's at least one buffered message, and then removes and returns all of them.
+        """
+        while len(self._messages) == 0:
+            self._waiter = asyncio.get_event_loop().create_future()
+            try:
+                await self._waiter
+            finally:
+                self._waiter = None
+        messages: List[OrderBookMessage] = list(self._messages)
+        self._messages.clear()
+        self._wakeup_count += 1
+        self._message_count += len(messages)
+        self._max_batch_size = max(self._max_batch_size, len(messages))
+        return messages
+
+
+class OrderBookMessageStream(asyncio.Queue):
+    """
+    A bounded stream of messages from a data source to the tracker.
+
+    Data sources add messages with put_nowait(), which never blocks nor raises QueueFull. When the stream is full, its
+    messages are handed to the overflow handler instead - the tracker routes them to the order books' message buffers
+    right away, where they're conflated if needed - so a stalled router never lets the stream grow past maxsize.
+    """
+    def __init__(self, maxsize: int, overflow_handler: Callable[[List[OrderBookMessage]], None]):
+        super().__init__(maxsize=maxsize)
+        self._overflow_handler: Callable[[List[OrderBookMessage]], None] = overflow_handler
+        self._overflow_count: int = 0
+        self._overflow_message_count: int = 0
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {
+            "depth": self.qsize(),
+            "max_size": self.maxsize,
+            "overflows": self._overflow_count,
+            "overflow_messages": self._overflow_message_count
+        }
+
+    def put_nowait(self, message: OrderBookMessage):
+        if self.full():
+            messages: List[OrderBookMessage] = []
+            while not self.empty():
+                messages.append(self.get_nowait())
+            self._overflow_count += 1
+            self._overflow_message_count += len(messages)
+            self._overflow_handler(messages)
+        super().put_nowait(message)
+
+    async def put(self, message: OrderBookMessage):
+        self.put_nowait(message)
+
 
 class OrderBookTrackerDataSourceType(Enum):
     LOCAL_CLUSTER = 1
     REMOTE_API = 2
     EXCHANGE_API = 3
+    ORDER_BOOK_SERVER = 4
 
 
 class OrderBookTracker(ABC):
     PAST_DIFF_WINDOW_SIZE: int = 32
+    # Minimum time between two snapshot resyncs of the same order book, and the pause after each resync snapshot.
+    SNAPSHOT_RESYNC_MIN_INTERVAL: float = 60.0
+    SNAPSHOT_RESYNC_DELAY: float = 1.0
+    # Most messages held by each data source stream, and by the message buffer of each order book.
+    MESSAGE_STREAM_MAX_SIZE: int = 10000
+    MESSAGE_BUFFER_MAX_SIZE: int = 1000
+    CONFLATION_POLICY: OrderBookConflationPolicy = OrderBookConflationPolicy.MERGE_DIFFS
+    # Time between two refreshes of the tracked markets, when the subscribed symbols don't change in between.
+    TRACKING_REFRESH_INTERVAL: float = 3600.0
     _obt_logger: Optional[logging.Logger] = None
 
     @classmethod
@@ -46,15 +258,40 @@ class OrderBookTracker(ABC):
         self._data_source_type: OrderBookTrackerDataSourceType = data_source_type
         self._tracking_tasks: Dict[str, asyncio.Task] = {}
         self._order_books: Dict[str, OrderBook] = {}
-        self._tracking_message_queues: Dict[str, asyncio.Queue] = {}
+        self._tracking_message_buffers: Dict[str, OrderBookMessageBuffer] = {}
         self._past_diffs_windows: Dict[str, Deque] = {}
+        self._price_tick_sizes: Dict[str, float] = {}
+        self._fixed_point_sizes: Dict[str, Tuple[Any, Any]] = {}
+        self._max_depth: Optional[int] = None
+        self._restored_order_books: Dict[str, OrderBook] = {}
+        self._restored_diff_uids: Dict[str, int] = {}
+        self._resync_tasks: Dict[str, asyncio.Task] = {}
+        self._last_resync_timestamps: Dict[str, float] = {}
+        self._sequence_gap_counts: Dict[str, int] = {}
+        self._stale_symbols: Set[str] = set()
+        self._feed_latency_stats: Dict[str, FeedLatencyStats] = {}
+        # Latencies since the diff router's last periodic log, across all order books.
+        self._feed_latency_window: FeedLatencyStats = FeedLatencyStats()
+        self._shared_order_books: Optional[SharedOrderBooks] = None
+        self._order_book_listeners: List[Callable[[str, OrderBook, Optional[List[OrderBookMessage]]], None]] = []
+        # Subscribers of each symbol, by consumer. None until the first subscription.
+        self._symbol_subscribers: Optional[Dict[str, Counter]] = None
+        self._tracking_refresh_event: asyncio.Event = asyncio.Event()
+        self._resync_lock: asyncio.Lock = asyncio.Lock()
         self._order_book_diff_listener_task: Optional[asyncio.Task] = None
         self._order_book_snapshot_listener_task: Optional[asyncio.Task] = None
         self._order_book_diff_router_task: Optional[asyncio.Task] = None
         self._order_book_snapshot_router_task: Optional[asyncio.Task] = None
         self._refresh_tracking_task: Optional[asyncio.Task] = None
-        self._order_book_diff_stream: asyncio.Queue = asyncio.Queue()
-        self._order_book_snapshot_stream: asyncio.Queue = asyncio.Queue()
+        self._diff_router_counts: Dict[str, int] = {"accepted": 0, "rejected": 0, "queued": 0}
+        self._order_book_diff_stream: OrderBookMessageStream = OrderBookMessageStream(
+            self.MESSAGE_STREAM_MAX_SIZE,
+            lambda messages: self._route_stream_overflow(self._route_diff_message, messages)
+        )
+        self._order_book_snapshot_stream: OrderBookMessageStream = OrderBookMessageStream(
+            self.MESSAGE_STREAM_MAX_SIZE,
+            lambda messages: self._route_stream_overflow(self._route_snapshot_message, messages)
+        )
         self._ev_loop: asyncio.BaseEventLoop = asyncio.get_event_loop()
 
     @property
@@ -66,6 +303,27 @@ class OrderBookTracker(ABC):
     async def start(self):
         raise NotImplementedError
 
+    def stop(self):
+        """
+        Cancels the tracker's tasks - including the per symbol tracking and resync tasks, which aren't awaited by
+        start() and so aren't cancelled along with it.
+        """
+        for task in [self._order_book_diff_listener_task,
+                     self._order_book_snapshot_listener_task,
+                     self._order_book_diff_router_task,
+                     self._order_book_snapshot_router_task,
+                     self._refresh_tracking_task]:
+            if task is not None:
+                task.cancel()
+        self._order_book_diff_listener_task = self._order_book_snapshot_listener_task = None
+        self._order_book_diff_router_task = self._order_book_snapshot_router_task = None
+        self._refresh_tracking_task = None
+        for task in list(self._tracking_tasks.values()) + list(self._resync_tasks.values()):
+            task.cancel()
+        self._tracking_tasks.clear()
+        self._resync_tasks.clear()
+        self._stale_symbols.clear()
+
     @property
     def order_books(self) -> Dict[str, OrderBook]:
         return self._order_books
@@ -77,20 +335,423 @@ class OrderBookTracker(ABC):
             for symbol, order_book in self._order_books.items()
         }
 
+    @property
+    def max_depth(self) -> Optional[int]:
+        """
+        Limits all tracked order books to their top max_depth price levels. See OrderBook.set_max_depth().
+        """
+        return self._max_depth
+
+    @max_depth.setter
+    def max_depth(self, max_depth: Optional[int]):
+        self._max_depth = max_depth
+        for order_book in self._order_books.values():
+            order_book.set_max_depth(max_depth)
+
+    @property
+    def memory_usage(self) -> Dict[str, Dict[str, int]]:
+        return {
+            symbol: order_book.memory_usage
+            for symbol, order_book in self._order_books.items()
+        }
+
+    @property
+    def message_batch_stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Number of wakeups of each order book's tracking task, the number of messages they applied, the average and the
+        largest number of messages applied per wakeup.
+        """
+        return {
+            symbol: message_buffer.stats
+            for symbol, message_buffer in self._tracking_message_buffers.items()
+        }
+
+    @property
+    def message_queue_stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        Current and largest number of messages waiting in each order book's message buffer, its size limit, how many
+        times its messages were conflated, how many messages the conflations removed, and how many diffs were dropped
+        for resyncs.
+        """
+        return {
+            symbol: message_buffer.queue_stats
+            for symbol, message_buffer in self._tracking_message_buffers.items()
+        }
+
+    @property
+    def message_stream_stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        Current number of messages in the diff and snapshot streams, their size limit, and how many times they
+        overflowed into the order books' message buffers.
+        """
+        return {
+            "diff": self._order_book_diff_stream.stats,
+            "snapshot": self._order_book_snapshot_stream.stats
+        }
+
+    @property
+    def feed_latency_stats(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """
+        Feed, processing and total latency stats of the messages applied to each order book, since the tracker started.
+        See FeedLatencyStats.
+        """
+        return {
+            symbol: feed_latency_stats.stats
+            for symbol, feed_latency_stats in self._feed_latency_stats.items()
+        }
+
+    @property
+    def exchange_feed_latency_stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Same as feed_latency_stats, across all of the tracker's order books.
+        """
+        exchange_stats: FeedLatencyStats = FeedLatencyStats()
+        for feed_latency_stats in self._feed_latency_stats.values():
+            exchange_stats.merge(feed_latency_stats)
+        return exchange_stats.stats
+
+    def reset_feed_latency_stats(self):
+        self._feed_latency_stats.clear()
+
+    @property
+    def sequence_gap_counts(self) -> Dict[str, int]:
+        """
+        Number of gaps detected in the diff messages of each order book, since the tracker started.
+        """
+        return self._sequence_gap_counts
+
+    @property
+    def stale_symbols(self) -> Set[str]:
+        """
+        Symbols whose order books have missed some diffs, and are waiting for a resync snapshot. Their diffs aren't
+        applied until it arrives, so their order books stay at the last update before the gap.
+        """
+        return self._stale_symbols
+
+    def set_price_tick_size(self, symbol: str, price_tick_size: float):
+        """
+        Stores the order book for the symbol in tick ladders over its fixed price grid. See OrderBook.use_tick_ladder().
+
+        This can be called before the symbol is tracked - the setting is applied once its order book is created.
+        """
+        self._price_tick_sizes[symbol] = price_tick_size
+        if symbol in self._order_books:
+            self._order_books[symbol].use_tick_ladder(price_tick_size)
+
+    def set_fixed_point(self, symbol: str, price_tick_size: Any, amount_lot_size: Any = None):
+        """
+        Rounds the prices and amounts of the order book for the symbol to the market's price tick size and amount lot
+        size. See OrderBook.use_fixed_point().
+
+        This can be called before the symbol is tracked, and does nothing if the sizes haven't changed - so it can be
+        called every time the market's trading rules are refreshed.
+        """
+        if self._fixed_point_sizes.get(symbol) == (price_tick_size, amount_lot_size):
+            return
+        self._fixed_point_sizes[symbol] = (price_tick_size, amount_lot_size)
+        if symbol in self._order_books:
+            self._order_books[symbol].use_fixed_point(price_tick_size, amount_lot_size)
+
+    @property
+    def subscribed_symbols(self) -> Optional[List[str]]:
+        """
+        The symbols with at least one subscriber, or None if nothing ever subscribed - the tracker then tracks the
+        symbols it was created with, or all the exchange's active markets.
+        """
+        if self._symbol_subscribers is None:
+            return None
+        return list(self._symbol_subscribers.keys())
+
+    @property
+    def subscription_counts(self) -> Dict[str, Dict[str, int]]:
+        """
+        Number of subscriptions to each symbol, by consumer.
+        """
+        return {symbol: dict(subscribers) for symbol, subscribers in (self._symbol_subscribers or {}).items()}
+
+    def subscribe(self, symbol: str, consumer: str = "default"):
+        """
+        Adds a subscription to the symbol's order book on behalf of a consumer - e.g. a strategy, market or the CLI.
+
+        Once anything subscribes, the tracker only streams and tracks the subscribed symbols, so the data source's
+        connections, snapshot fetches and the tracker's memory scale with the symbols in use rather than with the
+        exchange. Subscriptions are reference counted: a symbol stays tracked until every subscription to it is
+        removed with unsubscribe(). This can be called before and after the tracker starts.
+        """
+        if self._symbol_subscribers is None:
+            self._symbol_subscribers = {}
+        if symbol not in self._symbol_subscribers:
+            self._symbol_subscribers[symbol] = Counter()
+        self._symbol_subscribers[symbol][consumer] += 1
+        if sum(self._symbol_subscribers[symbol].values()) == 1:
+            self._update_subscriptions()
+
+    def unsubscribe(self, symbol: str, consumer: str = "default"):
+        """
+        Removes a subscription added with subscribe(). The symbol stops being tracked once it has no subscriptions left.
+        """
+        subscribers: Optional[Counter] = (self._symbol_subscribers or {}).get(symbol)
+        if subscribers is None or subscribers[consumer] < 1:
+            raise ValueError(f"{consumer} isn't subscribed to {symbol}.")
+        subscribers[consumer] -= 1
+        if subscribers[consumer] < 1:
+            del subscribers[consumer]
+        if len(subscribers) < 1:
+            del self._symbol_subscribers[symbol]
+            self._update_subscriptions()
+
+    def _get_subscribed_pairs(self,
+                              available_pairs: Dict[str, OrderBookTrackerEntry]) -> Dict[str, OrderBookTrackerEntry]:
+        """
+        Leaves out the tracking pairs nothing subscribed to, for data sources that don't limit themselves to the
+        subscribed symbols.
+        """
+        if self._symbol_subscribers is None:
+            return available_pairs
+        return {symbol: entry for symbol, entry in available_pairs.items() if symbol in self._symbol_subscribers}
+
+    def _update_subscriptions(self):
+        """
+        Hands the subscribed symbols to the data source, and refreshes the tracked order books to match them.
+        """
+        self.data_source.set_subscribed_symbols(self.subscribed_symbols)
+        self._tracking_refresh_event.set()
+
+    def publish_order_books(self, shared_order_books: Optional[SharedOrderBooks]):
+        """
+        Publishes the top price levels of the tracked order books into shared_order_books after every update, for
+        other processes to read. See SharedOrderBooks and ShardedOrderBookTracker.
+        """
+        self._shared_order_books = shared_order_books
+
+    def add_order_book_listener(self, listener: Callable[[str, OrderBook, Optional[List[OrderBookMessage]]], None]):
+        """
+        Calls listener(symbol, order_book, messages) after every update of a tracked order book, with the messages that
+        were just applied to it. messages is None for trackers that don't pass them on, e.g. the level 3 order book
+        trackers. See OrderBookServer.
+        """
+        self._order_book_listeners.append(listener)
+
+    def remove_order_book_listener(self,
+                                   listener: Callable[[str, OrderBook, Optional[List[OrderBookMessage]]], None]):
+        self._order_book_listeners.remove(listener)
+
+    def _publish_order_book(self, symbol: str, messages: Optional[List[OrderBookMessage]] = None):
+        order_book: Optional[OrderBook] = self._order_books.get(symbol)
+        if order_book is None:
+            return
+        if self._shared_order_books is not None:
+            self._shared_order_books.publish(symbol, order_book)
+        for listener in self._order_book_listeners:
+            listener(symbol, order_book, messages)
+
+    def _configure_order_book(self, symbol: str, order_book: OrderBook):
+        """
+        Applies the tracker's order book settings to a newly tracked order book.
+        """
+        if symbol in self._price_tick_sizes:
+            order_book.use_tick_ladder(self._price_tick_sizes[symbol])
+        if symbol in self._fixed_point_sizes:
+            order_book.use_fixed_point(*self._fixed_point_sizes[symbol])
+        if self._max_depth is not None:
+            order_book.set_max_depth(self._max_depth)
+
+    def snapshot_arrays(self, depth: Optional[int] = None) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+        """
+        Same as snapshot, but with the order books as float64 arrays. See OrderBook.snapshot_arrays().
+        """
+        return {
+            symbol: order_book.snapshot_arrays(depth)
+            for symbol, order_book in self._order_books.items()
+        }
+
+    def checkpoint(self, path: str) -> int:
+        """
+        Saves all tracked order books, with their snapshot_uid and last_diff_uid, into a checkpoint file at path.
+
+        The checkpoint is written to a temporary file first and then renamed to path, so an interrupted checkpoint
+        never replaces a previous one. Returns the number of order books saved.
+        """
+        temp_path: str = f"{path}.tmp"
+        with open(temp_path, "wb") as fd:
+            fd.write(CHECKPOINT_HEADER.pack(CHECKPOINT_MAGIC, CHECKPOINT_VERSION, len(self._order_books)))
+            for symbol, order_book in self._order_books.items():
+                symbol_bytes: bytes = symbol.encode("utf8")
+                order_book_bytes: bytes = order_book.to_bytes()
+                fd.write(CHECKPOINT_RECORD_HEADER.pack(len(symbol_bytes), len(order_book_bytes)))
+                fd.write(symbol_bytes + bytes(_checkpoint_padding(len(symbol_bytes))))
+                fd.write(order_book_bytes)
+                fd.write(bytes(_checkpoint_padding(len(order_book_bytes))))
+            fd.flush()
+            os.fsync(fd.fileno())
+        os.replace(temp_path, path)
+        return len(self._order_books)
+
+    def restore(self, path: str, order_book_class: Type[OrderBook] = OrderBook) -> List[str]:
+        """
+        Loads the order books from a checkpoint file written by checkpoint(). Returns the restored symbols.
+
+        This should be called before start(). The restored order books are tracked right away, without waiting for
+        the data source to bootstrap them - and only the diffs newer than their last_diff_uid are applied to them.
+        """
+        restored_order_books: Dict[str, OrderBook] = {}
+        with open(path, "rb") as fd, mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ) as mapped_file:
+            with memoryview(mapped_file) as buffer:
+                magic, format_version, order_book_count = CHECKPOINT_HEADER.unpack_from(buffer, 0)
+                if magic != CHECKPOINT_MAGIC:
+                    raise ValueError(f"{path} is not an order book tracker checkpoint.")
+                if format_version != CHECKPOINT_VERSION:
+                    raise ValueError(f"Unsupported order book tracker checkpoint format version {format_version}.")
+                offset: int = CHECKPOINT_HEADER.size
+                for _ in range(order_book_count):
+                    symbol_length, order_book_length = CHECKPOINT_RECORD_HEADER.unpack_from(buffer, offset)
+                    offset += CHECKPOINT_RECORD_HEADER.size
+                    symbol: str = bytes(buffer[offset:offset + symbol_length]).decode("utf8")
+                    offset += symbol_length + _checkpoint_padding(symbol_length)
+                    with buffer[offset:offset + order_book_length] as order_book_buffer:
+                        restored_order_books[symbol] = order_book_class.from_bytes(order_book_buffer)
+                    offset += order_book_length + _checkpoint_padding(order_book_length)
+
+        self._restored_order_books.update(restored_order_books)
+        self.logger().info("Restored %d order books from %s.", len(restored_order_books), path)
+        return list(restored_order_books.keys())
+
+    def _is_stale_diff(self, order_book: OrderBook, message: OrderBookMessage) -> bool:
+        """
+        Whether a diff message predates the order book's snapshot, or was already applied to an order book restored
+        from a checkpoint.
+        """
+        return (order_book.snapshot_uid > message.update_id or
+                message.update_id <= self._restored_diff_uids.get(message.symbol, -1))
+
+    def _check_diff_sequence(self,
+                             symbol: str,
+                             order_book: OrderBook,
+                             message: OrderBookMessage,
+                             last_update_id: Optional[int] = None) -> bool:
+        """
+        Checks that a diff message continues from the last update applied to the order book - or from last_update_id,
+        if given - for data sources whose diff messages carry their first update ID. If some updates were skipped, a
+        snapshot resync is scheduled for the order book and False is returned.
+        """
+        first_update_id: int = message.first_update_id
+        if first_update_id < 0:
+            return True
+        if last_update_id is None:
+            last_update_id = max(order_book.snapshot_uid, order_book.last_diff_uid)
+        if first_update_id <= last_update_id + 1:
+            return True
+
+        self._sequence_gap_counts[symbol] = self._sequence_gap_counts.get(symbol, 0) + 1
+        self.logger().warning("Order book diffs for %s skipped from update ID %d to %d. Resyncing from a snapshot.",
+                              symbol, last_update_id, first_update_id)
+        self._schedule_resync(symbol)
+        return False
+
+    def _schedule_resync(self, symbol: str):
+        """
+        Starts a snapshot resync of the order book for the symbol, unless one is already in progress.
+        """
+        resync_task: Optional[asyncio.Task] = self._resync_tasks.get(symbol)
+        if resync_task is None or resync_task.done():
+            self._resync_tasks[symbol] = asyncio.ensure_future(self._resync_order_book(symbol))
+
+    def _record_applied_messages(self, symbol: str, messages: List[OrderBookMessage]):
+        """
+        Sets the apply time of messages that were just applied to the order book for the symbol, and records their
+        latencies.
+        """
+        if len(messages) < 1:
+            return
+        apply_timestamp_ns: int = clock_ns()
+        clock_offset_ns: int = clock_ns(time.time) - apply_timestamp_ns
+        feed_latency_stats: Optional[FeedLatencyStats] = self._feed_latency_stats.get(symbol)
+        if feed_latency_stats is None:
+            feed_latency_stats = self._feed_latency_stats[symbol] = FeedLatencyStats()
+        for message in messages:
+            message.apply_timestamp_ns = apply_timestamp_ns
+            feed_latency_stats.record(message, clock_offset_ns)
+            self._feed_latency_window.record(message, clock_offset_ns)
+
+    def _create_message_buffer(self) -> OrderBookMessageBuffer:
+        conflation_policy: OrderBookConflationPolicy = self.CONFLATION_POLICY
+        if conflation_policy is OrderBookConflationPolicy.RESYNC and not self.data_source.supports_snapshot_messages:
+            # Dropped diffs couldn't be replaced by a resync snapshot.
+            conflation_policy = OrderBookConflationPolicy.KEEP_DIFFS
+        return OrderBookMessageBuffer(self.MESSAGE_BUFFER_MAX_SIZE, conflation_policy)
+
+    def _put_message(self, symbol: str, message: OrderBookMessage):
+        """
+        Adds a message to the buffer of the order book for the symbol, and resyncs the order book if the buffer had to
+        drop its pending diffs.
+        """
+        if not self._tracking_message_buffers[symbol].put(message):
+            self.logger().warning("Dropped the pending diffs of the full message buffer for %s. Resyncing from a "
+                                  "snapshot.", symbol)
+            self._schedule_resync(symbol)
+
+    async def _resync_order_book(self, symbol: str):
+        """
+        Fetches a new snapshot for a single order book and queues it for its tracking task, which replays the recent
+        diffs on top of it. Resyncs of the same order book are at least SNAPSHOT_RESYNC_MIN_INTERVAL seconds apart, and
+        the resync snapshots of all order books are fetched one at a time.
+        """
+        try:
+            next_resync_timestamp: float = (self._last_resync_timestamps.get(symbol, 0.0) +
+                                            self.SNAPSHOT_RESYNC_MIN_INTERVAL)
+            if next_resync_timestamp > time.time():
+                await asyncio.sleep(next_resync_timestamp - time.time())
+            async with self._resync_lock:
+                self._last_resync_timestamps[symbol] = time.time()
+                snapshot_message: OrderBookMessage = await self.data_source.get_snapshot_message(symbol)
+                if symbol in self._tracking_message_buffers:
+                    self._put_message(symbol, snapshot_message)
+                    self.logger().info("Resynced order book for %s at update ID %d.",
+                                       symbol, snapshot_message.update_id)
+                await asyncio.sleep(self.SNAPSHOT_RESYNC_DELAY)
+        except asyncio.CancelledError:
+            raise
+        except NotImplementedError:
+            self.logger().warning("The order book data source can't resync the order book for %s. Applying its diffs "
+                                  "without one.", symbol)
+            self._stale_symbols.discard(symbol)
+        except Exception:
+            self.logger().error("Unexpected error resyncing the order book for %s.", symbol, exc_info=True)
+
+    def _start_restored_tracking(self):
+        """
+        Starts tracking the order books restored from a checkpoint, if they're not tracked already.
+        """
+        for symbol, order_book in self._restored_order_books.items():
+            if symbol in self._tracking_tasks and not self._tracking_tasks[symbol].done():
+                continue
+            self._order_books[symbol] = order_book
+            self._configure_order_book(symbol, order_book)
+            self._restored_diff_uids[symbol] = order_book.last_diff_uid
+            self._tracking_message_buffers[symbol] = self._create_message_buffer()
+            self._tracking_tasks[symbol] = asyncio.ensure_future(self._track_single_book(symbol))
+            self.logger().info("Started order book tracking for %s, restored at update ID %d.",
+                               symbol, max(order_book.snapshot_uid, order_book.last_diff_uid))
+        self._restored_order_books.clear()
+
     async def _refresh_tracking_tasks(self):
         """
         Starts tracking for any new trading pairs, and stop tracking for any inactive trading pairs.
         """
+        self._start_restored_tracking()
         tracking_symbols: Set[str] = set([key for key in self._tracking_tasks.keys()
                                           if not self._tracking_tasks[key].done()])
-        available_pairs: Dict[str, OrderBookTrackerEntry] = await self.data_source.get_tracking_pairs()
+        available_pairs: Dict[str, OrderBookTrackerEntry] = self._get_subscribed_pairs(
+            await self.data_source.get_tracking_pairs()
+        )
         available_symbols: Set[str] = set(available_pairs.keys())
         new_symbols: Set[str] = available_symbols - tracking_symbols
         deleted_symbols: Set[str] = tracking_symbols - available_symbols
 
         for symbol in new_symbols:
             self._order_books[symbol] = available_pairs[symbol].order_book
-            self._tracking_message_queues[symbol] = asyncio.Queue()
+            self._configure_order_book(symbol, self._order_books[symbol])
+            self._tracking_message_buffers[symbol] = self._create_message_buffer()
             self._tracking_tasks[symbol] = asyncio.ensure_future(self._track_single_book(symbol))
             self.logger().info("Started order book tracking for %s.", symbol)
 
@@ -98,57 +759,102 @@ class OrderBookTracker(ABC):
             self._tracking_tasks[symbol].cancel()
             del self._tracking_tasks[symbol]
             del self._order_books[symbol]
-            del self._tracking_message_queues[symbol]
+            del self._tracking_message_buffers[symbol]
+            self._restored_diff_uids.pop(symbol, None)
+            self._stale_symbols.discard(symbol)
+            if symbol in self._resync_tasks:
+                self._resync_tasks.pop(symbol).cancel()
             self.logger().info("Stopped order book tracking for %s.", symbol)
 
     async def _refresh_tracking_loop(self):
         """
-        Refreshes the tracking of new markets, removes inactive markets, every once in a while.
+        Refreshes the tracking of new markets, removes inactive markets, every once in a while - and whenever the
+        subscribed symbols change.
         """
         while True:
             try:
+                self._tracking_refresh_event.clear()
                 await self._refresh_tracking_tasks()
-                await asyncio.sleep(3600.0)
+                try:
+                    await asyncio.wait_for(self._tracking_refresh_event.wait(), timeout=self.TRACKING_REFRESH_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
             except asyncio.CancelledError:
                 raise
             except Exception:
                 self.logger().error("Unknown error. Retrying after 5 seconds.", exc_info=True)
                 await asyncio.sleep(5.0)
 
+    @staticmethod
+    async def _get_stream_messages(stream: asyncio.Queue) -> List[OrderBookMessage]:
+        """
+        Waits for the next message from a data source stream, and returns it along with all the other messages already
+        in the stream.
+        """
+        messages: List[OrderBookMessage] = [await stream.get()]
+        while not stream.empty():
+            messages.append(stream.get_nowait())
+        return messages
+
+    def _route_diff_message(self, message: OrderBookMessage):
+        """
+        Adds a real-time diff message to the buffer of its order book, and counts it in the router stats.
+        """
+        symbol: str = message.symbol
+        if symbol not in self._tracking_message_buffers:
+            self._diff_router_counts["rejected"] += 1
+            return
+        # Check the order book's initial update ID. If it's larger, don't bother.
+        order_book: OrderBook = self._order_books[symbol]
+
+        if self._is_stale_diff(order_book, message):
+            self._diff_router_counts["rejected"] += 1
+            return
+        self._put_message(symbol, message)
+        self._diff_router_counts["accepted"] += 1
+
+    def _route_snapshot_message(self, message: OrderBookMessage):
+        """
+        Adds a real-time snapshot message to the buffer of its order book.
+        """
+        symbol: str = message.symbol
+        if symbol in self._tracking_message_buffers:
+            self._put_message(symbol, message)
+
+    def _route_stream_overflow(self,
+                               route: Callable[[OrderBookMessage], None],
+                               messages: List[OrderBookMessage]):
+        """
+        Routes the messages of a full data source stream. This is called from the data source's put_nowait(), so
+        errors are logged rather than raised.
+        """
+        try:
+            for message in messages:
+                route(message)
+        except Exception:
+            self.logger().error("Unexpected error routing the messages of a full order book stream.", exc_info=True)
+
     async def _order_book_diff_router(self):
         """
         Route the real-time order book diff messages to the correct order book.
         """
         last_message_timestamp: float = time.time()
-        messages_accepted: int = 0
-        messages_rejected: int = 0
 
         while True:
             try:
-                ob_message: OrderBookMessage = await self._order_book_diff_stream.get()
-                symbol: str = ob_message.symbol
-
-                if symbol not in self._tracking_message_queues:
-                    messages_rejected += 1
-                    continue
-                message_queue: asyncio.Queue = self._tracking_message_queues[symbol]
-                # Check the order book's initial update ID. If it's larger, don't bother.
-                order_book: OrderBook = self._order_books[symbol]
-
-                if order_book.snapshot_uid > ob_message.update_id:
-                    messages_rejected += 1
-                    continue
-                await message_queue.put(ob_message)
-                messages_accepted += 1
+                for ob_message in await self._get_stream_messages(self._order_book_diff_stream):
+                    self._route_diff_message(ob_message)
 
                 # Log some statistics.
                 now: float = time.time()
                 if int(now / 60.0) > int(last_message_timestamp / 60.0):
-                    self.logger().info("Diff messages processed: %d, rejected: %d",
-                                       messages_accepted,
-                                       messages_rejected)
-                    messages_accepted = 0
-                    messages_rejected = 0
+                    self.logger().info("Diff messages processed: %d, rejected: %d, queued: %d",
+                                       self._diff_router_counts["accepted"],
+                                       self._diff_router_counts["rejected"],
+                                       self._diff_router_counts["queued"])
+                    for key in self._diff_router_counts:
+                        self._diff_router_counts[key] = 0
+                    self._log_feed_latency()
 
                 last_message_timestamp = now
             except asyncio.CancelledError:
@@ -157,54 +863,117 @@ class OrderBookTracker(ABC):
                 self.logger().error("Unknown error. Retrying after 5 seconds.", exc_info=True)
                 await asyncio.sleep(5.0)
 
+    def _log_feed_latency(self):
+        """
+        Logs the latencies of the messages applied since the last call, and starts a new window.
+        """
+        feed_stats: Dict[str, float] = self._feed_latency_window.feed.stats
+        processing_stats: Dict[str, float] = self._feed_latency_window.processing.stats
+        total_stats: Dict[str, float] = self._feed_latency_window.total.stats
+        self.logger().info("Order book latency p50/p99 in ms - feed: %.1f/%.1f, processing: %.1f/%.1f, "
+                           "total: %.1f/%.1f, over %d messages.",
+                           feed_stats["p50_ms"], feed_stats["p99_ms"],
+                           processing_stats["p50_ms"], processing_stats["p99_ms"],
+                           total_stats["p50_ms"], total_stats["p99_ms"],
+                           processing_stats["count"])
+        self._feed_latency_window = FeedLatencyStats()
+
     async def _order_book_snapshot_router(self):
         """
         Route the real-time order book snapshot messages to the correct order book.
         """
         while True:
             try:
-                ob_message: OrderBookMessage = await self._order_book_snapshot_stream.get()
-                symbol: str = ob_message.symbol
-                if symbol not in self._tracking_message_queues:
-                    continue
-                message_queue: asyncio.Queue = self._tracking_message_queues[symbol]
-                await message_queue.put(ob_message)
+                for ob_message in await self._get_stream_messages(self._order_book_snapshot_stream):
+                    self._route_snapshot_message(ob_message)
             except asyncio.CancelledError:
                 raise
             except Exception:
                 self.logger().error("Unknown error. Retrying after 5 seconds.", exc_info=True)
                 await asyncio.sleep(5.0)
 
+    async def _get_pending_messages(self,
+                                    symbol: str,
+                                    message_buffer: OrderBookMessageBuffer) -> List[OrderBookMessage]:
+        """
+        Waits for the next messages to apply to the order book for the symbol.
+        """
+        return await message_buffer.drain()
+
+    def _apply_diff_batch(self,
+                          symbol: str,
+                          order_book: OrderBook,
+                          diffs: List[OrderBookMessage],
+                          past_diffs_window: Deque[OrderBookMessage]):
+        """
+        Applies consecutive diff messages to the order book as a single diff, with the update ID of the last message.
+
+        The price levels of the messages are merged by OrderBook.apply_diff_batch(), so the result is the same as
+        applying the messages one by one - but the order book's top of book checks, analytics and level listeners run
+        once for the whole batch.
+
+        From the first diff after a sequence gap, the order book is stale: its diffs only go into the past diffs window,
+        to be replayed on top of the resync snapshot.
+        """
+        if len(diffs) < 1:
+            return
+        applied_diffs: List[OrderBookMessage] = []
+        last_update_id: int = max(order_book.snapshot_uid, order_book.last_diff_uid)
+        for message in diffs:
+            if symbol not in self._stale_symbols:
+                if (self._check_diff_sequence(symbol, order_book, message, last_update_id) or
+                        not self.data_source.supports_snapshot_messages):
+                    applied_diffs.append(message)
+                else:
+                    self._stale_symbols.add(symbol)
+            last_update_id = max(last_update_id, message.update_id)
+            past_diffs_window.append(message)
+        while len(past_diffs_window) > self.PAST_DIFF_WINDOW_SIZE:
+            past_diffs_window.popleft()
+
+        if len(applied_diffs) > 0:
+            order_book.apply_diff_batch(applied_diffs)
+            self._record_applied_messages(symbol, applied_diffs)
+
     async def _track_single_book(self, symbol: str):
         past_diffs_window: Deque[OrderBookMessage] = deque()
         self._past_diffs_windows[symbol] = past_diffs_window
 
-        message_queue: asyncio.Queue = self._tracking_message_queues[symbol]
+        message_buffer: OrderBookMessageBuffer = self._tracking_message_buffers[symbol]
         order_book: OrderBook = self._order_books[symbol]
         last_message_timestamp: float = time.time()
         diff_messages_accepted: int = 0
+        # Publish the order book as it was bootstrapped or restored, before any messages are applied to it.
+        self._publish_order_book(symbol)
 
         while True:
             try:
-                message: OrderBookMessage = await message_queue.get()
-                if message.type is OrderBookMessageType.DIFF:
-                    order_book.apply_diffs(message.bids, message.asks, message.update_id)
-                    past_diffs_window.append(message)
-                    while len(past_diffs_window) > self.PAST_DIFF_WINDOW_SIZE:
-                        past_diffs_window.popleft()
-                    diff_messages_accepted += 1
-
-                    # Output some statistics periodically.
-                    now: float = time.time()
-                    if int(now / 60.0) > int(last_message_timestamp / 60.0):
-                        self.logger().info("Processed %d order book diffs for %s.",
-                                           diff_messages_accepted, symbol)
-                        diff_messages_accepted = 0
-                    last_message_timestamp = now
-                elif message.type is OrderBookMessageType.SNAPSHOT:
-                    past_diffs: List[OrderBookMessage] = list(past_diffs_window)
-                    order_book.restore_from_snapshot_and_diffs(message, past_diffs)
-                    self.logger().debug("Processed order book snapshot for %s.", symbol)
+                diffs: List[OrderBookMessage] = []
+                messages: List[OrderBookMessage] = await self._get_pending_messages(symbol, message_buffer)
+                for message in messages:
+                    if message.type is OrderBookMessageType.DIFF:
+                        diffs.append(message)
+                    elif message.type is OrderBookMessageType.SNAPSHOT:
+                        # Apply the diffs received before the snapshot first, so they're part of the replay window.
+                        self._apply_diff_batch(symbol, order_book, diffs, past_diffs_window)
+                        diff_messages_accepted += len(diffs)
+                        diffs = []
+                        past_diffs: List[OrderBookMessage] = list(past_diffs_window)
+                        order_book.restore_from_snapshot_and_diffs(message, past_diffs)
+                        self._stale_symbols.discard(symbol)
+                        self._record_applied_messages(symbol, [message])
+                        self.logger().debug("Processed order book snapshot for %s.", symbol)
+                self._apply_diff_batch(symbol, order_book, diffs, past_diffs_window)
+                diff_messages_accepted += len(diffs)
+                self._publish_order_book(symbol, messages)
+
+                # Output some statistics periodically.
+                now: float = time.time()
+                if int(now / 60.0) > int(last_message_timestamp / 60.0):
+                    self.logger().info("Processed %d order book diffs for %s, %.1f messages per wakeup.",
+                                       diff_messages_accepted, symbol, message_buffer.stats["messages_per_wakeup"])
+                    diff_messages_accepted = 0
+                last_message_timestamp = now
             except asyncio.CancelledError:
                 raise
             except Exception:
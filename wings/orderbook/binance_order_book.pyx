@@ -2,13 +2,15 @@
 import logging
 from typing import (
     Dict,
-    Optional
+    Optional,
+    Union
 )
 import ujson
 
 from aiokafka import ConsumerRecord
 from sqlalchemy.engine import RowProxy
 
+from wings.depth_message_decoder cimport DepthMessageDecoder
 from wings.events import TradeType
 from wings.order_book cimport OrderBook
 from wings.order_book_message import (
@@ -17,6 +19,16 @@ from wings.order_book_message import (
 )
 bob_logger = None
 
+# Depth update events, from either a single stream or the "data" field of a combined stream message.
+cdef DepthMessageDecoder _exchange_diff_decoder = DepthMessageDecoder("s", "b", "a",
+                                                                      update_id_key="u",
+                                                                      first_update_id_key="U",
+                                                                      wrapper_key="data",
+                                                                      event_time_key="E")
+cdef DepthMessageDecoder _recorded_diff_decoder = DepthMessageDecoder("s", "b", "a",
+                                                                      update_id_key="u",
+                                                                      event_time_key="E")
+
 
 cdef class BinanceOrderBook(OrderBook):
     @classmethod
@@ -49,10 +61,22 @@ cdef class BinanceOrderBook(OrderBook):
             msg.update(metadata)
         return OrderBookMessage(OrderBookMessageType.DIFF, {
             "symbol": msg["s"],
+            "first_update_id": msg["U"],
             "update_id": msg["u"],
             "bids": msg["b"],
             "asks": msg["a"]
-        }, timestamp=timestamp)
+        }, timestamp=timestamp, exchange_timestamp_ns=msg["E"] * 1000000 if "E" in msg else -1)
+
+    @classmethod
+    def diff_message_from_raw_exchange(cls,
+                                       raw_msg: Union[str, bytes],
+                                       timestamp: Optional[float] = None) -> OrderBookMessage:
+        """
+        Same as diff_message_from_exchange(), but decodes the raw websocket message directly into the price level
+        arrays of the order book message.
+        """
+        cdef bytes raw = raw_msg.encode("utf8") if isinstance(raw_msg, str) else raw_msg
+        return _exchange_diff_decoder.c_decode(raw, -1, timestamp)
 
     @classmethod
     def snapshot_message_from_db(cls, record: RowProxy, metadata: Optional[Dict] = None) -> OrderBookMessage:
@@ -68,6 +92,10 @@ cdef class BinanceOrderBook(OrderBook):
 
     @classmethod
     def diff_message_from_db(cls, record: RowProxy, metadata: Optional[Dict] = None) -> OrderBookMessage:
+        cdef bytes raw
+        if metadata is None:
+            raw = record["json"].encode("utf8") if isinstance(record["json"], str) else record["json"]
+            return _recorded_diff_decoder.c_decode(raw, -1, record["timestamp"] * 1e-3)
         msg = ujson.loads(record["json"]) # Binance json in DB is TEXT
         if metadata:
             msg.update(metadata)
@@ -92,6 +120,8 @@ cdef class BinanceOrderBook(OrderBook):
 
     @classmethod
     def diff_message_from_kafka(cls, record: ConsumerRecord, metadata: Optional[Dict] = None) -> OrderBookMessage:
+        if metadata is None:
+            return _recorded_diff_decoder.c_decode(record.value, -1, record.timestamp * 1e-3)
         msg = ujson.loads(record.value.decode("utf-8"))
         if metadata:
             msg.update(metadata)
@@ -121,6 +151,6 @@ cdef class BinanceOrderBook(OrderBook):
     @classmethod
     def from_snapshot(cls, msg: OrderBookMessage) -> "OrderBook":
         retval = BinanceOrderBook()
-        retval.apply_snapshot(msg.bids, msg.asks, msg.update_id)
+        retval.apply_snapshot(msg.bids_array, msg.asks_array, msg.update_id)
         return retval
 
@@ -8,12 +8,17 @@ from typing import (
     Dict
 )
 
+from wings.depth_message_decoder cimport DepthMessageDecoder
 from wings.events import TradeType
 from wings.order_book cimport OrderBook
 from wings.order_book_message import OrderBookMessage, OrderBookMessageType
 import logging
 btob_logger = None
 
+# The update IDs of recorded diff messages are their recording timestamps, so they're not read from the messages.
+cdef DepthMessageDecoder _db_diff_decoder = DepthMessageDecoder("s", "b", "a")
+cdef DepthMessageDecoder _kafka_diff_decoder = DepthMessageDecoder("s", "bids", "asks")
+
 
 cdef class BittrexOrderBook(OrderBook):
     @classmethod
@@ -39,6 +44,9 @@ cdef class BittrexOrderBook(OrderBook):
     @classmethod
     def diff_message_from_db(cls, record: RowProxy, metadata: Optional[Dict] = None) -> OrderBookMessage:
         ts = record["timestamp"]
+        if metadata is None and not isinstance(record["json"], dict):
+            raw = record["json"].encode("utf8") if isinstance(record["json"], str) else record["json"]
+            return _db_diff_decoder.c_decode(raw, int(ts), ts * 1e-3)
         msg = record["json"] if type(record["json"])==dict else ujson.loads(record["json"])
         if metadata:
             msg.update(metadata)
@@ -65,8 +73,10 @@ cdef class BittrexOrderBook(OrderBook):
     @classmethod
     def diff_message_from_kafka(cls, record: ConsumerRecord, metadata: Optional[Dict] = None) -> OrderBookMessage:
         decompressed = bz2.decompress(record.value)
-        msg = ujson.loads(decompressed)
         ts = record.timestamp
+        if metadata is None:
+            return _kafka_diff_decoder.c_decode(decompressed, ts, ts * 1e-3)
+        msg = ujson.loads(decompressed)
         if metadata:
             msg.update(metadata)
         return OrderBookMessage(OrderBookMessageType.DIFF, {
@@ -95,5 +105,5 @@ cdef class BittrexOrderBook(OrderBook):
     @classmethod
     def from_snapshot(cls, msg: OrderBookMessage) -> "OrderBook":
         retval = BittrexOrderBook()
-        retval.apply_snapshot(msg.bids, msg.asks, msg.update_id)
+        retval.apply_snapshot(msg.bids_array, msg.asks_array, msg.update_id)
         return retval
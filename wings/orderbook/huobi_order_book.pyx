@@ -9,11 +9,16 @@ from typing import (
     Dict
 )
 
+from wings.depth_message_decoder cimport DepthMessageDecoder
 from wings.events import TradeType
 from wings.order_book cimport OrderBook
 from wings.order_book_message import OrderBookMessage, OrderBookMessageType
 hob_logger = None
 
+# The update IDs of recorded diff messages are their recording timestamps, so they're not read from the messages.
+cdef DepthMessageDecoder _db_diff_decoder = DepthMessageDecoder("s", "b", "a")
+cdef DepthMessageDecoder _kafka_diff_decoder = DepthMessageDecoder("s", "bids", "asks")
+
 
 cdef class HuobiOrderBook(OrderBook):
     @classmethod
@@ -40,6 +45,9 @@ cdef class HuobiOrderBook(OrderBook):
     @classmethod
     def diff_message_from_db(cls, record: RowProxy, metadata: Optional[Dict] = None) -> OrderBookMessage:
         ts = record["timestamp"]
+        if metadata is None and not isinstance(record["json"], dict):
+            raw = record["json"].encode("utf8") if isinstance(record["json"], str) else record["json"]
+            return _db_diff_decoder.c_decode(raw, int(ts), ts * 1e-3)
         msg = record["json"] if type(record["json"])==dict else ujson.loads(record["json"])
         if metadata:
             msg.update(metadata)
@@ -66,8 +74,10 @@ cdef class HuobiOrderBook(OrderBook):
     @classmethod
     def diff_message_from_kafka(cls, record: ConsumerRecord, metadata: Optional[Dict] = None) -> OrderBookMessage:
         decompressed = bz2.decompress(record.value)
-        msg = ujson.loads(decompressed)
         ts = record.timestamp
+        if metadata is None:
+            return _kafka_diff_decoder.c_decode(decompressed, ts, ts * 1e-3)
+        msg = ujson.loads(decompressed)
         if metadata:
             msg.update(metadata)
         return OrderBookMessage(OrderBookMessageType.DIFF, {
@@ -97,5 +107,5 @@ cdef class HuobiOrderBook(OrderBook):
     @classmethod
     def from_snapshot(cls, msg: OrderBookMessage) -> "OrderBook":
         retval = HuobiOrderBook()
-        retval.apply_snapshot(msg.bids, msg.asks, msg.update_id)
+        retval.apply_snapshot(msg.bids_array, msg.asks_array, msg.update_id)
         return retval
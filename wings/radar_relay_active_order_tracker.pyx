@@ -1,28 +1,14 @@
 # distutils: language=c++
-# distutils: sources=wings/cpp/OrderBookEntry.cpp
+# distutils: sources=wings/cpp/OrderBookEntry.cpp wings/cpp/OrderBookLevel3.cpp
 import logging
 import numpy as np
 from decimal import Decimal
-from typing import Dict
 
-from wings.order_book_row import OrderBookRow
+from .active_order_tracker cimport ActiveOrderTracker
 _rraot_logger = None
 
-s_empty_diff = np.ndarray(shape=(0, 4), dtype="float64")
-
-RadarRelayOrderBookTrackingDictionary = Dict[Decimal, Dict[str, Dict[str, any]]]
-
-
-cdef class RadarRelayActiveOrderTracker:
-    def __init__(self,
-                 active_asks: RadarRelayOrderBookTrackingDictionary = None,
-                 active_bids: RadarRelayOrderBookTrackingDictionary = None,
-                 order_price_map: Dict[str, Decimal] = None):
-        super().__init__()
-        self._active_asks = active_asks or {}
-        self._active_bids = active_bids or {}
-        self._order_price_map = order_price_map or {}
 
+cdef class RadarRelayActiveOrderTracker(ActiveOrderTracker):
     @classmethod
     def logger(cls) -> logging.Logger:
         global _rraot_logger
@@ -30,213 +16,59 @@ cdef class RadarRelayActiveOrderTracker:
             _rraot_logger = logging.getLogger(__name__)
         return _rraot_logger
 
-    @property
-    def active_asks(self) -> RadarRelayOrderBookTrackingDictionary:
-        return self._active_asks
-
-    @property
-    def active_bids(self) -> RadarRelayOrderBookTrackingDictionary:
-        return self._active_bids
-
-    @property
-    def order_price_map(self) -> Dict[str, Decimal]:
-        return self._order_price_map
-
-    def volume_for_ask_price(self, price) -> float:
-        return sum([float(msg["remainingBaseTokenAmount"]) for msg in self._active_asks[price].values()])
-
-    def volume_for_bid_price(self, price) -> float:
-        return sum([float(msg["remainingBaseTokenAmount"]) for msg in self._active_bids[price].values()])
-
-    cdef tuple c_convert_diff_message_to_np_arrays(self, object message):
-        # "CANCEL" and "REMOVE" messages contain only orderHash and not price which is why "_order_price_map" is
-        # required.
+    cdef c_process_diff_message(self, object message):
+        # Orders are tracked by order hash, so "CANCEL" and "REMOVE" messages - which contain only the orderHash and not
+        # the price - don't need to look up the price first.
         cdef:
             str action = message.content["action"]
             dict event = message.content["event"]
+            dict order
             str order_side
             str order_hash
-            object price
-            double timestamp = message.timestamp
-            double quantity = 0
 
         if action == "NEW":
-            order_side = event["order"]["type"]
-            order_hash = event["order"]["orderHash"]
-            price = Decimal(event["order"]["price"])
-            self._order_price_map[order_hash] = price
-            order_dict = {
-                "orderHash": order_hash,
-                "remainingBaseTokenAmount": event["order"]["remainingBaseTokenAmount"]
-            }
-            if order_side == "BID":
-                if price in self._active_bids:
-                    self._active_bids[price][order_hash] = order_dict
-                else:
-                    self._active_bids[price] = {order_hash: order_dict}
-
-                quantity = self.volume_for_bid_price(price)
-                return np.array([[timestamp, float(price), quantity, message.update_id]], dtype="float64"), s_empty_diff
-
-            elif order_side == "ASK":
-                if price in self._active_asks:
-                    self._active_asks[price][order_hash] = order_dict
-                else:
-                    self._active_asks[price] = {order_hash: order_dict}
-
-                quantity = self.volume_for_ask_price(price)
-                return s_empty_diff, np.array([[timestamp, float(price), quantity, message.update_id]], dtype="float64")
-            else:
+            order = event["order"]
+            order_side = order["type"]
+            order_hash = order["orderHash"]
+            if order_side != "BID" and order_side != "ASK":
                 raise ValueError(f"Unknown order side '{order_side}'. Aborting.")
+            self._level3_book.addOrder(order_hash.encode("utf8"),
+                                       order_side == "BID",
+                                       self.c_price_to_ticks(order["price"]),
+                                       float(order["remainingBaseTokenAmount"]))
 
         elif action in ["REMOVE", "CANCEL"]:
             order_side = event["orderType"]
             order_hash = event["orderHash"]
-            if order_hash in self._order_price_map:
-                price = self._order_price_map[order_hash]
-            else:
-                self.logger().debug(f"OrderHash {order_hash} {message.timestamp} order not found in order price map")
-                return s_empty_diff, s_empty_diff
-
-            del self._order_price_map[order_hash]
-
-            if order_side == "BID":
-                if price in self._active_bids:
-                    if order_hash in self._active_bids[price]:
-                        del self._active_bids[price][order_hash]
-
-                    if len(self._active_bids[price]) < 1:
-                        del self._active_bids[price]
-
-                        return (np.array([[timestamp, float(price), 0.0, message.update_id]], dtype="float64"),
-                                s_empty_diff)
-                    else:
-                        quantity = self.volume_for_bid_price(price)
-                        return (np.array([[timestamp, float(price), quantity, message.update_id]], dtype="float64"),
-                                s_empty_diff)
-                else:
-                    return s_empty_diff, s_empty_diff
-            elif order_side == "ASK":
-                if price in self._active_asks:
-                    if order_hash in self._active_asks[price]:
-                        del self._active_asks[price][order_hash]
-
-                    if len(self._active_asks[price]) < 1:
-                        del self._active_asks[price]
-                        return (s_empty_diff,
-                                np.array([[timestamp, float(price), 0.0, message.update_id]], dtype="float64"))
-                    else:
-                        quantity = self.volume_for_ask_price(price)
-                        return (s_empty_diff,
-                                np.array([[timestamp, float(price), quantity, message.update_id]], dtype="float64"))
-                else:
-                    return s_empty_diff, s_empty_diff
-            else:
+            if order_side != "BID" and order_side != "ASK":
                 raise ValueError(f"Unknown order side '{order_side}'. Aborting.")
+            if not self._level3_book.removeOrder(order_hash.encode("utf8")):
+                self.logger().debug(f"OrderHash {order_hash} {message.timestamp} order not found in active orders")
 
         elif action == "FILL":
-            remaining_base_amount = Decimal(event["order"]["remainingBaseTokenAmount"])
-            order_hash = event["order"]["orderHash"]
-            price = Decimal(event["order"]["price"])
-            order_side = event["type"]
-            if order_side == "BUY":
-                if price in self._active_bids:
-                    if order_hash in self._active_bids[price]:
-                        if event["order"]["state"] == "FILLED":
-                            del self._order_price_map[order_hash]
-                            del self._active_bids[price][order_hash]
-                        else: # update the remaining amount of the order
-                            self._active_bids[price][order_hash]["remainingBaseTokenAmount"] = remaining_base_amount
-
-                        if len(self._active_bids[price]) < 1:
-                            del self._active_bids[price]
-                            return (np.array([[timestamp, float(price), 0.0, message.update_id]], dtype="float64"),
-                                    s_empty_diff)
-                        else:
-                            quantity = self.volume_for_bid_price(price)
-                            return (np.array([[timestamp, float(price), quantity, message.update_id]], dtype="float64"),
-                                    s_empty_diff)
-
-                # return empty diff if order or price is not found
-                return s_empty_diff, s_empty_diff
-            elif order_side == "SELL":
-                if price in self._active_asks:
-                    if order_hash in self._active_asks[price]:
-                        if event["order"]["state"] == "FILLED":
-                            del self._order_price_map[order_hash]
-                            del self._active_bids[price][order_hash]
-                        else: # update the remaining amount of the order
-                            self._active_asks[price][order_hash]["remainingBaseTokenAmount"] = remaining_base_amount
-
-                        if len(self._active_asks[price]) < 1:
-                            del self._active_asks[price]
-                            return (s_empty_diff,
-                                    np.array([[timestamp, float(price), 0.0, message.update_id]], dtype="float64"))
-                        else:
-                            quantity = self.volume_for_ask_price(price)
-                            return (s_empty_diff,
-                                np.array([[timestamp, float(price), quantity, message.update_id]],
-                                         dtype="float64"))
-
-                # return empty diff if order or price is not found
-                return s_empty_diff, s_empty_diff
+            order = event["order"]
+            order_hash = order["orderHash"]
+            if order["state"] == "FILLED":
+                self._level3_book.removeOrder(order_hash.encode("utf8"))
+            else: # update the remaining amount of the order
+                self._level3_book.setOrderAmount(order_hash.encode("utf8"), float(order["remainingBaseTokenAmount"]))
 
         else:
             raise ValueError(f"Unknown action type '{action}'. Must be 'NEW', 'REMOVE', 'CANCEL' or 'FILL'.")
 
-    cdef tuple c_convert_snapshot_message_to_np_arrays(self, object message):
+    cdef c_process_snapshot_message(self, object message):
         cdef:
-            object price
             str order_hash
-            str amount
 
         # Refresh all order tracking.
-        self._active_bids.clear()
-        self._active_asks.clear()
-        self._order_price_map.clear()
-        for snapshot_orders, active_orders in [(message.content["bids"], self._active_bids),
-                                               (message.content["asks"], self._active_asks)]:
+        self._level3_book.clear()
+        for snapshot_orders, is_bid in [(message.content["bids"], True), (message.content["asks"], False)]:
             for order in snapshot_orders:
-                price = Decimal(order["price"])
                 order_hash = order["orderHash"]
-                order_dict = {
-                    "orderHash": order_hash,
-                    "remainingBaseTokenAmount": order["remainingBaseTokenAmount"]
-                }
-
-                if price in active_orders:
-                    active_orders[price][order_hash] = order_dict
-                else:
-                    active_orders[price] = {
-                        order_hash: order_dict
-                    }
-                self._order_price_map[order_hash] = price
-
-        # Return the sorted snapshot tables.
-        cdef:
-            np.ndarray[np.float64_t, ndim=2] bids = np.array(
-                [[message.timestamp,
-                  float(price),
-                  sum([float(order_dict["remainingBaseTokenAmount"])
-                       for order_dict in self._active_bids[price].values()]),
-                  message.update_id]
-                 for price in sorted(self._active_bids.keys(), reverse=True)], dtype="float64", ndmin=2)
-            np.ndarray[np.float64_t, ndim=2] asks = np.array(
-                [[message.timestamp,
-                  float(price),
-                  sum([float(order_dict["remainingBaseTokenAmount"])
-                       for order_dict in self._active_asks[price].values()]),
-                  message.update_id]
-                 for price in sorted(self._active_asks.keys(), reverse=True)], dtype="float64", ndmin=2)
-
-        # If there're no rows, the shape would become (1, 0) and not (0, 4).
-        # Reshape to fix that.
-        if bids.shape[1] != 4:
-            bids = bids.reshape((0, 4))
-        if asks.shape[1] != 4:
-            asks = asks.reshape((0, 4))
-
-        return bids, asks
+                self._level3_book.addOrder(order_hash.encode("utf8"),
+                                           is_bid,
+                                           self.c_price_to_ticks(order["price"]),
+                                           float(order["remainingBaseTokenAmount"]))
 
     cdef np.ndarray[np.float64_t, ndim=1] c_convert_trade_message_to_np_array(self, object message):
         cdef:
@@ -247,16 +79,3 @@ cdef class RadarRelayActiveOrderTracker:
 
         return np.array([message.timestamp, trade_type_value, float(price), float(filled_base_amount)],
                         dtype="float64")
-
-
-    def convert_diff_message_to_order_book_row(self, message):
-        np_bids, np_asks = self.c_convert_diff_message_to_np_arrays(message)
-        bids_row = [OrderBookRow(price, qty, update_id) for ts, price, qty, update_id in np_bids]
-        asks_row = [OrderBookRow(price, qty, update_id) for ts, price, qty, update_id in np_asks]
-        return bids_row, asks_row
-
-    def convert_snapshot_message_to_order_book_row(self, message):
-        np_bids, np_asks = self.c_convert_snapshot_message_to_np_arrays(message)
-        bids_row = [OrderBookRow(price, qty, update_id) for ts, price, qty, update_id in np_bids]
-        asks_row = [OrderBookRow(price, qty, update_id) for ts, price, qty, update_id in np_asks]
-        return bids_row, asks_row
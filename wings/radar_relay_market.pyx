@@ -27,6 +27,7 @@ from .order_book cimport OrderBook
 from wings.cancellation_result import CancellationResult
 from wings.order_book_tracker import OrderBookTrackerDataSourceType
 from wings.tracker.radar_relay_order_book_tracker import RadarRelayOrderBookTracker
+from wings.tracker.order_book_tracker_registry import OrderBookTrackerRegistry
 from wings.events import (
     MarketEvent,
     BuyOrderCreatedEvent,
@@ -222,8 +223,9 @@ cdef class RadarRelayMarket(MarketBase):
                  wallet_spender_address: str = ZERO_EX_MAINNET_ERC20_PROXY,
                  symbols: Optional[List[str]] = None):
         super().__init__()
-        self._order_book_tracker = RadarRelayOrderBookTracker(data_source_type=order_book_tracker_data_source_type,
-                                                              symbols=symbols)
+        self._order_book_tracker = OrderBookTrackerRegistry.get_tracker(RadarRelayOrderBookTracker,
+                                                                        symbols,
+                                                                        order_book_tracker_data_source_type)
         self._account_balances = {}
         self._ev_loop = asyncio.get_event_loop()
         self._poll_notifier = asyncio.Event()
@@ -880,6 +882,14 @@ cdef class RadarRelayMarket(MarketBase):
         self._pending_approval_tx_hashes.update(tx_hashes)
         self._approval_tx_polling_task = asyncio.ensure_future(self._approval_tx_polling_loop())
 
+    cdef c_stop(self, Clock clock):
+        MarketBase.c_stop(self, clock)
+        if self._order_tracker_task is not None:
+            self._order_tracker_task.cancel()
+            self._order_tracker_task = None
+        # Drop the market's subscriptions to the shared order book tracker, which stops after its last consumer.
+        self._order_book_tracker.release()
+
     cdef c_tick(self, double timestamp):
         cdef:
             int64_t last_tick = <int64_t>(self._last_timestamp / self._poll_interval)
@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+
+import asyncio
+import logging
+import time
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Set
+)
+
+
+class ScheduledRequest:
+    """
+    Holds one of the scheduler's concurrent request slots, and the request's weight from its budget, for the duration
+    of an `async with` block.
+    """
+    def __init__(self, scheduler: "RequestScheduler", weight: float):
+        self._scheduler: RequestScheduler = scheduler
+        self._weight: float = weight
+        self._concurrency: Optional[asyncio.Semaphore] = None
+
+    async def __aenter__(self):
+        self._concurrency = self._scheduler.concurrency_semaphore
+        await self._concurrency.acquire()
+        try:
+            await self._scheduler.acquire(self._weight)
+        except BaseException:
+            self._concurrency.release()
+            raise
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self._concurrency.release()
+
+
+class RequestScheduler:
+    """
+    Paces requests to an exchange's REST API to stay within its rate limits, following the request weight model of
+    e.g. Binance: every request costs a weight, and an API client may spend up to weight_limit every interval seconds.
+
+    The budget is a token bucket, which starts full and refills continuously at weight_limit per interval. Requests wait
+    for their weight in the order they're made, and up to max_concurrency of them run at the same time. Data sources
+    share one scheduler per exchange, so snapshot bootstraps, refreshes and resyncs all draw from the same budget.
+
+    Since the shared scheduler outlives event loops - e.g. across tests - its asyncio lock and semaphore are created
+    for the event loop they're used from, rather than in __init__.
+    """
+    _rs_logger: Optional[logging.Logger] = None
+
+    @classmethod
+    def logger(cls) -> logging.Logger:
+        if cls._rs_logger is None:
+            cls._rs_logger = logging.getLogger(__name__)
+        return cls._rs_logger
+
+    def __init__(self, weight_limit: float, interval: float, max_concurrency: int = 10):
+        if weight_limit <= 0 or interval <= 0:
+            raise ValueError(f"Request weight limit and interval must be positive, got {weight_limit} per {interval}s.")
+        if max_concurrency < 1:
+            raise ValueError(f"max_concurrency must be positive, got {max_concurrency}.")
+        self._weight_limit: float = weight_limit
+        self._interval: float = interval
+        self._available_weight: float = weight_limit
+        self._last_refill_time: float = time.monotonic()
+        self._resume_time: float = 0.0
+        self._max_concurrency: int = max_concurrency
+        self._ev_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._concurrency: Optional[asyncio.Semaphore] = None
+        self._request_count: int = 0
+        self._request_weight: float = 0.0
+        self._wait_time: float = 0.0
+
+    @property
+    def weight_limit(self) -> float:
+        return self._weight_limit
+
+    @property
+    def interval(self) -> float:
+        return self._interval
+
+    def _check_event_loop(self):
+        """
+        Creates the lock and semaphore for the current event loop, if they were created for another one.
+        """
+        ev_loop: asyncio.AbstractEventLoop = asyncio.get_event_loop()
+        if ev_loop is not self._ev_loop:
+            self._ev_loop = ev_loop
+            self._lock = asyncio.Lock()
+            self._concurrency = asyncio.Semaphore(self._max_concurrency)
+
+    @property
+    def concurrency_semaphore(self) -> asyncio.Semaphore:
+        """
+        Limits the number of concurrent requests to max_concurrency, on the current event loop.
+        """
+        self._check_event_loop()
+        return self._concurrency
+
+    @property
+    def available_weight(self) -> float:
+        self._refill()
+        return self._available_weight
+
+    @property
+    def stats(self) -> Dict[str, float]:
+        return {
+            "requests": self._request_count,
+            "weight": self._request_weight,
+            "wait_time": self._wait_time,
+            "available_weight": self.available_weight
+        }
+
+    def _refill(self):
+        now: float = time.monotonic()
+        self._available_weight = min(
+            self._weight_limit,
+            self._available_weight + (now - self._last_refill_time) * self._weight_limit / self._interval
+        )
+        self._last_refill_time = now
+
+    def sync_used_weight(self, used_weight: float):
+        """
+        Lowers the available weight to what the exchange reports is left - e.g. from Binance's X-MBX-USED-WEIGHT
+        response header - which also counts the requests made outside this scheduler.
+        """
+        self._refill()
+        self._available_weight = min(self._available_weight, self._weight_limit - used_weight)
+
+    def pause(self, seconds: float):
+        """
+        Holds back all requests for the given number of seconds, e.g. after the exchange responded with HTTP 429 and
+        a Retry-After header.
+        """
+        self._resume_time = max(self._resume_time, time.monotonic() + seconds)
+        self.logger().warning(f"Request rate limit exceeded. Pausing requests for {seconds:.1f} seconds.")
+
+    async def acquire(self, weight: float):
+        """
+        Waits until the weight can be spent without exceeding the rate limit, and spends it. Weights above the limit are
+        capped to it, so they still go through once the budget is full.
+        """
+        weight = min(weight, self._weight_limit)
+        start_time: float = time.monotonic()
+        self._check_event_loop()
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._last_refill_time < self._resume_time:
+                    await asyncio.sleep(self._resume_time - self._last_refill_time)
+                elif self._available_weight < weight:
+                    await asyncio.sleep((weight - self._available_weight) * self._interval / self._weight_limit)
+                else:
+                    break
+            self._available_weight -= weight
+        self._request_count += 1
+        self._request_weight += weight
+        self._wait_time += time.monotonic() - start_time
+
+    def request(self, weight: float) -> ScheduledRequest:
+        """
+        Usage: `async with scheduler.request(weight): ...` around a single API request.
+        """
+        return ScheduledRequest(self, weight)
+
+    async def fetch_all(self,
+                        keys: List[str],
+                        fetch: Callable[[str], Awaitable[Any]],
+                        weight: float,
+                        priority_keys: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Calls fetch() for every key concurrently, as fast as the rate limit allows, with the keys in priority_keys
+        going first. Returns the results by key in the order they were scheduled, leaving out the keys whose fetch
+        failed.
+        """
+        key_set: Set[str] = set(keys)
+        ordered_keys: List[str] = [key for key in dict.fromkeys(priority_keys or []) if key in key_set]
+        prioritized_keys: Set[str] = set(ordered_keys)
+        ordered_keys += [key for key in keys if key not in prioritized_keys]
+
+        async def fetch_one(key: str) -> Any:
+            async with self.request(weight):
+                return await fetch(key)
+
+        results: List[Any] = await asyncio.gather(*[fetch_one(key) for key in ordered_keys], return_exceptions=True)
+        retval: Dict[str, Any] = {}
+        for key, result in zip(ordered_keys, results):
+            if isinstance(result, Exception):
+                self.logger().error(f"Error fetching {key}.", exc_info=(type(result), result, result.__traceback__))
+            elif isinstance(result, BaseException):
+                raise result
+            else:
+                retval[key] = result
+        return retval
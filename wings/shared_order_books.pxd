@@ -0,0 +1,44 @@
+# distutils: language=c++
+
+from libc.stdint cimport (
+    int64_t,
+    uint32_t,
+    uint64_t
+)
+
+from .order_book cimport OrderBook
+
+
+cdef struct SharedOrderBookSlotHeader:
+    uint64_t sequence
+    int64_t update_id
+    int64_t order_book_version
+    uint32_t bid_count
+    uint32_t ask_count
+
+
+cdef class SharedOrderBooks:
+    cdef str _path
+    cdef object _file
+    cdef object _mmap
+    cdef unsigned char[:] _view
+    cdef char *_slots
+    cdef size_t _slot_size
+    cdef size_t _depth
+    cdef list _symbols
+    cdef dict _slot_indices
+    cdef list _bid_arrays
+    cdef list _ask_arrays
+    cdef list _published_order_books
+
+    cdef Py_ssize_t c_get_slot_index(self, str symbol) except -1
+    cdef SharedOrderBookSlotHeader *c_get_slot(self, size_t slot_index)
+    cdef c_publish(self, size_t slot_index, OrderBook order_book)
+    cdef bint c_read(self,
+                     size_t slot_index,
+                     size_t max_rows,
+                     double *bids,
+                     size_t *bid_count,
+                     double *asks,
+                     size_t *ask_count,
+                     int64_t *update_id)
@@ -0,0 +1,243 @@
+# distutils: language=c++
+# distutils: sources=wings/cpp/SeqLock.cpp
+
+import mmap
+import os
+import struct
+import time
+from typing import (
+    List,
+    Tuple
+)
+
+from libc.math cimport (
+    INFINITY,
+    NAN
+)
+from libc.string cimport memcpy
+import numpy as np
+cimport numpy as np
+
+from .order_book cimport OrderBook
+from .SeqLock cimport SeqLock
+
+# Binary layout of the shared order books file. The header holds the magic bytes, format version, number of slots, the
+# depth of each side and the size of a slot, followed by a table of slot symbols - UTF-8, NUL padded. The slots start at
+# the next multiple of SLOT_ALIGNMENT bytes, and each holds a SharedOrderBookSlotHeader followed by the [price, amount,
+# update_id] rows of its bids and then its asks.
+SHARED_ORDER_BOOKS_MAGIC = b"HBSB"
+SHARED_ORDER_BOOKS_VERSION = 1
+SHARED_ORDER_BOOKS_HEADER = struct.Struct("<4sHxxIIQ")
+SYMBOL_SIZE = 32
+cdef size_t HEADER_SIZE = 64
+cdef size_t SLOT_ALIGNMENT = 64
+cdef size_t SLOT_HEADER_SIZE = 64
+cdef size_t ROW_SIZE = 3 * sizeof(double)
+# Reads spin this many times on a slot being written, then yield the CPU in case the writer was preempted, and give up
+# after READ_TIMEOUT seconds - e.g. if the writing process died halfway through an update.
+cdef int READ_SPIN_COUNT = 1000
+cdef double READ_TIMEOUT = 1.0
+
+
+cdef size_t _align(size_t size):
+    return (size + SLOT_ALIGNMENT - 1) // SLOT_ALIGNMENT * SLOT_ALIGNMENT
+
+
+cdef class SharedOrderBooks:
+    """
+    The top price levels of a fixed set of order books, in a memory mapped file shared between processes.
+
+    Each order book has a slot of up to `depth` bid and ask levels, which a single writing process updates with
+    publish(), and any number of processes read without locks - every slot is guarded by a seqlock, so readers retry
+    instead of ever seeing a half written update, and never block the writer.
+    """
+    def __init__(self, path: str):
+        cdef:
+            size_t slot_count
+            size_t slots_offset
+            size_t slot_offset
+
+        self._path = path
+        self._file = open(path, "r+b")
+        self._mmap = mmap.mmap(self._file.fileno(), 0)
+        magic, format_version, slot_count, self._depth, self._slot_size = \
+            SHARED_ORDER_BOOKS_HEADER.unpack_from(self._mmap, 0)
+        if magic != SHARED_ORDER_BOOKS_MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a shared order books file.")
+        if format_version != SHARED_ORDER_BOOKS_VERSION:
+            self.close()
+            raise ValueError(f"Unsupported shared order books format version {format_version}.")
+
+        self._symbols = [
+            self._mmap[HEADER_SIZE + i * SYMBOL_SIZE:HEADER_SIZE + (i + 1) * SYMBOL_SIZE].rstrip(b"\0").decode("utf8")
+            for i in range(slot_count)
+        ]
+        self._slot_indices = {symbol: index for index, symbol in enumerate(self._symbols)}
+        slots_offset = _align(HEADER_SIZE + slot_count * SYMBOL_SIZE)
+        self._view = self._mmap
+        self._slots = <char *> &self._view[slots_offset] if slot_count > 0 else NULL
+        self._bid_arrays = []
+        self._ask_arrays = []
+        # The order book last published into each slot by this process, to skip republishing unchanged ones.
+        self._published_order_books = [None] * slot_count
+        for i in range(slot_count):
+            slot_offset = slots_offset + i * self._slot_size + SLOT_HEADER_SIZE
+            self._bid_arrays.append(np.frombuffer(self._mmap, dtype="float64", count=self._depth * 3,
+                                                  offset=slot_offset).reshape(self._depth, 3))
+            self._ask_arrays.append(np.frombuffer(self._mmap, dtype="float64", count=self._depth * 3,
+                                                  offset=slot_offset + self._depth * ROW_SIZE).reshape(self._depth, 3))
+
+    @classmethod
+    def create(cls, path: str, symbols: List[str], depth: int) -> "SharedOrderBooks":
+        """
+        Creates the shared order books file at path, with empty slots for the symbols, and opens it.
+        """
+        cdef:
+            size_t slot_size = _align(SLOT_HEADER_SIZE + 2 * depth * ROW_SIZE)
+            size_t slots_offset = _align(HEADER_SIZE + len(symbols) * SYMBOL_SIZE)
+            bytearray header = bytearray(slots_offset)
+
+        if depth < 1:
+            raise ValueError(f"depth must be positive, got {depth}.")
+        SHARED_ORDER_BOOKS_HEADER.pack_into(header, 0, SHARED_ORDER_BOOKS_MAGIC, SHARED_ORDER_BOOKS_VERSION,
+                                            len(symbols), depth, slot_size)
+        for index, symbol in enumerate(symbols):
+            symbol_bytes = symbol.encode("utf8")
+            if len(symbol_bytes) >= SYMBOL_SIZE:
+                raise ValueError(f"Symbol {symbol} is longer than {SYMBOL_SIZE - 1} bytes.")
+            header[HEADER_SIZE + index * SYMBOL_SIZE:HEADER_SIZE + index * SYMBOL_SIZE + len(symbol_bytes)] = \
+                symbol_bytes
+        with open(path, "wb") as fd:
+            fd.write(header)
+            fd.truncate(slots_offset + len(symbols) * slot_size)
+        return cls(path)
+
+    def close(self):
+        self._bid_arrays = []
+        self._ask_arrays = []
+        self._published_order_books = []
+        self._slots = NULL
+        self._view = None
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @property
+    def symbols(self) -> List[str]:
+        return list(self._symbols)
+
+    @property
+    def depth(self) -> int:
+        return self._depth
+
+    cdef Py_ssize_t c_get_slot_index(self, str symbol) except -1:
+        slot_index = self._slot_indices.get(symbol)
+        if slot_index is None:
+            raise KeyError(f"{symbol} has no slot in {self._path}.")
+        return slot_index
+
+    cdef SharedOrderBookSlotHeader *c_get_slot(self, size_t slot_index):
+        return <SharedOrderBookSlotHeader *> (self._slots + slot_index * self._slot_size)
+
+    cdef c_publish(self, size_t slot_index, OrderBook order_book):
+        cdef:
+            SharedOrderBookSlotHeader *slot = self.c_get_slot(slot_index)
+            uint64_t write_sequence
+
+        if self._published_order_books[slot_index] is order_book and slot.order_book_version == order_book._version:
+            return
+        write_sequence = SeqLock.beginWrite(&slot.sequence)
+        slot.bid_count = order_book.c_fill_snapshot_array(False, self._bid_arrays[slot_index], self._depth, INFINITY)
+        slot.ask_count = order_book.c_fill_snapshot_array(True, self._ask_arrays[slot_index], self._depth, INFINITY)
+        slot.update_id = max(order_book._snapshot_uid, order_book._last_diff_uid)
+        slot.order_book_version = order_book._version
+        SeqLock.endWrite(&slot.sequence, write_sequence)
+        self._published_order_books[slot_index] = order_book
+
+    cdef bint c_read(self,
+                     size_t slot_index,
+                     size_t max_rows,
+                     double *bids,
+                     size_t *bid_count,
+                     double *asks,
+                     size_t *ask_count,
+                     int64_t *update_id):
+        cdef:
+            SharedOrderBookSlotHeader *slot = self.c_get_slot(slot_index)
+            char *rows = (<char *> slot) + SLOT_HEADER_SIZE
+            uint64_t read_sequence
+            int spin
+            double deadline = 0
+
+        while True:
+            for spin in range(READ_SPIN_COUNT):
+                read_sequence = SeqLock.beginRead(&slot.sequence)
+                if read_sequence & 1:
+                    continue
+                bid_count[0] = min(<size_t> slot.bid_count, max_rows)
+                ask_count[0] = min(<size_t> slot.ask_count, max_rows)
+                update_id[0] = slot.update_id
+                memcpy(bids, rows, bid_count[0] * ROW_SIZE)
+                memcpy(asks, rows + self._depth * ROW_SIZE, ask_count[0] * ROW_SIZE)
+                if SeqLock.validateRead(&slot.sequence, read_sequence):
+                    return True
+            if deadline == 0:
+                deadline = time.monotonic() + READ_TIMEOUT
+            elif time.monotonic() > deadline:
+                return False
+            time.sleep(0)
+
+    def publish(self, symbol: str, order_book: OrderBook):
+        """
+        Writes the top price levels of the order book into the symbol's slot, unless the order book hasn't changed
+        since it was last published. Only one process may publish each symbol.
+        """
+        self.c_publish(self.c_get_slot_index(symbol), order_book)
+
+    def get_sequence(self, symbol: str) -> int:
+        """
+        The number of times the symbol's slot was published. Readers can skip reading slots whose sequence hasn't
+        changed.
+        """
+        return self.c_get_slot(self.c_get_slot_index(symbol)).sequence // 2
+
+    def get_depth(self, symbol: str) -> Tuple[np.ndarray, np.ndarray, int]:
+        """
+        Returns the published bid and ask levels of the symbol as [price, amount, update_id] arrays, from the best price
+        downwards, and the order book's update ID.
+        """
+        cdef:
+            np.ndarray[np.float64_t, ndim=2] bids = np.empty((self._depth, 3), dtype="float64")
+            np.ndarray[np.float64_t, ndim=2] asks = np.empty((self._depth, 3), dtype="float64")
+            size_t bid_count
+            size_t ask_count
+            int64_t update_id
+
+        if not self.c_read(self.c_get_slot_index(symbol), self._depth, <double *> bids.data, &bid_count,
+                           <double *> asks.data, &ask_count, &update_id):
+            raise RuntimeError(f"Can't read a consistent order book for {symbol} from {self._path}.")
+        return bids[:bid_count], asks[:ask_count], update_id
+
+    def get_top_of_book(self, symbol: str) -> Tuple[float, float, float, float]:
+        """
+        Returns the symbol's best bid price and amount, and best ask price and amount - NaN for an empty side.
+        """
+        cdef:
+            double bid[3]
+            double ask[3]
+            size_t bid_count
+            size_t ask_count
+            int64_t update_id
+
+        if not self.c_read(self.c_get_slot_index(symbol), 1, bid, &bid_count, ask, &ask_count, &update_id):
+            raise RuntimeError(f"Can't read a consistent order book for {symbol} from {self._path}.")
+        return (bid[0] if bid_count > 0 else NAN, bid[1] if bid_count > 0 else NAN,
+                ask[0] if ask_count > 0 else NAN, ask[1] if ask_count > 0 else NAN)
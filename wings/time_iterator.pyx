@@ -18,6 +18,9 @@ cdef class TimeIterator(PubSub):
     cdef c_tick(self, double timestamp):
         self._current_timestamp = timestamp
 
+    cdef c_stop(self, Clock clock):
+        pass
+
     @property
     def current_timestamp(self) -> float:
         return self._current_timestamp
@@ -27,4 +30,7 @@ cdef class TimeIterator(PubSub):
         return self._clock
 
     def start(self, clock: Clock):
-        self.c_start(clock, clock.current_timestamp)
\ No newline at end of file
+        self.c_start(clock, clock.current_timestamp)
+
+    def stop(self, clock: Optional[Clock] = None):
+        self.c_stop(clock)
@@ -3,23 +3,26 @@
 import asyncio
 from collections import deque, defaultdict
 import logging
-import time
 from typing import (
     Deque,
     Dict,
     List,
     Optional
 )
+
+import conf
 from wings.model.sql_connection_manager import SQLConnectionManager
 from wings.order_book_tracker import (
+    OrderBookMessageBuffer,
     OrderBookTracker,
     OrderBookTrackerDataSourceType)
 from wings.data_source.binance_local_cluster_order_book_data_source import BinanceLocalClusterOrderBookDataSource
 from wings.data_source.order_book_tracker_data_source import OrderBookTrackerDataSource
 from wings.data_source.remote_api_order_book_data_source import RemoteAPIOrderBookDataSource
 from wings.data_source.binance_api_order_book_data_source import BinanceAPIOrderBookDataSource
+from wings.data_source.order_book_server_data_source import OrderBookServerDataSource
 from wings.order_book import OrderBook
-from wings.order_book_message import OrderBookMessage, OrderBookMessageType
+from wings.order_book_message import OrderBookMessage
 
 
 class BinanceOrderBookTracker(OrderBookTracker):
@@ -33,16 +36,18 @@ class BinanceOrderBookTracker(OrderBookTracker):
 
     def __init__(self,
                  data_source_type: OrderBookTrackerDataSourceType = OrderBookTrackerDataSourceType.LOCAL_CLUSTER,
-                 symbols: Optional[List[str]] = None):
+                 symbols: Optional[List[str]] = None,
+                 snapshot_refresh_interval: Optional[float] = BinanceAPIOrderBookDataSource.SNAPSHOT_REFRESH_INTERVAL,
+                 priority_symbols: Optional[List[str]] = None):
         super().__init__(data_source_type=data_source_type)
 
-        self._order_book_diff_stream: asyncio.Queue = asyncio.Queue()
-        self._order_book_snapshot_stream: asyncio.Queue = asyncio.Queue()
         self._ev_loop: asyncio.BaseEventLoop = asyncio.get_event_loop()
         self._data_source: Optional[OrderBookTrackerDataSource] = None
         self._process_msg_deque_task: Optional[asyncio.Task] = None
         self._saved_message_queues: Dict[str, Deque[OrderBookMessage]] = defaultdict(lambda: deque(maxlen=1000))
         self._symbols: Optional[List[str]] = symbols
+        self._snapshot_refresh_interval: Optional[float] = snapshot_refresh_interval
+        self._priority_symbols: Optional[List[str]] = priority_symbols
 
     @property
     def data_source(self) -> OrderBookTrackerDataSource:
@@ -53,7 +58,13 @@ class BinanceOrderBookTracker(OrderBookTracker):
             elif self._data_source_type is OrderBookTrackerDataSourceType.REMOTE_API:
                 self._data_source = RemoteAPIOrderBookDataSource()
             elif self._data_source_type is OrderBookTrackerDataSourceType.EXCHANGE_API:
-                self._data_source = BinanceAPIOrderBookDataSource(symbols=self._symbols)
+                self._data_source = BinanceAPIOrderBookDataSource(
+                    symbols=self._symbols,
+                    snapshot_refresh_interval=self._snapshot_refresh_interval,
+                    priority_symbols=self._priority_symbols
+                )
+            elif self._data_source_type is OrderBookTrackerDataSourceType.ORDER_BOOK_SERVER:
+                self._data_source = OrderBookServerDataSource(conf.order_book_server_address, symbols=self._symbols)
             else:
                 raise ValueError(f"data_source_type {self._data_source_type} is not supported.")
         return self._data_source
@@ -86,93 +97,24 @@ class BinanceOrderBookTracker(OrderBookTracker):
                              self._refresh_tracking_task,
                              )
 
-    async def _order_book_diff_router(self):
-        """
-        Route the real-time order book diff messages to the correct order book.
-        """
-        last_message_timestamp: float = time.time()
-        messages_queued: int = 0
-        messages_accepted: int = 0
-        messages_rejected: int = 0
-
-        while True:
-            try:
-                ob_message: OrderBookMessage = await self._order_book_diff_stream.get()
-                symbol: str = ob_message.symbol
-
-                if symbol not in self._tracking_message_queues:
-                    messages_queued += 1
-                    # Save diff messages received before snapshots are ready
-                    self._saved_message_queues[symbol].append(ob_message)
-                    continue
-                message_queue: asyncio.Queue = self._tracking_message_queues[symbol]
-                # Check the order book's initial update ID. If it's larger, don't bother.
-                order_book: OrderBook = self._order_books[symbol]
-
-                if order_book.snapshot_uid > ob_message.update_id:
-                    messages_rejected += 1
-                    continue
-                await message_queue.put(ob_message)
-                messages_accepted += 1
-
-                # Log some statistics.
-                now: float = time.time()
-                if int(now / 60.0) > int(last_message_timestamp / 60.0):
-                    self.logger().info("Diff messages processed: %d, rejected: %d, queued: %d",
-                                       messages_accepted,
-                                       messages_rejected,
-                                       messages_queued)
-                    messages_accepted = 0
-                    messages_rejected = 0
-                    messages_queued = 0
-
-                last_message_timestamp = now
-            except asyncio.CancelledError:
-                raise
-            except Exception:
-                self.logger().error("Unknown error. Retrying after 5 seconds.", exc_info=True)
-                await asyncio.sleep(5.0)
-
-    async def _track_single_book(self, symbol: str):
-        past_diffs_window: Deque[OrderBookMessage] = deque()
-        self._past_diffs_windows[symbol] = past_diffs_window
-
-        message_queue: asyncio.Queue = self._tracking_message_queues[symbol]
-        order_book: OrderBook = self._order_books[symbol]
-        last_message_timestamp: float = time.time()
-        diff_messages_accepted: int = 0
-
-        while True:
-            try:
-                message: OrderBookMessage = None
-                saved_messages: Deque[OrderBookMessage] = self._saved_message_queues[symbol]
-
-                # Process saved messages first if there are any
-                if len(saved_messages) > 0:
-                    message = saved_messages.popleft()
-                else:
-                    message = await message_queue.get()
-
-                if message.type is OrderBookMessageType.DIFF:
-                    order_book.apply_diffs(message.bids, message.asks, message.update_id)
-                    past_diffs_window.append(message)
-                    while len(past_diffs_window) > self.PAST_DIFF_WINDOW_SIZE:
-                        past_diffs_window.popleft()
-                    diff_messages_accepted += 1
-
-                    # Output some statistics periodically.
-                    now: float = time.time()
-                    if int(now / 60.0) > int(last_message_timestamp / 60.0):
-                        self.logger().info("Processed %d order book diffs for %s.",
-                                           diff_messages_accepted, symbol)
-                        diff_messages_accepted = 0
-                    last_message_timestamp = now
-                elif message.type is OrderBookMessageType.SNAPSHOT:
-                    past_diffs: List[OrderBookMessage] = list(past_diffs_window)
-                    order_book.restore_from_snapshot_and_diffs(message, past_diffs)
-                    self.logger().debug("Processed order book snapshot for %s.", symbol)
-            except asyncio.CancelledError:
-                raise
-            except Exception:
-                self.logger().error("Unknown error. Retrying after 5 seconds.", exc_info=True)
-                await asyncio.sleep(5.0)
+    def _route_diff_message(self, message: OrderBookMessage):
+        symbol: str = message.symbol
+        if symbol not in self._tracking_message_buffers:
+            self._diff_router_counts["queued"] += 1
+            # Save diff messages received before snapshots are ready
+            self._saved_message_queues[symbol].append(message)
+            return
+        super()._route_diff_message(message)
+
+    async def _get_pending_messages(self,
+                                    symbol: str,
+                                    message_buffer: OrderBookMessageBuffer) -> List[OrderBookMessage]:
+        # Process saved messages first if there are any
+        saved_messages: Deque[OrderBookMessage] = self._saved_message_queues[symbol]
+        if len(saved_messages) > 0:
+            order_book: OrderBook = self._order_books[symbol]
+            messages: List[OrderBookMessage] = [message for message in saved_messages
+                                                if not self._is_stale_diff(order_book, message)]
+            saved_messages.clear()
+            return messages
+        return await message_buffer.drain()
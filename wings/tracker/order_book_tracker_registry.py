@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+
+import asyncio
+import logging
+from typing import (
+    Any,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    Type
+)
+
+from wings.order_book import OrderBook
+from wings.order_book_tracker import (
+    OrderBookTracker,
+    OrderBookTrackerDataSourceType
+)
+
+
+class SharedOrderBookTracker:
+    """
+    A consumer's handle on an order book tracker shared through OrderBookTrackerRegistry. It exposes the part of the
+    tracker the markets use - limited to the consumer's symbols - and keeps the consumer's subscriptions to them until
+    it's released.
+    """
+    def __init__(self, tracker_key: Tuple, tracker: OrderBookTracker, symbols: Optional[List[str]], consumer: str):
+        self._tracker_key: Tuple = tracker_key
+        self._tracker: OrderBookTracker = tracker
+        self._symbols: Optional[List[str]] = list(dict.fromkeys(symbols)) if symbols is not None else None
+        self._consumer: str = consumer
+        self._released: bool = False
+
+    @property
+    def tracker(self) -> OrderBookTracker:
+        return self._tracker
+
+    @property
+    def symbols(self) -> Optional[List[str]]:
+        return self._symbols
+
+    @property
+    def consumer(self) -> str:
+        return self._consumer
+
+    @property
+    def order_books(self) -> Dict[str, OrderBook]:
+        """
+        The shared order books of the consumer's symbols - the same OrderBook instances every other consumer of the
+        tracker sees.
+        """
+        order_books: Dict[str, OrderBook] = self._tracker.order_books
+        if self._symbols is None:
+            return order_books
+        return {symbol: order_books[symbol] for symbol in self._symbols if symbol in order_books}
+
+    def set_price_tick_size(self, symbol: str, price_tick_size: float):
+        self._tracker.set_price_tick_size(symbol, price_tick_size)
+
+    def set_fixed_point(self, symbol: str, price_tick_size: Any, amount_lot_size: Any = None):
+        self._tracker.set_fixed_point(symbol, price_tick_size, amount_lot_size)
+
+    async def start(self):
+        """
+        Starts the shared tracker if it isn't running yet, and waits on it. Cancelling this leaves the tracker running
+        for its other consumers.
+        """
+        await asyncio.shield(OrderBookTrackerRegistry.start_tracker(self._tracker_key))
+
+    def release(self):
+        """
+        Removes the consumer's subscriptions. The tracker stops once all its consumers are released.
+        """
+        if not self._released:
+            self._released = True
+            OrderBookTrackerRegistry.release(self)
+
+
+class OrderBookTrackerRegistry:
+    """
+    Shares one order book tracker - and so one set of data source connections and order books - per exchange and data
+    source type, between all the markets and strategies of the process.
+
+    Consumers get a SharedOrderBookTracker handle from get_tracker(), which subscribes to their symbols in the shared
+    tracker, see OrderBookTracker.subscribe(). Consumers that don't name their symbols track all the exchange's active
+    markets, so they share a separate tracker that isn't limited to subscribed symbols.
+    """
+    _obtr_logger: Optional[logging.Logger] = None
+    _trackers: Dict[Tuple, OrderBookTracker] = {}
+    _tracker_tasks: Dict[Tuple, asyncio.Task] = {}
+    _tracker_consumers: Dict[Tuple, List[SharedOrderBookTracker]] = {}
+    _consumer_count: int = 0
+
+    @classmethod
+    def logger(cls) -> logging.Logger:
+        if cls._obtr_logger is None:
+            cls._obtr_logger = logging.getLogger(__name__)
+        return cls._obtr_logger
+
+    @classmethod
+    def get_tracker(cls,
+                    tracker_class: Type[OrderBookTracker],
+                    symbols: Optional[List[str]] = None,
+                    data_source_type: OrderBookTrackerDataSourceType = OrderBookTrackerDataSourceType.EXCHANGE_API,
+                    consumer: Optional[str] = None,
+                    tracker_kwargs: Optional[Dict[str, Any]] = None) -> SharedOrderBookTracker:
+        """
+        Returns a handle on the shared tracker of tracker_class and data_source_type, subscribed to the symbols on
+        behalf of the consumer. tracker_kwargs only apply when the shared tracker is created.
+        """
+        cls._consumer_count += 1
+        if consumer is None:
+            consumer = f"{tracker_class.__name__}_consumer_{cls._consumer_count}"
+        tracker_key: Tuple = (tracker_class, data_source_type, symbols is None)
+        if tracker_key not in cls._trackers:
+            cls._trackers[tracker_key] = tracker_class(data_source_type=data_source_type, **(tracker_kwargs or {}))
+            cls._tracker_consumers[tracker_key] = []
+            cls.logger().info("Created shared order book tracker %s for %s.",
+                              tracker_class.__name__, "all markets" if symbols is None else "subscribed markets")
+        tracker: OrderBookTracker = cls._trackers[tracker_key]
+        shared_tracker: SharedOrderBookTracker = SharedOrderBookTracker(tracker_key, tracker, symbols, consumer)
+        for symbol in shared_tracker.symbols or []:
+            tracker.subscribe(symbol, consumer)
+        cls._tracker_consumers[tracker_key].append(shared_tracker)
+        return shared_tracker
+
+    @classmethod
+    def start_tracker(cls, tracker_key: Tuple) -> asyncio.Task:
+        """
+        Starts the shared tracker once, and returns its task.
+        """
+        tracker_task: Optional[asyncio.Task] = cls._tracker_tasks.get(tracker_key)
+        if tracker_task is None or tracker_task.done():
+            tracker_task = asyncio.ensure_future(cls._trackers[tracker_key].start())
+            cls._tracker_tasks[tracker_key] = tracker_task
+        return tracker_task
+
+    @classmethod
+    def release(cls, shared_tracker: SharedOrderBookTracker):
+        tracker_key: Tuple = shared_tracker._tracker_key
+        tracker: OrderBookTracker = cls._trackers[tracker_key]
+        consumers: List[SharedOrderBookTracker] = cls._tracker_consumers[tracker_key]
+        consumers.remove(shared_tracker)
+        if len(consumers) > 0:
+            for symbol in shared_tracker.symbols or []:
+                tracker.unsubscribe(symbol, shared_tracker.consumer)
+            return
+
+        # The last consumer's subscriptions are left as they are - updating them would wake up the tracker's tasks
+        # just as they're cancelled.
+        tracker_task: Optional[asyncio.Task] = cls._tracker_tasks.pop(tracker_key, None)
+        if tracker_task is not None:
+            tracker_task.cancel()
+        tracker.stop()
+        del cls._trackers[tracker_key]
+        del cls._tracker_consumers[tracker_key]
+        cls.logger().info("Stopped shared order book tracker %s, after its last consumer was released.",
+                          type(tracker).__name__)
+
+    @classmethod
+    def consumer_counts(cls) -> Dict[str, int]:
+        """
+        Number of consumers of each shared tracker.
+        """
+        return {
+            f"{tracker_class.__name__}/{data_source_type.name}{'/all' if all_markets else ''}": len(consumers)
+            for (tracker_class, data_source_type, all_markets), consumers in cls._tracker_consumers.items()
+        }
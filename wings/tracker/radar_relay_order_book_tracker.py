@@ -14,7 +14,12 @@ from typing import (
 )
 
 from wings.data_source.radar_relay_local_cluster_order_book_data_source import RadarRelayLocalClusterOrderBookDataSource
-from wings.order_book_tracker import OrderBookTracker, OrderBookTrackerDataSourceType
+from wings.order_book_tracker import (
+    OrderBookConflationPolicy,
+    OrderBookMessageBuffer,
+    OrderBookTracker,
+    OrderBookTrackerDataSourceType
+)
 from wings.data_source.order_book_tracker_data_source import OrderBookTrackerDataSource
 from wings.data_source.radar_relay_api_order_book_data_source import RadarRelayAPIOrderBookDataSource
 from wings.order_book_message import OrderBookMessageType, RadarRelayOrderBookMessage
@@ -24,6 +29,8 @@ from wings.radar_relay_active_order_tracker import RadarRelayActiveOrderTracker
 
 
 class RadarRelayOrderBookTracker(OrderBookTracker):
+    # Level 3 diffs are individual order events, which can't be merged into net price level changes.
+    CONFLATION_POLICY: OrderBookConflationPolicy = OrderBookConflationPolicy.RESYNC
     _rrobt_logger: Optional[logging.Logger] = None
 
     @classmethod
@@ -34,11 +41,10 @@ class RadarRelayOrderBookTracker(OrderBookTracker):
 
     def __init__(self,
                  data_source_type: OrderBookTrackerDataSourceType = OrderBookTrackerDataSourceType.EXCHANGE_API,
-                 symbols: Optional[List[str]] = None):
+                 symbols: Optional[List[str]] = None,
+                 priority_symbols: Optional[List[str]] = None):
         super().__init__(data_source_type=data_source_type)
 
-        self._order_book_diff_stream: asyncio.Queue = asyncio.Queue()
-        self._order_book_snapshot_stream: asyncio.Queue = asyncio.Queue()
         self._ev_loop: asyncio.BaseEventLoop = asyncio.get_event_loop()
         self._data_source: Optional[OrderBookTrackerDataSource] = None
         self._process_msg_deque_task: Optional[asyncio.Task] = None
@@ -47,18 +53,19 @@ class RadarRelayOrderBookTracker(OrderBookTracker):
         self._past_diffs_windows: Dict[str, Deque] = {}
         self._order_books: Dict[str, RadarRelayOrderBook] = {}
         self._saved_message_queues: Dict[str, Deque[RadarRelayOrderBookMessage]] = defaultdict(lambda: deque(maxlen=1000))
-        self._order_book_diff_stream: asyncio.Queue = asyncio.Queue()
-        self._order_book_snapshot_stream: asyncio.Queue = asyncio.Queue()
         self._ev_loop: asyncio.BaseEventLoop = asyncio.get_event_loop()
         self._data_source: Optional[OrderBookTrackerDataSource] = None
         self._active_order_trackers: Dict[str, RadarRelayActiveOrderTracker] = defaultdict(RadarRelayActiveOrderTracker)
         self._symbols: Optional[List[str]] = symbols
+        self._priority_symbols: Optional[List[str]] = priority_symbols
+        self._address_token_map: Optional[Dict[str, any]] = None
 
     @property
     def data_source(self) -> OrderBookTrackerDataSource:
         if not self._data_source:
             if self._data_source_type is OrderBookTrackerDataSourceType.EXCHANGE_API:
-                self._data_source = RadarRelayAPIOrderBookDataSource(symbols=self._symbols)
+                self._data_source = RadarRelayAPIOrderBookDataSource(symbols=self._symbols,
+                                                                     priority_symbols=self._priority_symbols)
             elif self._data_source_type is OrderBookTrackerDataSourceType.LOCAL_CLUSTER:
                 self._data_source = RadarRelayLocalClusterOrderBookDataSource()
             else:
@@ -92,13 +99,20 @@ class RadarRelayOrderBookTracker(OrderBookTracker):
                              self._order_book_diff_router_task,
                              self._refresh_tracking_task)
 
+    def restore(self, path: str, order_book_class: type = RadarRelayOrderBook) -> List[str]:
+        # Radar Relay order books are built from the individual orders in the active order trackers, which aren't part
+        # of the checkpoint.
+        raise NotImplementedError("Radar Relay order books can't be restored from a checkpoint.")
+
     async def _refresh_tracking_tasks(self):
         """
         Starts tracking for any new trading pairs, and stop tracking for any inactive trading pairs.
         """
         tracking_symbols: Set[str] = set([key for key in self._tracking_tasks.keys()
                                           if not self._tracking_tasks[key].done()])
-        available_pairs: Dict[str, RadarRelayOrderBookTrackerEntry] = await self.data_source.get_tracking_pairs()
+        available_pairs: Dict[str, RadarRelayOrderBookTrackerEntry] = self._get_subscribed_pairs(
+            await self.data_source.get_tracking_pairs()
+        )
         available_symbols: Set[str] = set(available_pairs.keys())
         new_symbols: Set[str] = available_symbols - tracking_symbols
         deleted_symbols: Set[str] = tracking_symbols - available_symbols
@@ -107,7 +121,8 @@ class RadarRelayOrderBookTracker(OrderBookTracker):
             order_book_tracker_entry: RadarRelayOrderBookTrackerEntry = available_pairs[symbol]
             self._active_order_trackers[symbol] = order_book_tracker_entry.active_order_tracker
             self._order_books[symbol] = order_book_tracker_entry.order_book
-            self._tracking_message_queues[symbol] = asyncio.Queue()
+            self._configure_order_book(symbol, self._order_books[symbol])
+            self._tracking_message_buffers[symbol] = self._create_message_buffer()
             self._tracking_tasks[symbol] = asyncio.ensure_future(self._track_single_book(symbol))
             self.logger().info("Started order book tracking for %s.", symbol)
 
@@ -116,108 +131,94 @@ class RadarRelayOrderBookTracker(OrderBookTracker):
             del self._tracking_tasks[symbol]
             del self._order_books[symbol]
             del self._active_order_trackers[symbol]
-            del self._tracking_message_queues[symbol]
+            del self._tracking_message_buffers[symbol]
             self.logger().info("Stopped order book tracking for %s.", symbol)
 
     async def _order_book_diff_router(self):
-        """
-        Route the real-time order book diff messages to the correct order book.
-        """
-        last_message_timestamp: float = time.time()
-        messages_queued: int = 0
-        messages_accepted: int = 0
-        messages_rejected: int = 0
-        address_token_map: Dict[str, any] = await self._data_source.get_all_token_info()
-        while True:
-            try:
-                ob_message: RadarRelayOrderBookMessage = await self._order_book_diff_stream.get()
-                base_token_address: str = ob_message.content["event"]["baseTokenAddress"]
-                quote_token_address: str = ob_message.content["event"]["quoteTokenAddress"]
-                base_token_symbol: str = address_token_map[base_token_address]["symbol"]
-                quote_token_symbol: str = address_token_map[quote_token_address]['symbol']
-                trading_pair_symbol: str = f"{base_token_symbol}-{quote_token_symbol}"
-
-                if trading_pair_symbol not in self._tracking_message_queues:
-                    messages_queued += 1
-                    # Save diff messages received before snapshots are ready
-                    self._saved_message_queues[trading_pair_symbol].append(ob_message)
-                    continue
-                message_queue: asyncio.Queue = self._tracking_message_queues[trading_pair_symbol]
-                # Check the order book's initial update ID. If it's larger, don't bother.
-                order_book: RadarRelayOrderBook = self._order_books[trading_pair_symbol]
-
-                if order_book.snapshot_uid > ob_message.update_id:
-                    messages_rejected += 1
-                    continue
-                await message_queue.put(ob_message)
-                messages_accepted += 1
-
-                # Log some statistics.
-                now: float = time.time()
-                if int(now / 60.0) > int(last_message_timestamp / 60.0):
-                    self.logger().info("Diff messages processed: %d, rejected: %d, queued: %d",
-                                       messages_accepted,
-                                       messages_rejected,
-                                       messages_queued)
-                    messages_accepted = 0
-                    messages_rejected = 0
-                    messages_queued = 0
-
-                last_message_timestamp = now
-            except asyncio.CancelledError:
-                raise
-            except Exception:
-                self.logger().error("Unknown error. Retrying after 5 seconds.", exc_info=True)
-                await asyncio.sleep(5.0)
+        self._address_token_map = await self._data_source.get_all_token_info()
+        await super()._order_book_diff_router()
+
+    def _route_diff_message(self, message: RadarRelayOrderBookMessage):
+        if self._address_token_map is None:
+            # Diffs from a full stream can't be routed before the token info is fetched. The order books start from
+            # snapshots taken after them anyway.
+            self._diff_router_counts["rejected"] += 1
+            return
+        base_token_address: str = message.content["event"]["baseTokenAddress"]
+        quote_token_address: str = message.content["event"]["quoteTokenAddress"]
+        base_token_symbol: str = self._address_token_map[base_token_address]["symbol"]
+        quote_token_symbol: str = self._address_token_map[quote_token_address]['symbol']
+        trading_pair_symbol: str = f"{base_token_symbol}-{quote_token_symbol}"
+
+        if trading_pair_symbol not in self._tracking_message_buffers:
+            self._diff_router_counts["queued"] += 1
+            # Save diff messages received before snapshots are ready
+            self._saved_message_queues[trading_pair_symbol].append(message)
+            return
+        # Check the order book's initial update ID. If it's larger, don't bother.
+        order_book: RadarRelayOrderBook = self._order_books[trading_pair_symbol]
+
+        if order_book.snapshot_uid > message.update_id:
+            self._diff_router_counts["rejected"] += 1
+            return
+        self._put_message(trading_pair_symbol, message)
+        self._diff_router_counts["accepted"] += 1
+
+    async def _get_pending_messages(self,
+                                    symbol: str,
+                                    message_buffer: OrderBookMessageBuffer) -> List[RadarRelayOrderBookMessage]:
+        # Process saved messages first if there are any
+        saved_messages: Deque[RadarRelayOrderBookMessage] = self._saved_message_queues[symbol]
+        if len(saved_messages) > 0:
+            messages: List[RadarRelayOrderBookMessage] = list(saved_messages)
+            saved_messages.clear()
+            return messages
+        return await message_buffer.drain()
 
     async def _track_single_book(self, symbol: str):
         past_diffs_window: Deque[RadarRelayOrderBookMessage] = deque()
         self._past_diffs_windows[symbol] = past_diffs_window
 
-        message_queue: asyncio.Queue = self._tracking_message_queues[symbol]
+        message_buffer: OrderBookMessageBuffer = self._tracking_message_buffers[symbol]
         order_book: RadarRelayOrderBook = self._order_books[symbol]
         active_order_tracker: RadarRelayActiveOrderTracker = self._active_order_trackers[symbol]
 
         last_message_timestamp: float = time.time()
         diff_messages_accepted: int = 0
+        # Publish the order book as it was bootstrapped or restored, before any messages are applied to it.
+        self._publish_order_book(symbol)
 
         while True:
             try:
-                message: RadarRelayOrderBookMessage = None
-                saved_messages: Deque[RadarRelayOrderBookMessage] = self._saved_message_queues[symbol]
-                # Process saved messages first if there are any
-                if len(saved_messages) > 0:
-                    message = saved_messages.popleft()
-                else:
-                    message = await message_queue.get()
-
-                if message.type is OrderBookMessageType.DIFF:
-                    bids, asks = active_order_tracker.convert_diff_message_to_order_book_row(message)
-                    order_book.apply_diffs(bids, asks, message.update_id)
-                    past_diffs_window.append(message)
-                    while len(past_diffs_window) > self.PAST_DIFF_WINDOW_SIZE:
-                        past_diffs_window.popleft()
-                    diff_messages_accepted += 1
-
-                    # Output some statistics periodically.
-                    now: float = time.time()
-                    if int(now / 60.0) > int(last_message_timestamp / 60.0):
-                        self.logger().info("Processed %d order book diffs for %s.",
-                                           diff_messages_accepted, symbol)
-                        diff_messages_accepted = 0
-                    last_message_timestamp = now
-                elif message.type is OrderBookMessageType.SNAPSHOT:
-                    past_diffs: List[RadarRelayOrderBookMessage] = list(past_diffs_window)
-                    # only replay diffs later than snapshot, first update active order with snapshot then replay diffs
-                    replay_position = bisect.bisect_right(past_diffs, message)
-                    replay_diffs = past_diffs[replay_position:]
-                    s_bids, s_asks = active_order_tracker.convert_snapshot_message_to_order_book_row(message)
-                    order_book.apply_snapshot(s_bids, s_asks, message.update_id)
-                    for diff_message in replay_diffs:
-                        d_bids, d_asks = active_order_tracker.convert_diff_message_to_order_book_row(diff_message)
-                        order_book.apply_diffs(d_bids, d_asks, diff_message.update_id)
-
-                    self.logger().debug("Processed order book snapshot for %s.", symbol)
+                for message in await self._get_pending_messages(symbol, message_buffer):
+                    if message.type is OrderBookMessageType.DIFF:
+                        active_order_tracker.apply_diff_message(order_book, message)
+                        self._record_applied_messages(symbol, [message])
+                        past_diffs_window.append(message)
+                        while len(past_diffs_window) > self.PAST_DIFF_WINDOW_SIZE:
+                            past_diffs_window.popleft()
+                        diff_messages_accepted += 1
+                    elif message.type is OrderBookMessageType.SNAPSHOT:
+                        past_diffs: List[RadarRelayOrderBookMessage] = list(past_diffs_window)
+                        # only replay diffs later than snapshot, first update active order with snapshot then
+                        # replay diffs
+                        replay_position = bisect.bisect_right(past_diffs, message)
+                        replay_diffs = past_diffs[replay_position:]
+                        active_order_tracker.apply_snapshot_message(order_book, message)
+                        for diff_message in replay_diffs:
+                            active_order_tracker.apply_diff_message(order_book, diff_message)
+                        self._record_applied_messages(symbol, [message])
+
+                        self.logger().debug("Processed order book snapshot for %s.", symbol)
+                self._publish_order_book(symbol)
+
+                # Output some statistics periodically.
+                now: float = time.time()
+                if int(now / 60.0) > int(last_message_timestamp / 60.0):
+                    self.logger().info("Processed %d order book diffs for %s, %.1f messages per wakeup.",
+                                       diff_messages_accepted, symbol, message_buffer.stats["messages_per_wakeup"])
+                    diff_messages_accepted = 0
+                last_message_timestamp = now
             except asyncio.CancelledError:
                 raise
             except Exception:
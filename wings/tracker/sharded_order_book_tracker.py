@@ -0,0 +1,211 @@
+#!/usr/bin/env python
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import tempfile
+import time
+from typing import (
+    Any,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    Type
+)
+
+from wings.data_source.order_book_tracker_data_source import OrderBookTrackerDataSource
+from wings.order_book import OrderBook
+from wings.order_book_tracker import (
+    OrderBookTracker,
+    OrderBookTrackerDataSourceType
+)
+from wings.shared_order_books import SharedOrderBooks
+
+
+def _run_tracker_shard(tracker_class: Type[OrderBookTracker],
+                       tracker_kwargs: Dict[str, Any],
+                       symbols: List[str],
+                       shared_order_books_path: str):
+    """
+    Entry point of a shard's worker process. Tracks the shard's symbols with a tracker of its own, which publishes its
+    order books into the shared order books file.
+    """
+    ev_loop: asyncio.AbstractEventLoop = asyncio.new_event_loop()
+    asyncio.set_event_loop(ev_loop)
+    shared_order_books: SharedOrderBooks = SharedOrderBooks(shared_order_books_path)
+    tracker: OrderBookTracker = tracker_class(symbols=symbols, **tracker_kwargs)
+    tracker.publish_order_books(shared_order_books)
+    try:
+        ev_loop.run_until_complete(tracker.start())
+    except KeyboardInterrupt:
+        pass
+
+
+class ShardedOrderBookTracker(OrderBookTracker):
+    """
+    Tracks order books in worker processes, so that parsing and applying the exchange's messages is spread over several
+    cores instead of sharing the main process' event loop.
+
+    The symbols are split over shard_count worker processes. Each one runs its own tracker_class tracker - with its own
+    data source and order book tracking tasks - for its symbols, and publishes the top `depth` + 1 price levels of its
+    order books into a shared memory file after every update. The main process reads them from there without locks,
+    see SharedOrderBooks.
+
+    order_books holds local copies of the top `depth` published price levels, which are updated every
+    ORDER_BOOK_SYNC_INTERVAL seconds, or by sync_order_books(). The extra published level tells the local copies
+    whether there's more depth beyond theirs, in which case quotes past it raise an EnvironmentError - see
+    OrderBook.set_max_depth(). Worker processes that exit are restarted.
+    """
+    SHARD_CHECK_INTERVAL: float = 5.0
+    ORDER_BOOK_SYNC_INTERVAL: float = 0.5
+    _sobt_logger: Optional[logging.Logger] = None
+
+    @classmethod
+    def logger(cls) -> logging.Logger:
+        if cls._sobt_logger is None:
+            cls._sobt_logger = logging.getLogger(__name__)
+        return cls._sobt_logger
+
+    def __init__(self,
+                 tracker_class: Type[OrderBookTracker],
+                 symbols: List[str],
+                 shard_count: Optional[int] = None,
+                 depth: int = 20,
+                 data_source_type: OrderBookTrackerDataSourceType = OrderBookTrackerDataSourceType.EXCHANGE_API,
+                 tracker_kwargs: Optional[Dict[str, Any]] = None):
+        super().__init__(data_source_type=data_source_type)
+        if len(symbols) < 1:
+            raise ValueError("Sharded order book tracking needs at least one symbol.")
+        shard_count = min(shard_count or os.cpu_count() or 1, len(symbols))
+        self._tracker_class: Type[OrderBookTracker] = tracker_class
+        self._tracker_kwargs: Dict[str, Any] = dict(tracker_kwargs or {}, data_source_type=data_source_type)
+        self._symbols: List[str] = list(symbols)
+        self._depth: int = depth
+        self._shard_symbols: List[List[str]] = [self._symbols[i::shard_count] for i in range(shard_count)]
+        self._shard_processes: List[Optional[multiprocessing.Process]] = [None] * shard_count
+        self._shard_restart_counts: List[int] = [0] * shard_count
+        self._shard_order_books: Optional[SharedOrderBooks] = None
+        self._synced_sequences: Dict[str, int] = {}
+        # Worker processes are spawned rather than forked, so they don't inherit the main process' event loop and
+        # connections.
+        self._mp_context = multiprocessing.get_context("spawn")
+
+    @property
+    def data_source(self) -> OrderBookTrackerDataSource:
+        raise NotImplementedError("Sharded order book trackers run their data sources in the worker processes.")
+
+    @property
+    def shard_status(self) -> List[Dict[str, Any]]:
+        """
+        The symbols, process ID, liveness and number of restarts of each worker process.
+        """
+        return [
+            {
+                "symbols": self._shard_symbols[shard_index],
+                "pid": process.pid if process is not None else None,
+                "alive": process is not None and process.is_alive(),
+                "restarts": self._shard_restart_counts[shard_index]
+            }
+            for shard_index, process in enumerate(self._shard_processes)
+        ]
+
+    def get_top_of_book(self, symbol: str) -> Tuple[float, float, float, float]:
+        """
+        Reads the best bid price and amount, and best ask price and amount of the symbol straight from shared memory.
+        """
+        if self._shard_order_books is None:
+            raise RuntimeError("The sharded order book tracker hasn't been started.")
+        return self._shard_order_books.get_top_of_book(symbol)
+
+    def sync_order_books(self):
+        """
+        Copies the price levels published since the last sync into the local order books.
+        """
+        if self._shard_order_books is None:
+            return
+        for symbol, order_book in self._order_books.items():
+            sequence: int = self._shard_order_books.get_sequence(symbol)
+            if sequence == self._synced_sequences.get(symbol, 0):
+                continue
+            try:
+                bids, asks, update_id = self._shard_order_books.get_depth(symbol)
+            except RuntimeError:
+                # The worker died halfway through an update - keep the previous copy until it's restarted.
+                continue
+            order_book.apply_snapshot(bids, asks, update_id)
+            self._synced_sequences[symbol] = sequence
+
+    def _start_shard(self, shard_index: int):
+        process: multiprocessing.Process = self._mp_context.Process(
+            target=_run_tracker_shard,
+            args=(self._tracker_class, self._tracker_kwargs, self._shard_symbols[shard_index],
+                  self._shard_order_books.path),
+            name=f"order_book_shard_{shard_index}",
+            daemon=True
+        )
+        process.start()
+        self._shard_processes[shard_index] = process
+        self.logger().info("Started order book tracking shard %d with PID %d, for %s.",
+                           shard_index, process.pid, ", ".join(self._shard_symbols[shard_index]))
+
+    def _check_shards(self):
+        """
+        Starts the worker processes that aren't running yet, and restarts the ones that exited.
+        """
+        for shard_index, process in enumerate(self._shard_processes):
+            if process is not None and process.is_alive():
+                continue
+            if process is not None:
+                self.logger().warning("Order book tracking shard %d exited with code %s. Restarting it.",
+                                      shard_index, process.exitcode)
+                self._shard_restart_counts[shard_index] += 1
+            self._start_shard(shard_index)
+
+    async def start(self):
+        shared_memory_dir: Optional[str] = "/dev/shm" if os.path.isdir("/dev/shm") else None
+        fd, path = tempfile.mkstemp(prefix="order_books_", suffix=".shm", dir=shared_memory_dir)
+        os.close(fd)
+        self._shard_order_books = SharedOrderBooks.create(path, self._symbols, self._depth + 1)
+        for symbol in self._symbols:
+            order_book: OrderBook = OrderBook()
+            self._configure_order_book(symbol, order_book)
+            if order_book.max_depth is None or order_book.max_depth > self._depth:
+                order_book.set_max_depth(self._depth)
+            self._order_books[symbol] = order_book
+
+        try:
+            last_check_timestamp: float = 0.0
+            while True:
+                if time.time() - last_check_timestamp >= self.SHARD_CHECK_INTERVAL:
+                    self._check_shards()
+                    last_check_timestamp = time.time()
+                self.sync_order_books()
+                await asyncio.sleep(self.ORDER_BOOK_SYNC_INTERVAL)
+        finally:
+            self.stop()
+            await self._join_shards()
+
+    async def _join_shards(self):
+        """
+        Waits for the terminated worker processes to exit, in the default executor so the event loop isn't blocked.
+        """
+        processes: List[multiprocessing.Process] = [process for process in self._shard_processes if process is not None]
+        self._shard_processes = [None] * len(self._shard_processes)
+        ev_loop: asyncio.AbstractEventLoop = asyncio.get_event_loop()
+        await asyncio.gather(*[ev_loop.run_in_executor(None, process.join, 5.0) for process in processes])
+
+    def stop(self):
+        """
+        Terminates the worker processes, and removes the shared memory file. The processes are joined by start().
+        """
+        super().stop()
+        for process in self._shard_processes:
+            if process is not None and process.is_alive():
+                process.terminate()
+        if self._shard_order_books is not None:
+            path: str = self._shard_order_books.path
+            self._shard_order_books.close()
+            self._shard_order_books = None
+            os.remove(path)
@@ -0,0 +1,32 @@
+# distutils: language=c++
+
+from libc.stdint cimport int64_t
+from libcpp.vector cimport vector
+cimport numpy as np
+
+
+cdef struct TradeWindowStats:
+    double volume
+    double quote_volume
+    double buy_volume
+    double sell_volume
+    int64_t buy_count
+    int64_t sell_count
+
+
+cdef class TradeTape:
+    cdef np.ndarray _trades
+    cdef double[:, :] _trades_view
+    cdef int64_t _capacity
+    cdef int64_t _trade_count
+    cdef double _last_timestamp
+    cdef double _expiry_timestamp
+    cdef vector[double] _windows
+    cdef vector[int64_t] _window_starts
+    cdef vector[TradeWindowStats] _window_stats
+
+    cdef c_add_trade(self, double timestamp, bint is_buy, double price, double amount)
+    cdef c_accumulate(self, TradeWindowStats *stats, int64_t sequence, double sign)
+    cdef c_expire_windows(self, double timestamp)
+    cdef int64_t c_find_trade(self, double timestamp)
+    cdef TradeWindowStats c_get_stats(self, double seconds, double timestamp)
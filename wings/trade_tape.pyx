@@ -0,0 +1,208 @@
+# distutils: language=c++
+
+from libc.math cimport (
+    INFINITY,
+    isnan
+)
+from libc.stdint cimport int64_t
+import numpy as np
+from typing import (
+    Dict,
+    Optional,
+    Tuple
+)
+
+from wings.events import TradeType
+
+# Columns of the trades array. The side column holds the TradeType value of each trade.
+cdef enum:
+    TRADE_TAPE_TIMESTAMP = 0
+    TRADE_TAPE_SIDE = 1
+    TRADE_TAPE_PRICE = 2
+    TRADE_TAPE_AMOUNT = 3
+
+cdef double BUY_SIDE = TradeType.BUY.value
+cdef double SELL_SIDE = TradeType.SELL.value
+
+
+cdef class TradeTape:
+    """
+    Fixed capacity record of the most recent trades of a market, stored in a NumPy array used as a ring buffer.
+
+    The volume, buy / sell volume and trade counts of a number of configured time windows are kept up to date as
+    trades are added and expire, and are read in constant time. Other windows are computed on demand, with a binary
+    search over the trade timestamps. Neither needs any allocation nor a Python loop.
+
+    Windows only cover the trades still held by the tape - once the tape is full, adding a trade drops the oldest one
+    from all windows.
+    """
+    def __init__(self, capacity: int = 4096, windows: Tuple[float, ...] = (60.0, 300.0)):
+        if capacity < 1:
+            raise ValueError(f"capacity must be positive, got {capacity}.")
+        for window in windows:
+            if not window > 0:
+                raise ValueError(f"Trade tape windows must be positive, got {window}.")
+        self._trades = np.zeros((capacity, 4), dtype="float64")
+        self._trades_view = self._trades
+        self._capacity = capacity
+        self._trade_count = 0
+        self._last_timestamp = -INFINITY
+        self._expiry_timestamp = -INFINITY
+        for window in windows:
+            self._windows.push_back(window)
+            self._window_starts.push_back(0)
+            self._window_stats.push_back(TradeWindowStats(0, 0, 0, 0, 0, 0))
+
+    cdef c_add_trade(self, double timestamp, bint is_buy, double price, double amount):
+        """
+        Appends a trade to the tape. Trades must be added in time order - an earlier timestamp than the last trade's is
+        recorded as the last trade's timestamp.
+        """
+        cdef:
+            int64_t slot = self._trade_count % self._capacity
+            int64_t dropped_sequence = self._trade_count - self._capacity
+            size_t i
+
+        if timestamp < self._last_timestamp:
+            timestamp = self._last_timestamp
+        for i in range(self._windows.size()):
+            if dropped_sequence >= 0 and self._window_starts[i] <= dropped_sequence:
+                self.c_accumulate(&self._window_stats[i], dropped_sequence, -1)
+                self._window_starts[i] = dropped_sequence + 1
+
+        self._trades_view[slot, TRADE_TAPE_TIMESTAMP] = timestamp
+        self._trades_view[slot, TRADE_TAPE_SIDE] = BUY_SIDE if is_buy else SELL_SIDE
+        self._trades_view[slot, TRADE_TAPE_PRICE] = price
+        self._trades_view[slot, TRADE_TAPE_AMOUNT] = amount
+        for i in range(self._windows.size()):
+            self.c_accumulate(&self._window_stats[i], self._trade_count, 1)
+        self._trade_count += 1
+        self._last_timestamp = timestamp
+        self.c_expire_windows(timestamp)
+
+    cdef c_accumulate(self, TradeWindowStats *stats, int64_t sequence, double sign):
+        """
+        Adds (sign = 1) or removes (sign = -1) the trade with the sequence number to / from the window stats.
+        """
+        cdef:
+            int64_t slot = sequence % self._capacity
+            double amount = self._trades_view[slot, TRADE_TAPE_AMOUNT] * sign
+
+        stats.volume += amount
+        stats.quote_volume += amount * self._trades_view[slot, TRADE_TAPE_PRICE]
+        if self._trades_view[slot, TRADE_TAPE_SIDE] == BUY_SIDE:
+            stats.buy_volume += amount
+            stats.buy_count += <int64_t> sign
+        else:
+            stats.sell_volume += amount
+            stats.sell_count += <int64_t> sign
+
+    cdef c_expire_windows(self, double timestamp):
+        """
+        Removes the trades at or before (timestamp - window) from the configured windows.
+        """
+        cdef:
+            double cutoff
+            size_t i
+
+        if timestamp <= self._expiry_timestamp:
+            return
+        self._expiry_timestamp = timestamp
+        for i in range(self._windows.size()):
+            cutoff = timestamp - self._windows[i]
+            while (self._window_starts[i] < self._trade_count and
+                   self._trades_view[self._window_starts[i] % self._capacity, TRADE_TAPE_TIMESTAMP] <= cutoff):
+                self.c_accumulate(&self._window_stats[i], self._window_starts[i], -1)
+                self._window_starts[i] += 1
+            if self._window_starts[i] == self._trade_count:
+                # Start from exact zeros again, rather than from the rounding errors of the removed trades.
+                self._window_stats[i] = TradeWindowStats(0, 0, 0, 0, 0, 0)
+
+    cdef int64_t c_find_trade(self, double timestamp):
+        """
+        Returns the sequence number of the first trade on the tape after the timestamp, or the number of trades
+        added if there's none.
+        """
+        cdef:
+            int64_t low = max(0, self._trade_count - self._capacity)
+            int64_t high = self._trade_count
+            int64_t middle
+
+        while low < high:
+            middle = (low + high) // 2
+            if self._trades_view[middle % self._capacity, TRADE_TAPE_TIMESTAMP] > timestamp:
+                high = middle
+            else:
+                low = middle + 1
+        return low
+
+    cdef TradeWindowStats c_get_stats(self, double seconds, double timestamp):
+        """
+        Returns the stats of the trades within (timestamp - seconds, timestamp]. A NaN timestamp stands for the latest
+        timestamp the tape has seen.
+        """
+        cdef:
+            TradeWindowStats stats = TradeWindowStats(0, 0, 0, 0, 0, 0)
+            int64_t sequence
+            int64_t end
+            size_t i
+
+        if isnan(timestamp):
+            timestamp = self._expiry_timestamp
+        if timestamp >= self._expiry_timestamp:
+            for i in range(self._windows.size()):
+                if self._windows[i] == seconds:
+                    self.c_expire_windows(timestamp)
+                    return self._window_stats[i]
+
+        sequence = self.c_find_trade(timestamp - seconds)
+        end = self.c_find_trade(timestamp)
+        while sequence < end:
+            self.c_accumulate(&stats, sequence, 1)
+            sequence += 1
+        return stats
+
+    def add_trade(self, timestamp: float, is_buy: bool, price: float, amount: float):
+        self.c_add_trade(timestamp, is_buy, price, amount)
+
+    def get_stats(self, seconds: float, timestamp: Optional[float] = None) -> Dict[str, float]:
+        """
+        Returns the trade count, volume and VWAP of the trades within the last `seconds` before the timestamp, in total
+        and by side. The timestamp defaults to the latest timestamp the tape has seen.
+        """
+        cdef TradeWindowStats stats = self.c_get_stats(seconds, float("NaN") if timestamp is None else timestamp)
+        return {
+            "trade_count": stats.buy_count + stats.sell_count,
+            "buy_count": stats.buy_count,
+            "sell_count": stats.sell_count,
+            "volume": stats.volume,
+            "buy_volume": stats.buy_volume,
+            "sell_volume": stats.sell_volume,
+            "vwap": stats.quote_volume / stats.volume if stats.volume > 0 else float("NaN")
+        }
+
+    def get_vwap(self, seconds: float, timestamp: Optional[float] = None) -> float:
+        cdef TradeWindowStats stats = self.c_get_stats(seconds, float("NaN") if timestamp is None else timestamp)
+        return stats.quote_volume / stats.volume if stats.volume > 0 else float("NaN")
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    @property
+    def size(self) -> int:
+        return min(self._trade_count, self._capacity)
+
+    @property
+    def windows(self) -> Tuple[float, ...]:
+        return tuple(self._windows)
+
+    @property
+    def trades(self) -> np.ndarray:
+        """
+        Copy of the trades on the tape in time order, as an (n, 4) array of [timestamp, side, price, amount] rows.
+        """
+        cdef int64_t start = self._trade_count % self._capacity
+        if self._trade_count <= self._capacity:
+            return self._trades[:self._trade_count].copy()
+        return np.concatenate([self._trades[start:], self._trades[:start]])